@@ -1,13 +1,13 @@
 import re
+import json
 import dash
-from flask import request
 from dash import html, set_props, dcc
 from dash_iconify import DashIconify
 import feffery_antd_components as fac
 import feffery_utils_components as fuc
 from dash.dependencies import Input, Output, State
 from flask_principal import identity_changed, AnonymousIdentity
-from flask_login import current_user, logout_user, AnonymousUserMixin
+from flask_login import current_user, logout_user
 from feffery_dash_utils.version_utils import (
     check_python_version,
     check_dependencies_version,
@@ -28,6 +28,7 @@ from configs import BaseConfig, RouterConfig, AuthConfig
 from models.init_db import db
 from models.conversations import Conversations
 from models.logs import LoginLogs
+from models.voice_transcripts import VoiceCallTranscripts
 
 # 导入新的核心管理器
 from core.state_manager.state_manager import StateManager, State as AppState
@@ -39,6 +40,7 @@ from core.error_handler.error_handler import ErrorHandler, ErrorType, ErrorSever
 from core.performance_monitor.performance_monitor import performance_monitor, start_performance_monitoring
 from core.resource_manager.resource_manager import resource_manager, start_resource_cleanup
 from core.health_checker.health_checker import health_checker, add_health_check, start_health_checking
+from core.log_retention.log_retention import log_retention_manager, start_log_retention
 # from config.config import config  # 暂时禁用，配置整理放到后面专题
 
 # 检查Python版本
@@ -78,6 +80,11 @@ app.performance_monitor = performance_monitor
 app.resource_manager = resource_manager
 app.health_checker = health_checker
 
+# 启动登录日志过期分区清理任务，默认不开启（DatabaseConfig.login_logs_retention_months为0），
+# 开启后各worker进程通过文件锁选出唯一的进程执行清理
+start_log_retention()
+performance_monitor.register_collector("log_retention", log_retention_manager.get_stats)
+
 print("✅ 核心管理器已初始化")
 print(f"   - 状态管理器: {state_manager.get_state().value}")
 print(f"   - 事件管理器: {len(event_manager.get_registered_handlers())} 个处理器")
@@ -799,41 +806,62 @@ def root_router(pathname, trigger):
     return _404.render()
 
 
-@app.callback(
-    Input("duplicate-login-check-interval", "n_intervals"),
-    State("root-url", "pathname"),
-)
-def duplicate_login_check(n_intervals, pathname):
-    """重复登录辅助轮询检查"""
+# 重复登录辅助轮询检查
+# 在浏览器端直接请求轻量的token检查接口，不经过Dash回调；服务端基于用户身份缓存及会话token注册表做内存比对，
+# 每个用户在每个进程中最多每identity_cache_ttl/duplicate_login_token_refresh_interval秒回源数据库一次
+# 处于后台的标签页不发起检查，切回前台时立即补查一次
+app.clientside_callback(
+    """
+    async function(n_intervals) {
+        const publicPathnames = %s;
 
-    # 若当前页面属于无需校验登录状态的公共页面，结束检查
-    if pathname in RouterConfig.public_pathnames:
-        return
+        const checkSessionToken = async () => {
+            // 若当前页面属于无需校验登录状态的公共页面，结束检查
+            if (publicPathnames.includes(window.location.pathname)) {
+                return true;
+            }
+            try {
+                const response = await fetch('/api/session/token-check', {
+                    credentials: 'same-origin',
+                    cache: 'no-store'
+                });
+                if (!response.ok) {
+                    return true;
+                }
+                const result = await response.json();
+                if (!result.valid) {
+                    // 重定向到登出页
+                    window.location.assign('/logout');
+                    return false;
+                }
+            } catch (e) {
+                // 网络异常时保持当前状态，等待下次检查
+            }
+            return true;
+        };
+
+        if (!window._duplicateLoginVisibilityBound) {
+            window._duplicateLoginVisibilityBound = true;
+            document.addEventListener('visibilitychange', () => {
+                if (!document.hidden) {
+                    checkSessionToken();
+                }
+            });
+        }
 
-    # 若当前用户身份未知
-    if isinstance(current_user, AnonymousUserMixin):
-        # 重定向到登出页
-        set_props(
-            "global-redirect",
-            {"children": dcc.Location(pathname="/logout", id="global-redirect-target")},
-        )
+        if (document.hidden) {
+            return window.dash_clientside.no_update;
+        }
 
-    # 若当前用户已登录
-    elif current_user.is_authenticated:
-        match_user = Users.get_user(current_user.id)
-        # 若当前回调请求携带cookies中的session_token，当前用户数据库中的最新session_token不一致
-        if match_user.session_token != request.cookies.get(
-            BaseConfig.session_token_cookie_name
-        ):
-            # 重定向到登出页
-            set_props(
-                "global-redirect",
-                {
-                    "children": dcc.Location(
-                        pathname="/logout", id="global-redirect-target"
-                    )
-                },
-            )
+        // 已被登出时停止轮询
+        return (await checkSessionToken()) ? window.dash_clientside.no_update : true;
+    }
+    """
+    % json.dumps(RouterConfig.public_pathnames),
+    Output("duplicate-login-check-interval", "disabled"),
+    Input("duplicate-login-check-interval", "n_intervals"),
+    prevent_initial_call=True,
+)
 
 
 if __name__ == "__main__":
@@ -873,7 +901,7 @@ register_core_chat_callback(app)
 try:
     with db.connection_context():
         # 创建所有必要的表
-        db.create_tables([Users, Conversations, LoginLogs], safe=True)
+        db.create_tables([Users, Conversations, LoginLogs, VoiceCallTranscripts], safe=True)
         print("✅ 数据库表初始化完成")
 except Exception as e:
     print(f"❌ 数据库初始化失败: {e}")
@@ -399,6 +399,220 @@ window.dash_clientside = Object.assign({}, window.dash_clientside, {
             };
             
             // window.controlledLog.log('滚动监听器初始化完成');
+        },
+        // 聊天历史虚拟滚动：同步服务端已挂载的消息窗口，测量消息高度并设置窗口前后占位元素的高度
+        syncChatHistoryWindow: (rendered) => {
+            const historyContainer = document.getElementById('ai-chat-x-history');
+            if (!historyContainer || !rendered) {
+                return window.dash_clientside.no_update;
+            }
+
+            let state = window.chatHistoryWindow;
+            if (!state || state.key !== rendered.key) {
+                // 切换会话后已测量的消息高度及流式内容失效
+                state = window.chatHistoryWindow = { key: rendered.key, version: rendered.version, heights: {}, anchor: null };
+                window.chatStreamingContent = {};
+            } else if (state.version !== rendered.version) {
+                // 消息被删除后其后消息的下标前移，按下标记录的已测量高度随之平移；删除的消息未知时丢弃已测量的高度
+                if (Array.isArray(rendered.deleted)) {
+                    rendered.deleted.forEach((index) => {
+                        window.dash_clientside.clientside_basic.shiftChatHistoryHeights(state, index);
+                    });
+                } else {
+                    state.heights = {};
+                    state.anchor = null;
+                }
+            }
+            Object.assign(state, {
+                version: rendered.version,
+                start: rendered.start || 0,
+                end: rendered.end ?? rendered.count ?? 0,
+                count: rendered.count || 0,
+                windowSize: rendered.window || 0,
+                requested: null
+            });
+
+            // 首次同步时绑定滚动监听，每帧最多计算一次可视区域
+            if (!historyContainer.__chatHistoryWindowBound) {
+                historyContainer.__chatHistoryWindowBound = true;
+                let ticking = false;
+                historyContainer.addEventListener('scroll', () => {
+                    if (ticking) {
+                        return;
+                    }
+                    ticking = true;
+                    requestAnimationFrame(() => {
+                        ticking = false;
+                        window.dash_clientside.clientside_basic.updateChatHistoryViewport();
+                    });
+                }, { passive: true });
+            }
+
+            // 等待本次更新的消息完成渲染后测量
+            requestAnimationFrame(() => {
+                window.dash_clientside.clientside_basic.measureChatHistoryWindow();
+                window.dash_clientside.clientside_basic.applyStreamingContent();
+            });
+            return window.dash_clientside.no_update;
+        },
+        // 删除下标为index的消息后，平移其后消息的已测量高度及滚动锚点
+        shiftChatHistoryHeights: (state, index) => {
+            const heights = {};
+            Object.entries(state.heights).forEach(([key, height]) => {
+                const i = Number(key);
+                if (i !== index) {
+                    heights[i > index ? i - 1 : i] = height;
+                }
+            });
+            state.heights = heights;
+            if (state.anchor && state.anchor.index > index) {
+                state.anchor.index -= 1;
+            }
+        },
+        // 估算未测量消息的高度：已测量消息的平均高度
+        estimateChatMessageHeight: (state) => {
+            const heights = Object.values(state.heights);
+            return heights.length ? heights.reduce((a, b) => a + b, 0) / heights.length : 120;
+        },
+        // 测量已挂载消息的高度，设置占位元素高度，并恢复滚动锚点使可视区域内的消息位置不变
+        measureChatHistoryWindow: () => {
+            const state = window.chatHistoryWindow;
+            const historyContainer = document.getElementById('ai-chat-x-history');
+            const content = document.getElementById('ai-chat-x-history-content');
+            const topSpacer = document.getElementById('ai-chat-x-history-spacer-top');
+            const bottomSpacer = document.getElementById('ai-chat-x-history-spacer-bottom');
+            if (!state || !historyContainer || !content || !topSpacer || !bottomSpacer) {
+                return;
+            }
+
+            // 仅在已挂载元素与窗口内的消息一一对应时记录高度（无消息时为欢迎提示）
+            const children = content.children;
+            if (state.count && children.length === state.end - state.start) {
+                for (let i = 0; i < children.length; i++) {
+                    // 按相邻元素的位置差计算，包含消息间距
+                    const height = i + 1 < children.length ?
+                        children[i + 1].offsetTop - children[i].offsetTop :
+                        children[i].offsetHeight + parseFloat(window.getComputedStyle(children[i]).marginBottom || 0);
+                    if (height > 0) {
+                        state.heights[state.start + i] = height;
+                    }
+                }
+            }
+
+            const estimate = window.dash_clientside.clientside_basic.estimateChatMessageHeight(state);
+            let topHeight = 0;
+            let bottomHeight = 0;
+            for (let i = 0; i < state.start; i++) {
+                topHeight += state.heights[i] ?? estimate;
+            }
+            for (let i = state.end; i < state.count; i++) {
+                bottomHeight += state.heights[i] ?? estimate;
+            }
+            topSpacer.style.height = `${Math.round(topHeight)}px`;
+            bottomSpacer.style.height = `${Math.round(bottomHeight)}px`;
+
+            // 用户正在查看历史消息时，保持滚动锚点消息在可视区域中的位置
+            const isAtBottom = window.userScrollPosition ? window.userScrollPosition.isAtBottom() : false;
+            if (state.anchor && !isAtBottom) {
+                const anchorChild = children[state.anchor.index - state.start];
+                if (anchorChild && state.anchor.index >= state.start && state.anchor.index < state.end) {
+                    const offset = anchorChild.getBoundingClientRect().top - historyContainer.getBoundingClientRect().top;
+                    if (Math.abs(offset - state.anchor.offset) > 1) {
+                        historyContainer.scrollTop += offset - state.anchor.offset;
+                    }
+                }
+            }
+        },
+        // 按滚动位置计算可视区域内的消息，接近已挂载窗口边缘时请求服务端挂载新的窗口
+        updateChatHistoryViewport: () => {
+            const state = window.chatHistoryWindow;
+            const historyContainer = document.getElementById('ai-chat-x-history');
+            const content = document.getElementById('ai-chat-x-history-content');
+            const topSpacer = document.getElementById('ai-chat-x-history-spacer-top');
+            if (!state || !state.windowSize || !historyContainer || !content || !topSpacer) {
+                return;
+            }
+
+            // 消息列表（含顶部占位元素）在滚动区域中的起始位置
+            const containerTop = historyContainer.getBoundingClientRect().top;
+            const listTop = topSpacer.getBoundingClientRect().top - containerTop + historyContainer.scrollTop;
+            const viewTop = historyContainer.scrollTop - listTop;
+            const viewBottom = viewTop + historyContainer.clientHeight;
+
+            // 按已测量高度找到可视区域内的消息[first, last)
+            const estimate = window.dash_clientside.clientside_basic.estimateChatMessageHeight(state);
+            let offset = 0;
+            let first = -1;
+            let last = state.count;
+            for (let i = 0; i < state.count; i++) {
+                offset += state.heights[i] ?? estimate;
+                if (first < 0 && offset > viewTop) {
+                    first = i;
+                }
+                if (offset >= viewBottom) {
+                    last = i + 1;
+                    break;
+                }
+            }
+            if (first < 0) {
+                first = Math.max(state.count - 1, 0);
+            }
+
+            // 记录滚动锚点：可视区域内第一条已挂载的消息
+            const anchorIndex = Math.max(first, state.start);
+            const anchorChild = content.children[anchorIndex - state.start];
+            if (anchorChild && anchorIndex < state.end) {
+                state.anchor = {
+                    index: anchorIndex,
+                    offset: anchorChild.getBoundingClientRect().top - containerTop
+                };
+            }
+
+            // 可视区域距已挂载窗口边缘不足四分之一窗口时，请求以可视区域为中心的新窗口
+            if (state.count <= state.windowSize) {
+                return;
+            }
+            const margin = Math.floor(state.windowSize / 4);
+            const nearStart = state.start > 0 && first < state.start + margin;
+            const nearEnd = state.end < state.count && last > state.end - margin;
+            if (!nearStart && !nearEnd) {
+                return;
+            }
+            const end = Math.min(state.count, Math.max(0, Math.floor((first + last - state.windowSize) / 2)) + state.windowSize);
+            const start = Math.max(0, end - state.windowSize);
+            if ((start === state.start && end === state.end) ||
+                (state.requested && state.requested.start === start && state.requested.end === end)) {
+                return;
+            }
+            state.requested = { start, end };
+            window.dash_clientside.set_props('ai-chat-x-history-viewport', {
+                data: { key: state.key, start, end, timestamp: Date.now() }
+            });
+        },
+        // 记录流式输出中的消息内容，完成或超时后清除
+        rememberStreamingContent: (messageId, content, status) => {
+            window.chatStreamingContent = window.chatStreamingContent || {};
+            if (status === 'completed' || status === 'timeout') {
+                delete window.chatStreamingContent[messageId];
+            } else {
+                window.chatStreamingContent[messageId] = content;
+            }
+        },
+        // 流式输出中的消息被虚拟滚动卸载后重新挂载时，恢复已接收的内容
+        applyStreamingContent: () => {
+            Object.entries(window.chatStreamingContent || {}).forEach(([messageId, content]) => {
+                const messageElement = document.getElementById(messageId);
+                const contentElement = messageElement && messageElement.querySelector('p');
+                if (!contentElement) {
+                    return;
+                }
+                // 处理未闭合的代码块
+                const codeBlockCount = (content.match(/```/g) || []).length;
+                const processedContent = codeBlockCount % 2 === 1 ? content + '\n```' : content;
+                if (contentElement.textContent !== processedContent) {
+                    contentElement.textContent = processedContent;
+                }
+            });
         }
     }
 });
@@ -28,6 +28,13 @@ class VoiceWebSocketManager {
         this.voiceCallDisplayUpdateTimer = null;  // 防抖定时器
         this.voiceCallTranscriptionDisplay = null;  // 当前显示数据
         
+        // 新增：语音实时对话转录增量上传相关属性
+        this.voiceCallTranscriptSessionId = null;  // 本次通话的上传会话ID
+        this.voiceCallTranscriptSeq = 0;  // 下一个批次序号
+        this.voiceCallTranscriptQueue = [];  // 待上传（或上传失败待重试）的批次
+        this.voiceCallTranscriptSentIds = new Set();  // 已入队的消息ID，避免重复上传
+        this.voiceCallTranscriptFlushPromise = null;  // 串行上传链
+        
         // 预注册心跳回应为no-op，避免未注册报错
         this.messageHandlers.set('heartbeat_response', () => {});
         // 预注册音频消息处理器占位，避免未注册时报错
@@ -58,6 +65,8 @@ class VoiceWebSocketManager {
         // 🔧 关键修复：注册 voice_call_started 处理器（必须在构造函数中注册）
         this.registerMessageHandler('voice_call_started', (data) => {
             window.controlledLog?.log('语音通话已启动:', data);
+            // 新增：为本次通话初始化转录增量上传状态
+            this.resetVoiceCallTranscriptUpload();
             // 显示音频可视化区域
             this.showAudioVisualizer();
             // 更新音频可视化器状态
@@ -285,6 +294,12 @@ class VoiceWebSocketManager {
             // 当is_active设为False时，Dash回调会自动隐藏Drawer
             window.controlledLog?.log('✅ 语音通话已停止，Drawer将通过Dash回调自动隐藏');
             
+            // 新增：上传尚未上传的转录消息并通知服务端通话结束（仅剩最后一个小批次，挂断无需等待）
+            if (this.isVoiceCallIncrementalSaveEnabled()) {
+                this.queueVoiceCallTranscript(this.pendingVoiceCallMessages || []);
+                this.flushVoiceCallTranscriptBatches(true);
+            }
+            
             // 清理显示数据
             this.voiceCallTranscriptionDisplay = null;
             this.pendingVoiceCallMessages = [];
@@ -326,8 +341,8 @@ class VoiceWebSocketManager {
                 window.controlledLog?.log('✅ Store状态已更新为不活跃，Drawer由点击挂断按钮统一关闭');
             }
             
-            // 可选保存消息到数据库（如果启用）
-            if (window.voiceConfig && window.voiceConfig.VOICE_CALL_SAVE_TO_DATABASE) {
+            // 可选保存消息到数据库（如果启用，且未启用增量上传）
+            if (window.voiceConfig && window.voiceConfig.VOICE_CALL_SAVE_TO_DATABASE && !this.isVoiceCallIncrementalSaveEnabled()) {
                 this.saveVoiceCallMessages();
             }
         });
@@ -2234,6 +2249,12 @@ class VoiceWebSocketManager {
                 return a.timestamp - b.timestamp; // 正常按时间戳排序
             });
             
+            // 新增：将新消息加入增量上传队列（在截断显示数量之前，保证不丢消息）
+            if (this.isVoiceCallIncrementalSaveEnabled()) {
+                this.queueVoiceCallTranscript(this.pendingVoiceCallMessages);
+                this.flushVoiceCallTranscriptBatches(false);
+            }
+            
             // 清空待更新队列
             this.pendingVoiceCallMessages = [];
             
@@ -2433,6 +2454,102 @@ class VoiceWebSocketManager {
         }
     }
     
+    /**
+     * 是否启用语音实时对话转录增量上传
+     */
+    isVoiceCallIncrementalSaveEnabled() {
+        return !!(window.voiceConfig
+            && window.voiceConfig.VOICE_CALL_SAVE_TO_DATABASE
+            && window.voiceConfig.VOICE_CALL_INCREMENTAL_SAVE);
+    }
+    
+    /**
+     * 重置转录增量上传状态（每次通话开始时调用）
+     */
+    resetVoiceCallTranscriptUpload() {
+        this.voiceCallTranscriptSessionId = `voice-call-${this.sessionId || 'none'}-${Date.now()}`;
+        this.voiceCallTranscriptSeq = 0;
+        this.voiceCallTranscriptQueue = [];
+        this.voiceCallTranscriptSentIds = new Set();
+        this.voiceCallTranscriptStartedAt = Date.now();
+    }
+    
+    /**
+     * 将新消息切分为带序号的批次加入上传队列
+     */
+    queueVoiceCallTranscript(messages) {
+        if (!this.voiceCallTranscriptSessionId) {
+            this.resetVoiceCallTranscriptUpload();
+        }
+        
+        const newMessages = (messages || []).filter(msg => {
+            if (!msg || !msg.message_id || this.voiceCallTranscriptSentIds.has(msg.message_id)) {
+                return false;
+            }
+            this.voiceCallTranscriptSentIds.add(msg.message_id);
+            return true;
+        });
+        
+        const batchSize = parseInt(window.voiceConfig?.VOICE_CALL_TRANSCRIPT_BATCH_MAX_MESSAGES, 10) || 20;
+        for (let i = 0; i < newMessages.length; i += batchSize) {
+            this.voiceCallTranscriptQueue.push({
+                session_id: this.voiceCallTranscriptSessionId,
+                conversation_id: this.sessionId,
+                seq: this.voiceCallTranscriptSeq++,
+                messages: newMessages.slice(i, i + batchSize)
+            });
+        }
+    }
+    
+    /**
+     * 按序上传队列中的转录批次，失败的批次保留在队列中以相同序号重试（服务端幂等）
+     */
+    flushVoiceCallTranscriptBatches(final = false) {
+        const queue = this.voiceCallTranscriptQueue;
+        
+        // 通话结束时追加一个空的结束批次，通知服务端立即落库
+        if (final) {
+            queue.push({
+                session_id: this.voiceCallTranscriptSessionId,
+                conversation_id: this.sessionId,
+                seq: this.voiceCallTranscriptSeq++,
+                messages: [],
+                final: true,
+                // 通话时长，用于服务端按用户计量语音通话消耗
+                call_duration_ms: Date.now() - (this.voiceCallTranscriptStartedAt || Date.now())
+            });
+        }
+        
+        // 串行化上传，避免并发请求打乱批次顺序
+        this.voiceCallTranscriptFlushPromise = (this.voiceCallTranscriptFlushPromise || Promise.resolve())
+            .then(() => this.uploadVoiceCallTranscriptQueue(queue));
+        return this.voiceCallTranscriptFlushPromise;
+    }
+    
+    /**
+     * 依次上传指定队列中的批次，遇到失败即停止，等待下次重试
+     */
+    async uploadVoiceCallTranscriptQueue(queue) {
+        try {
+            while (queue.length > 0) {
+                const response = await fetch('/api/voice-call/transcript-batch', {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify(queue[0]),
+                    // 页面关闭时仍尽量完成上传
+                    keepalive: true
+                });
+                if (!response.ok) {
+                    console.error('转录批次上传失败:', response.statusText);
+                    return;
+                }
+                queue.shift();
+            }
+        } catch (error) {
+            console.error('转录批次上传失败，将在下次重试:', error);
+        }
+    }
+    
     /**
      * 注册连接处理器
      */
@@ -16,7 +16,7 @@ from views.core_pages import (
     independent_wildcard_page,
     url_params_page,
     # 系统管理相关页面
-    login_logs, users_man, chat,
+    login_logs, users_man, chat, usage_stats,
 )
 
 # 路由配置参数
@@ -192,6 +192,11 @@ def core_router(
         # 更新页面返回内容
         page_content = login_logs.render()
 
+    # 运营分析-使用统计
+    elif pathname == "/core/usage-stats":
+        # 更新页面返回内容
+        page_content = usage_stats.render()
+
     # 多标签页形式
     if page_config.get("core_layout_type") == "tabs":
         # 基于Patch进行标签页子项远程映射更新
@@ -1,19 +1,192 @@
 import dash
-from dash import Input, Output, State, ctx, set_props
+from dash import Input, Output, State, ctx, set_props, Patch
 import feffery_antd_components as fac
 from server import app
 from feffery_dash_utils.style_utils import style
 import dash.html as html
 import time  # 确保导入了time模块
 from datetime import datetime
-from components.chat_session_list import render as render_session_list
-from components.mobile_session_list import render_mobile_session_list
+from components.chat_session_list import (
+    render as render_session_list,
+    render_session_item,
+    session_item_style,
+    get_session_items,
+)
+from components.mobile_session_list import (
+    render_mobile_session_list,
+    render_mobile_session_item,
+    mobile_session_item_style,
+)
 from models.conversations import Conversations
+from core.message_store.message_store import create_messages
 from utils.log import log as log
 # 导入Conversations模型
 # 导入active_sse_connections用于会话切换时的SSE连接清理
 # 注意：这个导入可能会在模块加载时失败，所以在使用时需要动态导入
 
+
+def build_session_list_patches(session_index, current_session_id=None, selected_session_id=None,
+                               inserted=None, removed_id=None, renamed=None):
+    """
+    按客户端会话索引计算桌面端及移动端会话列表的Patch增量更新，依次处理移除、插入、改名及选中状态
+
+    Args:
+        session_index: 客户端会话索引，与两端会话列表子元素一一对应的会话ID列表
+        current_session_id: 当前选中的会话ID
+        selected_session_id: 需要选中的会话ID，None时保持当前选中状态
+        inserted: 插入到列表顶部的会话，包含key及full_title字段
+        removed_id: 需要移除的会话ID
+        renamed: 改名的会话，包含key及full_title字段
+
+    Returns:
+        (桌面端列表Patch, 移动端列表Patch, 会话索引Patch, 更新后的会话索引)，
+        会话索引中找不到需要更新的会话（客户端索引已过期）时返回None
+    """
+    keys = list(session_index or [])
+    desktop_patch, mobile_patch, index_patch = Patch(), Patch(), Patch()
+    highlighted_id = current_session_id if selected_session_id is None else selected_session_id
+
+    if removed_id is not None:
+        if removed_id not in keys:
+            return None
+        position = keys.index(removed_id)
+        for patch in (desktop_patch, mobile_patch, index_patch):
+            del patch[position]
+        keys.pop(position)
+
+    if inserted is not None:
+        selected = inserted["key"] == highlighted_id
+        desktop_patch.prepend(render_session_item(inserted, selected=selected))
+        mobile_patch.prepend(render_mobile_session_item(inserted, selected=selected))
+        index_patch.prepend(inserted["key"])
+        keys.insert(0, inserted["key"])
+
+    if renamed is not None:
+        if renamed["key"] not in keys:
+            return None
+        position = keys.index(renamed["key"])
+        selected = renamed["key"] == highlighted_id
+        desktop_patch[position] = render_session_item(renamed, selected=selected)
+        mobile_patch[position] = render_mobile_session_item(renamed, selected=selected)
+
+    if selected_session_id is not None and selected_session_id != current_session_id:
+        if selected_session_id not in keys:
+            return None
+        # 仅更新前后两个选中会话项的样式
+        for session_id, selected in ((current_session_id, False), (selected_session_id, True)):
+            if session_id in keys:
+                position = keys.index(session_id)
+                desktop_patch[position]['props']['style'] = session_item_style(selected)
+                mobile_patch[position]['props']['style'] = mobile_session_item_style(selected)
+
+    return desktop_patch, mobile_patch, index_patch, keys
+
+
+def load_session_messages(conv_id):
+    """从数据库加载会话的历史消息"""
+    conv = Conversations.get_conversation_by_conv_id(conv_id)
+    if conv and conv.conv_memory and isinstance(conv.conv_memory, dict):
+        return conv.conv_memory.get('messages', [])
+    return []
+
+
+def stop_session_sse(next_session_id):
+    """切换会话前停止当前SSE连接"""
+    try:
+        set_props("chat-X-sse", {"url": None})
+        log.debug(f"停止当前SSE连接，切换到会话: {next_session_id}")
+        try:
+            from callbacks.core_pages_c.chat_input_area_c import active_sse_connections
+            for message_id in list(active_sse_connections.keys()):
+                del active_sse_connections[message_id]
+                log.debug(f"清理SSE连接: {message_id}")
+        except ImportError:
+            pass
+    except Exception as e:
+        log.error(f"停止SSE连接时出错: {e}")
+
+
+def delete_session(conv_id, current_session_id, session_index):
+    """
+    删除会话并计算会话列表的Patch增量更新，删除当前会话时切换到剩余的第一个会话，没有剩余会话时新建会话
+
+    Returns:
+        handle_all_session_management回调session_outputs的位置参数：
+        (refresh, rename_conv_id, modal_visible, rename_value, session_id, messages, patches)
+    """
+    try:
+        # 调用Conversations模型的delete_conversation_by_conv_id方法删除会话
+        success = Conversations.delete_conversation_by_conv_id(conv_id)
+        if not success:
+            set_props(
+                "global-message",
+                {
+                    "children": fac.AntdMessage(
+                        type="error",
+                        content="删除会话失败"
+                    )
+                },
+            )
+            return (dash.no_update, dash.no_update, False, '')
+
+        set_props(
+            "global-message",
+            {
+                "children": fac.AntdMessage(
+                    type="success",
+                    content="会话已删除"
+                )
+            },
+        )
+
+        # 删除的不是当前会话时仅移除对应的会话项
+        if conv_id != current_session_id:
+            patches = build_session_list_patches(session_index, current_session_id, removed_id=conv_id)
+            if patches is None:
+                return ({'timestamp': time.time()}, dash.no_update, False, '')
+            return (dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, patches)
+
+        # 删除当前会话时切换到剩余的第一个（最新的）会话，没有剩余会话时新建会话
+        stop_session_sse(None)
+        remaining = [key for key in (session_index or []) if key != conv_id]
+        if remaining:
+            new_session_id = remaining[0]
+            patches = build_session_list_patches(
+                session_index, current_session_id, selected_session_id=new_session_id, removed_id=conv_id
+            )
+            messages = create_messages(load_session_messages(new_session_id))
+        else:
+            from flask_login import current_user
+            conv_name = Conversations.default_conv_name()
+            new_session_id = Conversations.add_conversation(user_id=current_user.id, conv_name=conv_name)
+            patches = build_session_list_patches(
+                session_index,
+                current_session_id,
+                selected_session_id=new_session_id,
+                removed_id=conv_id,
+                inserted={"key": new_session_id, "full_title": conv_name}
+            )
+            messages = create_messages()
+
+        if patches is None:
+            # 会话索引与列表不一致，触发会话列表刷新，由刷新逻辑选择会话
+            return ({'timestamp': time.time()}, dash.no_update, False, '', None, create_messages())
+        return (dash.no_update, dash.no_update, False, '', new_session_id, messages, patches)
+    except Exception as e:
+        log.error(f"删除会话失败: {e}")
+        set_props(
+            "global-message",
+            {
+                "children": fac.AntdMessage(
+                    type="error",
+                    content=f"删除会话失败: {str(e)}"
+                )
+            },
+        )
+        # 删除失败时不刷新列表
+        return (dash.no_update, dash.no_update, False, '')
+
+
 def register_chat_callbacks(app):
     # 添加自定义折叠按钮的客户端回调函数 - 支持切换本地SVG图标
     app.clientside_callback(
@@ -76,6 +249,8 @@ def register_chat_callbacks(app):
             set_props("preference-drawer", {"visible": True})
 
     # 合并的会话管理回调函数（桌面端 + 移动端）
+    # 新建、删除、改名及移动端切换会话时按客户端会话索引以Patch增量更新桌面端及移动端会话列表，
+    # 会话索引与列表不一致时触发会话列表刷新，由刷新回调全量重新渲染
     @app.callback(
         [
             Output('ai-chat-x-session-refresh-trigger', 'data'),
@@ -84,7 +259,9 @@ def register_chat_callbacks(app):
             Output('ai-chat-x-session-rename-input', 'value'),
             Output('ai-chat-x-current-session-id', 'data', allow_duplicate=True),
             Output('ai-chat-x-messages-store', 'data', allow_duplicate=True),
-            Output('ai-chat-x-mobile-session-content', 'children')
+            Output('ai-chat-x-session-list', 'children', allow_duplicate=True),
+            Output('ai-chat-x-mobile-session-list', 'children', allow_duplicate=True),
+            Output('ai-chat-x-session-index', 'data', allow_duplicate=True)
         ],
         [
             # 桌面端输入
@@ -106,298 +283,173 @@ def register_chat_callbacks(app):
             State('ai-chat-x-current-rename-conv-id', 'data'),
             State('ai-chat-x-session-rename-input', 'value'),
             # 移动端状态
-            State('ai-chat-x-current-session-id', 'data')
+            State('ai-chat-x-current-session-id', 'data'),
+            # 客户端会话索引
+            State('ai-chat-x-session-index', 'data')
         ],
         prevent_initial_call=True,  # 确保页面加载时不触发此回调
     )
-    def handle_all_session_management(desktop_dropdown_clicks, new_session_clicks, 
+    def handle_all_session_management(desktop_dropdown_clicks, new_session_clicks,
                                      rename_ok_clicks, rename_cancel_clicks, rename_close_clicks,
                                      mobile_create_clicks, mobile_session_clicks, mobile_delete_clicks,
-                                     refresh_trigger, desktop_clicked_keys, desktop_ids, 
-                                     current_rename_conv_id, new_name, current_session_id):
+                                     refresh_trigger, desktop_clicked_keys, desktop_ids,
+                                     current_rename_conv_id, new_name, current_session_id, session_index):
         """处理所有会话管理操作：桌面端和移动端"""
-        
+
+        def session_outputs(refresh=dash.no_update, rename_conv_id=dash.no_update, modal_visible=False,
+                            rename_value='', session_id=dash.no_update, messages=dash.no_update, patches=None):
+            """按回调输出顺序组装返回值，patches为build_session_list_patches的返回值"""
+            desktop_patch, mobile_patch, index_patch = patches[:3] if patches else (dash.no_update,) * 3
+            return [refresh, rename_conv_id, modal_visible, rename_value, session_id, messages,
+                    desktop_patch, mobile_patch, index_patch]
+
         try:
             # 检查是否有触发
             if not ctx.triggered:
-                return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
-            
+                return session_outputs()
+
             # 获取触发回调的组件ID
             triggered_id = ctx.triggered_id
             triggered_prop_id = ctx.triggered[0]['prop_id']
-            
+
             # 检查是否有有效点击
-            if not any(trigger['prop_id'].endswith('nClicks') or trigger['prop_id'].endswith('n_clicks') 
-                      or trigger['prop_id'].endswith('okCounts') or trigger['prop_id'].endswith('cancelCounts') 
+            if not any(trigger['prop_id'].endswith('nClicks') or trigger['prop_id'].endswith('n_clicks')
+                      or trigger['prop_id'].endswith('okCounts') or trigger['prop_id'].endswith('cancelCounts')
                       or trigger['prop_id'].endswith('closeCounts') for trigger in ctx.triggered):
                 # 没有有效点击时，确保对话框是隐藏的
-                return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
+                return session_outputs()
+
+            # 以Patch插入的会话项点击次数为0，不视为有效点击
+            if isinstance(triggered_id, dict) and not ctx.triggered[0]['value']:
+                return session_outputs()
         except Exception as e:
             log.error(f"会话操作回调初始化失败: {e}")
-            return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
-        
-        # 处理桌面端新建会话按钮点击
-        if triggered_id == 'ai-chat-x-session-new':
-            if new_session_clicks and new_session_clicks > 0:
+            return session_outputs()
+
+        # 处理桌面端及移动端新建会话按钮点击
+        if triggered_id in ('ai-chat-x-session-new', 'ai-chat-x-create-alternative-btn'):
+            if (new_session_clicks if triggered_id == 'ai-chat-x-session-new' else mobile_create_clicks):
                 try:
                     # 获取当前用户ID
                     from flask_login import current_user
-                    
+
                     if hasattr(current_user, 'id'):
                         user_id = current_user.id
-                        
+
                         # 调用Conversations模型的add_conversation方法创建新会话
-                        conv_id = Conversations.add_conversation(user_id=user_id)
-                        
-                        # log.debug(f"=== 创建新会话 ===")
-                        # log.debug(f"新会话ID: {conv_id}")
+                        conv_name = Conversations.default_conv_name()
+                        conv_id = Conversations.add_conversation(user_id=user_id, conv_name=conv_name)
+
                         log.debug(f"用户ID: {user_id}")
-                        
+
                         # 显示创建成功的消息
                         set_props(
                             "global-message",
                             {
                                 "children": fac.AntdMessage(
-                                    type="success", 
+                                    type="success",
                                     content="新会话创建成功"
                                 )
                             },
                         )
-                        
-                        # 返回新的时间戳以触发会话列表刷新，同时设置当前会话ID和清空消息列表
-                        # log.debug(f"=== 新建会话完成，设置当前会话ID: {conv_id} ===")
-                        # 同时更新移动端会话列表
-                        from flask_login import current_user
-                        mobile_session_list = render_mobile_session_list(user_id=current_user.id, selected_session_id=conv_id)
-                        return [{'timestamp': time.time()}, dash.no_update, False, '', conv_id, [], mobile_session_list]
+
+                        # 将新会话插入到会话列表顶部并选中，同时设置当前会话ID和清空消息列表
+                        patches = build_session_list_patches(
+                            session_index,
+                            current_session_id,
+                            selected_session_id=conv_id,
+                            inserted={"key": conv_id, "full_title": conv_name}
+                        )
+                        return session_outputs(session_id=conv_id, messages=create_messages(), patches=patches)
                     else:
                         # 用户未登录或无法获取用户ID
                         set_props(
                             "global-message",
                             {
                                 "children": fac.AntdMessage(
-                                    type="error", 
+                                    type="error",
                                     content="无法创建会话：用户信息无效"
                                 )
                             },
                         )
-                        return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
+                        return session_outputs()
                 except Exception as e:
+                    log.error(f"创建新会话失败: {e}")
                     # 显示创建失败的消息
                     set_props(
                         "global-message",
                         {
                             "children": fac.AntdMessage(
-                                type="error", 
+                                type="error",
                                 content=f"创建会话失败: {str(e)}"
                             )
                         },
                     )
-                    return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
-        
-        # 处理移动端新建会话按钮点击
-        elif triggered_id == 'ai-chat-x-create-alternative-btn':
-            if mobile_create_clicks and mobile_create_clicks > 0:
-                try:
-                    from flask_login import current_user
-                    if hasattr(current_user, 'id'):
-                        user_id = current_user.id
-                        # 调用Conversations模型的add_conversation方法创建新会话
-                        conv_id = Conversations.add_conversation(user_id=user_id)
-                        
-                        # log.debug(f"移动端创建新会话: {conv_id}")
-                        
-                        # 显示创建成功的消息
-                        set_props(
-                            "global-message",
-                            {
-                                "children": fac.AntdMessage(
-                                    type="success", 
-                                    content="新会话创建成功"
-                                )
-                            },
-                        )
-                        
-                        # 触发会话列表刷新
-                        # 同时更新移动端会话列表
-                        from flask_login import current_user
-                        mobile_session_list = render_mobile_session_list(user_id=current_user.id, selected_session_id=conv_id)
-                        return [{'timestamp': time.time()}, dash.no_update, False, '', conv_id, [], mobile_session_list]
-                    else:
-                        # 用户未登录
-                        set_props(
-                            "global-message",
-                            {
-                                "children": fac.AntdMessage(
-                                    type="error", 
-                                    content="无法创建会话：用户信息无效"
-                                )
-                            },
-                        )
-                        return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
-                except Exception as e:
-                    log.error(f"移动端创建新会话失败: {e}")
-                    set_props(
-                        "global-message",
-                        {
-                            "children": fac.AntdMessage(
-                                type="error", 
-                                content=f"创建会话失败: {str(e)}"
-                            )
-                        },
-                    )
-                    return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
-        
+                    return session_outputs()
+
         # 处理移动端会话项点击
         elif isinstance(triggered_id, dict) and triggered_id.get('type') == 'ai-chat-x-mobile-session-item':
             try:
                 # 获取点击的会话ID
                 clicked_session_id = triggered_id['index']
-                
+
                 # 显示切换成功的消息
                 set_props(
                     "global-message",
                     {
                         "children": fac.AntdMessage(
-                            type="success", 
+                            type="success",
                             content="会话已切换"
                         )
                     },
                 )
-                
-                # 触发会话列表刷新
-                # 同时更新移动端会话列表
-                from flask_login import current_user
-                mobile_session_list = render_mobile_session_list(user_id=current_user.id, selected_session_id=clicked_session_id)
-                return [{'timestamp': time.time()}, dash.no_update, False, '', clicked_session_id, [], mobile_session_list]
+
+                if clicked_session_id == current_session_id:
+                    return session_outputs()
+
+                # 更新选中状态并加载该会话的历史消息，无需重新查询及渲染会话列表
+                stop_session_sse(clicked_session_id)
+                patches = build_session_list_patches(session_index, current_session_id, selected_session_id=clicked_session_id)
+                if patches is None:
+                    # 会话索引与列表不一致，触发会话列表刷新
+                    return session_outputs(refresh={'timestamp': time.time()}, session_id=clicked_session_id, messages=create_messages())
+                return session_outputs(
+                    session_id=clicked_session_id,
+                    messages=create_messages(load_session_messages(clicked_session_id)),
+                    patches=patches
+                )
             except Exception as e:
                 log.error(f"移动端会话切换失败: {e}")
                 set_props(
                     "global-message",
                     {
                         "children": fac.AntdMessage(
-                            type="error", 
+                            type="error",
                             content=f"会话切换失败: {str(e)}"
                         )
                     },
                 )
-                return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
-        
+                return session_outputs()
+
         # 处理移动端会话删除
         elif isinstance(triggered_id, dict) and triggered_id.get('type') == 'ai-chat-x-mobile-session-delete':
-            try:
-                # 获取要删除的会话ID
-                conv_id = triggered_id['index']
-                
-                # 调用Conversations模型的delete_conversation_by_conv_id方法删除会话
-                success = Conversations.delete_conversation_by_conv_id(conv_id)
-                
-                if success:
-                    # 显示删除成功的消息
-                    set_props(
-                        "global-message",
-                        {
-                            "children": fac.AntdMessage(
-                                type="success", 
-                                content="会话已删除"
-                            )
-                        },
-                    )
-                    
-                    # 触发会话列表刷新
-                    # 同时更新移动端会话列表
-                    from flask_login import current_user
-                    mobile_session_list = render_mobile_session_list(user_id=current_user.id, selected_session_id=None)
-                    return [{'timestamp': time.time()}, dash.no_update, False, '', dash.no_update, [], mobile_session_list]
-                else:
-                    # 显示删除失败的消息
-                    set_props(
-                        "global-message",
-                        {
-                            "children": fac.AntdMessage(
-                                type="error", 
-                                content="删除会话失败"
-                            )
-                        },
-                    )
-                    return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
-            except Exception as e:
-                log.error(f"移动端删除会话失败: {e}")
-                set_props(
-                    "global-message",
-                    {
-                        "children": fac.AntdMessage(
-                            type="error", 
-                            content=f"删除会话失败: {str(e)}"
-                        )
-                    },
-                )
-                return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
-        
+            return session_outputs(*delete_session(triggered_id['index'], current_session_id, session_index))
+
         # 处理会话下拉菜单点击
         elif isinstance(triggered_id, dict) and triggered_id.get('type') == 'ai-chat-x-session-dropdown':
             # 获取当前会话的conv_id
             conv_id = triggered_id["index"]
-            
+
             # 找到对应的clickedKey
+            clicked_key = None
             for i, id_dict in enumerate(desktop_ids):
                 if id_dict["index"] == conv_id:
                     clicked_key = desktop_clicked_keys[i]
                     break
-            
+
             # 如果点击的是删除按钮
             if clicked_key == "delete":
-                try:
-                    # log.debug(f"=== 开始删除会话 ===")
-                    # log.debug(f"要删除的会话ID: {conv_id}")
-                    # 调用Conversations模型的delete_conversation_by_conv_id方法删除会话
-                    success = Conversations.delete_conversation_by_conv_id(conv_id)
-                    
-                    if success:
-                        # log.debug(f"会话删除成功: {conv_id}")
-                        # 显示删除成功的消息
-                        set_props(
-                            "global-message",
-                            {
-                                "children": fac.AntdMessage(
-                                    type="success", 
-                                    content="会话删除成功"
-                                )
-                            },
-                        )
-                    else:
-                        # 显示删除失败的消息
-                        set_props(
-                            "global-message",
-                            {
-                                "children": fac.AntdMessage(
-                                    type="error", 
-                                    content="删除会话失败"
-                                )
-                            },
-                        )
-                        return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
-                    
-                    # 返回新的时间戳以触发会话列表刷新，不保持当前会话ID（让刷新逻辑智能选择）
-                    refresh_timestamp = {'timestamp': time.time()}
-                    # log.debug(f"删除会话后触发刷新，时间戳: {refresh_timestamp}")
-                    # 同时更新移动端会话列表
-                    from flask_login import current_user
-                    mobile_session_list = render_mobile_session_list(user_id=current_user.id, selected_session_id=None)
-                    return [refresh_timestamp, dash.no_update, False, '', None, [], mobile_session_list]
-                except Exception as e:
-                    # 显示删除失败的消息
-                    set_props(
-                        "global-message",
-                        {
-                            "children": fac.AntdMessage(
-                                type="error", 
-                                content=f"会话删除失败: {str(e)}"
-                            )
-                        },
-                    )
-                    # 删除失败时不刷新列表
-                    return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
+                return session_outputs(*delete_session(conv_id, current_session_id, session_index))
             # 如果点击的是改名按钮
             elif clicked_key == "rename":
                 # 获取当前会话的名称
@@ -409,10 +461,10 @@ def register_chat_callbacks(app):
                 except Exception as e:
                     # 如果获取失败，使用空字符串
                     current_conv_name = ""
-                
+
                 # 存储当前要改名的会话ID并显示改名对话框，同时显示当前会话名称
-                return [dash.no_update, conv_id, True, current_conv_name, dash.no_update, dash.no_update, dash.no_update]
-        
+                return session_outputs(rename_conv_id=conv_id, modal_visible=True, rename_value=current_conv_name)
+
         # 处理会话改名对话框的确定按钮点击
         elif triggered_id == 'ai-chat-x-session-rename-modal' and 'okCounts' in triggered_prop_id:
             # 检查会话ID和新名称是否有效
@@ -420,64 +472,73 @@ def register_chat_callbacks(app):
                 try:
                     # 调用Conversations模型的update_conversation_by_conv_id方法更新会话名称
                     Conversations.update_conversation_by_conv_id(conv_id=current_rename_conv_id, conv_name=new_name.strip())
-                    
+
                     # 显示改名成功的消息
                     set_props(
                         "global-message",
                         {
                             "children": fac.AntdMessage(
-                                type="success", 
+                                type="success",
                                 content="会话名称修改成功"
                             )
                         },
                     )
-                    
-                    # 返回新的时间戳以触发会话列表刷新，保持当前会话ID，并清空输入框和关闭对话框
-                    # 同时更新移动端会话列表
-                    from flask_login import current_user
-                    mobile_session_list = render_mobile_session_list(user_id=current_user.id, selected_session_id=current_rename_conv_id)
-                    return [{'timestamp': time.time()}, None, False, '', dash.no_update, dash.no_update, mobile_session_list]
+
+                    # 仅替换改名的会话项，清空输入框并关闭对话框
+                    patches = build_session_list_patches(
+                        session_index,
+                        current_session_id,
+                        renamed={"key": current_rename_conv_id, "full_title": new_name.strip()}
+                    )
+                    if patches is None:
+                        # 会话索引与列表不一致，触发会话列表刷新
+                        return session_outputs(refresh={'timestamp': time.time()}, rename_conv_id=None)
+                    return session_outputs(rename_conv_id=None, patches=patches)
                 except Exception as e:
                     # 显示改名失败的消息
                     set_props(
                         "global-message",
                         {
                             "children": fac.AntdMessage(
-                                type="error", 
+                                type="error",
                                 content=f"会话名称修改失败: {str(e)}"
                             )
                         },
                     )
                     # 改名失败时不刷新列表，但清空输入框和关闭对话框
-                    return [dash.no_update, None, False, '', dash.no_update, dash.no_update, dash.no_update]
+                    return session_outputs(rename_conv_id=None)
             else:
                 # 新名称不能为空
                 set_props(
                     "global-message",
                     {
                         "children": fac.AntdMessage(
-                            type="warning", 
+                            type="warning",
                             content="会话名称不能为空"
                         )
                     },
                 )
                 # 名称为空时不刷新列表，但清空输入框
-                return [dash.no_update, current_rename_conv_id, True, '', dash.no_update, dash.no_update, dash.no_update]
-        
+                return session_outputs(rename_conv_id=current_rename_conv_id, modal_visible=True)
+
         # 处理会话改名对话框的取消或关闭按钮点击
         elif triggered_id == 'ai-chat-x-session-rename-modal' and ('cancelCounts' in triggered_prop_id or 'closeCounts' in triggered_prop_id):
             # 清空输入框和关闭对话框，但不刷新列表
-            return [dash.no_update, None, False, '', dash.no_update, dash.no_update, dash.no_update]
-        
+            return session_outputs(rename_conv_id=None)
+
         # 其他情况不刷新列表，不显示对话框，清空输入框
-        return [dash.no_update, dash.no_update, False, '', dash.no_update, dash.no_update, dash.no_update]
+        return session_outputs()
 
     # 添加：会话项点击回调 - 处理会话切换
     @app.callback(
         [
             Output('ai-chat-x-current-session-id', 'data'),
             Output('ai-chat-x-messages-store', 'data', allow_duplicate=True),
-            Output('ai-chat-x-session-list-container', 'children')
+            Output('ai-chat-x-session-list', 'children', allow_duplicate=True),
+            Output('ai-chat-x-mobile-session-list', 'children', allow_duplicate=True),
+            Output('ai-chat-x-session-index', 'data', allow_duplicate=True),
+            Output('ai-chat-x-session-list-container', 'children'),
+            Output('ai-chat-x-mobile-session-content', 'children')
         ],
         [
             Input({'type': 'ai-chat-x-session-item', 'index': dash.ALL}, 'n_clicks'),
@@ -485,136 +546,89 @@ def register_chat_callbacks(app):
         ],
         [
             State('ai-chat-x-current-session-id', 'data'),
-            State('ai-chat-x-session-list-container', 'children')
+            State('ai-chat-x-session-index', 'data')
         ],
         prevent_initial_call=True,
     )
-    def handle_session_switch(session_clicks, refresh_trigger, current_session_id, current_children):
-        """处理会话切换和列表刷新"""
+    def handle_session_switch(session_clicks, refresh_trigger, current_session_id, session_index):
+        """处理会话切换和列表刷新：会话切换仅以Patch更新选中状态，列表刷新时全量重新渲染会话列表"""
         ctx_triggered = ctx.triggered
-        
-        # 添加调试信息
-        if ctx_triggered:
-            # log.debug(f"=== 会话切换回调触发 ===")
-            # log.debug(f"触发ID: {ctx_triggered[0]['prop_id']}")
-            # log.debug(f"触发值: {ctx_triggered[0]['value']}")
-            pass
-        
+        no_updates = [dash.no_update] * 7
+
         # 处理会话项点击
-        if ctx_triggered and 'ai-chat-x-session-item' in ctx_triggered[0]['prop_id'] and 'n_clicks' in ctx_triggered[0]['prop_id']:
+        if ctx_triggered and isinstance(ctx.triggered_id, dict) and ctx.triggered_id.get('type') == 'ai-chat-x-session-item':
+            # 以Patch插入的会话项点击次数为0，不视为有效点击
+            if not ctx_triggered[0]['value']:
+                return no_updates
             try:
                 # 获取点击的会话ID
-                triggered_id = ctx_triggered[0]['prop_id']
-                # 解析JSON获取index
-                import json
-                id_dict = json.loads(triggered_id.split('.')[0])
-                clicked_session_id = id_dict['index']
-                
-                # 添加详细日志
-                # log.debug(f"=== 会话切换开始 ===")
-                # log.debug(f"点击的会话ID: {clicked_session_id}")
-                # log.debug(f"当前会话ID: {current_session_id}")
-                
-                # 新增：如果切换到不同会话，清理当前SSE连接
-                if current_session_id != clicked_session_id:
-                    try:
-                        # 停止当前SSE连接
-                        set_props("chat-X-sse", {"url": None})
-                        log.debug(f"停止当前SSE连接，切换到会话: {clicked_session_id}")
-                        try:
-                            from callbacks.core_pages_c.chat_input_area_c import active_sse_connections
-                            for message_id in list(active_sse_connections.keys()):
-                                del active_sse_connections[message_id]
-                                log.debug(f"清理SSE连接: {message_id}")
-                        except ImportError:
-                            pass
-                    except Exception as e:
-                        log.error(f"停止SSE连接时出错: {e}")
-                
+                clicked_session_id = ctx.triggered_id['index']
+
+                # 点击当前会话时无需重新加载
+                if clicked_session_id == current_session_id:
+                    return no_updates
+
+                # 如果切换到不同会话，清理当前SSE连接
+                stop_session_sse(clicked_session_id)
+
                 # 从数据库加载该会话的历史消息
-                conv = Conversations.get_conversation_by_conv_id(clicked_session_id)
-                if conv:
-                    # log.debug(f"找到会话记录: conversation_id={conv.conversation_id}, conv_id={conv.conv_id}")
-                    # log.debug(f"会话名称: {conv.conv_name}")
-                    # log.debug(f"conv_memory类型: {type(conv.conv_memory)}")
-                    # log.debug(f"conv_memory内容: {conv.conv_memory}")
-                    
-                    if conv.conv_memory and isinstance(conv.conv_memory, dict):
-                        # 加载历史消息
-                        history_messages = conv.conv_memory.get('messages', [])
-                        # log.debug(f"加载会话历史消息: {clicked_session_id}, 消息数量: {len(history_messages)}")
-                        # log.debug(f"历史消息内容: {history_messages}")
-                    else:
-                        # 如果没有历史消息，返回空列表
-                        history_messages = []
-                        # log.debug(f"会话无历史消息或conv_memory格式错误: {clicked_session_id}")
-                else:
-                    # 如果没有找到会话，返回空列表
-                    history_messages = []
-                    # log.debug(f"未找到会话记录: {clicked_session_id}")
-                
-                # 重新渲染会话列表（更新选中状态）
+                history_messages = create_messages(load_session_messages(clicked_session_id))
+
+                # 按会话索引更新选中状态，无需重新查询及渲染会话列表
+                patches = build_session_list_patches(session_index, current_session_id, selected_session_id=clicked_session_id)
+                if patches is not None:
+                    desktop_patch, mobile_patch, index_patch, _ = patches
+                    return [clicked_session_id, history_messages, desktop_patch, mobile_patch, index_patch,
+                            dash.no_update, dash.no_update]
+
+                # 会话索引与列表不一致时重新渲染会话列表
                 from flask_login import current_user
-                if hasattr(current_user, 'id'):
-                    updated_children = render_session_list(user_id=current_user.id, selected_session_id=clicked_session_id)
-                else:
-                    updated_children = render_session_list(selected_session_id=clicked_session_id)
-                
-                # log.debug(f"=== 会话切换完成，返回会话ID: {clicked_session_id} ===")
-                return clicked_session_id, history_messages, updated_children
-                
+                sessions = get_session_items(current_user.id)
+                return [clicked_session_id, history_messages, dash.no_update, dash.no_update, dash.no_update,
+                        render_session_list(sessions=sessions, selected_session_id=clicked_session_id),
+                        render_mobile_session_list(sessions=sessions, selected_session_id=clicked_session_id)]
+
             except Exception as e:
                 log.error(f"处理会话切换失败: {e}")
-                return dash.no_update, dash.no_update, dash.no_update
-        
+                return no_updates
+
         # 处理列表刷新
         elif ctx_triggered and ctx_triggered[0]['prop_id'] == 'ai-chat-x-session-refresh-trigger.data':
             from flask_login import current_user
-            # log.debug(f"=== 会话列表刷新 ===")
-            # log.debug(f"当前会话ID: {current_session_id}")
-            # log.debug(f"触发原因: {ctx_triggered[0]}")
-            
+
             # 智能选择会话ID
             new_session_id = current_session_id
             history_messages = []
-            
+
             if hasattr(current_user, 'id'):
                 # 获取用户的所有会话
-                user_sessions = Conversations.get_user_conversations(current_user.id)
-                # log.debug(f"用户会话列表: {user_sessions}")
-                # log.debug(f"会话数量: {len(user_sessions) if user_sessions else 0}")
+                user_sessions = get_session_items(current_user.id)
                 if user_sessions:
                     # 如果当前会话ID仍然存在，保持它
-                    if current_session_id and any(session['conv_id'] == current_session_id for session in user_sessions):
+                    if current_session_id and any(session['key'] == current_session_id for session in user_sessions):
                         new_session_id = current_session_id
-                        # 加载当前会话的历史消息
-                        conv = Conversations.get_conversation_by_conv_id(current_session_id)
-                        if conv and conv.conv_memory:
-                            history_messages = conv.conv_memory.get('messages', [])
                     else:
                         # 当前会话不存在，选择第一个会话（最新的）
-                        new_session_id = user_sessions[0]['conv_id']
-                        conv = Conversations.get_conversation_by_conv_id(new_session_id)
-                        if conv and conv.conv_memory:
-                            history_messages = conv.conv_memory.get('messages', [])
-                        # log.debug(f"当前会话不存在，选择第一个会话（最新的）: {new_session_id}")
+                        new_session_id = user_sessions[0]['key']
+                    # 加载会话的历史消息
+                    history_messages = load_session_messages(new_session_id)
                 else:
                     # 没有会话，创建新会话
-                    new_session_id = Conversations.add_conversation(user_id=current_user.id)
+                    conv_name = Conversations.default_conv_name()
+                    new_session_id = Conversations.add_conversation(user_id=current_user.id, conv_name=conv_name)
+                    user_sessions = [{"key": new_session_id, "full_title": conv_name}]
                     history_messages = []
-                    # log.debug(f"没有会话，创建新会话: {new_session_id}")
-                
-                updated_children = render_session_list(user_id=current_user.id, selected_session_id=new_session_id)
+
+                updated_children = render_session_list(sessions=user_sessions, selected_session_id=new_session_id)
+                mobile_children = render_mobile_session_list(sessions=user_sessions, selected_session_id=new_session_id)
             else:
                 updated_children = render_session_list(selected_session_id=new_session_id)
-            
-            # log.debug(f"=== 会话列表刷新完成 ===")
-            # log.debug(f"新会话ID: {new_session_id}")
-            # log.debug(f"历史消息数量: {len(history_messages)}")
-            
-            return new_session_id, history_messages, updated_children
-        
-        return dash.no_update, dash.no_update, dash.no_update
+                mobile_children = render_mobile_session_list(selected_session_id=new_session_id)
+
+            return [new_session_id, create_messages(history_messages), dash.no_update, dash.no_update, dash.no_update,
+                    updated_children, mobile_children]
+
+        return no_updates
 
 # 注册回调函数
 register_chat_callbacks(app)
\ No newline at end of file
@@ -1,16 +1,20 @@
 import dash
-from dash import ctx, Input, Output, State, callback, no_update, html, ClientsideFunction, ALL, set_props
+from dash import ctx, Input, Output, State, callback, no_update, html, ClientsideFunction, ALL, set_props, Patch
 import feffery_antd_components as fac
 import json
 from datetime import datetime
 
-from components.ai_chat_message_history import AiChatMessageHistory
+from components.ai_chat_message_history import AiChatMessageItems, RENDERABLE_ROLES, render_chat_message
 from server import app, server  # 确保同时导入了server
 from utils.yychat_client import yychat_client
 from utils.log import log
 from configs.topics_loader import get_random_topic_description_by_category, get_categories
 from configs.base_config import BaseConfig
-import copy
+from core.usage_rollup.usage_rollup import record_usage, record_topic_click
+from core.message_store.message_store import (
+    get_messages, get_message_changes, append_messages, replace_message, delete_message
+)
+from core.message_render_cache.message_render_cache import message_render_cache
 import threading
 import time
 from flask import Response, stream_with_context
@@ -48,6 +52,8 @@ def save_messages_to_database(current_session_id, user_message, ai_message):
                     current_session_id,
                     conv_memory={'messages': existing_messages}
                 )
+                # 累计使用情况汇总：一条用户消息及一条AI回复
+                record_usage(conv.user_id, messages=2, user_messages=1)
                 log.info(f"✅ 消息已保存到数据库: {current_session_id}")
         except Exception as e:
             log.error(f"保存消息到数据库失败: {e}")
@@ -87,19 +93,20 @@ def handle_chat_interactions(topic_clicks, send_button_clicks, completion_event_
     # 添加调试日志
     # log.debug(f"回调被触发: {triggered_id}")
     
-    # 初始化消息存储（如果为空）
-    messages = messages_store or []
+    # 消息存储中仅保存令牌，完整消息列表从服务端消息存储获取
+    messages_token = messages_store
+    messages = get_messages(messages_token)
     
     # 确保ctx.triggered不为空
     if not ctx.triggered:
-        return messages, message_content, False, False, dash.no_update
+        return messages_token, message_content, False, False, dash.no_update
     
     # 验证输入框内容（仅对发送按钮触发）
     if triggered_id == 'ai-chat-x-send-btn':
         log.info(f"🔍 chat_input_area_c.py: 发送按钮被触发，消息内容: {message_content[:50] if message_content else 'None'}...")
         if not message_content or not message_content.strip():
             log.info('输入框为空，拒绝提交')
-            return messages, message_content, False, False, dash.no_update
+            return messages_token, message_content, False, False, dash.no_update
     
     # 处理话题点击
     if triggered_id and isinstance(triggered_id, dict) and triggered_id.get('type') == 'chat-topic':
@@ -117,11 +124,12 @@ def handle_chat_interactions(topic_clicks, send_button_clicks, completion_event_
                 random_description = get_random_topic_description_by_category(category)
                 
                 if random_description:
+                    record_topic_click(category)
                     log.debug(f"分类话题点击: {category}, 索引: {topic_index}, 内容: {random_description}")
-                    return messages, random_description, False, False, dash.no_update
+                    return messages_token, random_description, False, False, dash.no_update
         
         # 如果索引无效，返回默认值
-        return messages, message_content, False, False, dash.no_update
+        return messages_token, message_content, False, False, dash.no_update
     
     # 处理SSE完成事件
     elif triggered_id == 'ai-chat-x-sse-completed-receiver.data-completion-event' or 'sse-completed-receiver' in str(triggered_id):
@@ -156,18 +164,17 @@ def handle_chat_interactions(topic_clicks, send_button_clicks, completion_event_
                         # log.debug(f"从最后一条消息获取: message_id={message_id}")
                     else:
                         # log.debug("没有找到需要完成的流式消息")
-                        return messages, message_content, False, False, dash.no_update
-                
-                # 创建消息的深拷贝，避免修改原始数据
-                updated_messages = copy.deepcopy(messages)
+                        return messages_token, message_content, False, False, dash.no_update
                 
-                # 查找并更新对应的AI消息
-                for i, message in enumerate(updated_messages):
-                    if message.get('id') == message_id:
-                        updated_messages[i]['content'] = full_content
-                        updated_messages[i]['is_streaming'] = False
-                        # log.debug(f"更新AI消息: {message_id} -> {full_content}")
-                        break
+                # 查找并更新对应的AI消息（从末尾查找，流式消息通常为最后一条）
+                updated_token = messages_token
+                message_index = messages.find(message_id)
+                if message_index >= 0:
+                    updated_token = replace_message(
+                        messages_token,
+                        {**messages[message_index], 'content': full_content, 'is_streaming': False}
+                    )
+                    # log.debug(f"更新AI消息: {message_id} -> {full_content}")
                 
                 # 保存AI消息到数据库
                 if current_session_id:
@@ -203,35 +210,32 @@ def handle_chat_interactions(topic_clicks, send_button_clicks, completion_event_
                 
                 # 返回更新后的消息存储，但保持按钮状态由统一状态管理器控制
                 # 注意：不在这里重置按钮状态，让统一状态管理器控制到TTS完成
-                return updated_messages, message_content, dash.no_update, dash.no_update, dash.no_update
+                return updated_token, message_content, dash.no_update, dash.no_update, dash.no_update
             except Exception as e:
                 log.error(f"处理SSE完成事件时出错: {e}")
-                return messages, message_content, dash.no_update, dash.no_update, dash.no_update
+                return messages_token, message_content, dash.no_update, dash.no_update, dash.no_update
         else:
             # log.debug("SSE完成事件数据不完整，跳过处理")
-            return messages, message_content, dash.no_update, dash.no_update, dash.no_update
+            return messages_token, message_content, dash.no_update, dash.no_update, dash.no_update
 
     # 处理语音转录触发的发送（镜像Store）
     elif triggered_id == 'voice-transcription-store-server' and transcription_data and transcription_data.get('text'):
         try:
             transcribed_text = transcription_data.get('text', '').strip()
             if not transcribed_text:
-                return messages, message_content, False, False
-
-            updated_messages = copy.deepcopy(messages)
+                return messages_token, message_content, False, False
 
             # 添加用户消息
-            usr_message_id = f"usr-message-{len(updated_messages)}"
+            usr_message_id = f"usr-message-{len(messages)}"
             user_message = {
                 'role': 'user',
                 'content': transcribed_text,
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'id': usr_message_id
             }
-            updated_messages.append(user_message)
 
             # 添加AI流式消息占位
-            ai_message_id = f"ai-message-{len(updated_messages)}"
+            ai_message_id = f"ai-message-{len(messages) + 1}"
             ai_message = {
                 'role': 'assistant',
                 'content': '正在思考中...',
@@ -239,7 +243,6 @@ def handle_chat_interactions(topic_clicks, send_button_clicks, completion_event_
                 'id': ai_message_id,
                 'is_streaming': True
             }
-            updated_messages.append(ai_message)
 
             # 保存消息到数据库
             save_messages_to_database(current_session_id, user_message, ai_message)
@@ -257,10 +260,10 @@ def handle_chat_interactions(topic_clicks, send_button_clicks, completion_event_
                 pass
 
             # 返回：更新消息列表，清空输入框，设置按钮loading/disabled，并设置语音开关（含client_id）
-            return updated_messages, '', True, True, enable_voice_payload
+            return append_messages(messages_token, user_message, ai_message), '', True, True, enable_voice_payload
         except Exception as e:
             log.error(f"处理语音转录发送时出错: {e}")
-            return messages, message_content, False, False, dash.no_update
+            return messages_token, message_content, False, False, dash.no_update
     
     # 处理消息发送
     elif triggered_id in ['ai-chat-x-send-btn'] and message_content:
@@ -297,21 +300,17 @@ def handle_chat_interactions(topic_clicks, send_button_clicks, completion_event_
         message_content = message_content.strip()
         
         if message_content:
-            # 创建消息的深拷贝，避免修改原始数据
-            updated_messages = copy.deepcopy(messages)
-                       
-            # 添加用户消息到消息列表的副本
-            usr_message_id = f"usr-message-{len(updated_messages)}"
+            # 添加用户消息
+            usr_message_id = f"usr-message-{len(messages)}"
             user_message = {
                 'role': 'user',
                 'content': message_content,
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'id': usr_message_id
             }
-            updated_messages.append(user_message)
             
             # 创建一个空白的AI消息，用于后续接收流式响应
-            ai_message_id = f"ai-message-{len(updated_messages)}"
+            ai_message_id = f"ai-message-{len(messages) + 1}"
             ai_message = {
                 'role': 'assistant',
                 'content': '正在思考中...',
@@ -320,21 +319,21 @@ def handle_chat_interactions(topic_clicks, send_button_clicks, completion_event_
                 'is_streaming': True
             }
             
-            # 添加空白AI消息到消息列表
-            updated_messages.append(ai_message)
-            
             # 保存消息到数据库
             save_messages_to_database(current_session_id, user_message, ai_message)
             
+            # 在服务端消息存储中追加用户消息和空白AI消息，仅向浏览器返回新令牌
+            updated_token = append_messages(messages_token, user_message, ai_message)
+            
             # log.debug(f"创建用户消息和AI消息: {user_message}, {ai_message}")
-            log.info(f"✅ 发送按钮处理完成，更新后消息数量: {len(updated_messages)}, 返回给ai-chat-x-messages-store")
+            log.info(f"✅ 发送按钮处理完成，更新后消息数量: {updated_token['count']}, 返回给ai-chat-x-messages-store")
             
-            return updated_messages, '', True, True, dash.no_update  # 发送时禁用按钮并显示loading
+            return updated_token, '', True, True, dash.no_update  # 发送时禁用按钮并显示loading
         # 如果消息内容为空，返回默认值
-        return messages, message_content, False, False, dash.no_update
+        return messages_token, message_content, False, False, dash.no_update
     
     # 默认返回当前状态
-    return messages, message_content, False, False, dash.no_update
+    return messages_token, message_content, False, False, dash.no_update
 
 # SSE触发回调 - 用于启动SSE连接
 @app.callback(
@@ -350,7 +349,8 @@ def handle_chat_interactions(topic_clicks, send_button_clicks, completion_event_
     [State('ai-chat-x-current-session-id', 'data')],
     prevent_initial_call=True
 )
-def trigger_sse(messages, enable_voice, ws_connection, current_session_id):
+def trigger_sse(messages_store, enable_voice, ws_connection, current_session_id):
+    messages = get_messages(messages_store)
     log.info(f"🔍 trigger_sse被触发: messages数量={len(messages) if messages else 0}, enable_voice={enable_voice}")
     log.info(f"🔍 参数: ws_connection={ws_connection}")
     if messages:
@@ -369,9 +369,14 @@ def trigger_sse(messages, enable_voice, ws_connection, current_session_id):
                 return no_update, no_update
             role = last_message.get('role', 'assistant')
             
-            # 构建完整的历史消息列表（包含所有用户和助手消息，用于保持对话连贯性）
+            # 构建历史消息列表（包含用户和助手消息，用于保持对话连贯性）
+            # 从末尾向前收集，只保留最近的N条消息（避免请求过大），开销与历史消息总数无关
+            max_history = BaseConfig.max_history_messages_count
             conversation_messages = []
-            for m in messages:
+            for m in reversed(messages):
+                if len(conversation_messages) >= max_history:
+                    log.debug(f"历史消息过多，已限制为最近{max_history}条消息")
+                    break
                 # 跳过最后一条正在流式传输的AI消息占位符
                 if m.get('id') == message_id and m.get('is_streaming', False):
                     continue
@@ -386,12 +391,7 @@ def trigger_sse(messages, enable_voice, ws_connection, current_session_id):
                         'role': 'user' if msg_role == 'user' else 'assistant',
                         'content': msg_content
                     })
-            
-            # 限制历史消息数量，只保留最近的N条消息（避免请求过大）
-            max_history = BaseConfig.max_history_messages_count
-            if len(conversation_messages) > max_history:
-                conversation_messages = conversation_messages[-max_history:]
-                log.debug(f"历史消息过多，已限制为最近{max_history}条消息")
+            conversation_messages.reverse()
             
             # 处理会话ID - 如果为空，使用默认值
             session_id = current_session_id or 'conversation_0001'
@@ -485,19 +485,241 @@ def trigger_sse(messages, enable_voice, ws_connection, current_session_id):
 
 # 消息处理回调 - 已移除，所有更新通过客户端回调完成
 
-# 更新聊天历史显示 - 只在初始加载和非流式场景下更新
+# 单次增量更新聊天历史时最多应用的变更数，超出时全量渲染
+MAX_HISTORY_PATCH_CHANGES = 8
+
+
+def clamp_chat_history_window(count, start=None, end=None):
+    """
+    计算聊天历史中实际挂载的消息窗口[start, end)，默认为最近的消息
+    窗口大小不超过BaseConfig.chat_history_window_size，为0时挂载全部消息
+    """
+    window_size = BaseConfig.chat_history_window_size
+    if not window_size or count <= window_size:
+        return 0, count
+
+    end = count if end is None else max(0, min(end, count))
+    start = max(0, end - window_size) if start is None else max(0, min(start, end))
+    # 窗口至少包含一条消息，且不超过窗口大小
+    if end - start > window_size:
+        end = start + window_size
+    if start >= end:
+        start, end = (end - 1, end) if end > 0 else (0, 1)
+    return start, end
+
+
+def render_full_chat_history(messages_token, messages, start=None, end=None):
+    """
+    全量渲染聊天历史，仅挂载虚拟滚动窗口内的消息，窗口外的消息由前端按已测量高度以占位元素代替
+    :return: (聊天历史子元素, 已渲染状态)
+    """
+    count = len(messages)
+    # 全部消息均可渲染时，消息下标与聊天历史中的元素下标一致，后续可按下标增量更新
+    aligned = all(msg.get('role') in RENDERABLE_ROLES for msg in messages)
+    # 存在不渲染的消息时下标无法对应，挂载全部消息
+    start, end = clamp_chat_history_window(count, start, end) if aligned else (0, count)
+
+    state = {
+        'key': (messages_token or {}).get('key'),
+        'version': (messages_token or {}).get('version'),
+        'count': count,
+        'aligned': aligned,
+        # 已挂载的消息窗口及窗口大小，供前端计算占位高度及滚动时请求新的窗口
+        'start': start,
+        'end': end,
+        'window': BaseConfig.chat_history_window_size if aligned else 0
+    }
+    return AiChatMessageItems(messages[start:end]), state
+
+
+def build_chat_history_patch(rendered, messages_token):
+    """
+    按消息存储中从已渲染版本到令牌版本之间的变更记录，生成聊天历史的Patch增量更新，
+    追加、替换、删除消息的开销及载荷与历史消息数无关
+    :param rendered: 已渲染状态，见render_full_chat_history()
+    :param messages_token: 消息存储令牌
+    :return: (Patch, 已渲染状态)，无法增量更新时返回None
+    """
+    # 已渲染状态未知、切换了会话、当前或即将显示欢迎提示、已挂载窗口不含最新消息时，需全量渲染
+    if not (
+        rendered and messages_token
+        and rendered.get('aligned')
+        and rendered.get('key') == messages_token.get('key')
+        and rendered.get('count') and messages_token.get('count')
+        and rendered.get('end', rendered['count']) == rendered['count']
+    ):
+        return None
+
+    changes = get_message_changes(messages_token, rendered.get('version'))
+    # 变更记录不连续（如并发更新）、已被淘汰或变更过多时全量渲染
+    if changes is None or len(changes) > MAX_HISTORY_PATCH_CHANGES:
+        return None
+
+    start = rendered.get('start', 0)
+    patch = Patch()
+    deleted = []
+    for base, record in changes:
+        if record['op'] == 'append':
+            if any(msg.get('role') not in RENDERABLE_ROLES for msg in record['messages']):
+                return None
+            for msg in record['messages']:
+                patch.append(render_chat_message(msg))
+        elif record['op'] == 'replace':
+            index = base.find(record['message'].get('id'))
+            if index < 0:
+                continue
+            if record['message'].get('role') not in RENDERABLE_ROLES:
+                return None
+            # 窗口之前未挂载的消息无需更新
+            if index >= start:
+                patch[index - start] = render_chat_message(record['message'])
+        elif record['op'] == 'delete':
+            index = base.find(record['id'])
+            if index < 0:
+                continue
+            deleted.append(index)
+            if index < start:
+                start -= 1
+            else:
+                del patch[index - start]
+        else:
+            return None
+
+    count = messages_token['count']
+    # 已挂载的消息全部被删除时全量渲染
+    if count <= start:
+        return None
+
+    # 追加消息后超出窗口大小时，卸载窗口开头的消息
+    tail_start, _ = clamp_chat_history_window(count)
+    for _ in range(tail_start - start):
+        del patch[0]
+    start = max(start, tail_start)
+
+    return patch, {
+        **rendered,
+        'version': messages_token['version'],
+        'count': count,
+        'start': start,
+        'end': count,
+        'window': BaseConfig.chat_history_window_size,
+        'deleted': deleted
+    }
+
+
+def get_chat_history_deletions(rendered, messages_token):
+    """
+    获取已渲染版本到令牌版本之间依次删除的消息下标，供前端平移按下标记录的已测量消息高度
+    :return: 删除的消息下标列表，切换了会话或变更记录不连续、已被淘汰时返回None
+    """
+    if not (rendered and messages_token and rendered.get('key') == messages_token.get('key')):
+        return None
+
+    changes = get_message_changes(messages_token, rendered.get('version'))
+    if changes is None:
+        return None
+
+    deleted = []
+    for base, record in changes:
+        if record['op'] == 'delete':
+            index = base.find(record['id'])
+            if index >= 0:
+                deleted.append(index)
+    return deleted
+
+
+def build_chat_history_window_patch(rendered, messages, start, end):
+    """
+    生成聊天历史的虚拟滚动窗口从已挂载窗口移动到[start, end)的Patch，仅挂载新进入窗口的消息、卸载移出窗口的消息
+    :return: Patch，新旧窗口不重叠时返回None
+    """
+    old_start, old_end = rendered['start'], rendered['end']
+    if start >= old_end or end <= old_start:
+        return None
+
+    patch = Patch()
+    # 窗口开头：卸载移出的消息或在开头依次插入新进入的消息
+    for _ in range(start - old_start):
+        del patch[0]
+    for msg in reversed(messages[start:old_start]):
+        patch.prepend(render_chat_message(msg))
+    # 窗口末尾：此时已挂载的消息为[start, old_end)
+    for _ in range(old_end - end):
+        del patch[end - start]
+    for msg in messages[old_end:end]:
+        patch.append(render_chat_message(msg))
+    return patch
+
+
+# 更新聊天历史显示 - 按消息存储的变更记录增量更新，新一轮对话的服务端开销及载荷与历史长度无关
+# 滚动时按前端请求的虚拟滚动窗口挂载消息，浏览器中同时挂载的消息数与历史长度无关
 @app.callback(
-    Output('ai-chat-x-history-content', 'children'),
-    [Input('ai-chat-x-messages-store', 'data')],
+    [
+        Output('ai-chat-x-history-content', 'children'),
+        Output('ai-chat-x-history-rendered', 'data')
+    ],
+    [
+        Input('ai-chat-x-messages-store', 'data'),
+        Input('ai-chat-x-history-viewport', 'data')
+    ],
+    [State('ai-chat-x-history-rendered', 'data')],
+    prevent_initial_call=True
+)
+def update_chat_history(messages_store, viewport, rendered):
+    """更新聊天历史显示 - 只在消息存储初始化、非流式更新或滚动超出已挂载窗口时调用"""
+    if ctx.triggered_id == 'ai-chat-x-history-viewport':
+        return scroll_chat_history(messages_store, viewport, rendered)
+
+    if rendered and messages_store and rendered.get('key') == messages_store.get('key') \
+            and rendered.get('version') == messages_store.get('version'):
+        return no_update, no_update
+
+    with message_render_cache.refresh():
+        result = build_chat_history_patch(rendered, messages_store)
+        if result is None:
+            # 全量渲染最近的消息，内容未变化的消息复用渲染缓存
+            children, state = render_full_chat_history(messages_store, get_messages(messages_store))
+            return children, {**state, 'deleted': get_chat_history_deletions(rendered, messages_store)}
+
+    return result
+
+
+def scroll_chat_history(messages_store, viewport, rendered):
+    """按前端请求的虚拟滚动窗口挂载消息"""
+    # 消息存储更新尚未渲染时以消息存储更新为准
+    if not (
+        viewport and rendered and messages_store
+        and rendered.get('window')
+        and viewport.get('key') == rendered.get('key') == messages_store.get('key')
+        and rendered.get('version') == messages_store.get('version')
+    ):
+        return no_update, no_update
+
+    start, end = clamp_chat_history_window(rendered['count'], viewport.get('start'), viewport.get('end'))
+    if (start, end) == (rendered.get('start'), rendered.get('end')):
+        return no_update, no_update
+
+    messages = get_messages(messages_store)
+    with message_render_cache.refresh('viewport'):
+        patch = build_chat_history_window_patch(rendered, messages, start, end)
+        if patch is None:
+            return render_full_chat_history(messages_store, messages, start, end)
+
+    return patch, {**rendered, 'start': start, 'end': end}
+
+
+# 聊天历史虚拟滚动：已挂载的消息窗口更新后测量消息高度并设置窗口前后占位元素的高度
+app.clientside_callback(
+    ClientsideFunction(
+        namespace='clientside_basic',
+        function_name='syncChatHistoryWindow'
+    ),
+    Output('ai-chat-x-history-spacer-top', 'id'),  # 虚拟输出，仅用于触发回调
+    Input('ai-chat-x-history-rendered', 'data'),
     prevent_initial_call=True
 )
-def update_chat_history(messages):
-    """更新聊天历史显示 - 只在消息存储初始化或非流式更新时调用"""
-    #log.debug(f"更新聊天历史，消息数量: {len(messages) if messages else 0}")
-    # 直接使用消息列表渲染聊天历史
-    return AiChatMessageHistory(messages or [])
 
-# 注册函数，供app.py调用
+
 def register_chat_input_callbacks(flask_app):
     """
     注册聊天输入区域的所有回调函数
@@ -661,6 +883,11 @@ app.clientside_callback(
                         console.warn('SSE响应超时:', message_id);
                     }
                     
+                    // 记录流式内容，消息被聊天历史虚拟滚动卸载后重新挂载时恢复
+                    if (window.dash_clientside && window.dash_clientside.clientside_basic && window.dash_clientside.clientside_basic.rememberStreamingContent) {
+                        window.dash_clientside.clientside_basic.rememberStreamingContent(message_id, fullContent, finalStatus);
+                    }
+
                     // 4. 使用message_id查找元素并更新完整内容
                     const messageElement = document.getElementById(message_id);
                     if (messageElement) {
@@ -697,88 +924,89 @@ app.clientside_callback(
                             // 对于传统文本元素，保持原有逻辑
                             messageElement.textContent = fullContent;
                         }
-                        
-                        // 5. 如果状态是completed，更新流式状态
-                        if (finalStatus === 'completed') {
-                            const parentMessage = messageElement.closest('.chat-message');
-                            if (parentMessage) {
-                                parentMessage.setAttribute('data-streaming', 'false');
+                    } else {
+                        // 消息已被聊天历史虚拟滚动卸载，重新挂载时按记录的流式内容恢复
+                        console.warn('未找到ID为', message_id, '的消息元素');
+                    }
+
+                    // 5. 如果状态是completed，更新流式状态（消息已被虚拟滚动卸载时同样需要完成处理）
+                    if (finalStatus === 'completed') {
+                        const parentMessage = messageElement && messageElement.closest('.chat-message');
+                        if (parentMessage) {
+                            parentMessage.setAttribute('data-streaming', 'false');
+                        }
+
+                        // 清理重连信息和超时检测器
+                        const sessionIdEl = document.getElementById('ai-chat-x-current-session-id');
+                        const sessionId = sessionIdEl?.value || '';
+                        if (window.dash_clientside && window.dash_clientside.clientside_basic) {
+                            if (window.dash_clientside.clientside_basic.clearSSEReconnectInfo) {
+                                window.dash_clientside.clientside_basic.clearSSEReconnectInfo(message_id, sessionId);
                             }
+                            if (window.dash_clientside.clientside_basic.clearSSETimeoutMonitor) {
+                                window.dash_clientside.clientside_basic.clearSSETimeoutMonitor(message_id);
+                            }
+                        }
 
-                            // 清理重连信息和超时检测器
-                            const sessionIdEl = document.getElementById('ai-chat-x-current-session-id');
-                            const sessionId = sessionIdEl?.value || '';
-                            if (window.dash_clientside && window.dash_clientside.clientside_basic) {
-                                if (window.dash_clientside.clientside_basic.clearSSEReconnectInfo) {
-                                    window.dash_clientside.clientside_basic.clearSSEReconnectInfo(message_id, sessionId);
-                                }
-                                if (window.dash_clientside.clientside_basic.clearSSETimeoutMonitor) {
-                                    window.dash_clientside.clientside_basic.clearSSETimeoutMonitor(message_id);
-                                }
+                        // 同步数据到消息存储
+                        const event = new CustomEvent('sseCompleted', {
+                            detail: {
+                                messageId: message_id,
+                                content: fullContent
                             }
+                        });
+                        document.dispatchEvent(event);
 
-                            // 同步数据到消息存储
-                            const event = new CustomEvent('sseCompleted', {
-                                detail: {
-                                    messageId: message_id,
-                                    content: fullContent
-                                }
-                            });
-                            document.dispatchEvent(event);
-
-                            // 检查 enable_auto_tts_after_sse 配置，决定是否触发TTS播放
-                            const enableAutoTTS = window.voiceConfig && window.voiceConfig.ENABLE_AUTO_TTS_AFTER_SSE === 'true';
-                            if (enableAutoTTS) {
-                                // 触发TTS播放（voice_player_enhanced.js 会监听 messageCompleted）
-                                try {
-                                    const ttsEvent = new CustomEvent('messageCompleted', {
-                                        detail: { text: fullContent }
+                        // 检查 enable_auto_tts_after_sse 配置，决定是否触发TTS播放
+                        const enableAutoTTS = window.voiceConfig && window.voiceConfig.ENABLE_AUTO_TTS_AFTER_SSE === 'true';
+                        if (enableAutoTTS) {
+                            // 触发TTS播放（voice_player_enhanced.js 会监听 messageCompleted）
+                            try {
+                                const ttsEvent = new CustomEvent('messageCompleted', {
+                                    detail: { text: fullContent }
+                                });
+                                document.dispatchEvent(ttsEvent);
+                            } catch (e) {
+                                console.warn('触发TTS事件失败:', e);
+                            }
+                        } else {
+                            console.log('SSE完成，但 enable_auto_tts_after_sse 为 false，跳过TTS播放');
+                            // 🔧 关键修复：当 enable_auto_tts_after_sse 为 false 时，直接重置按钮状态
+                            // 触发按钮状态重置事件，让统一按钮状态管理器重置到idle状态
+                            try {
+                                if (window.dash_clientside && window.dash_clientside.set_props) {
+                                    window.dash_clientside.set_props('button-event-trigger', {
+                                        data: {
+                                            type: 'tts_complete',
+                                            timestamp: Date.now()
+                                        }
                                     });
-                                    document.dispatchEvent(ttsEvent);
-                                } catch (e) {
-                                    console.warn('触发TTS事件失败:', e);
+                                    console.log('🔧 已触发按钮状态重置事件（enable_auto_tts_after_sse=false）');
                                 }
-                            } else {
-                                console.log('SSE完成，但 enable_auto_tts_after_sse 为 false，跳过TTS播放');
-                                // 🔧 关键修复：当 enable_auto_tts_after_sse 为 false 时，直接重置按钮状态
-                                // 触发按钮状态重置事件，让统一按钮状态管理器重置到idle状态
-                                try {
-                                    if (window.dash_clientside && window.dash_clientside.set_props) {
-                                        window.dash_clientside.set_props('button-event-trigger', {
-                                            data: {
-                                                type: 'tts_complete',
-                                                timestamp: Date.now()
-                                            }
-                                        });
-                                        console.log('🔧 已触发按钮状态重置事件（enable_auto_tts_after_sse=false）');
-                                    }
-                                } catch (e) {
-                                    console.warn('触发按钮状态重置事件失败:', e);
-                                }
-                            }
-                            
-                            // 新增：SSE完成时强制滚动到底部
-                            if (window.dash_clientside && window.dash_clientside.clientside_basic && window.dash_clientside.clientside_basic.forceScrollToBottom) {
-                                setTimeout(() => {
-                                    window.dash_clientside.clientside_basic.forceScrollToBottom();
-                                }, 100); // 延迟100ms确保DOM更新完成
+                            } catch (e) {
+                                console.warn('触发按钮状态重置事件失败:', e);
                             }
                         }
                         
-                        // 新增：处理超时状态
-                        if (finalStatus === 'timeout') {
-                            const parentMessage = messageElement.closest('.chat-message');
-                            if (parentMessage) {
-                                parentMessage.setAttribute('data-streaming', 'false');
-                            }
-                            
-                            // 清理超时检测器
-                            if (window.dash_clientside && window.dash_clientside.clientside_basic && window.dash_clientside.clientside_basic.clearSSETimeoutMonitor) {
-                                window.dash_clientside.clientside_basic.clearSSETimeoutMonitor(message_id);
-                            }
+                        // 新增：SSE完成时强制滚动到底部
+                        if (window.dash_clientside && window.dash_clientside.clientside_basic && window.dash_clientside.clientside_basic.forceScrollToBottom) {
+                            setTimeout(() => {
+                                window.dash_clientside.clientside_basic.forceScrollToBottom();
+                            }, 100); // 延迟100ms确保DOM更新完成
+                        }
+                    }
+                    
+                    // 新增：处理超时状态
+                    if (finalStatus === 'timeout') {
+                        const parentMessage = messageElement && messageElement.closest('.chat-message');
+                        if (parentMessage) {
+                            parentMessage.setAttribute('data-streaming', 'false');
+                        }
+                        
+                        // 清理超时检测器
+                        if (window.dash_clientside && window.dash_clientside.clientside_basic && window.dash_clientside.clientside_basic.clearSSETimeoutMonitor) {
+                            window.dash_clientside.clientside_basic.clearSSETimeoutMonitor(message_id);
                         }
-                    } else {
-                        console.warn('未找到ID为', message_id, '的消息元素');
                     }
                 }
             }
@@ -910,7 +1138,7 @@ def manage_connection_status(sse_url, completion_event, tag_clicks):
 # 合并的自动滚动和初始化回调
 app.clientside_callback(
     """
-    function(messages, historyId) {
+    function(messagesToken, historyId) {
         // 安全检查：确保 dash_clientside 对象存在
         if (typeof window.dash_clientside === 'undefined' || !window.dash_clientside) {
             console.warn('dash_clientside not ready, skipping auto scroll');
@@ -937,8 +1165,8 @@ app.clientside_callback(
             }
         }
         // 如果是消息存储更新触发
-        else if (triggeredId === 'ai-chat-x-messages-store.data' && messages && messages.length > 0) {
-            // window.controlledLog?.log('消息存储更新，触发自动滚动，消息数量:', messages.length);
+        else if (triggeredId === 'ai-chat-x-messages-store.data' && messagesToken && messagesToken.count > 0) {
+            // window.controlledLog?.log('消息存储更新，触发自动滚动，消息数量:', messagesToken.count);
             
             // 使用优化的自动滚动函数
             if (window.dash_clientside.clientside_basic && window.dash_clientside.clientside_basic.autoScrollToBottom) {
@@ -982,9 +1210,11 @@ app.clientside_callback(
     prevent_initial_call=True
 )
 def handle_message_operations(ai_regenerate_clicks, user_regenerate_clicks, cancel_clicks, 
-                             messages, current_session_id, send_btn_clicks):
+                             messages_store, current_session_id, send_btn_clicks):
     """处理所有消息相关操作：重新生成、取消发送"""
     
+    messages = get_messages(messages_store)
+    
     if not ctx.triggered:
         return [dash.no_update] * 4
     
@@ -1011,30 +1241,23 @@ def handle_message_operations(ai_regenerate_clicks, user_regenerate_clicks, canc
                 return [dash.no_update] * 4
             
             # 找到目标消息和上一条用户消息
-            target_message_index = None
             previous_user_message = None
             
-            for i, message in enumerate(messages):
-                if message.get('id') == target_message_id:
-                    target_message_index = i
-                    # 查找上一条用户消息
-                    for j in range(i-1, -1, -1):
-                        if messages[j].get('role') == 'user':
-                            previous_user_message = messages[j]
-                            break
-                    break
-            
-            if target_message_index is None:
+            target_message_index = messages.find(target_message_id)
+            if target_message_index < 0:
                 return [dash.no_update] * 4
             
+            # 查找上一条用户消息
+            for j in range(target_message_index - 1, -1, -1):
+                if messages[j].get('role') == 'user':
+                    previous_user_message = messages[j]
+                    break
+            
             if previous_user_message is None:
                 return [dash.no_update] * 4
             
-            # 创建消息的深拷贝
-            updated_messages = copy.deepcopy(messages)
-            
             # 删除目标AI消息
-            del updated_messages[target_message_index]
+            updated_token = delete_message(messages_store, target_message_id)
             
             # 创建新的AI消息（正在思考中...）
             new_ai_message = {
@@ -1046,10 +1269,10 @@ def handle_message_operations(ai_regenerate_clicks, user_regenerate_clicks, canc
             }
             
             # 添加新的AI消息
-            updated_messages.append(new_ai_message)
+            updated_token = append_messages(updated_token, new_ai_message)
             
-            # 返回更新后的消息，SSE会自动通过trigger_sse回调触发
-            return updated_messages, dash.no_update, dash.no_update, dash.no_update
+            # 返回更新后的消息存储令牌，SSE会自动通过trigger_sse回调触发
+            return updated_token, dash.no_update, dash.no_update, dash.no_update
         
         # 处理用户消息重新生成
         elif '"type":"user-chat-x-regenerate"' in prop_id:
@@ -1062,10 +1285,9 @@ def handle_message_operations(ai_regenerate_clicks, user_regenerate_clicks, canc
             
             # 找到目标用户消息
             target_message = None
-            for message in messages:
-                if message.get('id') == target_message_id and message.get('role') == 'user':
-                    target_message = message
-                    break
+            target_message_index = messages.find(target_message_id)
+            if target_message_index >= 0 and messages[target_message_index].get('role') == 'user':
+                target_message = messages[target_message_index]
             
             if target_message:
                 # 将用户消息内容填入输入框
@@ -1086,19 +1308,12 @@ def handle_message_operations(ai_regenerate_clicks, user_regenerate_clicks, canc
             if not messages:
                 return [dash.no_update] * 4
             
-            # 创建消息的深拷贝
-            updated_messages = copy.deepcopy(messages)
-            
             # 找到并删除目标消息
-            target_message_index = None
-            for i, message in enumerate(updated_messages):
-                if message.get('id') == target_message_id and message.get('is_streaming', False):
-                    target_message_index = i
-                    break
+            target_message_index = messages.find(target_message_id)
             
-            if target_message_index is not None:
+            if target_message_index >= 0 and messages[target_message_index].get('is_streaming', False):
                 # 删除正在流式传输的消息
-                del updated_messages[target_message_index]
+                updated_token = delete_message(messages_store, target_message_id)
                 
                 # 清理活跃的SSE连接
                 if target_message_id in active_sse_connections:
@@ -1115,7 +1330,7 @@ def handle_message_operations(ai_regenerate_clicks, user_regenerate_clicks, canc
                 )
                 
                 log.debug(f"取消发送消息: {target_message_id}")
-                return updated_messages, dash.no_update, dash.no_update, success_message
+                return updated_token, dash.no_update, dash.no_update, success_message
             else:
                 # 未找到目标消息
                 error_message = fac.AntdMessage(
@@ -1138,7 +1353,7 @@ def handle_message_operations(ai_regenerate_clicks, user_regenerate_clicks, canc
 # 复制消息的客户端回调
 app.clientside_callback(
     """
-    function(ai_copy_clicks, user_copy_clicks, messages) {
+    function(ai_copy_clicks, user_copy_clicks, ai_contents, user_contents) {
         if (!window.dash_clientside) {
             return window.dash_clientside.no_update;
         }
@@ -1166,51 +1381,55 @@ app.clientside_callback(
                 const messageId = idDict.index;
                 // window.controlledLog?.log('消息ID:', messageId);
                 
-                // 从消息存储中获取原始内容
-                if (messages) {
-                    const targetMessage = messages.find(msg => msg.id === messageId);
-                    if (targetMessage && targetMessage.content) {
-                        // 复制到剪贴板 - 使用fallback方案
-                        const content = targetMessage.content;
-                        
-                        // 尝试使用现代clipboard API
-                        if (navigator.clipboard && navigator.clipboard.writeText) {
-                            navigator.clipboard.writeText(content).then(() => {
-                                // window.controlledLog?.log('复制成功');
-                            }).catch(() => {
-                                // 如果现代API失败，使用fallback
-                                fallbackCopyToClipboard(content);
-                            });
-                        } else {
-                            // 使用fallback方案
-                            fallbackCopyToClipboard(content);
+                // 从消息中保存原始内容的Store获取（完整消息列表仅保存在服务端）
+                const statesList = window.dash_clientside.callback_context.states_list || [];
+                const contentGroups = [ai_contents || [], user_contents || []];
+                let content = null;
+                statesList.forEach((group, groupIndex) => {
+                    (group || []).forEach((item, i) => {
+                        if (item.id && item.id.index === messageId) {
+                            content = contentGroups[groupIndex][i];
                         }
+                    });
+                });
+                if (content) {
+                    // 复制到剪贴板 - 尝试使用现代clipboard API
+                    if (navigator.clipboard && navigator.clipboard.writeText) {
+                        navigator.clipboard.writeText(content).then(() => {
+                            // window.controlledLog?.log('复制成功');
+                        }).catch(() => {
+                            // 如果现代API失败，使用fallback
+                            fallbackCopyToClipboard(content);
+                        });
+                    } else {
+                        // 使用fallback方案
+                        fallbackCopyToClipboard(content);
                     }
+                }
+                
+                // Fallback复制函数
+                function fallbackCopyToClipboard(text) {
+                    const textArea = document.createElement('textarea');
+                    textArea.value = text;
+                    textArea.style.position = 'fixed';
+                    textArea.style.left = '-999999px';
+                    textArea.style.top = '-999999px';
+                    document.body.appendChild(textArea);
+                    textArea.focus();
+                    textArea.select();
                     
-                    // Fallback复制函数
-                    function fallbackCopyToClipboard(text) {
-                        const textArea = document.createElement('textarea');
-                        textArea.value = text;
-                        textArea.style.position = 'fixed';
-                        textArea.style.left = '-999999px';
-                        textArea.style.top = '-999999px';
-                        document.body.appendChild(textArea);
-                        textArea.focus();
-                        textArea.select();
-                        
-                        try {
-                            const successful = document.execCommand('copy');
-                            if (successful) {
-                                // window.controlledLog?.log('复制成功 (fallback)');
-                            } else {
-                                // window.controlledLog?.log('复制失败 (fallback)');
-                            }
-                        } catch (err) {
-                            // window.controlledLog?.log('复制失败 (fallback):', err);
+                    try {
+                        const successful = document.execCommand('copy');
+                        if (successful) {
+                            // window.controlledLog?.log('复制成功 (fallback)');
+                        } else {
+                            // window.controlledLog?.log('复制失败 (fallback)');
                         }
-                        
-                        document.body.removeChild(textArea);
+                    } catch (err) {
+                        // window.controlledLog?.log('复制失败 (fallback):', err);
                     }
+                    
+                    document.body.removeChild(textArea);
                 }
             } catch (error) {
                 // console.error('复制消息失败:', error);
@@ -1225,7 +1444,10 @@ app.clientside_callback(
         Input({'type': 'ai-chat-x-copy', 'index': dash.ALL}, 'nClicks'),
         Input({'type': 'user-chat-x-copy', 'index': dash.ALL}, 'nClicks')
     ],
-    State('ai-chat-x-messages-store', 'data'),
+    [
+        State({'type': 'ai-chat-x-original-markdown', 'index': dash.ALL}, 'data'),
+        State({'type': 'user-chat-x-original-content', 'index': dash.ALL}, 'data')
+    ],
     prevent_initial_call=True
 )
 
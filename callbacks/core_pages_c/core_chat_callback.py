@@ -5,11 +5,11 @@
 
 import json
 import time
-import copy
 from datetime import datetime
 from dash import Input, Output, State, no_update, ctx
 import dash
 from utils.log import log
+from core.message_store.message_store import get_messages, append_messages, replace_message
 
 # 添加用于SSE连接的存储
 active_sse_connections = {}
@@ -78,22 +78,22 @@ def register_core_chat_callback(app):
         triggered_id = ctx.triggered_id if ctx.triggered else None
         log.info(f"🔍 核心聊天回调被触发: {triggered_id}")
         
-        # 初始化消息存储
-        messages = messages_store or []
+        # 消息存储中仅保存令牌，完整消息列表从服务端消息存储获取
+        messages = get_messages(messages_store)
         
         # 清理过期的SSE连接记录
         cleanup_expired_sse_connections()
         
         # 默认返回值
         default_returns = [
-            messages, message_content, False, False,  # 消息相关
+            messages_store, message_content, False, False,  # 消息相关
             dash.no_update, dash.no_update, dash.no_update  # 语音和SSE
         ]
         
         # 1. 处理文本消息发送
         if triggered_id == 'ai-chat-x-send-btn' and message_content:
             log.info(f"📝 处理文本消息发送: {message_content[:50]}...")
-            return _handle_text_message_send(messages, message_content, current_session_id, default_returns)
+            return _handle_text_message_send(messages_store, messages, message_content, current_session_id, default_returns)
         
         # 2. 处理话题点击
         elif triggered_id and 'chat-topic' in str(triggered_id):
@@ -103,39 +103,35 @@ def register_core_chat_callback(app):
         # 3. 处理语音转录
         elif triggered_id == 'voice-transcription-store-server' and transcription_data and transcription_data.get('text'):
             log.info(f"🎤 处理语音转录: {transcription_data.get('text', '')[:50]}...")
-            return _handle_voice_transcription(messages, transcription_data, current_session_id, default_returns)
+            return _handle_voice_transcription(messages_store, messages, transcription_data, current_session_id, default_returns)
         
         # 4. 处理SSE完成事件
         elif triggered_id == 'ai-chat-x-sse-completed-receiver.data-completion-event':
             log.info(f"✅ 处理SSE完成事件")
-            return _handle_sse_completion(messages, sse_completion_event, message_content, default_returns)
+            return _handle_sse_completion(messages_store, messages, sse_completion_event, message_content, default_returns)
         
         # 默认返回当前状态
         return default_returns
 
 
-def _handle_text_message_send(messages, message_content, current_session_id, default_returns):
+def _handle_text_message_send(messages_store, messages, message_content, current_session_id, default_returns):
     """处理文本消息发送"""
     message_content = message_content.strip()
     
     if not message_content:
         return default_returns
     
-    # 创建消息的深拷贝
-    updated_messages = copy.deepcopy(messages)
-    
     # 添加用户消息
-    usr_message_id = f"usr-message-{len(updated_messages)}"
+    usr_message_id = f"usr-message-{len(messages)}"
     user_message = {
         'role': 'user',
         'content': message_content,
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'id': usr_message_id
     }
-    updated_messages.append(user_message)
     
     # 添加AI消息占位
-    ai_message_id = f"ai-message-{len(updated_messages)}"
+    ai_message_id = f"ai-message-{len(messages) + 1}"
     ai_message = {
         'role': 'assistant',
         'content': '正在思考中...',
@@ -143,7 +139,7 @@ def _handle_text_message_send(messages, message_content, current_session_id, def
         'id': ai_message_id,
         'is_streaming': True
     }
-    updated_messages.append(ai_message)
+    updated_messages = messages.appended(user_message, ai_message)
     
     # 保存到数据库
     if current_session_id:
@@ -163,9 +159,15 @@ def _handle_text_message_send(messages, message_content, current_session_id, def
     
     # 构建SSE请求（包含完整历史消息以保持对话连贯性）
     try:
-        # 构建完整的历史消息列表（包含所有用户和助手消息）
+        # 构建历史消息列表（包含用户和助手消息）
+        # 从末尾向前收集，只保留最近的N条消息（避免请求过大），开销与历史消息总数无关
+        from configs.base_config import BaseConfig
+        max_history = BaseConfig.max_history_messages_count
         conversation_messages = []
-        for m in updated_messages:
+        for m in reversed(updated_messages):
+            if len(conversation_messages) >= max_history:
+                log.debug(f"历史消息过多，已限制为最近{max_history}条消息")
+                break
             # 跳过最后一条正在流式传输的AI消息占位符
             if m.get('id') == ai_message_id and m.get('is_streaming', False):
                 continue
@@ -180,13 +182,7 @@ def _handle_text_message_send(messages, message_content, current_session_id, def
                     'role': 'user' if msg_role == 'user' else 'assistant',
                     'content': msg_content
                 })
-        
-        # 限制历史消息数量，只保留最近的N条消息（避免请求过大）
-        from configs.base_config import BaseConfig
-        max_history = BaseConfig.max_history_messages_count
-        if len(conversation_messages) > max_history:
-            conversation_messages = conversation_messages[-max_history:]
-            log.debug(f"历史消息过多，已限制为最近{max_history}条消息")
+        conversation_messages.reverse()
         
         session_id = current_session_id or 'conversation_0001'
         
@@ -222,7 +218,7 @@ def _handle_text_message_send(messages, message_content, current_session_id, def
         
         # 更新返回值
         result = default_returns.copy()
-        result[0] = updated_messages  # messages
+        result[0] = append_messages(messages_store, user_message, ai_message)  # messages
         result[1] = ''  # input value
         result[2] = True  # loading
         result[3] = True  # disabled
@@ -233,34 +229,31 @@ def _handle_text_message_send(messages, message_content, current_session_id, def
     except Exception as e:
         log.error(f"构建SSE请求失败: {e}")
         result = default_returns.copy()
-        result[0] = updated_messages
+        result[0] = append_messages(messages_store, user_message, ai_message)
         result[1] = ''
         result[2] = True
         result[3] = True
         return result
 
 
-def _handle_voice_transcription(messages, transcription_data, current_session_id, default_returns):
+def _handle_voice_transcription(messages_store, messages, transcription_data, current_session_id, default_returns):
     """处理语音转录"""
     try:
         transcribed_text = transcription_data.get('text', '').strip()
         if not transcribed_text:
             return default_returns
 
-        updated_messages = copy.deepcopy(messages)
-
         # 添加用户消息
-        usr_message_id = f"usr-message-{len(updated_messages)}"
+        usr_message_id = f"usr-message-{len(messages)}"
         user_message = {
             'role': 'user',
             'content': transcribed_text,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'id': usr_message_id
         }
-        updated_messages.append(user_message)
 
         # 添加AI消息占位
-        ai_message_id = f"ai-message-{len(updated_messages)}"
+        ai_message_id = f"ai-message-{len(messages) + 1}"
         ai_message = {
             'role': 'assistant',
             'content': '正在思考中...',
@@ -268,11 +261,17 @@ def _handle_voice_transcription(messages, transcription_data, current_session_id
             'id': ai_message_id,
             'is_streaming': True
         }
-        updated_messages.append(ai_message)
+        updated_messages = messages.appended(user_message, ai_message)
 
         # 构建SSE请求（语音模式，包含完整历史消息以保持对话连贯性）
+        # 从末尾向前收集，只保留最近的N条消息（避免请求过大），开销与历史消息总数无关
+        from configs.base_config import BaseConfig
+        max_history = BaseConfig.max_history_messages_count
         conversation_messages = []
-        for m in updated_messages:
+        for m in reversed(updated_messages):
+            if len(conversation_messages) >= max_history:
+                log.debug(f"历史消息过多，已限制为最近{max_history}条消息")
+                break
             # 跳过最后一条正在流式传输的AI消息占位符
             if m.get('id') == ai_message_id and m.get('is_streaming', False):
                 continue
@@ -287,13 +286,7 @@ def _handle_voice_transcription(messages, transcription_data, current_session_id
                     'role': 'user' if msg_role == 'user' else 'assistant',
                     'content': msg_content
                 })
-        
-        # 限制历史消息数量，只保留最近的N条消息（避免请求过大）
-        from configs.base_config import BaseConfig
-        max_history = BaseConfig.max_history_messages_count
-        if len(conversation_messages) > max_history:
-            conversation_messages = conversation_messages[-max_history:]
-            log.debug(f"历史消息过多，已限制为最近{max_history}条消息")
+        conversation_messages.reverse()
         
         session_id = current_session_id or 'conversation_0001'
         
@@ -329,7 +322,7 @@ def _handle_voice_transcription(messages, transcription_data, current_session_id
         
         # 更新返回值
         result = default_returns.copy()
-        result[0] = updated_messages  # messages
+        result[0] = append_messages(messages_store, user_message, ai_message)  # messages
         result[1] = ''  # input value
         result[2] = True  # loading
         result[3] = True  # disabled
@@ -343,7 +336,7 @@ def _handle_voice_transcription(messages, transcription_data, current_session_id
         return default_returns
 
 
-def _handle_sse_completion(messages, completion_event_json, message_content, default_returns):
+def _handle_sse_completion(messages_store, messages, completion_event_json, message_content, default_returns):
     """处理SSE完成事件"""
     if not messages:
         return default_returns
@@ -362,13 +355,14 @@ def _handle_sse_completion(messages, completion_event_json, message_content, def
             else:
                 return default_returns
 
-        # 更新消息
-        updated_messages = copy.deepcopy(messages)
-        for i, message in enumerate(updated_messages):
-            if message.get('id') == message_id:
-                updated_messages[i]['content'] = full_content
-                updated_messages[i]['is_streaming'] = False
-                break
+        # 更新消息（从末尾查找，流式消息通常为最后一条）
+        updated_token = messages_store
+        message_index = messages.find(message_id)
+        if message_index >= 0:
+            updated_token = replace_message(
+                messages_store,
+                {**messages[message_index], 'content': full_content, 'is_streaming': False}
+            )
 
         # 清理SSE连接
         if message_id in active_sse_connections:
@@ -378,7 +372,7 @@ def _handle_sse_completion(messages, completion_event_json, message_content, def
         
         # 更新返回值
         result = default_returns.copy()
-        result[0] = updated_messages
+        result[0] = updated_token
         result[1] = message_content
         result[2] = False  # loading
         result[3] = False  # disabled
@@ -1,30 +1,34 @@
-import time
 import dash
-import pandas as pd
-from datetime import datetime
-from dash import set_props, dcc
+from dash import set_props
 import feffery_antd_components as fac
 from dash.dependencies import Input, Output, State
 
 from server import app
 from models.logs import LoginLogs
+from core.audit_log_writer.audit_log_writer import flush_login_logs
 
 
 @app.callback(
-    Output("core-login-logs-table", "data"),
+    [
+        Output("core-login-logs-table", "data"),
+        Output("core-login-logs-table-page-cursors", "data"),
+    ],
     [
         Input("core-login-logs-table-init-data-trigger", "timeoutCount"),
         Input("core-login-logs-table", "pagination"),
         Input("core-login-logs-table", "sorter"),
         Input("core-login-logs-table", "filter"),
     ],
+    State("core-login-logs-table-page-cursors", "data"),
     prevent_initial_call=True,
 )
-def handle_login_logs_table_data_load(timeoutCount, pagination, sorter, _filter):
+def handle_login_logs_table_data_load(
+    timeoutCount, pagination, sorter, _filter, page_cursors
+):
     """处理登录日志表数据加载"""
 
     # 为本次查询构造查询条件
-    query_condition = {}
+    query_condition = {"order_by": "id", "order": "descend"}
 
     # 若存在有效排序条件
     if sorter and sorter["columns"]:
@@ -36,13 +40,39 @@ def handle_login_logs_table_data_load(timeoutCount, pagination, sorter, _filter)
         if _filter.get("user_name"):
             query_condition["user_name_keyword"] = _filter["user_name"][0]
 
+    page_size = pagination["pageSize"]
+    current = pagination["current"]
+
+    # 查询条件或每页记录数变化后，已记录的分页游标全部失效
+    signature = [
+        query_condition["order_by"],
+        query_condition["order"],
+        query_condition.get("user_name_keyword"),
+        page_size,
+    ]
+    if not page_cursors or page_cursors.get("signature") != signature:
+        page_cursors = {"signature": signature, "cursors": {}}
+
+    # 从目标页之前最近的已知页游标处开始键集分页，仅对剩余的页数使用偏移
+    nearest_page = max(
+        (int(page) for page in page_cursors["cursors"] if int(page) < current),
+        default=0,
+    )
+
     # 获取登录日志数据
     match_login_logs = LoginLogs.get_logs(
-        limit=pagination["pageSize"],
-        offset=(pagination["current"] - 1) * pagination["pageSize"],
+        limit=page_size,
+        offset=(current - 1 - nearest_page) * page_size,
+        after=page_cursors["cursors"].get(str(nearest_page)),
         **query_condition,  # 传入实际查询条件
     )
 
+    # 记录当前页游标，供后续翻页使用
+    if match_login_logs:
+        page_cursors["cursors"][str(current)] = LoginLogs.get_seek_key(
+            match_login_logs[-1], query_condition["order_by"]
+        )
+
     return [
         {
             **item,
@@ -50,11 +80,13 @@ def handle_login_logs_table_data_load(timeoutCount, pagination, sorter, _filter)
                 "tag": item["status"],
                 "color": "green" if item["status"] == "登录成功" else "red",
             },
+            # 分区内id不唯一，展示及删除均使用跨分区唯一的记录标识
+            "id": LoginLogs.get_log_key(item),
             "login_datetime": item["login_datetime"].strftime("%Y-%m-%d %H:%M:%S"),
-            "key": item["id"],
+            "key": LoginLogs.get_log_key(item),
         }
         for item in match_login_logs
-    ]
+    ], page_cursors
 
 
 @app.callback(
@@ -70,6 +102,9 @@ def handle_login_logs_refresh_delete_truncate(*args):
 
     # 若本次为刷新操作
     if dash.ctx.triggered_id == "core-login-logs-refresh-data":
+        # 先落库本进程内尚在队列中的登录日志
+        flush_login_logs()
+
         # 消息提示
         set_props(
             "global-message",
@@ -138,55 +173,98 @@ def handle_login_logs_refresh_delete_truncate(*args):
             "selectedRowKeys": [],
         },
     )
+    # 数据已变化，重置分页游标
+    set_props("core-login-logs-table-page-cursors", {"data": None})
 
 
-@app.callback(
-    Input("core-login-logs-export-data-confirm", "confirmCounts"),
-    running=[(Output("core-login-logs-export-data", "loading"), True, False)],
-)
-def handle_login_logs_export_data(confirmCounts):
-    """处理导出数据操作"""
+app.clientside_callback(
+    # 流式读取导出接口响应，按已接收行数展示导出进度
+    """async (confirmCounts) => {
+        const exportButtonId = 'core-login-logs-export-data';
+        const showMessage = (type, content) => {
+            window.dash_clientside.set_props('global-message', {
+                children: {
+                    namespace: 'feffery_antd_components',
+                    type: 'AntdMessage',
+                    props: { type: type, content: content },
+                },
+            });
+        };
 
-    # 适当增加加载动画时长
-    time.sleep(0.5)
+        window.dash_clientside.set_props(exportButtonId, {
+            loading: true,
+            loadingChildren: '导出中',
+        });
 
-    # 查询全部数据记录
-    all_login_logs = pd.DataFrame(LoginLogs.get_logs())
+        try {
+            const response = await fetch('/api/login-logs/export?format=csv', {
+                credentials: 'same-origin',
+            });
+            if (!response.ok) {
+                showMessage('error', '登录日志记录导出失败');
+                return;
+            }
 
-    # 若登录日志记录不为空
-    if not all_login_logs.empty:
-        # 处理登录时间字段格式
-        all_login_logs["login_datetime"] = all_login_logs["login_datetime"].dt.strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
+            const total = parseInt(response.headers.get('X-Total-Count') || '0', 10);
+            if (!total) {
+                showMessage('warning', '当前无登录日志记录');
+                return;
+            }
 
-        # 返回下载文件流
-        set_props(
-            "global-download",
-            {
-                "data": dcc.send_data_frame(
-                    all_login_logs.to_csv,
-                    "登录日志导出结果{}.csv".format(
-                        datetime.now().strftime("%Y%m%d%H%M%S")
-                    ),
-                    index=False,
-                    encoding="utf-8",
-                )
-            },
-        )
-        # 消息提示
-        set_props(
-            "global-message",
-            {
-                "children": fac.AntdMessage(
-                    type="success", content="登录日志记录导出成功"
-                )
-            },
-        )
+            const reader = response.body.getReader();
+            const chunks = [];
+            let receivedRows = 0;
+            let lastPercent = -1;
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) {
+                    break;
+                }
+                chunks.push(value);
+                for (let i = 0; i < value.length; i++) {
+                    if (value[i] === 10) {
+                        receivedRows++;
+                    }
+                }
+                // 首行为表头
+                const percent = Math.min(
+                    99, Math.floor((Math.max(receivedRows - 1, 0) / total) * 100)
+                );
+                if (percent !== lastPercent) {
+                    lastPercent = percent;
+                    window.dash_clientside.set_props(exportButtonId, {
+                        loadingChildren: `导出中 ${percent}%`,
+                    });
+                }
+            }
 
-    else:
-        # 消息提示
-        set_props(
-            "global-message",
-            {"children": fac.AntdMessage(type="warning", content="当前无登录日志记录")},
-        )
+            // 从响应头中解析文件名
+            const disposition = response.headers.get('Content-Disposition') || '';
+            const matchFilename = disposition.match(/filename\\*=UTF-8''([^;]+)/);
+            const filename = matchFilename
+                ? decodeURIComponent(matchFilename[1])
+                : '登录日志导出结果.csv';
+
+            const url = URL.createObjectURL(new Blob(chunks, { type: 'text/csv' }));
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = filename;
+            document.body.appendChild(link);
+            link.click();
+            link.remove();
+            URL.revokeObjectURL(url);
+
+            showMessage('success', '登录日志记录导出成功');
+        } catch (e) {
+            console.error('登录日志导出失败:', e);
+            showMessage('error', '登录日志记录导出失败');
+        } finally {
+            window.dash_clientside.set_props(exportButtonId, {
+                loading: false,
+                loadingChildren: '导出中',
+            });
+        }
+    }""",
+    Input("core-login-logs-export-data-confirm", "confirmCounts"),
+    prevent_initial_call=True,
+)
@@ -0,0 +1,85 @@
+import time
+from datetime import date
+import feffery_antd_components as fac
+from dash.dependencies import Input, Output
+from feffery_dash_utils.style_utils import style
+
+from server import app
+from models.usage_stats import UserDailyUsage, TopicDailyClicks
+
+# 活跃用户排行展示的用户数
+TOP_USERS_LIMIT = 10
+
+
+@app.callback(
+    [
+        Output("core-usage-stats-messages", "value"),
+        Output("core-usage-stats-active_users", "value"),
+        Output("core-usage-stats-conversations", "value"),
+        Output("core-usage-stats-avg_conversation_length", "value"),
+        Output("core-usage-stats-logins", "value"),
+        Output("core-usage-stats-daily-table", "data"),
+        Output("core-usage-stats-topic-distribution", "children"),
+        Output("core-usage-stats-top-users-table", "data"),
+        Output("core-usage-stats-query-time", "children"),
+    ],
+    [
+        Input("core-usage-stats-init-data-trigger", "timeoutCount"),
+        Input("core-usage-stats-refresh", "nClicks"),
+        Input("core-usage-stats-date-range", "value"),
+    ],
+    prevent_initial_call=True,
+)
+def handle_usage_stats_load(timeoutCount, nClicks, date_range):
+    """处理使用统计数据加载，仅读取汇总表"""
+
+    start_time = time.perf_counter()
+
+    start_date, end_date = (date.fromisoformat(value[:10]) for value in date_range)
+
+    summary = UserDailyUsage.get_period_summary(start_date, end_date)
+    daily_summary = UserDailyUsage.get_daily_summary(start_date, end_date)
+    topic_distribution = TopicDailyClicks.get_distribution(start_date, end_date)
+    top_users = UserDailyUsage.get_top_users(start_date, end_date, limit=TOP_USERS_LIMIT)
+
+    # 平均会话长度：统计期间新增消息数 / 新建会话数
+    avg_conversation_length = (
+        round(summary["messages"] / summary["conversations"], 1)
+        if summary["conversations"]
+        else 0
+    )
+
+    total_clicks = sum(item["clicks"] for item in topic_distribution)
+
+    return [
+        summary["messages"],
+        summary["active_users"],
+        summary["conversations"],
+        avg_conversation_length,
+        summary["logins"],
+        [
+            {
+                **item,
+                "key": str(item["stat_date"]),
+                "stat_date": str(item["stat_date"]),
+            }
+            for item in reversed(daily_summary)
+        ],
+        [
+            fac.AntdSpace(
+                [
+                    fac.AntdText(item["topic"], style=style(width=100)),
+                    fac.AntdProgress(
+                        percent=round(item["clicks"] / total_clicks * 100, 1),
+                        style=style(flex=1),
+                    ),
+                    fac.AntdText(item["clicks"], type="secondary"),
+                ],
+                style=style(width="100%", alignItems="center"),
+            )
+            for item in topic_distribution
+        ]
+        or fac.AntdEmpty(description="暂无话题点击记录"),
+        [{**item, "key": item["user_id"]} for item in top_users],
+        f"查询耗时 {(time.perf_counter() - start_time) * 1000:.1f}ms",
+    ]
@@ -1,7 +1,8 @@
 import uuid
 import time
+import base64
 import dash
-from dash import set_props
+from dash import set_props, dcc
 import feffery_antd_components as fac
 from dash.dependencies import Input, Output, State
 from feffery_dash_utils.style_utils import style
@@ -10,6 +11,11 @@ from werkzeug.security import generate_password_hash
 from server import app
 from models.users import Users
 from configs import AuthConfig
+from core.user_import.user_import import (
+    UserImportError,
+    import_users_from_file,
+    get_user_import_template,
+)
 
 from utils.log import log as log
 
@@ -43,42 +49,48 @@ def format_user_data(user, all_users_count):
 def refresh_users_table_data():
     """刷新用户表格数据"""
 
-    # 查询全部用户信息
-    all_users = Users.get_all_users()
-    all_users_count = len(all_users)
-
     # 默认返回第一页数据（10条）
-    paginated_users = all_users[:10]
+    paginated_users, all_users_count = Users.query_page(limit=10)
 
     return [format_user_data(item, all_users_count) for item in paginated_users]
 
 
+def parse_user_role_filter(values):
+    """将角色筛选值统一转换为角色名称，兼容以角色描述作为筛选值的情况"""
+
+    description_to_role = {
+        role_info["description"]: role for role, role_info in AuthConfig.roles.items()
+    }
+    return [description_to_role.get(value, value) for value in values]
+
+
 @app.callback(
-    Output("core-users-table", "data"),
+    [
+        Output("core-users-table", "data"),
+        Output("core-users-table-page-cursors", "data"),
+    ],
     [
         Input("core-users-table-init-data-trigger", "timeoutCount"),
         Input("core-users-table", "pagination"),
         Input("core-users-table", "sorter"),
         Input("core-users-table", "filter"),
     ],
+    State("core-users-table-page-cursors", "data"),
     prevent_initial_call=True,
 )
-def handle_users_table_data_load(timeoutCount, pagination, sorter, _filter):
+def handle_users_table_data_load(timeoutCount, pagination, sorter, _filter, page_cursors):
     """处理用户表数据加载"""
 
     # 为本次查询构造查询条件
-    query_condition = {}
+    query_condition = {"order_by": "user_id", "order": "ascend"}
 
     # 若存在有效排序条件
     if sorter and sorter["columns"]:
         sort_column = sorter["columns"][0]
         sort_order = sorter["orders"][0]
         # 映射前端列名到模型字段名
-        if sort_column == "user_name":
-            query_condition["order_by"] = "user_name"
-            query_condition["order"] = sort_order
-        elif sort_column == "user_role":
-            query_condition["order_by"] = "user_role"
+        if sort_column in ("user_id", "user_name", "user_role") and sort_order:
+            query_condition["order_by"] = sort_column
             query_condition["order"] = sort_order
 
     # 若存在有效筛选条件
@@ -86,36 +98,53 @@ def handle_users_table_data_load(timeoutCount, pagination, sorter, _filter):
         if _filter.get("user_name"):
             query_condition["user_name_keyword"] = _filter["user_name"][0]
         if _filter.get("user_role"):
-            query_condition["user_role"] = _filter["user_role"]
+            query_condition["user_roles"] = parse_user_role_filter(_filter["user_role"])
+
+    page_size = pagination["pageSize"]
+    current = pagination["current"]
+
+    # 查询条件或每页记录数变化后，已记录的分页游标全部失效
+    signature = [
+        query_condition["order_by"],
+        query_condition["order"],
+        query_condition.get("user_name_keyword"),
+        query_condition.get("user_roles"),
+        page_size,
+    ]
+    if not page_cursors or page_cursors.get("signature") != signature:
+        page_cursors = {"signature": signature, "cursors": {}}
 
-    # 获取用户数据
-    all_users = Users.get_all_users()
-    all_users_count = len(all_users)
-
-    # 应用排序
-    if query_condition.get("order_by") and query_condition.get("order"):
-        order_by = query_condition["order_by"]
-        order = query_condition["order"]
-        all_users.sort(
-            key=lambda x: x[order_by],
-            reverse=(order == "descend")
-        )
+    # 从目标页之前最近的已知页游标处开始键集分页，仅对剩余的页数使用偏移
+    nearest_page = max(
+        (int(page) for page in page_cursors["cursors"] if int(page) < current),
+        default=0,
+    )
 
-    # 应用筛选
-    if query_condition.get("user_name_keyword"):
-        keyword = query_condition["user_name_keyword"].lower()
-        all_users = [user for user in all_users if keyword in user["user_name"].lower()]
+    # 获取用户数据
+    paginated_users, matched_users_count = Users.query_page(
+        limit=page_size,
+        offset=(current - 1 - nearest_page) * page_size,
+        after=page_cursors["cursors"].get(str(nearest_page)),
+        **query_condition,
+    )
 
-    if query_condition.get("user_role"):
-        roles = query_condition["user_role"]
-        all_users = [user for user in all_users if user["user_role"] in roles]
+    # 记录当前页游标，供后续翻页使用
+    if paginated_users:
+        page_cursors["cursors"][str(current)] = Users.get_seek_key(
+            paginated_users[-1], query_condition["order_by"]
+        )
 
-    # 应用分页
-    start_index = (pagination["current"] - 1) * pagination["pageSize"]
-    end_index = start_index + pagination["pageSize"]
-    paginated_users = all_users[start_index:end_index]
+    # 筛选结果多于1个用户时，全部用户数必然多于1个，无需额外计数
+    all_users_count = (
+        matched_users_count
+        if matched_users_count > 1
+        or not (query_condition.get("user_name_keyword") or query_condition.get("user_roles"))
+        else Users.get_count()
+    )
 
-    return [format_user_data(item, all_users_count) for item in paginated_users]
+    return [
+        format_user_data(item, all_users_count) for item in paginated_users
+    ], page_cursors
 
 
 @app.callback(
@@ -286,12 +315,14 @@ def handle_add_user_actions(submit_clicks, cancel_clicks, values):
                         # 重置分页参数
                         "pagination": {
                             "current": 1,
-                            "total": len(Users.get_all_users()),  # 获取用户最新总数
+                            "total": Users.get_count(),  # 获取用户最新总数
                             "pageSize": 10,
                             "showSizeChanger": False,
                         },
                     },
                 )
+                # 数据已变化，重置分页游标
+                set_props("core-users-table-page-cursors", {"data": None})
 
 
 @app.callback(
@@ -486,6 +517,8 @@ def handle_edit_user_actions(submit_clicks, cancel_clicks, values):
             "core-users-table",
             {"data": refresh_users_table_data()},
         )
+        # 数据已变化，重置分页游标
+        set_props("core-users-table-page-cursors", {"data": None})
 
 
 @app.callback(
@@ -507,9 +540,10 @@ def handle_delete_user(recentlyButtonClickedDataIndex, recentlyButtonClickedRow)
         user = Users.get_user(user_id)
 
         # 防止删除最后一个管理员
-        all_users = Users.get_all_users()
-        admin_users = [u for u in all_users if u["user_role"] == AuthConfig.admin_role]
-        if user.user_role == AuthConfig.admin_role and len(admin_users) <= 1:
+        if (
+            user.user_role == AuthConfig.admin_role
+            and Users.get_count(user_roles=[AuthConfig.admin_role]) <= 1
+        ):
             set_props(
                 "global-message",
                 {
@@ -541,13 +575,15 @@ def handle_delete_user(recentlyButtonClickedDataIndex, recentlyButtonClickedRow)
                 # 重置分页参数
                 "pagination": {
                     "current": 1,
-                    "total": len(Users.get_all_users()),  # 获取用户最新总数
+                    "total": Users.get_count(),  # 获取用户最新总数
                     "pageSize": 10,
                     "showSizeChanger": False,
                 },
                 "selectedRowKeys": [],
             },
         )
+        # 数据已变化，重置分页游标
+        set_props("core-users-table-page-cursors", {"data": None})
 
 
 @app.callback(
@@ -571,11 +607,12 @@ def handle_delete_selected_users(confirmCounts, selectedRowKeys):
         return
 
     # 检查是否包含最后一个管理员
-    all_users = Users.get_all_users()
-    admin_users = [u for u in all_users if u["user_role"] == AuthConfig.admin_role]
-    selected_admin_users = [u for u in selectedRowKeys if any(au["user_id"] == u and au["user_role"] == AuthConfig.admin_role for au in all_users)]
+    admin_users_count = Users.get_count(user_roles=[AuthConfig.admin_role])
+    selected_admin_users_count = Users.get_count(
+        user_roles=[AuthConfig.admin_role], user_ids=selectedRowKeys
+    )
 
-    if len(admin_users) <= len(selected_admin_users):
+    if admin_users_count <= selected_admin_users_count:
         set_props(
             "global-message",
             {
@@ -588,8 +625,7 @@ def handle_delete_selected_users(confirmCounts, selectedRowKeys):
         return
 
     # 执行删除
-    for user_id in selectedRowKeys:
-        Users.delete_user(user_id=user_id)
+    Users.delete_users(user_ids=selectedRowKeys)
 
     set_props(
         "global-message",
@@ -608,13 +644,15 @@ def handle_delete_selected_users(confirmCounts, selectedRowKeys):
             # 重置分页参数
             "pagination": {
                 "current": 1,
-                "total": len(Users.get_all_users()),  # 获取用户最新总数
+                "total": Users.get_count(),  # 获取用户最新总数
                 "pageSize": 10,
                 "showSizeChanger": False,
             },
             "selectedRowKeys": [],
         },
     )
+    # 数据已变化，重置分页游标
+    set_props("core-users-table-page-cursors", {"data": None})
 
 
 @app.callback(
@@ -641,9 +679,125 @@ def handle_refresh_data(nClicks):
             # 重置分页参数
             "pagination": {
                 "current": 1,
-                "total": len(Users.get_all_users()),  # 获取用户最新总数
+                "total": Users.get_count(),  # 获取用户最新总数
                 "pageSize": 10,
                 "showSizeChanger": False,
             },
         },
-    )
\ No newline at end of file
+    )
+    # 数据已变化，重置分页游标
+    set_props("core-users-table-page-cursors", {"data": None})
+
+@app.callback(
+    Output("core-users-import-modal", "visible"),
+    Input("core-users-import-users", "nClicks"),
+    prevent_initial_call=True,
+)
+def open_import_users_modal(nClicks):
+    """打开批量导入用户抽屉"""
+
+    return True
+
+
+@app.callback(
+    Input("core-users-import-template", "nClicks"),
+    prevent_initial_call=True,
+)
+def handle_download_import_template(nClicks):
+    """下载用户导入模板"""
+
+    filename, content = get_user_import_template()
+    set_props(
+        "global-download",
+        {"data": dcc.send_string(content, filename)},
+    )
+
+
+@app.callback(
+    Output("core-users-import-result", "children"),
+    Input("core-users-import-upload", "contents"),
+    State("core-users-import-upload", "filename"),
+    background=True,
+    running=[
+        (Output("core-users-import-upload", "disabled"), True, False),
+        (
+            Output("core-users-import-progress-container", "style"),
+            style(marginTop=8),
+            style(display="none"),
+        ),
+    ],
+    progress=[
+        Output("core-users-import-progress", "percent"),
+        Output("core-users-import-progress-text", "children"),
+    ],
+    progress_default=[0, "等待执行"],
+    cancel=[Input("core-users-import-cancel", "nClicks")],
+    prevent_initial_call=True,
+)
+def handle_import_users(set_progress, contents, filename):
+    """处理批量导入用户，在后台任务中执行并回传进度"""
+
+    if not contents:
+        return dash.no_update
+
+    try:
+        result = import_users_from_file(
+            base64.b64decode(contents.split(",", 1)[1]),
+            filename or "",
+            on_progress=lambda percent, stage: set_progress((percent, stage)),
+        )
+    except UserImportError as e:
+        return fac.AntdAlert(type="error", message=str(e), showIcon=True)
+    except Exception as e:
+        log.error(f"批量导入用户失败: {e}")
+        return fac.AntdAlert(type="error", message="批量导入用户失败", showIcon=True)
+
+    # 刷新用户列表
+    if result["imported"]:
+        set_props(
+            "core-users-table",
+            {
+                # 重置分页参数
+                "pagination": {
+                    "current": 1,
+                    "total": Users.get_count(),  # 获取用户最新总数
+                    "pageSize": 10,
+                    "showSizeChanger": False,
+                },
+            },
+        )
+        # 数据已变化，重置分页游标
+        set_props("core-users-table-page-cursors", {"data": None})
+
+    return fac.AntdSpace(
+        [
+            fac.AntdAlert(
+                type="success" if not result["failed"] else "warning",
+                message="共 {total} 行，成功导入 {imported} 行，失败 {failed} 行".format(
+                    **result
+                ),
+                description="耗时 {seconds} 秒（校验 {validate_seconds} 秒，密码散列 {hash_seconds} 秒，"
+                "写入 {insert_seconds} 秒），{rows_per_second} 行/秒".format(**result),
+                showIcon=True,
+            ),
+            *(
+                [
+                    fac.AntdTable(
+                        columns=[
+                            {"dataIndex": "row", "title": "行号", "width": 80},
+                            {"dataIndex": "user_name", "title": "用户名"},
+                            {"dataIndex": "reason", "title": "失败原因"},
+                        ],
+                        data=result["errors"],
+                        bordered=True,
+                        size="small",
+                        pagination={"pageSize": 10, "showSizeChanger": False},
+                    )
+                ]
+                if result["errors"]
+                else []
+            ),
+        ],
+        direction="vertical",
+        style=style(width="100%"),
+    )
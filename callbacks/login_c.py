@@ -1,3 +1,4 @@
+import math
 import uuid
 import time
 import dash
@@ -13,7 +14,15 @@ from flask_principal import identity_changed, Identity
 from server import app, User
 from models.users import Users
 from configs import BaseConfig, AuthConfig
-from models.logs import LoginLogs
+from core.audit_log_writer.audit_log_writer import write_login_log
+from core.identity_cache.identity_cache import invalidate_user_identity
+from core.session_registry.session_registry import session_registry
+from core.login_limiter.login_limiter import login_attempt_limiter
+from core.usage_rollup.usage_rollup import record_usage
+from core.password_verifier.password_verifier import (
+    PasswordVerifierBusyError,
+    verify_password,
+)
 
 
 @app.callback(
@@ -69,11 +78,48 @@ def handle_login(nClicks, nSubmit, values, remember_me):
 
     # 校验用户登录信息
 
+    # 若该IP或用户名近期失败次数过多，直接拒绝，不再查询用户及校验密码
+    retry_after = login_attempt_limiter.check(
+        request.remote_addr, values["login-user-name"]
+    )
+    if retry_after is not None:
+        set_props(
+            "global-message",
+            {
+                "children": fac.AntdMessage(
+                    type="error",
+                    content="登录失败次数过多，请{}秒后重试".format(math.ceil(retry_after)),
+                )
+            },
+        )
+
+        # 登录日志记录
+        write_login_log(
+            user_name=values["login-user-name"],
+            user_id=None,
+            ip=request.remote_addr,
+            browser=browser_info,
+            os=os_info,
+            status="失败次数过多",
+            login_datetime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        )
+
+        return [
+            # 表单帮助信息
+            {"密码": "登录失败次数过多"},
+            # 表单帮助状态
+            {"密码": "error"},
+        ]
+
     # 根据用户名尝试查询用户
     match_user = Users.get_user_by_name(values["login-user-name"])
 
     # 若用户不存在
     if not match_user:
+        login_attempt_limiter.record_failure(
+            request.remote_addr, values["login-user-name"]
+        )
+
         set_props(
             "global-message",
             {
@@ -85,7 +131,7 @@ def handle_login(nClicks, nSubmit, values, remember_me):
         )
 
         # 登录日志记录
-        LoginLogs.add_log(
+        write_login_log(
             user_name=values["login-user-name"],
             user_id=None,  # 不存在的用户无id
             ip=request.remote_addr,
@@ -103,10 +149,35 @@ def handle_login(nClicks, nSubmit, values, remember_me):
         ]
 
     else:
-        # 校验密码
+        # 校验密码，复用已查询到的用户记录，散列计算在进程池中执行
+        try:
+            password_correct = verify_password(
+                match_user.password_hash, values["login-password"]
+            )
+        except PasswordVerifierBusyError:
+            set_props(
+                "global-message",
+                {
+                    "children": fac.AntdMessage(
+                        type="warning",
+                        content="系统繁忙，请稍后重试",
+                    )
+                },
+            )
+
+            return [
+                # 表单帮助信息
+                {"密码": "系统繁忙，请稍后重试"},
+                # 表单帮助状态
+                {"密码": "warning"},
+            ]
 
         # 若密码不正确
-        if not Users.check_user_password(match_user.user_id, values["login-password"]):
+        if not password_correct:
+            login_attempt_limiter.record_failure(
+                request.remote_addr, values["login-user-name"]
+            )
+
             set_props(
                 "global-message",
                 {
@@ -118,7 +189,7 @@ def handle_login(nClicks, nSubmit, values, remember_me):
             )
 
             # 登录日志记录
-            LoginLogs.add_log(
+            write_login_log(
                 user_name=values["login-user-name"],
                 user_id=match_user.user_id,
                 ip=request.remote_addr,
@@ -135,10 +206,19 @@ def handle_login(nClicks, nSubmit, values, remember_me):
                 {"密码": "error"},
             ]
 
+        # 登录成功后清除该用户名的失败记录
+        login_attempt_limiter.record_success(values["login-user-name"])
+
         # 更新用户信息表session_token字段
         new_session_token = str(uuid.uuid4())
         Users.update_user(match_user.user_id, session_token=new_session_token)
 
+        # session_token轮换后，旧会话对应的身份缓存一并失效
+        invalidate_user_identity(match_user.user_id)
+
+        # 登记最新session_token，本进程内的旧会话在下一次重复登录检查时即被登出
+        session_registry.publish(match_user.user_id, new_session_token)
+
         # 进行用户登录
         new_user = User(
             id=match_user.user_id,
@@ -174,7 +254,7 @@ def handle_login(nClicks, nSubmit, values, remember_me):
         )
 
         # 登录日志记录
-        LoginLogs.add_log(
+        write_login_log(
             user_name=match_user.user_name,
             user_id=match_user.user_id,
             ip=request.remote_addr,
@@ -184,4 +264,7 @@ def handle_login(nClicks, nSubmit, values, remember_me):
             login_datetime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         )
 
+        # 累计使用情况汇总
+        record_usage(match_user.user_id, logins=1)
+
     return [{}, {}]
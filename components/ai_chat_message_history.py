@@ -2,7 +2,114 @@ from dash import html
 from components.chat_agent_message import ChatAgentMessage as render_agent_message
 from components.chat_feature_hints import ChatFeatureHints as render_feature_hints
 from components.chat_user_message import ChatUserMessage as render_user_message
+from core.message_render_cache.message_render_cache import message_render_cache
 import datetime
+import hashlib
+
+# 会在聊天历史中渲染的消息角色，其余角色的消息不对应任何子元素
+RENDERABLE_ROLES = ('user', 'assistant', 'agent', 'system')
+
+
+def render_welcome_hint(current_time=None):
+    """渲染无消息时的欢迎提示"""
+    return render_feature_hints(
+        message="您好！我是小妍，很高兴为您服务。我可以帮助您解答问题、提供建议或协助您完成工作。",
+        sender_name="小妍",
+        timestamp=current_time or datetime.datetime.now().strftime("%H:%M:%S"),
+        #icon="antd-robot",
+        icon_bg_color="#1890ff"
+    )
+
+
+def render_chat_message(msg, current_time=None):
+    """
+    渲染单条聊天消息，带id的消息使用消息渲染缓存，返回缓存的组件树字典
+    :param msg: dict，格式如：{'role': 'user'|'assistant'|'system', 'content': 'xxx', 'timestamp': 'xxx'}
+    :param current_time: 消息缺少时间戳时使用的时间
+    :return: 对应角色的消息组件（或其组件树字典），未知角色返回None
+    """
+    current_time = current_time or datetime.datetime.now().strftime("%H:%M:%S")
+
+    if msg.get('role') not in RENDERABLE_ROLES:
+        return None
+    if not msg.get('id'):
+        return _build_chat_message(msg, current_time)
+
+    # 角色决定消息的配色，缓存键覆盖渲染结果依赖的全部消息字段
+    content = msg.get('content', '') or ''
+    key = (
+        msg.get('role'),
+        msg.get('id'),
+        hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest(),
+        bool(msg.get('is_streaming', False)),
+        msg.get('timestamp', current_time)
+    )
+    return message_render_cache.get_or_build(key, lambda: _build_chat_message(msg, current_time))
+
+
+def _build_chat_message(msg, current_time):
+    """构建单条聊天消息的组件"""
+
+    # 统一处理assistant和agent角色
+    if msg.get('role') == 'assistant' or msg.get('role') == 'agent':
+        # 传递所有必要参数给 render_agent_message，使用正确的message参数
+        # 🔧 关键修复：移除icon参数，让组件内部使用src图片路径
+        return render_agent_message(
+            message=msg.get('content', ''),  # 修改为message参数
+            sender_name="小妍",
+            timestamp=msg.get('timestamp', current_time),  # 使用消息自带的时间戳
+            # icon="antd-robot",  # 🔧 移除icon参数，使用src图片
+            icon_bg_color="#1890ff",
+            message_bg_color="#f5f5f5",
+            message_text_color="#000000",
+            message_id=msg.get('id'),  # 传递消息ID
+            is_streaming=msg.get('is_streaming', False),  # 传递流式状态
+            original_markdown=msg.get('content', '')  # 传递原始Markdown内容
+        )
+    elif msg.get('role') == 'user':
+        # 传递所有必要参数给 render_user_message
+        return render_user_message(
+            message=msg.get('content', ''),  # 使用content字段
+            sender_name="我",
+            timestamp=msg.get('timestamp', current_time),  # 使用消息自带的时间戳
+            icon="antd-user",
+            icon_bg_color="#52c41a",
+            message_bg_color="#1890ff",
+            message_text_color="white",
+            message_id=msg.get('id'),  # 传递消息ID
+            original_content=msg.get('content', '')  # 传递原始消息内容
+        )
+    elif msg.get('role') == 'system':
+        # 系统消息处理
+        # 🔧 关键修复：移除icon参数，让组件内部使用src图片路径
+        return render_agent_message(
+            message=msg.get('content', ''),  # 修改为message参数
+            sender_name="系统",
+            timestamp=msg.get('timestamp', current_time),
+            # icon="antd-info-circle",  # 🔧 移除icon参数，使用src图片
+            icon_bg_color="#faad14"
+        )
+    return None
+
+
+def AiChatMessageItems(messages=None):
+    """
+    AI聊天消息列表，每条消息对应一个子元素，便于按消息进行Patch增量更新
+    :param messages: List[dict]，格式同render_chat_message()
+    :return: List，可直接作为聊天历史容器的children
+    """
+    # 获取当前时间并格式化（用于欢迎消息或无消息时）
+    current_time = datetime.datetime.now().strftime("%H:%M:%S")
+
+    if not messages:
+        return [render_welcome_hint(current_time)]
+
+    return [
+        render_chat_message(msg, current_time)
+        for msg in messages
+        if msg.get('role') in RENDERABLE_ROLES
+    ]
+
 
 def AiChatMessageHistory(messages=None):
     """
@@ -10,60 +117,4 @@ def AiChatMessageHistory(messages=None):
     :param messages: List[dict]，格式如：{'role': 'user'|'assistant'|'system', 'content': 'xxx', 'timestamp': 'xxx'}
     :return: Dash html.Div，可直接嵌入主聊天页面
     """
-    # 获取当前时间并格式化（用于欢迎消息或无消息时）
-    current_time = datetime.datetime.now().strftime("%H:%M:%S")
-    
-    children = []
-    if messages is None or len(messages) == 0:
-        # 传递所有必要参数给 render_feature_hints
-        children.append(render_feature_hints(
-            message="您好！我是小妍，很高兴为您服务。我可以帮助您解答问题、提供建议或协助您完成工作。",
-            sender_name="小妍",
-            timestamp=current_time,
-            #icon="antd-robot",
-            icon_bg_color="#1890ff"
-        ))
-    else:
-        for msg in messages:
-            # 统一处理assistant和agent角色
-            if msg.get('role') == 'assistant' or msg.get('role') == 'agent':
-                # 添加调试日志
-                #print(f"渲染AI消息 - ID: {msg.get('id')}, 内容: {msg.get('content')}")
-                # 传递所有必要参数给 render_agent_message，使用正确的message参数
-                # 🔧 关键修复：移除icon参数，让组件内部使用src图片路径
-                children.append(render_agent_message(
-                    message=msg.get('content', ''),  # 修改为message参数
-                    sender_name="小妍",
-                    timestamp=msg.get('timestamp', current_time),  # 使用消息自带的时间戳
-                    # icon="antd-robot",  # 🔧 移除icon参数，使用src图片
-                    icon_bg_color="#1890ff",
-                    message_bg_color="#f5f5f5",
-                    message_text_color="#000000",
-                    message_id=msg.get('id'),  # 传递消息ID
-                    is_streaming=msg.get('is_streaming', False),  # 传递流式状态
-                    original_markdown=msg.get('content', '')  # 传递原始Markdown内容
-                ))
-            elif msg.get('role') == 'user':
-                # 传递所有必要参数给 render_user_message
-                children.append(render_user_message(
-                    message=msg.get('content', ''),  # 使用content字段
-                    sender_name="我",
-                    timestamp=msg.get('timestamp', current_time),  # 使用消息自带的时间戳
-                    icon="antd-user",
-                    icon_bg_color="#52c41a",
-                    message_bg_color="#1890ff",
-                    message_text_color="white",
-                    message_id=msg.get('id'),  # 传递消息ID
-                    original_content=msg.get('content', '')  # 传递原始消息内容
-                ))
-            elif msg.get('role') == 'system':
-                # 系统消息处理
-                # 🔧 关键修复：移除icon参数，让组件内部使用src图片路径
-                children.append(render_agent_message(
-                    message=msg.get('content', ''),  # 修改为message参数
-                    sender_name="系统",
-                    timestamp=msg.get('timestamp', current_time),
-                    # icon="antd-info-circle",  # 🔧 移除icon参数，使用src图片
-                    icon_bg_color="#faad14"
-                ))
-    return html.Div(children)
\ No newline at end of file
+    return html.Div(AiChatMessageItems(messages))
@@ -9,11 +9,142 @@ from feffery_dash_utils.style_utils import style
 from models.conversations import Conversations
 
 
+def truncate_session_title(text, max_length=12):
+    """截断中文字符串，如果超过最大长度则添加省略号"""
+    if len(text) > max_length:
+        return text[:max_length] + "..."
+    return text
+
+
+def get_session_items(user_id):
+    """从数据库获取用户的会话列表数据，每个会话包含key（conv_id）及full_title（conv_name）字段"""
+    return [
+        {"key": session["conv_id"], "full_title": session["conv_name"]}
+        for session in Conversations.get_user_conversation_names(user_id=user_id)
+    ]
+
+
+def session_item_style(selected=False):
+    """会话项样式，选中的会话高亮显示"""
+    return {
+        "display": "flex",
+        "alignItems": "center",
+        "borderRadius": "6px",
+        "marginBottom": "4px",
+        "cursor": "pointer",
+        "width": "100%",
+        "boxSizing": "border-box",
+        "backgroundColor": "#e6f7ff" if selected else "#fafafa",
+        "borderLeft": "3px solid #1890ff" if selected else "3px solid transparent",
+        "transition": "all 0.3s ease"
+    }
+
+
+def render_session_item(item, selected=False):
+    """渲染单个会话项
+
+    参数:
+        item (dict): 会话数据，包含key及full_title字段
+        selected (bool): 是否为当前选中的会话
+
+    返回:
+        Dash组件对象
+    """
+    full_title = item.get("full_title", item.get("title", ""))
+    title = truncate_session_title(full_title)
+
+    # 使用html.Div替代FefferyDiv以支持nClicks
+    return html.Div(
+        [
+            # 会话标题部分 - 可点击，只有被截断时才显示Tooltip
+            html.Div(
+                # 判断是否需要显示Tooltip（名称被截断时）
+                fac.AntdTooltip(
+                    fac.AntdText(
+                        title,
+                        strong=True,
+                        ellipsis=True,
+                        style=style(padding="12px 0")
+                    ),
+                    title=full_title,  # 显示完整的会话名称
+                    placement="right",  # 在右侧显示
+                    mouseEnterDelay=0.5,  # 延迟0.5秒显示
+                    mouseLeaveDelay=0.1,  # 快速隐藏
+                    styles={
+                        "body": {
+                            "backgroundColor": "#ffffff",  # 白色背景，与页面主色调一致
+                            "color": "#333333",  # 深灰色字体，与页面文字色一致
+                            "fontWeight": "normal",  # 不加粗
+                            "fontSize": "12px",  # 字体大小
+                            "borderRadius": "6px",  # 圆角
+                            "padding": "8px 12px",  # 内边距
+                            "boxShadow": "0 3px 12px rgba(0, 0, 0, 0.15)",  # 阴影
+                            "border": "1px solid #d9d9d9",  # 浅灰色边框
+                            "whiteSpace": "nowrap",  # 防止换行
+                            "maxWidth": "none",  # 不限制最大宽度
+                        }
+                    }
+                ) if full_title != title else
+                # 如果名称没有被截断，直接显示文本，不包裹Tooltip
+                fac.AntdText(
+                    title,
+                    strong=True,
+                    ellipsis=True,
+                    style=style(padding="12px 0")
+                ),
+                id={"type": "ai-chat-x-session-item", "index": item["key"]},
+                n_clicks=0,  # 使用n_clicks而不是nClicks
+                className="session-item-clickable",  # 添加CSS类名
+                style={
+                    "flex": "1",
+                    "cursor": "pointer",
+                    "padding": "0 12px",
+                    "minWidth": "0",
+                    "overflow": "hidden"
+                }
+            ),
+            # 下拉菜单部分 - 不拦截点击事件
+            html.Div(
+                fac.AntdDropdown(
+                    fac.AntdButton(
+                        icon=fac.AntdIcon(
+                            icon="antd-more",
+                            className="global-help-text",
+                        ),
+                        type="text",
+                        size="small",
+                        style=style(color="#8c8c8c")  # 设置按钮颜色为灰色
+                    ),
+                    id={"type": "ai-chat-x-session-dropdown", "index": item["key"]},
+                    menuItems=[
+                        {
+                            "title": "改名",
+                            "key": "rename",
+                            "icon": "antd-edit"  # 添加改名图标
+                        },
+                        {
+                            "title": "删除",
+                            "key": "delete",
+                            "icon": "antd-delete"  # 添加删除图标
+                        }
+                    ],
+                    trigger="click",
+                ),
+                style={
+                    "flex": "none",
+                    "padding": "0 12px"
+                }
+            )
+        ],
+        style=session_item_style(selected)
+    )
+
+
 def render(sessions=None, user_id=None, refresh_timestamp=None, selected_session_id=None):
     """渲染聊天会话列表组件
     
     参数:
-        sessions (list, optional): 会话数据列表，每个会话包含key, title字段
+        sessions (list, optional): 会话数据列表，每个会话包含key, full_title字段，传入时不再查询数据库
         user_id (str, optional): 用户ID，用于从数据库获取会话数据
         refresh_timestamp (float, optional): 刷新时间戳，用于触发重新渲染
         selected_session_id (str, optional): 当前选中的会话ID，用于高亮显示
@@ -36,36 +167,17 @@ def render(sessions=None, user_id=None, refresh_timestamp=None, selected_session
         {"key": "3", "title": "新会话3", "full_title": "新会话3"}
     ]
     
-    # 从数据库获取会话数据
+    # 从数据库获取会话数据，传入会话数据时直接使用
     session_data = []
-    if user_id:
+    if sessions is not None:
+        session_data = sessions
+    elif user_id:
         try:
-            # 调用get_user_conversations方法获取用户会话
-            db_sessions = Conversations.get_user_conversations(user_id=user_id)
-            if db_sessions:
-                # 转换数据格式：key对应conv_id，title对应conv_name
-                # 辅助函数：截断中文字符串
-                def truncate_chinese_text(text, max_length=12):
-                    """截断中文字符串，如果超过最大长度则添加省略号"""
-                    if len(text) > max_length:
-                        return text[:max_length] + "..."
-                    return text
-                    
-                session_data = [
-                    {
-                        "key": session["conv_id"], 
-                        "title": truncate_chinese_text(session["conv_name"]),
-                        "full_title": session["conv_name"]  # 保存完整的会话名称用于Tooltip
-                    }
-                    for session in db_sessions
-                ]
+            session_data = get_session_items(user_id)
         except Exception as e:
             # print(f"获取会话数据失败: {e}")
             # 发生错误时使用默认数据
             session_data = default_sessions
-    elif sessions:
-        # 使用传入的会话数据
-        session_data = sessions
     else:
         # 使用默认数据
         session_data = default_sessions
@@ -75,6 +187,8 @@ def render(sessions=None, user_id=None, refresh_timestamp=None, selected_session
         [
             # 隐藏的Store用于跟踪点击事件
             dcc.Store(id="session-click-tracker", data=None),
+            # 客户端会话索引：与会话列表子元素一一对应的会话ID列表，会话列表按索引以Patch增量更新
+            dcc.Store(id="ai-chat-x-session-index", data=[item["key"] for item in session_data]),
             # 新建会话按钮 - 使用html.Div实现
             html.Div(
                 id='ai-chat-x-session-new',  # 设置指定的ID
@@ -116,102 +230,7 @@ def render(sessions=None, user_id=None, refresh_timestamp=None, selected_session
                 [
                     fac.AntdSpace(
                         [
-                            # 使用html.Div替代FefferyDiv以支持nClicks
-                            html.Div(
-                                [
-                                    # 会话标题部分 - 可点击，只有被截断时才显示Tooltip
-                                    html.Div(
-                                        # 判断是否需要显示Tooltip（名称被截断时）
-                                        fac.AntdTooltip(
-                                            fac.AntdText(
-                                                item["title"],
-                                                strong=True,
-                                                ellipsis=True,
-                                                style=style(padding="12px 0")
-                                            ),
-                                            title=item.get("full_title", item["title"]),  # 显示完整的会话名称
-                                            placement="right",  # 在右侧显示
-                                            mouseEnterDelay=0.5,  # 延迟0.5秒显示
-                                            mouseLeaveDelay=0.1,  # 快速隐藏
-                                            styles={
-                                                "body": {
-                                                    "backgroundColor": "#ffffff",  # 白色背景，与页面主色调一致
-                                                    "color": "#333333",  # 深灰色字体，与页面文字色一致
-                                                    "fontWeight": "normal",  # 不加粗
-                                                    "fontSize": "12px",  # 字体大小
-                                                    "borderRadius": "6px",  # 圆角
-                                                    "padding": "8px 12px",  # 内边距
-                                                    "boxShadow": "0 3px 12px rgba(0, 0, 0, 0.15)",  # 阴影
-                                                    "border": "1px solid #d9d9d9",  # 浅灰色边框
-                                                    "whiteSpace": "nowrap",  # 防止换行
-                                                    "maxWidth": "none",  # 不限制最大宽度
-                                                }
-                                            }
-                                        ) if item.get("full_title", item["title"]) != item["title"] else
-                                        # 如果名称没有被截断，直接显示文本，不包裹Tooltip
-                                        fac.AntdText(
-                                            item["title"],
-                                            strong=True,
-                                            ellipsis=True,
-                                            style=style(padding="12px 0")
-                                        ),
-                                        id={"type": "ai-chat-x-session-item", "index": item["key"]},
-                                        n_clicks=0,  # 使用n_clicks而不是nClicks
-                                        className="session-item-clickable",  # 添加CSS类名
-                                        style={
-                                            "flex": "1",
-                                            "cursor": "pointer",
-                                            "padding": "0 12px",
-                                            "minWidth": "0",
-                                            "overflow": "hidden"
-                                        }
-                                    ),
-                                    # 下拉菜单部分 - 不拦截点击事件
-                                    html.Div(
-                                        fac.AntdDropdown(
-                                            fac.AntdButton(
-                                                icon=fac.AntdIcon(
-                                                    icon="antd-more",
-                                                    className="global-help-text",
-                                                ),
-                                                type="text",
-                                                size="small",
-                                                style=style(color="#8c8c8c")  # 设置按钮颜色为灰色
-                                            ),
-                                            id={"type": "ai-chat-x-session-dropdown", "index": item["key"]},
-                                            menuItems=[
-                                                {
-                                                    "title": "改名",
-                                                    "key": "rename",
-                                                    "icon": "antd-edit"  # 添加改名图标
-                                                },
-                                                {
-                                                    "title": "删除",
-                                                    "key": "delete",
-                                                    "icon": "antd-delete"  # 添加删除图标
-                                                }
-                                            ],
-                                            trigger="click",
-                                        ),
-                                        style={
-                                            "flex": "none",
-                                            "padding": "0 12px"
-                                        }
-                                    )
-                                ],
-                                style={
-                                    "display": "flex",
-                                    "alignItems": "center",
-                                    "borderRadius": "6px",
-                                    "marginBottom": "4px",
-                                    "cursor": "pointer",
-                                    "width": "100%",
-                                    "boxSizing": "border-box",
-                                    "backgroundColor": "#e6f7ff" if item["key"] == selected_session_id else "#fafafa",
-                                    "borderLeft": "3px solid #1890ff" if item["key"] == selected_session_id else "3px solid transparent",
-                                    "transition": "all 0.3s ease"
-                                }
-                            )
+                            render_session_item(item, selected=item["key"] == selected_session_id)
                             for item in session_data
                         ],
                         id="ai-chat-x-session-list",
@@ -1,12 +1,19 @@
 
 import dash
-from dash import html
+import json
+from functools import lru_cache
+from dash import html, dcc, Patch
 import feffery_antd_components as fac
-from dash.dependencies import Input, Output
+import feffery_utils_components as fuc
+from dash.dependencies import Input, Output, State
 from dash.dependencies import ClientsideFunction
+from plotly.io.json import to_json_plotly
 from server import app
 from components.no_title_card import NoTitleCard
 
+# 打开抽屉时默认显示的Tab
+DEFAULT_HEALTH_RECORD_TAB = "health_check"
+
 
 def render_health_record_drawer():
     """渲染健康档案抽屉组件"""
@@ -19,24 +26,45 @@ def render_health_record_drawer():
         # 移除固定宽度，由回调函数动态设置
         maskClosable=False,  # 禁用点击遮罩关闭
         children=[
-            html.Div(id="health-record-content")
+            html.Div(id="health-record-content"),
+            # 已渲染内容的Tab，未渲染的Tab在首次切换到时再渲染
+            dcc.Store(id="health-record-loaded-tabs")
         ]
     )
 
 
+@lru_cache(maxsize=None)
+def _render_cached_section(key):
+    """
+    渲染抽屉中的静态内容（用户信息区域或Tab内容）并缓存为组件树字典，
+    各区域内容与用户及打开次数无关，进程内渲染一次后复用
+    """
+    renderers = {"user_header": _render_user_header, **{tab_key: render for tab_key, _, render in HEALTH_RECORD_TABS}}
+    return json.loads(to_json_plotly(renderers[key]()))
+
+
+def _render_tab_placeholder():
+    """渲染未加载Tab的占位内容"""
+    return fac.AntdSkeleton(active=True, paragraph={'rows': 6}, style={'padding': '16px'})
+
+
 @app.callback(
-    Output("health-record-content", "children"),
+    [
+        Output("health-record-content", "children"),
+        Output("health-record-loaded-tabs", "data")
+    ],
     Input("health-record-drawer", "visible"),
+    State("health-record-loaded-tabs", "data"),
     prevent_initial_call=True,
 )
-def update_drawer_content(visible):
-    """更新抽屉内容"""
-    if visible:
+def update_drawer_content(visible, loaded_tabs):
+    """更新抽屉内容 - 首次打开时仅渲染默认Tab，再次打开时保留已渲染的内容"""
+    if visible and not loaded_tabs:
         return html.Div(
             [
                 # 顶部用户信息区域
                 html.Div(
-                    _render_user_header(),
+                    _render_cached_section("user_header"),
                     style={'padding': '16px', 'marginBottom': '16px'}
                 ),
                 
@@ -46,54 +74,46 @@ def update_drawer_content(visible):
                         id="health-record-tabs",
                         items=[
                             {
-                                "key": "health_check",
-                                "label": "健康自测",
-                                "children": _render_health_check_tab()
-                            },
-                            {
-                                "key": "health_history",
-                                "label": "健康史",
-                                "children": _render_health_history_tab()
-                            },
-                            {
-                                "key": "health_report",
-                                "label": "健康报告",
-                                "children": _render_health_report_tab()
-                            },
-                            {
-                                "key": "health_plan",
-                                "label": "健康计划",
-                                "children": _render_health_plan_tab()
-                            },
-                            {
-                                "key": "diet_health",
-                                "label": "饮食健康",
-                                "children": _render_diet_health_tab()
-                            },
-                            {
-                                "key": "exercise_health",
-                                "label": "运动健康",
-                                "children": _render_exercise_health_tab()
-                            },
-                            {
-                                "key": "medication_record",
-                                "label": "药物记录",
-                                "children": _render_medication_record_tab()
-                            },
-                            {
-                                "key": "medical_folder",
-                                "label": "就医资料夹",
-                                "children": _render_medical_folder_tab()
+                                "key": key,
+                                "label": label,
+                                "children": (
+                                    _render_cached_section(key)
+                                    if key == DEFAULT_HEALTH_RECORD_TAB
+                                    else _render_tab_placeholder()
+                                )
                             }
+                            for key, label, _ in HEALTH_RECORD_TABS
                         ],
-                        defaultActiveKey="health_check"
+                        defaultActiveKey=DEFAULT_HEALTH_RECORD_TAB
                     ),
                     style={'padding': '0 16px 16px 16px', 'backgroundColor': '#fff'}
                 )
             ],
             style={'backgroundColor': '#fff'}
-        )
-    return dash.no_update
+        ), [DEFAULT_HEALTH_RECORD_TAB]
+    return dash.no_update, dash.no_update
+
+
+@app.callback(
+    [
+        Output("health-record-tabs", "items"),
+        Output("health-record-loaded-tabs", "data", allow_duplicate=True)
+    ],
+    Input("health-record-tabs", "activeKey"),
+    State("health-record-loaded-tabs", "data"),
+    prevent_initial_call=True,
+)
+def load_tab_content(active_key, loaded_tabs):
+    """首次切换到Tab时渲染其内容，仅更新该Tab"""
+    tab_keys = [key for key, _, _ in HEALTH_RECORD_TABS]
+    if active_key not in tab_keys or active_key in (loaded_tabs or []):
+        return dash.no_update, dash.no_update
+
+    items = Patch()
+    items[tab_keys.index(active_key)]["children"] = _render_cached_section(active_key)
+    loaded = Patch()
+    loaded.append(active_key)
+    return items, loaded
 
 
 def _render_user_header():
@@ -106,17 +126,21 @@ def _render_user_header():
                     fac.AntdCol(
                         flex="none",
                         children=html.Div(
-                            html.Img(
-                                src="/assets/imgs/people.png",
-                                style={
-                                    'width': '100%',
-                                    'height': 'auto',
-                                    'maxWidth': '140px',
-                                    'maxHeight': '140px',
-                                    'borderRadius': '8px',
-                                    'objectFit': 'contain',
-                                    'display': 'block'
-                                }
+                            # 头像图片进入可视区域时再加载
+                            fuc.FefferyLazyLoad(
+                                html.Img(
+                                    src="/assets/imgs/people.png",
+                                    style={
+                                        'width': '100%',
+                                        'height': 'auto',
+                                        'maxWidth': '140px',
+                                        'maxHeight': '140px',
+                                        'borderRadius': '8px',
+                                        'objectFit': 'contain',
+                                        'display': 'block'
+                                    }
+                                ),
+                                height='120px'
                             ),
                             style={
                                 'width': '120px',
@@ -1066,6 +1090,19 @@ def _render_diet_health_tab():
     )
 
 
+# 健康档案各Tab：(key, 标题, 渲染函数)
+HEALTH_RECORD_TABS = [
+    ("health_check", "健康自测", _render_health_check_tab),
+    ("health_history", "健康史", _render_health_history_tab),
+    ("health_report", "健康报告", _render_health_report_tab),
+    ("health_plan", "健康计划", _render_health_plan_tab),
+    ("diet_health", "饮食健康", _render_diet_health_tab),
+    ("exercise_health", "运动健康", _render_exercise_health_tab),
+    ("medication_record", "药物记录", _render_medication_record_tab),
+    ("medical_folder", "就医资料夹", _render_medical_folder_tab)
+]
+
+
 # 在文件末尾添加以下代码
 app.clientside_callback(
     ClientsideFunction(
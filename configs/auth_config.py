@@ -27,6 +27,7 @@ class AuthConfig:
             "keys": [
                 # 常规用户禁止访问系统管理相关页面
                 "/core/login-logs",
+                "/core/usage-stats",
                 "/core/users",
                 "/core/other-page1",
                 "/core/page1",
@@ -49,6 +49,45 @@ class BaseConfig:
     # 重复登录辅助检查轮询间隔时间，单位：秒
     duplicate_login_check_interval: Union[int, float] = 10
 
+    # 重复登录辅助检查时，各进程内存中缓存的用户最新session_token的最长信任时间，单位：秒
+    # 超过该时间后才会回源数据库，数据库查询次数与打开的标签页数量无关
+    # 应大于duplicate_login_check_interval，否则每次轮询检查都会回源数据库
+    # 本进程内的新登录立即生效，其他进程中发生的新登录，最迟在该时间加上轮询间隔后被感知
+    duplicate_login_token_refresh_interval: Union[int, float] = 30
+
+    # 用户身份缓存有效期，单位：秒，用于减少每次请求加载用户信息时的数据库查询
+    # 应大于duplicate_login_check_interval，否则每次轮询检查都会查询数据库加载用户
+    # 本进程内的登录及用户信息变更会立即失效对应缓存，其他进程中的变更最迟在该时间后生效
+    # 设置为0时关闭缓存
+    identity_cache_ttl: Union[int, float] = 30
+
+    # 用户身份缓存最大条目数
+    identity_cache_max_size: int = 10000
+
+    # 登录密码校验进程池的进程数，设置为0时在请求线程中直接校验
+    password_verify_workers: int = 2
+
+    # 登录密码校验同时处理及排队的任务上限，超出后提示系统繁忙
+    password_verify_max_pending: int = 32
+
+    # 登录密码校验等待结果的超时时间，单位：秒
+    password_verify_timeout: Union[int, float] = 10
+
+    # 登录失败次数统计时间窗口，单位：秒
+    login_attempt_window: Union[int, float] = 300
+
+    # 时间窗口内单个IP允许的最大登录失败次数，超出后在窗口期内拒绝该IP的登录尝试
+    login_attempt_max_failures_per_ip: int = 20
+
+    # 时间窗口内单个用户名允许的最大登录失败次数，超出后在窗口期内拒绝该用户名的登录尝试
+    login_attempt_max_failures_per_username: int = 5
+
+    # 批量导入用户时单个文件允许的最大行数
+    user_import_max_rows: int = 5000
+
+    # 批量导入用户时计算密码散列值使用的进程数，为None时使用全部CPU核心
+    user_import_hash_workers: Union[int, None] = None
+
     # 登录会话token对应的cookies项名称
     # 由于同一主机地址下的不同端口，在浏览器中会共享cookies
     # 因此在同一主机地址下部署多套基于magic-dash-pro模板开发的独立项目时
@@ -81,6 +120,52 @@ class BaseConfig:
     # 发送给服务端的历史消息最大数量（保留最近的N轮对话，每轮包含user和assistant各一条）
     # 建议值：20-30（即40-60条消息），既能保持对话连贯性，又不会导致请求过大
     max_history_messages_count: int = 30  # 保留最近30条消息（约15轮对话）
+
+    # 服务端聊天消息存储配置
+    # 浏览器端仅保存消息存储令牌，完整消息列表保存在服务端
+    # 内存中保留的聊天消息存储键数上限，超出后淘汰最久未使用的（磁盘上仍保留，可按需恢复）
+    message_store_max_sessions: int = 500
+    # 聊天消息存储的磁盘日志目录，相对路径以项目根目录为基准，多进程部署时各进程需共享该目录
+    message_store_dir: str = "cache/message_store"
+    # 磁盘日志保留时间（秒），超过该时间未更新的将被清理
+    message_store_ttl: int = 7 * 24 * 3600
+
+    # 聊天消息渲染缓存配置
+    # 是否缓存单条聊天消息渲染得到的组件树，全量刷新聊天历史时复用内容未变化的消息
+    message_render_cache_enabled: bool = True
+    # 渲染缓存按序列化后的字节数计量的占用上限，超出后淘汰最久未使用的条目
+    message_render_cache_max_bytes: int = 32 * 1024 * 1024
+
+    # 聊天历史虚拟滚动配置
+    # 聊天历史中同时挂载的最大消息数，窗口外的消息以按已测量高度计算的占位元素代替，0表示挂载全部消息
+    # 需覆盖数屏的消息，过小时滚动中会频繁请求新的窗口
+    chat_history_window_size: int = 60
+
+    # 页面骨架缓存配置
+    # 是否按(页面, 角色)缓存核心页面及聊天页面的骨架，渲染时仅注入当前用户的组件
+    layout_cache_enabled: bool = True
+
+    # Dash回调性能分析配置
+    # 是否统计每个服务端回调的调用次数、耗时、数据库耗时、请求及响应大小和no_update比例
+    # 启用后每个回调响应都会被重新解析JSON以统计实际更新的属性（约每30KB响应0.15ms，与响应大小成正比），
+    # 并在全局锁内记录统计，默认关闭，仅在排查回调性能问题时临时开启
+    callback_profiler_enabled: bool = False
+    # 同一客户端的回调请求由前序回调响应更新的属性触发，且间隔不超过该时间（秒）时，归入同一次用户操作
+    callback_profiler_action_window: float = 3.0
+    # 保留的最近用户操作及其触发的回调链条数
+    callback_profiler_recent_actions: int = 50
+
+    # 后台回调任务配置（批量导入用户等耗时操作）
+    # 任务队列目录，相对路径基于项目根目录，同一主机上的多个web工作进程共享该目录
+    background_jobs_dir: str = "cache/background_jobs"
+    # 每个web工作进程创建的任务工作进程数，设置为0时在web进程的后台线程中执行任务（不支持强制终止运行中的任务）
+    background_jobs_workers: int = 2
+    # 单个用户同时运行的任务上限，超出的任务排队等待，设置为0时不限制
+    background_jobs_max_per_user: int = 1
+    # 任务工作进程空闲时检查队列的间隔，单位：秒
+    background_jobs_poll_interval: float = 0.2
+    # 未被读取的任务结果保留时间，单位：秒
+    background_jobs_result_ttl: Union[int, float] = 3600
     
     # 语音自动播放配置
     # SSE结束后是否自动触发TTS语音播放
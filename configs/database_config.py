@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import List, Literal, Optional
 
 
 class DatabaseConfig:
@@ -9,6 +9,85 @@ class DatabaseConfig:
     # 当使用mysql类型时，请使用`pip install pymysql`安装必要依赖
     database_type: Literal["sqlite", "postgresql", "mysql"] = "postgresql"
 
+    # 是否开启数据库查询耗时统计（按模型方法聚合耗时直方图，并记录慢查询）
+    enable_query_monitor: bool = True
+
+    # 慢查询阈值，单位：毫秒
+    slow_query_threshold_ms: float = 200
+
+    # 保留的最近慢查询记录条数
+    slow_query_log_size: int = 100
+
+    # 登录日志总记录数缓存的最长信任时间，单位：秒
+    # 本进程内的增删操作会实时增量更新该缓存，超过该时间后才重新执行COUNT(*)以感知其他进程的写入
+    login_logs_count_refresh_interval: float = 60
+
+    # 是否按月分区存储登录日志，开启后新记录按登录时间写入loginlogs_pYYYYMM分区表
+    login_logs_partitioning: bool = True
+
+    # 各进程内缓存的登录日志分区列表的最长信任时间，单位：秒
+    login_logs_partition_refresh_interval: float = 60
+
+    # 登录日志保留月数（含当前月份），设置为0时不清理（默认）
+    # 设置为正整数后，应用启动时开启后台清理任务：整表删除保留期之外的月度分区，
+    # 并按登录时间删除原始登录日志表中保留期之外的记录，删除后无法恢复，请在确认审计要求后开启
+    # 同一主机上的多个worker进程通过文件锁保证只有一个进程执行清理，
+    # 也可保持为0，改为通过系统定时任务执行：python -m core.log_retention.log_retention
+    login_logs_retention_months: int = 0
+
+    # 登录日志过期分区清理任务执行间隔，单位：秒
+    login_logs_retention_check_interval: float = 3600
+
+    # 登录日志导出时每次从数据库读取的记录数，决定导出过程的内存占用上限
+    login_logs_export_chunk_size: int = 2000
+
+    # 是否异步批量写入登录日志，开启后登录请求仅将日志记录放入内存队列，由后台线程批量落库
+    login_logs_async_write: bool = True
+
+    # 登录日志队列定时落库间隔，单位：秒
+    login_logs_flush_interval: float = 1.0
+
+    # 登录日志队列累计记录数达到该值时立即落库
+    login_logs_flush_batch_size: int = 200
+
+    # 登录日志队列最大积压记录数，超出后由写入方同步落库，避免数据库不可用时内存无限增长
+    login_logs_max_pending: int = 20000
+
+    # 是否记录使用情况汇总（消息数、会话数、登录次数、话题点击），供管理端使用统计页面读取
+    usage_rollup_enabled: bool = True
+
+    # 使用情况增量合并进汇总表的间隔，单位：秒
+    usage_rollup_flush_interval: float = 10
+
+    # 是否按用户计量资源消耗（上游token、流式响应时长、语音合成字符数、语音通话时长）
+    usage_meter_enabled: bool = True
+
+    # 资源消耗计量落库间隔，单位：秒，新记录的消耗最迟约两个间隔后可查询
+    usage_meter_flush_interval: float = 30
+
+    # 只读副本连接配置参数列表，数据库类型与database_type一致，各项格式同对应类型的连接配置参数，
+    # 可额外通过max_connections单独指定该副本连接池大小，为空列表时全部查询发往主库
+    # 示例：[{"host": "192.168.66.11", "port": 5432, "user": "yyasistant", "password": "passw0rd", "database": "yyasistant"}]
+    read_replicas: List[dict] = []
+
+    # 主库连接池大小
+    primary_max_connections: int = 32
+
+    # 只读副本默认连接池大小
+    replica_max_connections: int = 32
+
+    # 允许的最大副本复制延迟，单位：秒，超出的副本暂不参与只读查询路由
+    replica_max_lag: float = 5
+
+    # 副本复制延迟检查间隔，单位：秒
+    replica_lag_check_interval: float = 5
+
+    # 复制延迟查询语句，需返回单个延迟秒数，为None时使用对应数据库类型的默认语句
+    replica_lag_query: Optional[str] = None
+
+    # 读己之写窗口，单位：秒，用户写入后该时长内其只读查询仍发往主库，应不小于正常复制延迟
+    read_your_writes_window: float = 5
+
     # 当database_type为'postgresql'时，对应的数据库连接配置参数，使用时请根据实际情况修改
     postgresql_config = {
         "host": "192.168.66.10",
@@ -21,7 +100,31 @@ class DatabaseConfig:
     # 当database_type为'mysql'时，对应的数据库连接配置参数，使用时请根据实际情况修改
     mysql_config = {
         "host": "127.0.0.1",
-        "port": 3306,        "user": "root",
+        "port": 3306,
+        "user": "root",
         "password": "admin123",
         "database": "magic_dash_pro",
     }
+
+    # 当database_type为'sqlite'时，对应的数据库连接配置参数
+    sqlite_config = {
+        # 数据库文件路径
+        "database": "yyAsistant.db",
+        # 连接复用策略：
+        # 'per_call'：每次模型操作新建连接并在结束后关闭（每次新建连接都需重新执行pragma）
+        # 'thread_local'：每个线程复用同一个连接，模型操作结束后不关闭
+        "connection_policy": "thread_local",
+        # 每个新连接建立时执行的pragma参数，设置为空字典时使用sqlite默认行为
+        "pragmas": {
+            # WAL日志模式，读写互不阻塞，写操作不再独占整个数据库文件
+            "journal_mode": "wal",
+            # WAL模式下NORMAL即可保证数据库一致性，减少fsync次数
+            "synchronous": "normal",
+            # 页缓存大小，负数表示以KiB为单位，即64MB
+            "cache_size": -64 * 1024,
+            # 内存映射读取大小，单位：字节
+            "mmap_size": 256 * 1024 * 1024,
+            # 遇到写锁时的等待时间，单位：毫秒，避免突发写入时直接抛出database is locked
+            "busy_timeout": 5000,
+        },
+    }
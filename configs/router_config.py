@@ -143,6 +143,25 @@ class RouterConfig:
                         },
                     ],
                 },
+                {
+                    "component": "SubMenu",
+                    "props": {
+                        "key": "运营分析",
+                        "title": "运营分析",
+                        "icon": "antd-bar-chart",
+                    },
+                    "children": [
+                        {
+                            "component": "Item",
+                            "props": {
+                                "key": "/core/usage-stats",
+                                "title": "使用统计",
+                                "icon": "antd-line-chart",
+                                "href": "/core/usage-stats",
+                            },
+                        },
+                    ],
+                },
             ],
         },
         {
@@ -185,6 +204,7 @@ class RouterConfig:
         "/core/users": "系统用户",
         "/core/chat": "AI聊天",
         "/core/login-logs": "登录日志",
+        "/core/usage-stats": "使用统计",
         "/core/other-page1": "其他页面1",
         "/403-demo": "403状态页演示",
         "/404-demo": "404状态页演示",
@@ -217,4 +237,5 @@ class RouterConfig:
         "/core/sub-menu-page2": ["子菜单演示"],
         "/core/sub-menu-page3": ["子菜单演示"],
         "/core/login-logs": ["日志管理"],
+        "/core/usage-stats": ["运营分析"],
     }
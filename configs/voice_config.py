@@ -45,6 +45,14 @@ class VoiceConfig:
     VOICE_CALL_TRANSCRIPTION_DEBOUNCE = 500  # 文本更新防抖时间（毫秒）
     VOICE_CALL_STREAMING_DISPLAY = False  # 是否流式显示（建议False，整句显示）
     
+    # 语音实时对话转录增量保存配置（VOICE_CALL_SAVE_TO_DATABASE=True时生效）
+    VOICE_CALL_INCREMENTAL_SAVE = True  # 是否在通话过程中分批增量上传转录文本（关闭时回退为挂断时一次性保存）
+    VOICE_CALL_TRANSCRIPT_BATCH_MAX_MESSAGES = 20  # 前端单个批次最多携带的消息数
+    VOICE_CALL_TRANSCRIPT_FLUSH_INTERVAL = 2.0  # 服务端缓冲区定时落库间隔（秒）
+    VOICE_CALL_TRANSCRIPT_FLUSH_BATCH_SIZE = 200  # 服务端缓冲区累计批次数达到该值时立即落库
+    VOICE_CALL_TRANSCRIPT_SEEN_CACHE_SIZE = 10000  # 服务端用于幂等去重的(session_id, seq)缓存容量
+    VOICE_CALL_MAX_METERED_SECONDS = 4 * 3600  # 单次语音通话计量时长上限（秒），避免异常上报的时长计入用户消耗
+    
     @classmethod
     def get_voice_options(cls) -> list:
         """获取可用的语音选项"""
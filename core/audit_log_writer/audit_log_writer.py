@@ -0,0 +1,129 @@
+"""
+登录日志异步批量写入器
+
+登录请求仅将登录日志记录放入内存队列，由后台线程按时间/数量策略以insert_many批量落库，
+进程退出时落库剩余记录。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, List, Any
+import logging
+
+from configs.database_config import DatabaseConfig
+from core.flush_buffer.flush_buffer import FlushBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter(FlushBuffer):
+    """登录日志异步批量写入器"""
+
+    name = "登录日志写入器"
+
+    def __init__(
+        self,
+        flush_interval: float = 1.0,
+        flush_batch_size: int = 200,
+        max_pending: int = 20000,
+    ):
+        """
+        初始化登录日志写入器
+
+        Args:
+            flush_interval: 定时落库间隔（秒）
+            flush_batch_size: 累计记录数达到该值时立即落库
+            max_pending: 最大积压记录数，超出后由写入方同步落库
+        """
+        super().__init__(flush_interval)
+        self.flush_batch_size = flush_batch_size
+        self.max_pending = max_pending
+
+        # 待落库记录
+        self.pending: List[Dict[str, Any]] = []
+
+    def append(self, **record) -> None:
+        """
+        追加一条登录日志记录，参数同LoginLogs.add_log()
+
+        Args:
+            record: 登录日志字段
+        """
+        self.ensure_started()
+
+        with self.lock:
+            self.pending.append(record)
+            self.counters["accepted"] += 1
+            pending_count = len(self.pending)
+
+            if pending_count >= self.flush_batch_size:
+                self.flush_event.set()
+
+        # 积压过多时（通常为数据库暂不可用），由写入方同步落库形成背压
+        if pending_count >= self.max_pending:
+            self.flush()
+            self._drop_overflow()
+
+    def _drop_overflow(self) -> None:
+        """同步落库后仍超出积压上限时，丢弃最早的记录"""
+        with self.lock:
+            overflow = len(self.pending) - self.max_pending
+            if overflow > 0:
+                del self.pending[:overflow]
+                self.counters["dropped"] += overflow
+
+        if overflow > 0:
+            logger.error(f"登录日志积压超出上限，已丢弃最早的 {overflow} 条记录")
+
+    def _take_pending(self) -> List[Dict[str, Any]]:
+        """取出全部待落库记录"""
+        records, self.pending = self.pending, []
+        return records
+
+    def _write_pending(self, records: List[Dict[str, Any]]) -> int:
+        """以单个事务批量落库"""
+        from models.logs import LoginLogs
+
+        LoginLogs.add_logs(records)
+        return len(records)
+
+    def _restore_pending(self, records: List[Dict[str, Any]]) -> None:
+        """落库失败的记录放回队首"""
+        self.pending = records + self.pending
+
+    def _pending_stats(self) -> Dict[str, Any]:
+        """待落库记录统计"""
+        return {
+            "pending": len(self.pending),
+            "flush_batch_size": self.flush_batch_size,
+        }
+
+
+# 全局登录日志写入器实例
+audit_log_writer = AuditLogWriter(
+    flush_interval=DatabaseConfig.login_logs_flush_interval,
+    flush_batch_size=DatabaseConfig.login_logs_flush_batch_size,
+    max_pending=DatabaseConfig.login_logs_max_pending,
+)
+
+
+# 便捷函数
+def write_login_log(**record) -> None:
+    """写入登录日志，按配置选择异步批量写入或同步写入"""
+    if DatabaseConfig.login_logs_async_write:
+        audit_log_writer.append(**record)
+    else:
+        from models.logs import LoginLogs
+
+        LoginLogs.add_log(**record)
+
+
+def flush_login_logs() -> int:
+    """立即落库"""
+    return audit_log_writer.flush()
+
+
+def get_audit_log_writer_stats() -> Dict[str, Any]:
+    """获取写入器统计"""
+    return audit_log_writer.get_stats()
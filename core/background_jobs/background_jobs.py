@@ -0,0 +1,535 @@
+"""
+后台回调任务管理模块
+
+实现Dash后台回调（background=True）使用的任务管理器：任务以文件形式写入本地磁盘队列，
+由按需fork的工作进程池领取执行，进度、set_props更新及结果同样经磁盘文件回传，
+因此同一主机上的多个web工作进程可共享同一队列。支持取消任务，并限制单个用户同时运行的任务数，
+超出上限的任务在队列中排队等待。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, List, Any, Callable, Optional, Tuple
+import atexit
+import hashlib
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows下仅使用线程锁，此时只支持单个web进程
+    fcntl = None
+
+import psutil
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+from dash.background_callback.managers import BaseBackgroundCallbackManager
+from dash.background_callback._proxy_set_props import ProxySetProps
+from dash.exceptions import PreventUpdate
+
+from configs import BaseConfig
+
+logger = logging.getLogger(__name__)
+
+# 项目根目录，相对路径的队列目录以此为基准
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 与Dash内置后台回调管理器一致的特殊结果
+NO_UPDATE_RESULT = {"_dash_no_update": "_dash_no_update"}
+
+
+class _JobFunction:
+    """在工作进程中执行的后台回调函数，负责构造回调上下文并回传进度、set_props更新及结果"""
+
+    def __init__(self, fn: Callable, progress: bool, registry_key: str):
+        self.fn = fn
+        self.progress = progress
+        self.registry_key = registry_key
+
+    def __call__(self, manager: "BackgroundJobManager", cache_key: str, args, context: dict):
+        updated_props = {}
+
+        def set_props(component_id, props):
+            # 工作进程内累积全部更新，web进程读取后删除，重复下发的属性不影响结果
+            updated_props.setdefault(component_id, {}).update(props)
+            manager._write_entry(cache_key, "props", updated_props)
+
+        def set_progress(progress_value):
+            if not isinstance(progress_value, (list, tuple)):
+                progress_value = [progress_value]
+            manager._write_entry(cache_key, "progress", list(progress_value))
+
+        ctx = AttributeDict(**context)
+        ctx.ignore_register_page = False
+        ctx.updated_props = ProxySetProps(set_props)
+        context_value.set(ctx)
+
+        maybe_progress = [set_progress] if self.progress else []
+        try:
+            if isinstance(args, dict):
+                return self.fn(*maybe_progress, **args)
+            if isinstance(args, (list, tuple)):
+                return self.fn(*maybe_progress, *args)
+            return self.fn(*maybe_progress, args)
+        except PreventUpdate:
+            return NO_UPDATE_RESULT
+        except Exception as e:  # 与Dash内置管理器一致，错误信息交由回调的错误处理逻辑展示
+            return {
+                "background_callback_error": {
+                    "msg": str(e),
+                    "tb": traceback.format_exc(),
+                }
+            }
+
+
+class BackgroundJobManager(BaseBackgroundCallbackManager):
+    """基于本地磁盘队列及工作进程池的后台回调任务管理器"""
+
+    def __init__(
+        self,
+        jobs_dir: str = "cache/background_jobs",
+        workers: int = 2,
+        max_jobs_per_user: int = 1,
+        poll_interval: float = 0.2,
+        result_ttl: float = 3600,
+    ):
+        """
+        初始化后台回调任务管理器
+
+        Args:
+            jobs_dir: 任务队列目录，相对路径基于项目根目录
+            workers: 工作进程数，为0时在当前进程的后台线程中执行任务（不支持强制终止运行中的任务）
+            max_jobs_per_user: 单个用户同时运行的任务上限，超出的任务排队等待，为0时不限制
+            poll_interval: 工作进程空闲时检查队列的间隔，单位：秒
+            result_ttl: 未被读取的任务结果保留时间，单位：秒
+        """
+        super().__init__(cache_by=None)
+
+        self.jobs_dir = jobs_dir if os.path.isabs(jobs_dir) else os.path.join(BASE_DIR, jobs_dir)
+        self.queue_dir = os.path.join(self.jobs_dir, "queue")
+        self.running_dir = os.path.join(self.jobs_dir, "running")
+        self.results_dir = os.path.join(self.jobs_dir, "results")
+        self.lock_path = os.path.join(self.jobs_dir, ".lock")
+
+        self.use_processes = workers > 0 and "fork" in multiprocessing.get_all_start_methods()
+        self.workers = workers if self.use_processes else max(workers, 1)
+        self.max_jobs_per_user = max_jobs_per_user
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+
+        self.identity_getter: Optional[Callable[[], Any]] = None
+        self.worker_initializer: Optional[Callable[[], None]] = None
+
+        # 工作进程或线程，按需创建，避免在gunicorn fork之前创建子进程
+        self.pool: List[Any] = []
+        self.last_cleanup = 0.0
+
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+        # 队列目录操作的进程内锁，与文件锁配合使用
+        self.queue_lock = threading.Lock()
+
+    def set_identity_getter(self, getter: Callable[[], Any]) -> None:
+        """设置获取当前用户标识的函数，用于限制单个用户同时运行的任务数"""
+        self.identity_getter = getter
+
+    def set_worker_initializer(self, initializer: Callable[[], None]) -> None:
+        """设置工作进程启动时执行的初始化函数，如丢弃从父进程继承的数据库连接"""
+        self.worker_initializer = initializer
+
+    # ------------------------------------------------------------------
+    # 磁盘队列
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self):
+        """跨进程互斥访问队列目录"""
+        with self.queue_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _ensure_dirs(self) -> None:
+        for path in (self.queue_dir, self.running_dir, self.results_dir):
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def _write_file(path: str, value: Any) -> None:
+        """原子写入，避免读取方读到不完整的文件"""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _read_file(self, path: str, remove: bool = False) -> Any:
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError):
+            return self.UNDEFINED
+        if remove:
+            self._remove_file(path)
+        return value
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _entry_path(self, cache_key: str, kind: str) -> str:
+        """任务结果、进度及set_props更新的文件路径"""
+        return os.path.join(self.results_dir, f"{cache_key}.{kind}")
+
+    def _write_entry(self, cache_key: str, kind: str, value: Any) -> None:
+        self._write_file(self._entry_path(cache_key, kind), value)
+
+    def _user_key(self) -> str:
+        """当前用户标识的摘要，用于文件名中区分用户"""
+        user_id = self.identity_getter() if self.identity_getter else None
+        if user_id is None:
+            return "anonymous"
+        return hashlib.sha1(str(user_id).encode("utf-8")).hexdigest()[:16]
+
+    def _find_queued(self, job_id: str) -> Optional[str]:
+        """查找排队中的任务文件名，文件名格式为: 入队时间-任务id-用户标识.job"""
+        for name in os.listdir(self.queue_dir):
+            if name.endswith(".job") and name.split("-", 2)[1:2] == [job_id]:
+                return name
+        return None
+
+    def _read_running(self) -> Dict[str, Dict[str, Any]]:
+        """读取运行中任务的元信息，并清理工作进程已异常退出的任务，需在持有队列锁时调用"""
+        running = {}
+        for name in os.listdir(self.running_dir):
+            if not name.endswith(".meta"):
+                continue
+            job_id = name[:-5]
+            meta = self._read_file(os.path.join(self.running_dir, name))
+            if meta is self.UNDEFINED:
+                continue
+            if not psutil.pid_exists(meta["pid"]):
+                logger.warning(f"后台任务 {job_id} 的工作进程 {meta['pid']} 已退出，清理任务")
+                self._remove_running(job_id)
+                continue
+            running[job_id] = meta
+        return running
+
+    def _remove_running(self, job_id: str) -> None:
+        self._remove_file(os.path.join(self.running_dir, f"{job_id}.meta"))
+        self._remove_file(os.path.join(self.running_dir, f"{job_id}.job"))
+
+    def _claim(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """按入队顺序领取一个任务，跳过同时运行任务数已达上限的用户的任务"""
+        with self._locked():
+            running_users = Counter(meta["user"] for meta in self._read_running().values())
+            for name in sorted(os.listdir(self.queue_dir)):
+                if not name.endswith(".job"):
+                    continue
+                _, job_id, user_key = name[:-4].split("-", 2)
+                if self.max_jobs_per_user and running_users[user_key] >= self.max_jobs_per_user:
+                    continue
+
+                job_path = os.path.join(self.running_dir, f"{job_id}.job")
+                os.replace(os.path.join(self.queue_dir, name), job_path)
+                self._write_file(
+                    os.path.join(self.running_dir, f"{job_id}.meta"),
+                    {"pid": os.getpid(), "user": user_key, "started_at": time.time()},
+                )
+                break
+            else:
+                return None
+
+        payload = self._read_file(job_path)
+        if payload is self.UNDEFINED:
+            return None
+        return job_id, payload
+
+    def _finish(self, job_id: str, cache_key: str, result: Any) -> None:
+        """写入任务结果，任务已被取消时丢弃结果"""
+        with self._locked():
+            if not os.path.exists(os.path.join(self.running_dir, f"{job_id}.meta")):
+                return
+            self._write_entry(cache_key, "result", result)
+            self._remove_running(job_id)
+
+    # ------------------------------------------------------------------
+    # 工作进程
+    # ------------------------------------------------------------------
+
+    def _worker_loop(self, parent_pid: int) -> None:
+        """工作进程主循环，父进程退出后随之退出"""
+        if self.use_processes:
+            # fork时其他线程可能持有该锁
+            self.queue_lock = threading.Lock()
+            if self.worker_initializer is not None:
+                self.worker_initializer()
+
+        while not self.use_processes or os.getppid() == parent_pid:
+            try:
+                claimed = self._claim()
+            except Exception as e:
+                logger.error(f"领取后台任务失败: {e}")
+                claimed = None
+
+            if claimed is None:
+                time.sleep(self.poll_interval)
+                continue
+
+            job_id, payload = claimed
+            job_fn = self.func_registry.get(payload["registry_key"])
+            if job_fn is None:
+                result = {
+                    "background_callback_error": {"msg": "后台回调函数未注册", "tb": ""}
+                }
+            else:
+                result = job_fn(self, payload["cache_key"], payload["args"], payload["context"])
+            self._finish(job_id, payload["cache_key"], result)
+
+    def _is_alive(self, worker) -> bool:
+        # 被终止的工作进程已由psutil回收，multiprocessing无法再获取其退出状态
+        if not worker.is_alive():
+            return False
+        return not self.use_processes or psutil.pid_exists(worker.pid)
+
+    def _ensure_workers(self) -> None:
+        """启动工作进程或线程，并替换已退出的工作进程"""
+        with self.lock:
+            alive = [worker for worker in self.pool if self._is_alive(worker)]
+            if len(alive) == self.workers:
+                return
+
+            self._ensure_dirs()
+            self.counters["restarted_workers"] += len(self.pool) - len(alive)
+
+            for _ in range(self.workers - len(alive)):
+                if self.use_processes:
+                    # 非守护进程，任务中可再创建进程池（如批量导入用户时并行计算密码散列值）
+                    worker = multiprocessing.get_context("fork").Process(
+                        target=self._worker_loop,
+                        args=(os.getpid(),),
+                        name="background-job-worker",
+                        daemon=False,
+                    )
+                else:
+                    worker = threading.Thread(
+                        target=self._worker_loop,
+                        args=(os.getpid(),),
+                        name="background-job-worker",
+                        daemon=True,
+                    )
+                worker.start()
+                alive.append(worker)
+
+            if not self.pool:
+                # 需在启动工作进程之后注册，以便先于multiprocessing等待非守护子进程退出的退出处理函数执行
+                atexit.register(self.shutdown)
+
+            self.pool = alive
+            logger.info(
+                f"后台回调工作{'进程' if self.use_processes else '线程'}已启动，数量: {self.workers}"
+            )
+
+    def _cleanup_results(self) -> None:
+        """删除超过保留时间未被读取的任务结果（如用户已离开页面）"""
+        now = time.time()
+        if now - self.last_cleanup < 60:
+            return
+        self.last_cleanup = now
+
+        for name in os.listdir(self.results_dir):
+            path = os.path.join(self.results_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.result_ttl:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _kill_process_tree(pid: int) -> None:
+        """终止工作进程及其创建的子进程"""
+        try:
+            process = psutil.Process(pid)
+            for child in process.children(recursive=True):
+                try:
+                    child.kill()
+                except psutil.NoSuchProcess:
+                    pass
+            process.kill()
+            process.wait(1)
+        except (psutil.NoSuchProcess, psutil.TimeoutExpired):
+            pass
+
+    def shutdown(self) -> None:
+        """终止全部工作进程"""
+        with self.lock:
+            pool, self.pool = self.pool, []
+        if self.use_processes:
+            for worker in pool:
+                if self._is_alive(worker):
+                    self._kill_process_tree(worker.pid)
+
+    # ------------------------------------------------------------------
+    # BaseBackgroundCallbackManager接口
+    # ------------------------------------------------------------------
+
+    def build_cache_key(self, fn, args, cache_args_to_ignore, triggered):
+        # 按用户区分结果，避免不同用户以相同参数触发同一回调时互相读取结果
+        return hashlib.sha256(
+            (
+                super().build_cache_key(fn, args, cache_args_to_ignore, triggered)
+                + self._user_key()
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def make_job_fn(self, fn, progress, key=None):
+        return _JobFunction(fn, progress, key)
+
+    def call_job_fn(self, key, job_fn, args, context):
+        self._ensure_workers()
+        self._cleanup_results()
+
+        # 清除同一任务上次被取消后残留的进度及更新
+        for kind in ("result", "progress", "props"):
+            self._remove_file(self._entry_path(key, kind))
+
+        job_id = uuid.uuid4().hex
+        payload = {
+            "registry_key": job_fn.registry_key,
+            "cache_key": key,
+            "args": args,
+            "context": dict(context),
+        }
+        # 先写入临时文件再移入队列目录，避免工作进程领取到不完整的任务
+        tmp_path = os.path.join(self.jobs_dir, f"{job_id}.tmp")
+        self._write_file(tmp_path, payload)
+        os.replace(
+            tmp_path,
+            os.path.join(self.queue_dir, f"{time.time_ns()}-{job_id}-{self._user_key()}.job"),
+        )
+
+        with self.lock:
+            self.counters["submitted"] += 1
+        return job_id
+
+    def job_running(self, job):
+        if not job:
+            return False
+
+        self._ensure_workers()
+        with self._locked():
+            return self._find_queued(job) is not None or job in self._read_running()
+
+    def terminate_job(self, job):
+        if not job:
+            return
+
+        with self._locked():
+            name = self._find_queued(job)
+            if name is not None:
+                self._remove_file(os.path.join(self.queue_dir, name))
+                terminated = True
+            else:
+                meta = self._read_running().get(job)
+                terminated = meta is not None
+                if terminated:
+                    # 在持有队列锁时终止，避免工作进程在此期间领取下一个任务
+                    if self.use_processes:
+                        self._kill_process_tree(meta["pid"])
+                    self._remove_running(job)
+
+        if terminated:
+            with self.lock:
+                self.counters["terminated"] += 1
+            # 补充被终止的工作进程
+            if self.use_processes:
+                self._ensure_workers()
+
+    def terminate_unhealthy_job(self, job):
+        if job and not self.job_running(job):
+            self.terminate_job(job)
+            return True
+        return False
+
+    def get_progress(self, key):
+        progress = self._read_file(self._entry_path(key, "progress"), remove=True)
+        return None if progress is self.UNDEFINED else progress
+
+    def result_ready(self, key):
+        return os.path.exists(self._entry_path(key, "result"))
+
+    def get_result(self, key, job):
+        result = self._read_file(self._entry_path(key, "result"), remove=True)
+        if result is self.UNDEFINED:
+            return self.UNDEFINED
+
+        self._remove_file(self._entry_path(key, "progress"))
+        with self.lock:
+            if isinstance(result, dict) and "background_callback_error" in result:
+                self.counters["failed"] += 1
+            else:
+                self.counters["completed"] += 1
+        return result
+
+    def get_updated_props(self, key):
+        updated_props = self._read_file(self._entry_path(key, "props"), remove=True)
+        return {} if updated_props is self.UNDEFINED else updated_props
+
+    def clear_cache_entry(self, key):
+        for kind in ("result", "progress", "props"):
+            self._remove_file(self._entry_path(key, kind))
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取任务统计，排队及运行中的任务数为同一队列目录下全部web进程的合计"""
+        queued = running = 0
+        if os.path.isdir(self.queue_dir):
+            with self._locked():
+                queued = sum(name.endswith(".job") for name in os.listdir(self.queue_dir))
+                running = len(self._read_running())
+
+        with self.lock:
+            return {
+                "mode": "process" if self.use_processes else "thread",
+                "workers": self.workers,
+                "alive_workers": sum(self._is_alive(worker) for worker in self.pool),
+                "max_jobs_per_user": self.max_jobs_per_user,
+                "queued": queued,
+                "running": running,
+                **dict(self.counters),
+            }
+
+
+# 全局后台回调任务管理器实例
+background_job_manager = BackgroundJobManager(
+    jobs_dir=BaseConfig.background_jobs_dir,
+    workers=BaseConfig.background_jobs_workers,
+    max_jobs_per_user=BaseConfig.background_jobs_max_per_user,
+    poll_interval=BaseConfig.background_jobs_poll_interval,
+    result_ttl=BaseConfig.background_jobs_result_ttl,
+)
+
+
+# 便捷函数
+def get_background_job_stats() -> Dict[str, Any]:
+    """获取后台回调任务统计"""
+    return background_job_manager.get_stats()
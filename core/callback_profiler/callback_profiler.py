@@ -0,0 +1,429 @@
+"""
+Dash回调性能分析模块
+
+包装Dash的回调分发视图，按回调统计调用次数、耗时、数据库耗时、请求及响应大小、no_update输出比例，
+并按客户端将由前序回调响应更新的属性触发的回调请求串联为同一次用户操作，统计每次用户操作触发的回调扇出。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, List, Any
+import json
+import time
+import inspect
+import threading
+from collections import defaultdict, deque, Counter
+from datetime import datetime
+import logging
+
+from flask import request, session
+from dash.exceptions import PreventUpdate
+
+from configs.base_config import BaseConfig
+from core.query_monitor.query_monitor import LatencyHistogram, query_monitor
+
+logger = logging.getLogger(__name__)
+
+# Dash回调分发路由名称
+_DISPATCH_ROUTE = "_dash-update-component"
+
+# 页面加载或组件新挂载时触发的初始回调没有changedPropIds
+_INITIAL_TRIGGER = "<initial>"
+
+
+def _count_outputs(outputs: Any) -> int:
+    """统计请求中的输出数，模式匹配输出展开为具体组件"""
+    if isinstance(outputs, list):
+        return sum(_count_outputs(output) for output in outputs)
+    return 1 if outputs else 0
+
+
+def _normalize_prop_id(prop_id: str) -> str:
+    """将模式匹配组件的属性id归一化，仅保留type字段，避免按具体组件拆分统计"""
+    component_id, _, prop = prop_id.rpartition(".")
+    if not component_id.startswith("{"):
+        return prop_id
+    try:
+        parsed = json.loads(component_id)
+    except ValueError:
+        return prop_id
+    normalized = {key: value if key == "type" else "*" for key, value in parsed.items()}
+    return f"{json.dumps(normalized, sort_keys=True, separators=(',', ':'))}.{prop}"
+
+
+class _CallbackStats:
+    """单个回调的统计"""
+
+    __slots__ = (
+        "function", "wall", "db_ms", "db_queries", "request_bytes", "response_bytes",
+        "max_request_bytes", "max_response_bytes", "outputs", "no_update_outputs",
+        "prevented", "wasted_ms", "errors", "last_called",
+    )
+
+    def __init__(self, function: str):
+        self.function = function
+        self.wall = LatencyHistogram()
+        self.db_ms = 0.0
+        self.db_queries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.max_request_bytes = 0
+        self.max_response_bytes = 0
+        # 输出总数及其中未更新（no_update）的输出数
+        self.outputs = 0
+        self.no_update_outputs = 0
+        # 全部输出均未更新（PreventUpdate或全部no_update）的调用次数及其耗时
+        self.prevented = 0
+        self.wasted_ms = 0.0
+        self.errors = 0
+        self.last_called = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为字典"""
+        count = self.wall.count
+        return {
+            "function": self.function,
+            "count": count,
+            "total_ms": round(self.wall.total_ms, 3),
+            "avg_ms": round(self.wall.total_ms / count, 3) if count else 0.0,
+            "p95_ms": self.wall.percentile(0.95),
+            "max_ms": round(self.wall.max_ms, 3),
+            "db_ms": round(self.db_ms, 3),
+            "db_queries": self.db_queries,
+            "avg_request_bytes": round(self.request_bytes / count) if count else 0,
+            "avg_response_bytes": round(self.response_bytes / count) if count else 0,
+            "max_request_bytes": self.max_request_bytes,
+            "max_response_bytes": self.max_response_bytes,
+            "no_update_ratio": round(self.no_update_outputs / self.outputs, 4) if self.outputs else 0.0,
+            "prevented": self.prevented,
+            "wasted_ms": round(self.wasted_ms, 3),
+            "errors": self.errors,
+            "last_called": self.last_called,
+        }
+
+
+class _ActionStats:
+    """同一触发属性的用户操作统计"""
+
+    __slots__ = ("count", "callbacks", "invocations", "total_ms", "db_ms", "response_bytes")
+
+    def __init__(self):
+        self.count = 0
+        # 回调id -> 触发次数
+        self.callbacks = Counter()
+        self.invocations = 0
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.response_bytes = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为字典"""
+        return {
+            "count": self.count,
+            "avg_fanout": round(self.invocations / self.count, 2) if self.count else 0.0,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "avg_db_ms": round(self.db_ms / self.count, 3) if self.count else 0.0,
+            "avg_response_bytes": round(self.response_bytes / self.count) if self.count else 0,
+            "callbacks": dict(self.callbacks.most_common()),
+        }
+
+
+class CallbackProfiler:
+    """Dash回调性能分析器"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        action_window: float = 3.0,
+        recent_actions: int = 50,
+        max_triggers: int = 500,
+    ):
+        """
+        初始化回调性能分析器
+
+        Args:
+            enabled: 是否启用统计
+            action_window: 同一客户端的回调请求由前序回调响应更新的属性触发，且间隔不超过该时间（秒）时，归入同一次用户操作
+            recent_actions: 保留的最近用户操作条数
+            max_triggers: 最多统计的触发属性数，超出后归入'<other>'
+        """
+        self.enabled = enabled
+        self.action_window = action_window
+        self.max_triggers = max_triggers
+        self.app = None
+
+        # 回调id -> 回调统计
+        self.callbacks: Dict[str, _CallbackStats] = {}
+        # 归一化的触发属性 -> 用户操作统计
+        self.actions: Dict[str, _ActionStats] = {}
+        self.recent_actions = deque(maxlen=recent_actions)
+        # 客户端 -> {"action": 当前用户操作, "pending": {属性id: 更新时间}}
+        self.clients: Dict[str, Dict[str, Any]] = {}
+
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def instrument(self, app) -> None:
+        """
+        包装Dash应用的回调分发视图
+
+        Args:
+            app: Dash应用实例
+        """
+        if not self.enabled or getattr(app, "_callback_profiler_instrumented", False):
+            return
+
+        self.app = app
+        endpoint = app.config.routes_pathname_prefix + _DISPATCH_ROUTE
+        dispatch = app.server.view_functions[endpoint]
+
+        def profiled_dispatch(*args, **kwargs):
+            return self._profile(dispatch, *args, **kwargs)
+
+        app.server.view_functions[endpoint] = profiled_dispatch
+        app._callback_profiler_instrumented = True
+
+    def _resolve_function(self, callback_id: str) -> str:
+        """根据回调id定位注册回调的函数，如'callbacks.core_pages_c.chat_c.handle_session_switch'"""
+        try:
+            function = inspect.unwrap(self.app.callback_map[callback_id]["callback"])
+            return f"{function.__module__}.{function.__qualname__}"
+        except (KeyError, AttributeError, TypeError):
+            return "<unknown>"
+
+    def _profile(self, dispatch, *args, **kwargs):
+        """执行回调分发并记录统计"""
+        body = request.get_json(silent=True) or {}
+        request_bytes = request.content_length or len(request.get_data())
+        start_time = time.perf_counter()
+        response = None
+        error = False
+
+        with query_monitor.track() as tracked:
+            try:
+                response = dispatch(*args, **kwargs)
+                return response
+            except PreventUpdate:
+                # 回调中止更新，视为全部输出未更新
+                raise
+            except Exception:
+                error = True
+                raise
+            finally:
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                try:
+                    self._record(body, request_bytes, response, duration_ms, tracked, error)
+                except Exception as e:
+                    logger.error(f"记录回调性能统计失败: {e}")
+
+    def _record(
+        self,
+        body: Dict[str, Any],
+        request_bytes: int,
+        response,
+        duration_ms: float,
+        tracked: Dict[str, Any],
+        error: bool,
+    ) -> None:
+        """记录一次回调调用"""
+        callback_id = body.get("output", "<unknown>")
+        changed_prop_ids = body.get("changedPropIds") or []
+        output_count = _count_outputs(body.get("outputs"))
+
+        # 响应中仅包含实际更新的输出，PreventUpdate或全部no_update时没有响应内容
+        updated_props: List[str] = []
+        updated_outputs = 0
+        response_bytes = 0
+        if response is not None:
+            data = response.get_data()
+            response_bytes = len(data)
+            try:
+                payload = json.loads(data) if data else {}
+            except ValueError:
+                payload = {}
+            for component_id, props in (payload.get("response") or {}).items():
+                updated_outputs += len(props)
+                updated_props.extend(f"{component_id}.{prop}" for prop in props)
+            for component_id, props in (payload.get("sideUpdate") or {}).items():
+                updated_props.extend(f"{component_id}.{prop}" for prop in props)
+        prevented = not error and not updated_props
+
+        # 按会话用户区分客户端，未登录时使用客户端地址
+        client = session.get("_user_id") or request.remote_addr or "<anonymous>"
+        now = time.time()
+
+        with self.lock:
+            stats = self.callbacks.get(callback_id)
+            if stats is None:
+                stats = self.callbacks[callback_id] = _CallbackStats(self._resolve_function(callback_id))
+            stats.wall.observe(duration_ms)
+            stats.db_ms += tracked["duration_ms"]
+            stats.db_queries += tracked["queries"]
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+            stats.max_request_bytes = max(stats.max_request_bytes, request_bytes)
+            stats.max_response_bytes = max(stats.max_response_bytes, response_bytes)
+            if not error:
+                stats.outputs += output_count
+                stats.no_update_outputs += max(output_count - updated_outputs, 0)
+            if prevented:
+                stats.prevented += 1
+                stats.wasted_ms += duration_ms
+            if error:
+                stats.errors += 1
+            stats.last_called = datetime.now().isoformat()
+            self.counters["invocations"] += 1
+
+            self._record_action(
+                client, now, callback_id, changed_prop_ids, updated_props,
+                duration_ms, tracked["duration_ms"], response_bytes,
+            )
+
+    def _record_action(
+        self,
+        client: str,
+        now: float,
+        callback_id: str,
+        changed_prop_ids: List[str],
+        updated_props: List[str],
+        duration_ms: float,
+        db_ms: float,
+        response_bytes: int,
+    ) -> None:
+        """将回调调用归入所属的用户操作，需在持有锁时调用"""
+        state = self.clients.setdefault(client, {"action": None, "pending": {}})
+        pending = state["pending"]
+        for prop_id, updated_at in list(pending.items()):
+            if now - updated_at > self.action_window:
+                del pending[prop_id]
+
+        action = state["action"]
+        # 由前序回调更新的属性触发的请求，以及紧随其后的初始回调归入当前用户操作
+        if changed_prop_ids:
+            chained = all(prop_id in pending for prop_id in changed_prop_ids)
+        else:
+            chained = action is not None and now - action["updated_at"] <= self.action_window
+        if action is None or not chained:
+            trigger = _normalize_prop_id(changed_prop_ids[0]) if changed_prop_ids else _INITIAL_TRIGGER
+            if trigger not in self.actions and len(self.actions) >= self.max_triggers:
+                trigger = "<other>"
+            action = state["action"] = {
+                "trigger": trigger,
+                "client": client,
+                "started": datetime.now().isoformat(),
+                "updated_at": now,
+                "callbacks": [],
+                "total_ms": 0.0,
+                "db_ms": 0.0,
+                "response_bytes": 0,
+            }
+            self.actions.setdefault(trigger, _ActionStats()).count += 1
+            self.recent_actions.append(action)
+            self.counters["actions"] += 1
+
+        action["updated_at"] = now
+        action["callbacks"].append({"callback": callback_id, "ms": round(duration_ms, 3)})
+        action["total_ms"] += duration_ms
+        action["db_ms"] += db_ms
+        action["response_bytes"] += response_bytes
+
+        action_stats = self.actions[action["trigger"]]
+        action_stats.callbacks[callback_id] += 1
+        action_stats.invocations += 1
+        action_stats.total_ms += duration_ms
+        action_stats.db_ms += db_ms
+        action_stats.response_bytes += response_bytes
+
+        for prop_id in updated_props:
+            pending[prop_id] = now
+
+        # 清理长时间无请求的客户端
+        if len(self.clients) > 1000:
+            for stale_client in [
+                key for key, value in self.clients.items()
+                if value["action"] is None or now - value["action"]["updated_at"] > self.action_window
+            ]:
+                del self.clients[stale_client]
+
+    def get_stats(self, top: int = 20) -> Dict[str, Any]:
+        """
+        获取回调性能统计
+
+        Args:
+            top: 最热及最浪费回调、触发属性返回的条数
+
+        Returns:
+            回调性能统计
+        """
+        with self.lock:
+            callbacks = {callback_id: stats.to_dict() for callback_id, stats in self.callbacks.items()}
+            actions = {trigger: stats.to_dict() for trigger, stats in self.actions.items()}
+            recent_actions = [
+                {
+                    **{key: value for key, value in action.items() if key != "updated_at"},
+                    "fanout": len(action["callbacks"]),
+                    "total_ms": round(action["total_ms"], 3),
+                    "db_ms": round(action["db_ms"], 3),
+                    "callbacks": list(action["callbacks"]),
+                }
+                for action in reversed(self.recent_actions)
+            ]
+            counters = dict(self.counters)
+
+        def ranked(key: str) -> List[Dict[str, Any]]:
+            return [
+                {"callback": callback_id, **stats}
+                for callback_id, stats in sorted(
+                    callbacks.items(), key=lambda item: item[1][key], reverse=True
+                )[:top]
+                if stats[key]
+            ]
+
+        return {
+            "enabled": self.enabled,
+            "callbacks": len(callbacks),
+            "action_window": self.action_window,
+            **counters,
+            # 按总耗时排序
+            "hottest": ranked("total_ms"),
+            # 按全部输出均未更新的调用耗时排序
+            "most_wasteful": ranked("wasted_ms"),
+            # 按平均扇出排序的用户操作
+            "actions": [
+                {"trigger": trigger, **stats}
+                for trigger, stats in sorted(
+                    actions.items(), key=lambda item: item[1]["avg_fanout"], reverse=True
+                )[:top]
+            ],
+            "recent_actions": recent_actions[:top],
+        }
+
+    def get_summary(self) -> Dict[str, Any]:
+        """获取供性能摘要使用的简要统计"""
+        stats = self.get_stats(top=5)
+        stats.pop("recent_actions")
+        return stats
+
+    def reset(self) -> None:
+        """重置统计"""
+        with self.lock:
+            self.callbacks.clear()
+            self.actions.clear()
+            self.recent_actions.clear()
+            self.clients.clear()
+            self.counters.clear()
+
+
+# 全局回调性能分析器实例
+callback_profiler = CallbackProfiler(
+    enabled=BaseConfig.callback_profiler_enabled,
+    action_window=BaseConfig.callback_profiler_action_window,
+    recent_actions=BaseConfig.callback_profiler_recent_actions,
+)
+
+
+# 便捷函数
+def get_callback_profile(top: int = 20) -> Dict[str, Any]:
+    """获取回调性能统计"""
+    return callback_profiler.get_stats(top)
@@ -0,0 +1,146 @@
+"""
+缓冲批量落库基类
+
+写入方仅在内存中累积待落库数据，由按需启动的后台线程按时间/数量策略批量落库，
+落库失败时放回缓冲等待下次重试，进程退出时落库剩余数据。
+子类只需实现取出、写入及放回待落库数据的逻辑。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, Any
+from abc import ABC, abstractmethod
+import atexit
+import threading
+import time
+from collections import defaultdict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FlushBuffer(ABC):
+    """缓冲批量落库基类"""
+
+    # 日志中使用的名称
+    name = "缓冲区"
+    # 记录已落库数量的统计项
+    flushed_counter = "flushed"
+
+    def __init__(self, flush_interval: float):
+        """
+        初始化缓冲区
+
+        Args:
+            flush_interval: 定时落库间隔（秒）
+        """
+        self.flush_interval = flush_interval
+
+        self.counters = defaultdict(int)
+        self.flush_thread = None
+        self.flush_active = False
+        self.flush_event = threading.Event()
+
+        # 待落库数据读写锁
+        self.lock = threading.Lock()
+        # 保证同一时刻只有一个落库操作
+        self.flush_lock = threading.Lock()
+
+        # 进程退出时落库剩余数据
+        atexit.register(self.stop)
+
+    def start(self) -> None:
+        """启动后台定时落库线程"""
+        if self.flush_active:
+            return
+
+        self.flush_active = True
+        self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flush_thread.start()
+        logger.info(f"{self.name}落库线程已启动，间隔: {self.flush_interval}秒")
+
+    def ensure_started(self) -> None:
+        """按需启动后台线程，避免在gunicorn fork之前创建线程"""
+        if not self.flush_active:
+            self.start()
+
+    def stop(self) -> None:
+        """停止后台线程并落库剩余数据"""
+        self.flush_active = False
+        self.flush_event.set()
+        if self.flush_thread:
+            self.flush_thread.join(timeout=1.0)
+        self.flush()
+        logger.info(f"{self.name}已停止")
+
+    def _flush_loop(self) -> None:
+        """定时落库循环"""
+        while self.flush_active:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"{self.name}落库循环出错: {e}")
+
+    @abstractmethod
+    def _take_pending(self) -> Any:
+        """取出并清空全部待落库数据，在self.lock内调用，无数据时返回空值"""
+
+    @abstractmethod
+    def _write_pending(self, pending: Any) -> int:
+        """将取出的数据写入数据库，返回落库数量"""
+
+    @abstractmethod
+    def _restore_pending(self, pending: Any) -> None:
+        """落库失败时将取出的数据放回缓冲，在self.lock内调用"""
+
+    def _after_flush(self, pending: Any) -> None:
+        """落库成功后的处理，在flush_lock内调用"""
+
+    def _pending_stats(self) -> Dict[str, Any]:
+        """待落库数据统计，在self.lock内调用"""
+        return {}
+
+    def flush(self) -> int:
+        """
+        将当前缓冲的全部数据批量落库
+
+        Returns:
+            本次落库数量
+        """
+        with self.flush_lock:
+            with self.lock:
+                pending = self._take_pending()
+
+            if not pending:
+                return 0
+
+            start_time = time.time()
+            try:
+                count = self._write_pending(pending)
+            except Exception as e:
+                # 落库失败时放回缓冲，等待下次重试
+                with self.lock:
+                    self._restore_pending(pending)
+                    self.counters["flush_failures"] += 1
+                logger.error(f"{self.name}落库失败，将重试: {e}")
+                return 0
+
+            with self.lock:
+                self.counters["flushes"] += 1
+                self.counters[self.flushed_counter] += count
+            logger.debug(f"{self.name}已落库: {count} 条，耗时 {time.time() - start_time:.3f}秒")
+
+            self._after_flush(pending)
+            return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓冲区统计"""
+        with self.lock:
+            return {
+                **self._pending_stats(),
+                "flush_interval": self.flush_interval,
+                **dict(self.counters),
+            }
@@ -0,0 +1,192 @@
+"""
+用户身份缓存
+
+为flask-login的user_loader提供短时效的用户身份缓存，按(user_id, session_token)索引，
+用户信息变更、删除或会话token轮换时按user_id失效。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import time
+import threading
+from collections import OrderedDict, defaultdict
+import logging
+
+from configs.base_config import BaseConfig
+
+logger = logging.getLogger(__name__)
+
+
+class IdentityCache:
+    """用户身份缓存"""
+
+    def __init__(self, ttl: float = 5.0, max_size: int = 10000):
+        """
+        初始化用户身份缓存
+
+        Args:
+            ttl: 缓存有效期（秒）
+            max_size: 最大缓存条目数
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # (user_id, session_token) -> (过期时间, 用户信息)
+        self.entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # user_id -> 该用户当前缓存的全部key
+        self.user_keys = defaultdict(set)
+        # user_id -> (失效版本号, 失效时间)，按失效时间排序，用于丢弃失效前发起的数据库读取结果
+        # 版本号取自全局递增计数，失效超过有效期的记录被淘汰，淘汰后以已淘汰的最大版本号代替，
+        # 保证失效前获取的版本号不会与之后的版本号相等
+        self.versions: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self.version_counter = 0
+        self.version_floor = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def get(self, user_id: str, session_token: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        获取缓存的用户信息
+
+        Args:
+            user_id: 用户ID
+            session_token: 当前请求携带的会话token
+
+        Returns:
+            用户信息，未命中或已过期时返回None
+        """
+        key = (user_id, session_token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def get_version(self, user_id: str) -> int:
+        """获取用户当前失效版本号，在读取数据库之前调用"""
+        with self.lock:
+            return self._get_version(user_id)
+
+    def set(
+        self,
+        user_id: str,
+        session_token: Optional[str],
+        user_info: Dict[str, Any],
+        version: int = None,
+    ) -> None:
+        """
+        写入缓存
+
+        Args:
+            user_id: 用户ID
+            session_token: 当前请求携带的会话token
+            user_info: 用户信息
+            version: 读取数据库前获取的失效版本号，若期间发生失效则放弃写入
+        """
+        key = (user_id, session_token)
+        with self.lock:
+            if version is not None and self._get_version(user_id) != version:
+                return
+
+            self.entries[key] = (time.monotonic() + self.ttl, user_info)
+            self.entries.move_to_end(key)
+            self.user_keys[user_id].add(key)
+
+            while len(self.entries) > self.max_size:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, user_id: str) -> None:
+        """
+        失效指定用户的全部缓存
+
+        Args:
+            user_id: 用户ID
+        """
+        with self.lock:
+            self.version_counter += 1
+            self.versions[user_id] = (self.version_counter, time.monotonic())
+            self.versions.move_to_end(user_id)
+            self._prune_versions()
+            for key in self.user_keys.pop(user_id, set()):
+                self.entries.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self.lock:
+            # 全部用户的版本号均提升至新的版本号，丢弃清空前发起的全部数据库读取结果
+            self.version_counter += 1
+            self.version_floor = self.version_counter
+            self.versions.clear()
+            self.entries.clear()
+            self.user_keys.clear()
+            self.invalidations += 1
+
+    def _get_version(self, user_id: str) -> int:
+        """获取用户当前失效版本号，调用方需持有锁"""
+        entry = self.versions.get(user_id)
+        return entry[0] if entry is not None else self.version_floor
+
+    def _prune_versions(self) -> None:
+        """淘汰失效超过有效期或超出最大条目数的版本记录，调用方需持有锁"""
+        expire_time = time.monotonic() - self.ttl
+        while self.versions:
+            user_id, (version, invalidated_at) = next(iter(self.versions.items()))
+            if invalidated_at > expire_time and len(self.versions) <= self.max_size:
+                break
+            del self.versions[user_id]
+            # 按失效时间淘汰，被淘汰的版本号依次递增
+            self.version_floor = version
+
+    def _remove(self, key: Tuple[str, Optional[str]]) -> None:
+        """移除单个缓存项，调用方需持有锁"""
+        self.entries.pop(key, None)
+        keys = self.user_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.user_keys[key[0]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "ttl": self.ttl,
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+                "tracked_versions": len(self.versions),
+            }
+
+
+# 全局用户身份缓存实例
+identity_cache = IdentityCache(
+    ttl=BaseConfig.identity_cache_ttl,
+    max_size=BaseConfig.identity_cache_max_size,
+)
+
+
+# 便捷函数
+def invalidate_user_identity(user_id: str) -> None:
+    """失效指定用户的身份缓存"""
+    identity_cache.invalidate(user_id)
+
+
+def get_identity_cache_stats() -> Dict[str, Any]:
+    """获取身份缓存统计"""
+    return identity_cache.get_stats()
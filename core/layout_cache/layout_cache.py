@@ -0,0 +1,195 @@
+"""
+页面骨架缓存
+
+核心页面骨架、聊天页面骨架等布局对同一角色的全部用户完全相同，按(页面, 角色)在进程内构建一次并预先
+转换为Dash组件的JSON结构字典，其中按用户变化的部分以占位组件代替。渲染时仅沿占位组件所在路径复制
+节点并注入当前用户的组件，其余节点与缓存的骨架共享。配置指纹变化时（如话题配置文件更新）重新构建。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, Any, Callable, Hashable, List, Tuple
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+import logging
+
+from dash import html
+from plotly.io.json import to_json_plotly
+
+from configs.base_config import BaseConfig
+from configs.topics_loader import get_topics_loader
+
+logger = logging.getLogger(__name__)
+
+# 占位组件id中的键名
+SLOT_ID_KEY = "layout-cache-slot"
+
+
+def layout_slot(name: str) -> html.Div:
+    """
+    创建骨架中按用户变化部分的占位组件
+
+    Args:
+        name: 占位名称，渲染时按名称注入对应的组件
+    """
+    return html.Div(id={SLOT_ID_KEY: name})
+
+
+def _find_slots(node: Any, path: Tuple = (), found: Dict[str, List[Tuple]] = None) -> Dict[str, List[Tuple]]:
+    """查找组件树字典中全部占位组件的路径"""
+    found = {} if found is None else found
+    if isinstance(node, dict):
+        slot_id = node.get("props", {}).get("id") if isinstance(node.get("props"), dict) else None
+        if isinstance(slot_id, dict) and SLOT_ID_KEY in slot_id:
+            found.setdefault(slot_id[SLOT_ID_KEY], []).append(path)
+            return found
+        for key, value in node.items():
+            if isinstance(value, (dict, list)):
+                _find_slots(value, path + (key,), found)
+    elif isinstance(node, list):
+        for index, value in enumerate(node):
+            if isinstance(value, (dict, list)):
+                _find_slots(value, path + (index,), found)
+    return found
+
+
+def _inject(node: Any, path: Tuple, value: Any) -> Any:
+    """沿路径复制节点并将路径末端替换为value，路径以外的节点与原组件树共享"""
+    if not path:
+        return value
+    copied = list(node) if isinstance(node, list) else dict(node)
+    copied[path[0]] = _inject(node[path[0]], path[1:], value)
+    return copied
+
+
+class _Skeleton:
+    """缓存的页面骨架"""
+
+    __slots__ = ("fingerprint", "tree", "slots", "size", "build_seconds")
+
+    def __init__(self, fingerprint: Hashable, tree: Any, slots: Dict[str, List[Tuple]], size: int, build_seconds: float):
+        self.fingerprint = fingerprint
+        # 组件树的JSON结构字典，渲染时不修改
+        self.tree = tree
+        # 占位名称 -> 占位组件在组件树中的路径
+        self.slots = slots
+        self.size = size
+        self.build_seconds = build_seconds
+
+
+class LayoutCache:
+    """页面骨架缓存"""
+
+    def __init__(self, fingerprint: Callable[[], Hashable] = None, enabled: bool = True):
+        """
+        初始化页面骨架缓存
+
+        Args:
+            fingerprint: 计算配置指纹的函数，指纹变化时重新构建骨架
+            enabled: 是否启用缓存，关闭时每次重新构建骨架
+        """
+        self.fingerprint = fingerprint or (lambda: None)
+        self.enabled = enabled
+
+        self.entries: Dict[Hashable, _Skeleton] = {}
+
+        self.counters = defaultdict(int)
+        self.build_seconds = 0.0
+        self.render_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def render(self, key: Hashable, build: Callable[[], Any], slots: Dict[str, Callable[[], Any]]) -> Any:
+        """
+        渲染页面：获取缓存的骨架并注入当前用户的组件
+
+        Args:
+            key: 骨架缓存键，需覆盖影响骨架的全部因素（如页面、角色）
+            build: 构建骨架的函数，按用户变化的部分以layout_slot(name)占位
+            slots: 占位名称 -> 构建当前用户对应组件的函数
+
+        Returns:
+            注入当前用户组件后的组件树字典
+        """
+        start_time = time.perf_counter()
+        fingerprint = self.fingerprint()
+
+        with self.lock:
+            skeleton = self.entries.get(key) if self.enabled else None
+            if skeleton is not None and skeleton.fingerprint != fingerprint:
+                self.counters["invalidations"] += 1
+                skeleton = None
+
+        if skeleton is None:
+            skeleton = self._build(fingerprint, build)
+            with self.lock:
+                self.counters["misses"] += 1
+                self.build_seconds += skeleton.build_seconds
+                if self.enabled:
+                    self.entries[key] = skeleton
+        else:
+            with self.lock:
+                self.counters["hits"] += 1
+
+        tree = skeleton.tree
+        for name, paths in skeleton.slots.items():
+            value = slots[name]()
+            for path in paths:
+                tree = _inject(tree, path, value)
+
+        with self.lock:
+            self.render_seconds += time.perf_counter() - start_time
+        return tree
+
+    def _build(self, fingerprint: Hashable, build: Callable[[], Any]) -> _Skeleton:
+        """构建骨架并转换为组件树字典"""
+        start_time = time.perf_counter()
+        serialized = to_json_plotly(build())
+        tree = json.loads(serialized)
+        build_seconds = time.perf_counter() - start_time
+        return _Skeleton(fingerprint, tree, _find_slots(tree), len(serialized.encode("utf-8")), build_seconds)
+
+    def clear(self) -> None:
+        """清空缓存，下次渲染时重新构建全部骨架"""
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取页面骨架缓存统计"""
+        with self.lock:
+            renders = self.counters["hits"] + self.counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "skeletons": len(self.entries),
+                "total_bytes": sum(skeleton.size for skeleton in self.entries.values()),
+                "build_ms": round(self.build_seconds * 1000, 3),
+                "avg_render_ms": round(self.render_seconds * 1000 / renders, 3) if renders else 0,
+                **dict(self.counters),
+            }
+
+
+def _config_fingerprint() -> Tuple:
+    """配置指纹：运行中可修改的话题配置文件的修改时间"""
+    try:
+        topics_modified = os.path.getmtime(get_topics_loader().config_path)
+    except OSError:
+        topics_modified = None
+    return BaseConfig.app_version, topics_modified
+
+
+# 全局页面骨架缓存实例
+layout_cache = LayoutCache(fingerprint=_config_fingerprint, enabled=BaseConfig.layout_cache_enabled)
+
+
+# 便捷函数
+def render_cached_layout(key: Hashable, build: Callable[[], Any], slots: Dict[str, Callable[[], Any]]) -> Any:
+    """获取缓存的骨架并注入当前用户的组件"""
+    return layout_cache.render(key, build, slots)
+
+
+def get_layout_cache_stats() -> Dict[str, Any]:
+    """获取页面骨架缓存统计"""
+    return layout_cache.get_stats()
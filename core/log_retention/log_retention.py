@@ -0,0 +1,186 @@
+"""
+登录日志保留期管理
+
+后台定时删除保留期之外的登录日志按月分区，整表删除，耗时与分区内记录数无关。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, Any, Optional
+import os
+import threading
+import time
+from datetime import datetime
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows下不支持多worker部署，直接执行清理
+    fcntl = None
+
+from configs.database_config import DatabaseConfig
+
+logger = logging.getLogger(__name__)
+
+# 项目根目录，清理任务文件锁位于其下的cache目录
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LogRetentionManager:
+    """登录日志保留期管理器"""
+
+    def __init__(
+        self,
+        retention_months: int = 0,
+        check_interval: float = 3600,
+        lock_path: str = "cache/log_retention.lock",
+    ):
+        """
+        初始化保留期管理器
+
+        Args:
+            retention_months: 保留月数（含当前月份），为0时不清理
+            check_interval: 清理任务执行间隔（秒）
+            lock_path: 多个worker进程间选出唯一清理进程的文件锁路径，相对路径基于项目根目录
+        """
+        self.retention_months = retention_months
+        self.check_interval = check_interval
+        self.lock_path = lock_path if os.path.isabs(lock_path) else os.path.join(BASE_DIR, lock_path)
+        self.lock_file = None
+
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_run_at: Optional[datetime] = None
+        self.check_thread = None
+        self.check_active = False
+        self.stop_event = threading.Event()
+
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        """启动后台定时清理线程"""
+        if self.check_active or self.retention_months <= 0:
+            return
+
+        self.check_active = True
+        self.stop_event.clear()
+        self.check_thread = threading.Thread(target=self._check_loop, daemon=True)
+        self.check_thread.start()
+        logger.info(
+            f"登录日志保留期清理任务已启动，保留 {self.retention_months} 个月，间隔: {self.check_interval}秒"
+        )
+
+    def stop(self) -> None:
+        """停止后台清理线程"""
+        self.check_active = False
+        self.stop_event.set()
+        if self.check_thread:
+            self.check_thread.join(timeout=1.0)
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+        logger.info("登录日志保留期清理任务已停止")
+
+    def _acquire_leadership(self) -> bool:
+        """
+        尝试获取清理任务文件锁，同一主机上仅持有锁的worker进程执行清理，
+        持有锁的进程退出后由其他进程在下一个执行间隔接替
+        """
+        if fcntl is None or self.lock_file is not None:
+            return True
+
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self.lock_file = lock_file
+        return True
+
+    def _check_loop(self) -> None:
+        """定时清理循环"""
+        while self.check_active:
+            try:
+                if self._acquire_leadership():
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"登录日志保留期清理出错: {e}")
+            self.stop_event.wait(self.check_interval)
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        执行一次过期分区清理
+
+        Returns:
+            清理结果，未开启保留期清理时不删除任何记录
+        """
+        from models.logs import LoginLogs
+
+        if self.retention_months <= 0:
+            logger.warning("未设置登录日志保留月数（DatabaseConfig.login_logs_retention_months），跳过清理")
+            return {"cutoff_datetime": None, "dropped_partitions": [], "legacy_deleted": 0}
+
+        start_time = time.time()
+        result = LoginLogs.drop_expired_partitions(self.retention_months)
+
+        with self.lock:
+            self.last_result = result
+            self.last_run_at = datetime.now()
+
+        if result["dropped_partitions"] or result["legacy_deleted"]:
+            logger.info(
+                f"登录日志过期清理完成: 删除分区 {result['dropped_partitions']}，"
+                f"原始表删除 {result['legacy_deleted']} 条，耗时 {time.time() - start_time:.3f}秒"
+            )
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取清理任务统计"""
+        with self.lock:
+            return {
+                "retention_months": self.retention_months,
+                "check_interval": self.check_interval,
+                "active": self.check_active,
+                "leader": self.lock_file is not None,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "last_result": (
+                    {
+                        **self.last_result,
+                        "cutoff_datetime": self.last_result["cutoff_datetime"].isoformat(),
+                    }
+                    if self.last_result
+                    else None
+                ),
+            }
+
+
+# 全局登录日志保留期管理器实例
+log_retention_manager = LogRetentionManager(
+    retention_months=DatabaseConfig.login_logs_retention_months,
+    check_interval=DatabaseConfig.login_logs_retention_check_interval,
+)
+
+
+# 便捷函数
+def start_log_retention() -> None:
+    """启动登录日志保留期清理任务"""
+    log_retention_manager.start()
+
+
+def purge_expired_login_logs() -> Dict[str, Any]:
+    """立即执行一次过期分区清理"""
+    return log_retention_manager.run_once()
+
+
+def get_log_retention_stats() -> Dict[str, Any]:
+    """获取清理任务统计"""
+    return log_retention_manager.get_stats()
+
+
+if __name__ == "__main__":
+    # 手动执行一次过期清理，可配合系统定时任务使用
+    # 命令：python -m core.log_retention.log_retention
+    print(purge_expired_login_logs())
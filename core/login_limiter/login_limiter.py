@@ -0,0 +1,119 @@
+"""
+登录尝试频率限制模块
+
+按来源IP及用户名统计滑动时间窗口内的失败登录次数，超出阈值后直接拒绝后续尝试，
+避免恶意重试消耗密码校验的CPU资源。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, Any, Optional
+import threading
+import time
+from collections import defaultdict, deque
+import logging
+
+from configs import BaseConfig
+
+logger = logging.getLogger(__name__)
+
+
+class LoginAttemptLimiter:
+    """登录失败次数限制器"""
+
+    def __init__(
+        self,
+        window: float = 300,
+        max_failures_per_ip: int = 20,
+        max_failures_per_username: int = 5,
+        max_keys: int = 100000,
+    ):
+        """
+        初始化登录失败次数限制器
+
+        Args:
+            window: 统计时间窗口（秒）
+            max_failures_per_ip: 时间窗口内单个IP允许的最大失败次数
+            max_failures_per_username: 时间窗口内单个用户名允许的最大失败次数
+            max_keys: 记录的IP及用户名数量上限，超出后清理过期记录
+        """
+        self.window = window
+        self.max_failures = {
+            "ip": max_failures_per_ip,
+            "username": max_failures_per_username,
+        }
+        self.max_keys = max_keys
+
+        # (类型, 值) -> 失败时间戳队列
+        self.failures: Dict[tuple, deque] = {}
+
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def _prune(self, key: tuple, now: float) -> Optional[deque]:
+        """清理指定记录中的过期时间戳"""
+        timestamps = self.failures.get(key)
+        if timestamps is None:
+            return None
+
+        while timestamps and timestamps[0] <= now - self.window:
+            timestamps.popleft()
+        if not timestamps:
+            del self.failures[key]
+            return None
+        return timestamps
+
+    def check(self, ip: str, username: str) -> Optional[float]:
+        """
+        检查本次登录尝试是否被限制
+
+        Args:
+            ip: 来源IP
+            username: 用户名
+
+        Returns:
+            被限制时返回需等待的秒数，否则返回None
+        """
+        now = time.monotonic()
+        with self.lock:
+            for key in (("ip", ip), ("username", username)):
+                timestamps = self._prune(key, now)
+                if timestamps and len(timestamps) >= self.max_failures[key[0]]:
+                    self.counters[f"blocked_by_{key[0]}"] += 1
+                    return timestamps[0] + self.window - now
+        return None
+
+    def record_failure(self, ip: str, username: str) -> None:
+        """记录一次失败的登录尝试"""
+        now = time.monotonic()
+        with self.lock:
+            if len(self.failures) >= self.max_keys:
+                for key in list(self.failures):
+                    self._prune(key, now)
+
+            for key in (("ip", ip), ("username", username)):
+                self.failures.setdefault(key, deque()).append(now)
+            self.counters["failures"] += 1
+
+    def record_success(self, username: str) -> None:
+        """登录成功后清除该用户名的失败记录"""
+        with self.lock:
+            self.failures.pop(("username", username), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限制器统计"""
+        with self.lock:
+            return {
+                "window": self.window,
+                "tracked_keys": len(self.failures),
+                **dict(self.counters),
+            }
+
+
+# 全局登录失败次数限制器实例
+login_attempt_limiter = LoginAttemptLimiter(
+    window=BaseConfig.login_attempt_window,
+    max_failures_per_ip=BaseConfig.login_attempt_max_failures_per_ip,
+    max_failures_per_username=BaseConfig.login_attempt_max_failures_per_username,
+)
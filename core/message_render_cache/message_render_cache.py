@@ -0,0 +1,179 @@
+"""
+聊天消息渲染缓存
+
+缓存单条聊天消息渲染得到的组件树（已转换为Dash组件的JSON结构字典），按
+(消息角色, 消息id, 内容哈希, 流式状态, 时间戳)索引，全量刷新聊天历史时内容未变化的消息无需重新构建组件树。
+按序列化后的字节数计量缓存占用，超出上限时淘汰最久未使用的条目，并统计每次聊天历史刷新节省的渲染耗时。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, Any, Callable, Hashable
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+import logging
+
+from plotly.io.json import to_json_plotly
+
+from configs.base_config import BaseConfig
+
+logger = logging.getLogger(__name__)
+
+
+class _RenderEntry:
+    """单条消息的渲染结果"""
+
+    __slots__ = ("value", "size", "build_seconds")
+
+    def __init__(self, value: Dict[str, Any], size: int, build_seconds: float):
+        # 组件树的JSON结构字典，返回给回调后不应修改
+        self.value = value
+        # 序列化后的字节数
+        self.size = size
+        # 构建组件树及转换为字典的耗时，命中时计为节省的耗时
+        self.build_seconds = build_seconds
+
+
+class MessageRenderCache:
+    """聊天消息渲染缓存"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, enabled: bool = True):
+        """
+        初始化渲染缓存
+
+        Args:
+            max_bytes: 缓存的渲染结果序列化后的总字节数上限
+            enabled: 是否启用缓存，关闭时每次直接构建组件
+        """
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self.entries: "OrderedDict[Hashable, _RenderEntry]" = OrderedDict()
+        self.total_bytes = 0
+
+        self.counters = defaultdict(int)
+        self.saved_seconds = 0.0
+        self.build_seconds = 0.0
+        # 最近一次聊天历史刷新的统计
+        self.last_refresh: Dict[str, Any] = {}
+
+        # 当前线程正在进行的聊天历史刷新统计
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """
+        获取缓存的渲染结果，未命中时调用build构建组件并缓存
+
+        Args:
+            key: 缓存键，需覆盖影响渲染结果的全部消息字段
+            build: 构建组件的函数
+
+        Returns:
+            组件树的JSON结构字典，未启用缓存时直接返回构建的组件
+        """
+        refresh = getattr(self.local, "refresh", None)
+
+        if not self.enabled:
+            return build()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+                self.saved_seconds += entry.build_seconds
+                if refresh is not None:
+                    refresh["hits"] += 1
+                    refresh["saved_seconds"] += entry.build_seconds
+                return entry.value
+
+        start_time = time.perf_counter()
+        serialized = to_json_plotly(build())
+        value = json.loads(serialized)
+        build_seconds = time.perf_counter() - start_time
+        size = len(serialized.encode("utf-8"))
+
+        with self.lock:
+            self.counters["misses"] += 1
+            self.build_seconds += build_seconds
+            if refresh is not None:
+                refresh["misses"] += 1
+
+            # 单条超过上限的渲染结果不缓存
+            if size <= self.max_bytes:
+                previous = self.entries.pop(key, None)
+                if previous is not None:
+                    self.total_bytes -= previous.size
+                self.entries[key] = _RenderEntry(value, size, build_seconds)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.total_bytes -= evicted.size
+                    self.counters["evictions"] += 1
+
+        return value
+
+    @contextmanager
+    def refresh(self, name: str = "history"):
+        """统计一次聊天历史刷新中的缓存命中及节省的渲染耗时"""
+        stats = {"hits": 0, "misses": 0, "saved_seconds": 0.0}
+        self.local.refresh = stats
+        start_time = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            self.local.refresh = None
+            summary = {
+                "name": name,
+                "messages": stats["hits"] + stats["misses"],
+                "hits": stats["hits"],
+                "misses": stats["misses"],
+                "saved_ms": round(stats["saved_seconds"] * 1000, 3),
+                "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 3),
+            }
+            with self.lock:
+                self.counters["refreshes"] += 1
+                self.last_refresh = summary
+            logger.debug(f"聊天历史刷新渲染统计: {summary}")
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取渲染缓存统计"""
+        with self.lock:
+            refreshes = self.counters["refreshes"]
+            return {
+                "enabled": self.enabled,
+                "entries": len(self.entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "saved_ms": round(self.saved_seconds * 1000, 3),
+                "build_ms": round(self.build_seconds * 1000, 3),
+                "avg_saved_ms_per_refresh": (
+                    round(self.saved_seconds * 1000 / refreshes, 3) if refreshes else 0
+                ),
+                "last_refresh": dict(self.last_refresh),
+                **dict(self.counters),
+            }
+
+
+# 全局聊天消息渲染缓存实例
+message_render_cache = MessageRenderCache(
+    max_bytes=BaseConfig.message_render_cache_max_bytes,
+    enabled=BaseConfig.message_render_cache_enabled,
+)
+
+
+# 便捷函数
+def get_message_render_cache_stats() -> Dict[str, Any]:
+    """获取渲染缓存统计"""
+    return message_render_cache.get_stats()
@@ -0,0 +1,560 @@
+"""
+服务端聊天消息存储
+
+在服务端按存储键保存聊天页面的完整消息列表，浏览器端的ai-chat-x-messages-store仅保存
+由存储键、版本号、消息数及本次变更组成的令牌，各聊天回调的请求与响应不再往返完整历史消息。
+消息保存在进程内存中（按最久未使用淘汰），每次变更同时以追加日志的形式写入磁盘目录，
+内存淘汰或多进程部署时，任一进程均可按令牌从磁盘日志恢复对应版本的消息；
+写入变更前持有存储键的跨进程文件锁并重放其他进程追加的变更，保证各进程分配的版本号唯一。
+各版本的消息列表为分块存储的不可变列表，变更时仅复制受影响的分块，未变更的分块在各版本之间共享，
+单轮对话的处理开销不随历史消息数增长。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+from contextlib import contextmanager, nullcontext
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from collections.abc import Sequence
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows下不支持多worker部署，不加跨进程锁
+    fcntl = None
+
+from configs.base_config import BaseConfig
+
+logger = logging.getLogger(__name__)
+
+# 项目根目录，相对路径的存储目录以此为基准
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 存储键格式，同时防止以存储键拼接磁盘路径时越出存储目录
+KEY_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class MessageList(Sequence):
+    """
+    不可变的消息列表
+
+    按固定大小分块存储，追加、替换、删除消息时仅复制受影响的分块及分块索引并返回新列表，
+    未变更的分块及消息字典在新旧列表之间共享。除末尾分块外各分块均为满块，按下标访问为O(1)。
+    """
+
+    __slots__ = ("_chunks", "_length")
+
+    # 每个分块的消息数
+    CHUNK_SIZE = 32
+
+    def __init__(self, messages: Iterable[Dict] = ()):
+        messages = list(messages)
+        self._chunks = self._split(messages)
+        self._length = len(messages)
+
+    @classmethod
+    def _split(cls, messages: List[Dict]) -> List[tuple]:
+        """将消息切分为分块"""
+        return [
+            tuple(messages[i : i + cls.CHUNK_SIZE])
+            for i in range(0, len(messages), cls.CHUNK_SIZE)
+        ]
+
+    @classmethod
+    def _from_chunks(cls, chunks: List[tuple], length: int) -> "MessageList":
+        """由分块直接构建，不复制消息"""
+        instance = cls.__new__(cls)
+        instance._chunks = chunks
+        instance._length = length
+        return instance
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("消息下标越界")
+        chunk_index, offset = divmod(index, self.CHUNK_SIZE)
+        return self._chunks[chunk_index][offset]
+
+    def __iter__(self) -> Iterator[Dict]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __reversed__(self) -> Iterator[Dict]:
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def __repr__(self) -> str:
+        return f"MessageList({list(self)!r})"
+
+    def find(self, message_id: str) -> int:
+        """从末尾开始按消息id查找下标，不存在时返回-1；最近的消息最先被找到"""
+        index = self._length
+        for message in reversed(self):
+            index -= 1
+            if message.get("id") == message_id:
+                return index
+        return -1
+
+    def appended(self, *messages: Dict) -> "MessageList":
+        """返回在末尾追加消息后的新列表"""
+        if not messages:
+            return self
+        chunks = list(self._chunks)
+        pending = list(messages)
+        if chunks and len(chunks[-1]) < self.CHUNK_SIZE:
+            room = self.CHUNK_SIZE - len(chunks[-1])
+            chunks[-1] = chunks[-1] + tuple(pending[:room])
+            pending = pending[room:]
+        chunks.extend(self._split(pending))
+        return self._from_chunks(chunks, self._length + len(messages))
+
+    def replaced(self, index: int, message: Dict) -> "MessageList":
+        """返回替换指定下标消息后的新列表"""
+        chunk_index, offset = divmod(index, self.CHUNK_SIZE)
+        chunk = self._chunks[chunk_index]
+        chunks = list(self._chunks)
+        chunks[chunk_index] = chunk[:offset] + (message,) + chunk[offset + 1 :]
+        return self._from_chunks(chunks, self._length)
+
+    def deleted(self, index: int) -> "MessageList":
+        """返回删除指定下标消息后的新列表，仅重建被删除消息所在分块及其后的分块"""
+        chunk_index, offset = divmod(index, self.CHUNK_SIZE)
+        rest = [message for chunk in self._chunks[chunk_index:] for message in chunk]
+        del rest[offset]
+        return self._from_chunks(
+            self._chunks[:chunk_index] + self._split(rest), self._length - 1
+        )
+
+
+class _StoreEntry:
+    """单个存储键的最近若干版本消息"""
+
+    __slots__ = ("versions", "records", "latest", "log_lines", "log_inode", "log_offset")
+
+    def __init__(self):
+        # 版本号 -> 消息列表，各版本之间共享未变更的分块及消息字典
+        self.versions: "OrderedDict[int, MessageList]" = OrderedDict()
+        # 版本号 -> 生成该版本的变更记录，用于按变更增量更新聊天历史显示
+        self.records: Dict[int, Dict] = {}
+        self.latest = 0
+        # 磁盘日志行数，用于判断是否需要压缩
+        self.log_lines = 0
+        # 已重放的磁盘日志文件及读取位置，用于增量读取其他进程追加的变更
+        self.log_inode = None
+        self.log_offset = 0
+
+
+class MessageStore:
+    """服务端聊天消息存储"""
+
+    def __init__(
+        self,
+        store_dir: str,
+        max_sessions: int = 500,
+        max_versions: int = 8,
+        ttl: float = 7 * 24 * 3600,
+        compact_threshold: int = 64,
+    ):
+        """
+        初始化消息存储
+
+        Args:
+            store_dir: 磁盘日志目录，多进程部署时各进程需共享该目录
+            max_sessions: 内存中保留的存储键数上限，超出后淘汰最久未使用的存储键
+            max_versions: 每个存储键在内存中保留的历史版本数，
+                同一次交互触发的多个回调基于同一版本并发更新时，各自基于该版本计算结果
+            ttl: 磁盘日志保留时间（秒），超过该时间未更新的日志将被清理
+            compact_threshold: 磁盘日志行数超过该值时压缩为最新版本的快照
+        """
+        self.store_dir = store_dir if os.path.isabs(store_dir) else os.path.join(BASE_DIR, store_dir)
+        self.max_sessions = max_sessions
+        self.max_versions = max_versions
+        self.ttl = ttl
+        self.compact_threshold = compact_threshold
+
+        self.entries: "OrderedDict[str, _StoreEntry]" = OrderedDict()
+        self.counters = defaultdict(int)
+        self.last_cleanup = 0.0
+
+        # 保护entries及磁盘日志写入
+        self.lock = threading.RLock()
+
+    def _log_path(self, key: str) -> str:
+        """获取存储键对应的磁盘日志路径"""
+        return os.path.join(self.store_dir, f"{key}.jsonl")
+
+    @staticmethod
+    def _apply_op(messages: MessageList, record: Dict) -> MessageList:
+        """将一条变更应用到消息列表上，返回新的消息列表，不修改原列表"""
+        op = record["op"]
+        if op == "reset":
+            return MessageList(record["messages"])
+        if op == "append":
+            return messages.appended(*record["messages"])
+        if op == "replace":
+            index = messages.find(record["message"].get("id"))
+            return messages.replaced(index, record["message"]) if index >= 0 else messages
+        if op == "delete":
+            index = messages.find(record["id"])
+            return messages.deleted(index) if index >= 0 else messages
+        raise ValueError(f"未知的消息变更类型: {op}")
+
+    def _add_version(self, entry: _StoreEntry, version: int, messages: MessageList, record: Dict) -> None:
+        """记录新版本，并淘汰超出保留数的旧版本"""
+        entry.versions[version] = messages
+        entry.records[version] = record
+        entry.latest = max(entry.latest, version)
+        while len(entry.versions) > self.max_versions:
+            oldest, _ = entry.versions.popitem(last=False)
+            entry.records.pop(oldest, None)
+
+    def _remember(self, key: str, entry: _StoreEntry) -> None:
+        """将存储键放入内存，并淘汰最久未使用的存储键"""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_sessions:
+            self.entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _replay(self, entry: _StoreEntry, data: bytes) -> None:
+        """将磁盘日志内容依次重放到存储键上"""
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 进程异常退出时可能残留不完整的末行
+                continue
+            base = entry.versions.get(record.get("base"))
+            if base is None:
+                base = entry.versions.get(entry.latest, MessageList())
+            self._add_version(entry, record["v"], self._apply_op(base, record), record)
+        entry.log_lines += len(lines)
+
+    def _load_entry(self, key: str) -> Optional[_StoreEntry]:
+        """从磁盘日志重放恢复存储键的最近若干版本"""
+        try:
+            with open(self._log_path(key), "rb") as f:
+                data = f.read()
+                inode = os.fstat(f.fileno()).st_ino
+        except FileNotFoundError:
+            return None
+
+        entry = _StoreEntry()
+        self._replay(entry, data)
+        entry.log_inode = inode
+        entry.log_offset = len(data)
+
+        self.counters["disk_loads"] += 1
+        return entry if entry.versions else None
+
+    def _sync_entry(self, key: str, entry: _StoreEntry) -> _StoreEntry:
+        """
+        重放其他进程在本进程上次读写之后追加的变更，需在存储键的跨进程锁内调用
+
+        Returns:
+            最新的存储键，日志已被其他进程压缩替换时为重新加载的存储键
+        """
+        path = self._log_path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return entry
+
+        if stat.st_ino == entry.log_inode and stat.st_size == entry.log_offset:
+            return entry
+
+        if stat.st_ino != entry.log_inode or stat.st_size < entry.log_offset:
+            loaded = self._load_entry(key)
+            if loaded is None:
+                return entry
+            self._remember(key, loaded)
+            return loaded
+
+        with open(path, "rb") as f:
+            f.seek(entry.log_offset)
+            data = f.read()
+        self._replay(entry, data)
+        entry.log_offset += len(data)
+        self.counters["disk_syncs"] += 1
+        return entry
+
+    def _get_entry(self, key: str, version: int) -> Optional[_StoreEntry]:
+        """获取包含指定版本的存储键，内存中没有该版本时（被淘汰或由其他进程更新）从磁盘恢复"""
+        entry = self.entries.get(key)
+        if entry is not None and version in entry.versions:
+            self.entries.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return entry
+
+        loaded = self._load_entry(key)
+        if loaded is None:
+            return entry
+        self._remember(key, loaded)
+        return loaded
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        """存储键的跨进程排他锁，持有期间其他进程不会追加或压缩该存储键的磁盘日志"""
+        lock_file = None
+        if fcntl is not None:
+            path = f"{self._log_path(key)}.lock"
+            try:
+                os.makedirs(self.store_dir, exist_ok=True)
+                lock_file = open(path, "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # 更新修改时间，避免使用中的锁文件被过期清理
+                os.utime(path)
+            except OSError as e:
+                self.counters["lock_failures"] += 1
+                logger.error(f"聊天消息存储加锁失败: {key}, {e}")
+        try:
+            yield
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+
+    def _write_log(self, key: str, entry: _StoreEntry, record: Dict) -> None:
+        """
+        追加写入变更日志，需在存储键的跨进程锁内调用
+
+        日志过长时压缩为内存中保留的各版本：基础版本仍保留的变更原样写入，其余版本写为快照，
+        其他进程持有的令牌在压缩后仍可恢复对应版本
+        """
+        path = self._log_path(key)
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            if entry.log_lines + 1 > self.compact_threshold:
+                lines = []
+                for version, messages in entry.versions.items():
+                    kept = entry.records[version]
+                    if kept["op"] == "reset" or kept.get("base") not in entry.versions:
+                        kept = {"v": version, "base": None, "op": "reset", "messages": list(messages)}
+                    lines.append(json.dumps(kept, ensure_ascii=False) + "\n")
+                data = "".join(lines).encode("utf-8")
+
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                entry.log_inode = os.stat(path).st_ino
+                entry.log_offset = len(data)
+                entry.log_lines = len(lines)
+                self.counters["compactions"] += 1
+            else:
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                with open(path, "ab") as f:
+                    f.write(line)
+                    entry.log_inode = os.fstat(f.fileno()).st_ino
+                    entry.log_offset = f.tell()
+                entry.log_lines += 1
+                self.counters["bytes_written"] += len(line)
+        except Exception as e:
+            # 写入失败时仍可从内存读取，仅影响淘汰后或其他进程的恢复
+            self.counters["write_failures"] += 1
+            logger.error(f"聊天消息存储写入磁盘失败: {key}, {e}")
+
+    def _cleanup_expired(self) -> None:
+        """清理超过保留时间未更新的磁盘日志，每小时最多执行一次"""
+        now = time.time()
+        if now - self.last_cleanup < 3600:
+            return
+        self.last_cleanup = now
+
+        try:
+            names = os.listdir(self.store_dir)
+        except FileNotFoundError:
+            return
+
+        for name in names:
+            path = os.path.join(self.store_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+                    self.counters["expired"] += 1
+            except OSError:
+                pass
+
+    def _make_token(self, key: str, version: int, messages: MessageList, delta: Dict) -> Dict[str, Any]:
+        """构建返回给浏览器端的令牌"""
+        return {"key": key, "version": version, "count": len(messages), "delta": delta}
+
+    def _commit(self, token: Optional[Dict], record: Dict) -> Dict[str, Any]:
+        """基于令牌对应的版本应用一条变更，生成新版本并返回新令牌"""
+        with self.lock:
+            if token and KEY_PATTERN.match(str(token.get("key"))):
+                key, base_version = token["key"], token.get("version")
+                key_lock = self._key_lock(key)
+            else:
+                key, base_version = uuid.uuid4().hex, None
+                # 新建的存储键尚未返回给任何进程，无需加锁
+                key_lock = nullcontext()
+                self._cleanup_expired()
+
+            with key_lock:
+                return self._commit_locked(key, token, base_version, record)
+
+    def _commit_locked(
+        self, key: str, token: Optional[Dict], base_version: Optional[int], record: Dict
+    ) -> Dict[str, Any]:
+        """在存储键的跨进程锁内基于最新日志分配版本号，应用变更并写入日志"""
+        entry = self._get_entry(key, base_version) if token else None
+        if entry is not None:
+            # 其他进程可能已基于同一版本写入新版本，分配版本号前先重放
+            entry = self._sync_entry(key, entry)
+        else:
+            entry = _StoreEntry()
+            self._remember(key, entry)
+            if token:
+                self.counters["misses"] += 1
+                logger.warning(f"聊天消息存储中不存在该存储键，将从空消息列表开始: {key}")
+
+        base = entry.versions.get(base_version)
+        if base is None:
+            if base_version is not None and entry.versions:
+                self.counters["version_conflicts"] += 1
+            base = entry.versions.get(entry.latest, MessageList())
+
+        messages = self._apply_op(base, record)
+        version = entry.latest + 1
+        record = {"v": version, "base": base_version, **record}
+        self._add_version(entry, version, messages, record)
+
+        self._write_log(key, entry, record)
+        self.counters["updates"] += 1
+
+        # 全量重置的消息列表不随令牌返回
+        delta = {"op": "reset"} if record["op"] == "reset" else {
+            k: v for k, v in record.items() if k not in ("v", "base")
+        }
+        return self._make_token(key, version, messages, delta)
+
+    def create(self, messages: List[Dict] = None) -> Dict[str, Any]:
+        """以给定消息列表新建存储键，用于切换或新建会话"""
+        with self.lock:
+            self.counters["creates"] += 1
+        return self._commit(None, {"op": "reset", "messages": list(messages or [])})
+
+    def get(self, token: Optional[Dict]) -> MessageList:
+        """
+        获取令牌对应版本的消息列表
+
+        返回的列表不可变，其中的消息字典与存储共享，不应修改，变更消息请使用append()/replace()/delete()
+        """
+        if not token or not KEY_PATTERN.match(str(token.get("key"))):
+            return MessageList()
+
+        with self.lock:
+            entry = self._get_entry(token["key"], token.get("version"))
+            if entry is None:
+                self.counters["misses"] += 1
+                return MessageList()
+            messages = entry.versions.get(token.get("version"))
+            if messages is None:
+                self.counters["version_conflicts"] += 1
+                messages = entry.versions[entry.latest]
+            return messages
+
+    def get_changes(self, token: Optional[Dict], since_version: int) -> Optional[List[tuple]]:
+        """
+        获取从since_version到令牌版本之间依次应用的变更
+
+        Returns:
+            [(变更前的消息列表, 变更记录)]，各版本不是依次基于前一版本生成（如并发更新）或已被淘汰时返回None
+        """
+        if not token or not KEY_PATTERN.match(str(token.get("key"))):
+            return None
+
+        version = token.get("version")
+        with self.lock:
+            entry = self._get_entry(token["key"], version)
+            if entry is None:
+                return None
+
+            changes = []
+            while version != since_version:
+                record = entry.records.get(version)
+                base = entry.versions.get(record.get("base")) if record else None
+                if base is None or record["op"] == "reset":
+                    return None
+                changes.append((base, record))
+                version = record["base"]
+            return changes[::-1]
+
+    def append(self, token: Optional[Dict], *messages: Dict) -> Dict[str, Any]:
+        """在末尾追加消息"""
+        return self._commit(token, {"op": "append", "messages": list(messages)})
+
+    def replace(self, token: Optional[Dict], message: Dict) -> Dict[str, Any]:
+        """按消息id替换消息"""
+        return self._commit(token, {"op": "replace", "message": message})
+
+    def delete(self, token: Optional[Dict], message_id: str) -> Dict[str, Any]:
+        """按消息id删除消息"""
+        return self._commit(token, {"op": "delete", "id": message_id})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取消息存储统计"""
+        with self.lock:
+            return {
+                "sessions_in_memory": len(self.entries),
+                "max_sessions": self.max_sessions,
+                **dict(self.counters),
+            }
+
+
+# 全局聊天消息存储实例
+message_store = MessageStore(
+    store_dir=BaseConfig.message_store_dir,
+    max_sessions=BaseConfig.message_store_max_sessions,
+    ttl=BaseConfig.message_store_ttl,
+)
+
+
+# 便捷函数
+def create_messages(messages: List[Dict] = None) -> Dict[str, Any]:
+    """以给定消息列表新建存储键，返回令牌"""
+    return message_store.create(messages)
+
+
+def get_messages(token: Optional[Dict]) -> MessageList:
+    """获取令牌对应版本的消息列表"""
+    return message_store.get(token)
+
+
+def get_message_changes(token: Optional[Dict], since_version: int) -> Optional[List[tuple]]:
+    """获取从since_version到令牌版本之间依次应用的变更"""
+    return message_store.get_changes(token, since_version)
+
+
+def append_messages(token: Optional[Dict], *messages: Dict) -> Dict[str, Any]:
+    """在末尾追加消息，返回新令牌"""
+    return message_store.append(token, *messages)
+
+
+def replace_message(token: Optional[Dict], message: Dict) -> Dict[str, Any]:
+    """按消息id替换消息，返回新令牌"""
+    return message_store.replace(token, message)
+
+
+def delete_message(token: Optional[Dict], message_id: str) -> Dict[str, Any]:
+    """按消息id删除消息，返回新令牌"""
+    return message_store.delete(token, message_id)
+
+
+def get_message_store_stats() -> Dict[str, Any]:
+    """获取消息存储统计"""
+    return message_store.get_stats()
@@ -0,0 +1,181 @@
+"""
+密码校验进程池模块
+
+将CPU密集的密码散列校验放到有界进程池中执行，避免登录高峰期占满处理聊天等请求的工作线程，
+并统计散列耗时及排队耗时。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, Any, Tuple
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import logging
+
+from werkzeug.security import check_password_hash
+
+from configs import BaseConfig
+from core.query_monitor.query_monitor import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordVerifierBusyError(Exception):
+    """待处理的校验任务达到上限时抛出"""
+
+
+def _check_password_hash(password_hash: str, password: str) -> Tuple[bool, float, float]:
+    """在子进程中执行的密码校验，返回(校验结果, 开始时间, 散列耗时)"""
+    start_time = time.time()
+    result = check_password_hash(password_hash, password)
+    return result, start_time, time.time() - start_time
+
+
+class PasswordVerifier:
+    """密码校验进程池"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 32, timeout: float = 10):
+        """
+        初始化密码校验进程池
+
+        Args:
+            max_workers: 进程数，为0时在当前线程中直接校验
+            max_pending: 同时处理及排队的校验任务上限，超出后直接拒绝
+            timeout: 单次校验等待结果的超时时间（秒）
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+
+        self.executor = None
+        self.pending = threading.BoundedSemaphore(max_pending)
+
+        # 散列耗时及排队耗时，单位：毫秒
+        self.hash_histogram = LatencyHistogram()
+        self.queue_histogram = LatencyHistogram()
+        self.rejected = 0
+        self.timeouts = 0
+        self.broken_pools = 0
+
+        self.lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """按需创建进程池，避免在gunicorn fork之前创建子进程"""
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    logger.info(f"密码校验进程池已启动，进程数: {self.max_workers}")
+        return self.executor
+
+    def _reset_executor(self, broken_executor: ProcessPoolExecutor) -> None:
+        """丢弃已损坏的进程池（如子进程被OOM终止），下次校验时重新创建"""
+        with self.lock:
+            if self.executor is broken_executor:
+                self.executor = None
+            self.broken_pools += 1
+        broken_executor.shutdown(wait=False)
+        logger.warning("密码校验进程池已损坏，将重新创建")
+
+    def _submit(self, executor: ProcessPoolExecutor, password_hash: str, password: str) -> Future:
+        """
+        提交校验任务，任务结束时才释放待处理名额，
+        超时后无法取消的运行中任务在实际结束前仍占用名额，使max_pending真正限制进程池负载
+        """
+        try:
+            future = executor.submit(_check_password_hash, password_hash, password)
+        except BaseException:
+            self.pending.release()
+            raise
+        future.add_done_callback(lambda _: self.pending.release())
+        return future
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """
+        校验密码
+
+        Args:
+            password_hash: 已查询到的用户密码散列值
+            password: 待校验的明文密码
+
+        Returns:
+            密码是否正确
+
+        Raises:
+            PasswordVerifierBusyError: 待处理的校验任务达到上限、校验超时或进程池重建后仍无法校验
+        """
+        if self.max_workers <= 0:
+            result, _, hash_seconds = _check_password_hash(password_hash, password)
+            with self.lock:
+                self.hash_histogram.observe(hash_seconds * 1000)
+            return result
+
+        # 进程池损坏时重建并重试一次
+        for attempt in range(2):
+            executor = self._get_executor()
+            if not self.pending.acquire(blocking=False):
+                with self.lock:
+                    self.rejected += 1
+                raise PasswordVerifierBusyError("密码校验任务过多")
+
+            submit_time = time.time()
+            try:
+                future = self._submit(executor, password_hash, password)
+                result, start_time, hash_seconds = future.result(timeout=self.timeout)
+                break
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+                if attempt:
+                    raise PasswordVerifierBusyError("密码校验进程池异常")
+            except FutureTimeoutError:
+                future.cancel()
+                with self.lock:
+                    self.timeouts += 1
+                raise PasswordVerifierBusyError("密码校验超时")
+
+        with self.lock:
+            self.hash_histogram.observe(hash_seconds * 1000)
+            self.queue_histogram.observe(max(start_time - submit_time, 0) * 1000)
+        return result
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取校验统计"""
+        with self.lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "hash": self.hash_histogram.to_dict(),
+                "queue": self.queue_histogram.to_dict(),
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "broken_pools": self.broken_pools,
+            }
+
+
+# 全局密码校验进程池实例
+password_verifier = PasswordVerifier(
+    max_workers=BaseConfig.password_verify_workers,
+    max_pending=BaseConfig.password_verify_max_pending,
+    timeout=BaseConfig.password_verify_timeout,
+)
+
+
+# 便捷函数
+def verify_password(password_hash: str, password: str) -> bool:
+    """在进程池中校验密码"""
+    return password_verifier.verify(password_hash, password)
+
+
+def get_password_verifier_stats() -> Dict[str, Any]:
+    """获取校验统计"""
+    return password_verifier.get_stats()
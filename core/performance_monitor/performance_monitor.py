@@ -8,7 +8,7 @@
 版本: 1.0.0
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 import time
 import psutil
 import threading
@@ -42,6 +42,8 @@ class PerformanceMonitor:
         self.counters = defaultdict(int)
         self.timers = {}
         self.system_metrics = {}
+        # 外部指标采集器，名称 -> 返回指标字典的函数
+        self.collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
         self.monitoring_active = False
         self.monitor_thread = None
         self.lock = threading.Lock()
@@ -100,6 +102,26 @@ class PerformanceMonitor:
         except Exception as e:
             logger.error(f"收集系统指标失败: {e}")
     
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        """
+        注册外部指标采集器，其结果会并入性能摘要
+        
+        Args:
+            name: 采集器名称
+            collector: 返回指标字典的函数
+        """
+        self.collectors[name] = collector
+    
+    def get_collector_metrics(self) -> Dict[str, Any]:
+        """获取全部外部采集器的指标"""
+        results = {}
+        for name, collector in list(self.collectors.items()):
+            try:
+                results[name] = collector()
+            except Exception as e:
+                logger.error(f"采集器 {name} 获取指标失败: {e}")
+        return results
+    
     def record_response_time(self, operation: str, duration: float, metadata: Dict[str, Any] = None) -> None:
         """
         记录响应时间
@@ -335,8 +357,10 @@ class PerformanceMonitor:
                     'error_types': dict(error_types),
                     'severity_counts': dict(severity_counts)
                 }
-            
-            return summary
+        
+        # 外部采集器在锁外调用，避免与采集器自身的锁嵌套
+        summary['collectors'] = self.get_collector_metrics()
+        return summary
     
     def get_system_metrics(self) -> Dict[str, Any]:
         """获取系统指标"""
@@ -369,7 +393,8 @@ class PerformanceMonitor:
                 'timestamp': datetime.now().isoformat(),
                 'metrics': {k: list(v) for k, v in self.metrics.items()},
                 'counters': dict(self.counters),
-                'system_metrics': self.system_metrics
+                'system_metrics': self.system_metrics,
+                'collectors': self.get_collector_metrics()
             }
             
             with open(filepath, 'w', encoding='utf-8') as f:
@@ -438,6 +463,16 @@ def get_performance_summary(hours: int = 1) -> Dict[str, Any]:
     return performance_monitor.get_performance_summary(hours)
 
 
+def register_collector(name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+    """注册外部指标采集器"""
+    performance_monitor.register_collector(name, collector)
+
+
+def get_collector_metrics() -> Dict[str, Any]:
+    """获取外部采集器指标"""
+    return performance_monitor.get_collector_metrics()
+
+
 def get_system_metrics() -> Dict[str, Any]:
     """获取系统指标"""
     return performance_monitor.get_system_metrics()
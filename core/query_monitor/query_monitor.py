@@ -0,0 +1,383 @@
+"""
+数据库查询监控模块
+
+为peewee数据库对象挂载查询耗时统计：按调用方模型方法与SQL语句聚合耗时直方图、行数，
+记录慢查询，并统计连接池取连接的等待时间。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+import os
+import re
+import sys
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+
+from configs.database_config import DatabaseConfig
+
+logger = logging.getLogger(__name__)
+
+# 耗时直方图桶上界，单位：毫秒，最后一个桶为+inf
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# 将IN查询中长度不定的占位符列表归一化，避免同一语句因参数个数不同被拆分统计
+_PLACEHOLDER_LIST_PATTERN = re.compile(r"\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)")
+
+# 调用栈回溯时需要跳过的库目录
+_SKIPPED_MODULE_NAMES = ("peewee", "playhouse")
+
+
+class LatencyHistogram:
+    """固定分桶耗时直方图"""
+
+    __slots__ = ("buckets", "count", "total_ms", "max_ms", "rows")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def observe(self, duration_ms: float) -> None:
+        """记录一次耗时"""
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+
+    def percentile(self, q: float) -> Optional[float]:
+        """按桶上界估算分位数，单位：毫秒"""
+        if not self.count:
+            return None
+
+        threshold = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.buckets):
+            cumulative += bucket_count
+            if cumulative >= threshold:
+                return (
+                    LATENCY_BUCKETS_MS[index]
+                    if index < len(LATENCY_BUCKETS_MS)
+                    else self.max_ms
+                )
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为字典"""
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "rows": self.rows,
+            "buckets": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)
+                },
+                "le_inf": self.buckets[-1],
+            },
+        }
+
+
+class _RowCountingCursor:
+    """统计读取行数的游标代理，其余属性透传给原始游标"""
+
+    __slots__ = ("_cursor", "_histograms", "_lock")
+
+    def __init__(self, cursor, histograms: Tuple[LatencyHistogram, ...], lock: threading.Lock):
+        self._cursor = cursor
+        self._histograms = histograms
+        self._lock = lock
+
+    def _add_rows(self, rows: int) -> None:
+        if rows:
+            with self._lock:
+                for histogram in self._histograms:
+                    histogram.rows += rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._add_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._add_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._add_rows(len(rows))
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._add_rows(1)
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class QueryMonitor:
+    """数据库查询监控器"""
+
+    def __init__(
+        self,
+        slow_query_threshold_ms: float = 200,
+        slow_query_log_size: int = 100,
+        max_statements: int = 2000,
+    ):
+        """
+        初始化查询监控器
+
+        Args:
+            slow_query_threshold_ms: 慢查询阈值（毫秒）
+            slow_query_log_size: 保留的最近慢查询条数
+            max_statements: 最多统计的(调用方, 语句)组合数，超出后归入'<other>'
+        """
+        self.slow_query_threshold_ms = slow_query_threshold_ms
+        self.max_statements = max_statements
+        self.caller_root = None
+
+        # (调用方, 归一化SQL) -> 耗时直方图
+        self.statements: Dict[Tuple[str, str], LatencyHistogram] = {}
+        # 调用方 -> 耗时直方图
+        self.callers: Dict[str, LatencyHistogram] = {}
+        # 连接池取连接等待耗时
+        self.pool_wait = LatencyHistogram()
+        self.pool_exhausted = 0
+        self.slow_queries = deque(maxlen=slow_query_log_size)
+
+        # 当前线程正在进行的查询耗时汇总，见track
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def instrument(self, database, caller_root: str = None) -> None:
+        """
+        为数据库对象挂载查询耗时统计
+
+        Args:
+            database: peewee数据库对象
+            caller_root: 调用方归因时优先匹配的源码目录（通常为models目录）
+        """
+        if getattr(database, "_query_monitor_instrumented", False):
+            return
+
+        self.caller_root = caller_root
+        original_execute_sql = database.execute_sql
+
+        def execute_sql(sql, params=None, *args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                cursor = original_execute_sql(sql, params, *args, **kwargs)
+            finally:
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                histograms = self.record_query(sql, duration_ms)
+            return self._wrap_cursor(cursor, histograms)
+
+        database.execute_sql = execute_sql
+
+        # 连接池数据库额外统计取连接等待耗时
+        if hasattr(database, "_in_use"):
+            original_connect = database.connect
+
+            def connect(*args, **kwargs):
+                start_time = time.perf_counter()
+                try:
+                    return original_connect(*args, **kwargs)
+                except Exception as e:
+                    if type(e).__name__ == "MaxConnectionsExceeded":
+                        with self.lock:
+                            self.pool_exhausted += 1
+                    raise
+                finally:
+                    duration_ms = (time.perf_counter() - start_time) * 1000
+                    with self.lock:
+                        self.pool_wait.observe(duration_ms)
+
+            database.connect = connect
+
+        database._query_monitor_instrumented = True
+
+    def _wrap_cursor(self, cursor, histograms: Tuple[LatencyHistogram, ...]):
+        """写操作直接使用rowcount，读操作通过游标代理统计实际读取行数"""
+        if cursor.description is None:
+            if cursor.rowcount and cursor.rowcount > 0:
+                with self.lock:
+                    for histogram in histograms:
+                        histogram.rows += cursor.rowcount
+            return cursor
+
+        return _RowCountingCursor(cursor, histograms, self.lock)
+
+    def _resolve_caller(self) -> str:
+        """回溯调用栈，定位发起查询的模型方法，如'Users.get_user'"""
+        frame = sys._getframe(3)
+        fallback = None
+        depth = 0
+        while frame is not None and depth < 50:
+            code = frame.f_code
+            filename = code.co_filename
+            if self.caller_root and filename.startswith(self.caller_root):
+                owner = frame.f_locals.get("cls") or frame.f_locals.get("self")
+                if owner is not None:
+                    owner_name = owner.__name__ if isinstance(owner, type) else type(owner).__name__
+                    return f"{owner_name}.{code.co_name}"
+                return f"{os.path.basename(filename)[:-3]}.{code.co_name}"
+
+            if fallback is None and not any(
+                f"{os.sep}{name}" in filename for name in _SKIPPED_MODULE_NAMES
+            ) and filename != __file__:
+                fallback = f"{os.path.basename(filename)}:{code.co_name}"
+
+            frame = frame.f_back
+            depth += 1
+
+        return fallback or "<unknown>"
+
+    def record_query(self, sql: str, duration_ms: float) -> Tuple[LatencyHistogram, LatencyHistogram]:
+        """
+        记录一次查询
+
+        Args:
+            sql: 参数化SQL语句
+            duration_ms: 执行耗时（毫秒）
+
+        Returns:
+            该语句及调用方对应的耗时直方图
+        """
+        caller = self._resolve_caller()
+        statement = _PLACEHOLDER_LIST_PATTERN.sub("(?...)", sql)
+
+        tracked = getattr(self.local, "tracked", None)
+        if tracked is not None:
+            tracked["queries"] += 1
+            tracked["duration_ms"] += duration_ms
+
+        with self.lock:
+            key = (caller, statement)
+            histogram = self.statements.get(key)
+            if histogram is None:
+                if len(self.statements) >= self.max_statements:
+                    key = (caller, "<other>")
+                    histogram = self.statements.setdefault(key, LatencyHistogram())
+                else:
+                    histogram = self.statements[key] = LatencyHistogram()
+            histogram.observe(duration_ms)
+
+            caller_histogram = self.callers.get(caller)
+            if caller_histogram is None:
+                caller_histogram = self.callers[caller] = LatencyHistogram()
+            caller_histogram.observe(duration_ms)
+
+            is_slow = duration_ms >= self.slow_query_threshold_ms
+            if is_slow:
+                self.slow_queries.append(
+                    {
+                        "caller": caller,
+                        "sql": sql,
+                        "duration_ms": round(duration_ms, 3),
+                        "timestamp": datetime.now().isoformat(),
+                    }
+                )
+
+        if is_slow:
+            logger.warning(f"慢查询 {duration_ms:.1f}ms [{caller}]: {sql}")
+
+        return histogram, caller_histogram
+
+    @contextmanager
+    def track(self):
+        """汇总当前线程在上下文内执行的查询次数及耗时，供按请求或回调归因数据库耗时"""
+        tracked = {"queries": 0, "duration_ms": 0.0}
+        previous = getattr(self.local, "tracked", None)
+        self.local.tracked = tracked
+        try:
+            yield tracked
+        finally:
+            self.local.tracked = previous
+            if previous is not None:
+                previous["queries"] += tracked["queries"]
+                previous["duration_ms"] += tracked["duration_ms"]
+
+    def get_stats(self, top: int = 20) -> Dict[str, Any]:
+        """
+        获取查询统计
+
+        Args:
+            top: 按总耗时排序返回的语句条数
+
+        Returns:
+            查询统计
+        """
+        with self.lock:
+            statements = sorted(
+                self.statements.items(), key=lambda item: item[1].total_ms, reverse=True
+            )[:top]
+            return {
+                "slow_query_threshold_ms": self.slow_query_threshold_ms,
+                "callers": {
+                    caller: histogram.to_dict()
+                    for caller, histogram in sorted(
+                        self.callers.items(), key=lambda item: item[1].total_ms, reverse=True
+                    )
+                },
+                "top_statements": [
+                    {"caller": caller, "sql": sql, **histogram.to_dict()}
+                    for (caller, sql), histogram in statements
+                ],
+                "pool_wait": {**self.pool_wait.to_dict(), "exhausted": self.pool_exhausted},
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def get_slow_queries(self) -> List[Dict[str, Any]]:
+        """获取最近的慢查询记录"""
+        with self.lock:
+            return list(self.slow_queries)
+
+    def reset(self) -> None:
+        """重置统计"""
+        with self.lock:
+            self.statements.clear()
+            self.callers.clear()
+            self.pool_wait = LatencyHistogram()
+            self.pool_exhausted = 0
+            self.slow_queries.clear()
+
+
+# 全局查询监控器实例
+query_monitor = QueryMonitor(
+    slow_query_threshold_ms=DatabaseConfig.slow_query_threshold_ms,
+    slow_query_log_size=DatabaseConfig.slow_query_log_size,
+)
+
+
+# 便捷函数
+def instrument_database(database, caller_root: str = None) -> None:
+    """为数据库对象挂载查询耗时统计"""
+    query_monitor.instrument(database, caller_root)
+
+
+def get_query_stats(top: int = 20) -> Dict[str, Any]:
+    """获取查询统计"""
+    return query_monitor.get_stats(top)
+
+
+def get_slow_queries() -> List[Dict[str, Any]]:
+    """获取最近的慢查询记录"""
+    return query_monitor.get_slow_queries()
@@ -0,0 +1,274 @@
+"""
+数据库只读副本路由模块
+
+将标记为只读的模型方法发往只读副本执行：按复制延迟排除落后过多的副本，
+当前用户写入后的一段时间内其只读查询仍发往主库（读己之写），无可用副本时回退至主库。
+最近写入时间保存在用户会话中随请求传递，多worker部署时用户在任一进程写入后，其他进程同样可以识别。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, List, Any, Callable, Optional
+import itertools
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+import logging
+
+from configs.database_config import DatabaseConfig
+
+logger = logging.getLogger(__name__)
+
+# 各类型数据库默认的复制延迟查询语句，返回延迟秒数，为None时仅检查副本可用性
+DEFAULT_LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+    "mysql": None,
+    "sqlite": None,
+}
+
+
+class ReplicaRouter:
+    """只读副本路由器"""
+
+    def __init__(
+        self,
+        max_lag: float = 5,
+        lag_check_interval: float = 5,
+        read_your_writes_window: float = 5,
+        max_tracked_identities: int = 10000,
+    ):
+        """
+        初始化只读副本路由器
+
+        Args:
+            max_lag: 允许的最大复制延迟（秒），超出的副本暂不参与路由
+            lag_check_interval: 各副本复制延迟的检查间隔（秒）
+            read_your_writes_window: 用户写入后其只读查询继续发往主库的时长（秒）
+            max_tracked_identities: 记录最近写入时间的用户数上限
+        """
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.read_your_writes_window = read_your_writes_window
+        self.max_tracked_identities = max_tracked_identities
+
+        self.primary = None
+        self.replicas: List[Any] = []
+        self.lag_query: Optional[str] = None
+        self.identity_getter: Callable[[], Optional[str]] = lambda: None
+        # 读写当前用户最近写入时间（time.time()）的函数，时间保存在用户会话中，可跨进程识别
+        self.last_write_getter: Callable[[], Optional[float]] = lambda: None
+        self.last_write_setter: Callable[[float], None] = lambda timestamp: None
+
+        # 副本序号 -> {"lag": 延迟秒数或None（不可用）, "checked_at": 检查时间}
+        self.replica_states: Dict[int, Dict[str, Any]] = {}
+        # 用户标识 -> 本进程内最近一次写入时间，用于无法写回会话的场景（如已发送响应头的流式响应）
+        self.recent_writes = OrderedDict()
+        self.round_robin = itertools.count()
+
+        self.local = threading.local()
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def install(self, primary, replicas: List[Any], lag_query: str = None) -> None:
+        """
+        为主库数据库对象挂载路由
+
+        Args:
+            primary: 主库peewee数据库对象，模型类均绑定于此
+            replicas: 只读副本peewee数据库对象列表
+            lag_query: 复制延迟查询语句
+        """
+        if getattr(primary, "_replica_router_installed", False):
+            return
+
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.lag_query = lag_query
+        self.replica_states = {
+            index: {"lag": 0.0, "checked_at": 0.0} for index in range(len(self.replicas))
+        }
+
+        original_execute_sql = primary.execute_sql
+        original_connection_context = primary.connection_context
+
+        def execute_sql(sql, params=None, *args, **kwargs):
+            replica = self.current_replica()
+            if replica is not None:
+                return replica.execute_sql(sql, params, *args, **kwargs)
+
+            if not sql.lstrip()[:6].upper() == "SELECT":
+                self.record_write()
+            return original_execute_sql(sql, params, *args, **kwargs)
+
+        def connection_context():
+            replica = self.current_replica()
+            if replica is not None:
+                return replica.connection_context()
+            return original_connection_context()
+
+        primary.execute_sql = execute_sql
+        primary.connection_context = connection_context
+        primary._replica_router_installed = True
+
+    def set_identity_getter(self, identity_getter: Callable[[], Optional[str]]) -> None:
+        """设置获取当前请求用户标识的函数，用于读己之写判断"""
+        self.identity_getter = identity_getter
+
+    def set_last_write_store(
+        self,
+        getter: Callable[[], Optional[float]],
+        setter: Callable[[float], None],
+    ) -> None:
+        """设置读写当前用户最近写入时间的函数，写入时间随用户会话在各worker进程之间传递"""
+        self.last_write_getter = getter
+        self.last_write_setter = setter
+
+    def current_replica(self):
+        """获取当前线程正在使用的只读副本"""
+        return getattr(self.local, "replica", None)
+
+    def record_write(self) -> None:
+        """记录当前用户的一次写入"""
+        self.last_write_setter(time.time())
+
+        identity = self.identity_getter()
+        if identity is None:
+            return
+
+        with self.lock:
+            self.recent_writes[identity] = time.monotonic()
+            self.recent_writes.move_to_end(identity)
+            while len(self.recent_writes) > self.max_tracked_identities:
+                self.recent_writes.popitem(last=False)
+
+    def _check_lag(self, index: int) -> Optional[float]:
+        """查询副本复制延迟，副本不可用时返回None"""
+        replica = self.replicas[index]
+        try:
+            with replica.connection_context():
+                if self.lag_query:
+                    row = replica.execute_sql(self.lag_query).fetchone()
+                    return float(row[0] or 0) if row else 0.0
+                replica.execute_sql("SELECT 1").fetchone()
+                return 0.0
+        except Exception as e:
+            logger.warning(f"只读副本{index}不可用: {e}")
+            return None
+
+    def _replica_lag(self, index: int) -> Optional[float]:
+        """获取副本复制延迟，超过检查间隔时重新查询"""
+        now = time.monotonic()
+        state = self.replica_states[index]
+        if now - state["checked_at"] < self.lag_check_interval:
+            return state["lag"]
+
+        # 先更新检查时间，避免并发请求重复查询
+        with self.lock:
+            if now - state["checked_at"] < self.lag_check_interval:
+                return state["lag"]
+            state["checked_at"] = now
+
+        lag = self._check_lag(index)
+        with self.lock:
+            state["lag"] = lag
+        return lag
+
+    def _recently_written(self) -> bool:
+        """当前用户是否处于读己之写窗口内"""
+        last_write = self.last_write_getter()
+        if last_write is not None and time.time() - last_write < self.read_your_writes_window:
+            return True
+
+        identity = self.identity_getter()
+        if identity is None:
+            return False
+        with self.lock:
+            last_write = self.recent_writes.get(identity)
+        return (
+            last_write is not None
+            and time.monotonic() - last_write < self.read_your_writes_window
+        )
+
+    def choose_replica(self):
+        """选择本次只读查询使用的副本，返回None时使用主库"""
+        if not self.replicas:
+            return None
+
+        if self._recently_written():
+            with self.lock:
+                self.counters["primary_read_your_writes"] += 1
+            return None
+
+        start = next(self.round_robin)
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            lag = self._replica_lag(index)
+            if lag is not None and lag <= self.max_lag:
+                with self.lock:
+                    self.counters[f"replica_{index}"] += 1
+                return self.replicas[index]
+
+        with self.lock:
+            self.counters["primary_no_healthy_replica"] += 1
+        return None
+
+    def read_only(self, fn: Callable) -> Callable:
+        """将模型方法标记为只读，其中的查询将发往只读副本"""
+
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            # 嵌套调用或已处于副本路由中时沿用当前选择
+            if getattr(self.local, "depth", 0):
+                self.local.depth += 1
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.local.depth -= 1
+
+            self.local.replica = self.choose_replica()
+            self.local.depth = 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.local.depth = 0
+                self.local.replica = None
+
+        return inner
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取路由统计"""
+        with self.lock:
+            return {
+                "replicas": len(self.replicas),
+                "max_lag": self.max_lag,
+                "read_your_writes_window": self.read_your_writes_window,
+                "replica_lag": {
+                    index: state["lag"] for index, state in self.replica_states.items()
+                },
+                "tracked_identities": len(self.recent_writes),
+                **dict(self.counters),
+            }
+
+
+# 全局只读副本路由器实例
+replica_router = ReplicaRouter(
+    max_lag=DatabaseConfig.replica_max_lag,
+    lag_check_interval=DatabaseConfig.replica_lag_check_interval,
+    read_your_writes_window=DatabaseConfig.read_your_writes_window,
+)
+
+
+# 便捷函数
+def read_only(fn: Callable) -> Callable:
+    """将模型方法标记为只读"""
+    return replica_router.read_only(fn)
+
+
+def get_replica_router_stats() -> Dict[str, Any]:
+    """获取路由统计"""
+    return replica_router.get_stats()
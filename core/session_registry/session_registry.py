@@ -0,0 +1,120 @@
+"""
+会话token注册表
+
+在进程内存中维护每个用户最新的登录会话token，供重复登录检查使用。
+本进程内登录时直接写入；其他worker进程产生的登录，通过按用户定期回源数据库感知，
+数据库读取频率与打开的标签页数量无关。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import time
+import threading
+import logging
+
+from configs.base_config import BaseConfig
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRegistry:
+    """会话token注册表"""
+
+    def __init__(self, refresh_interval: float = 5.0):
+        """
+        初始化会话token注册表
+
+        Args:
+            refresh_interval: 内存中的token最长信任时间（秒），超过后回源数据库
+        """
+        self.refresh_interval = refresh_interval
+
+        # user_id -> (加载时间, 最新session_token)
+        self.tokens: Dict[str, Tuple[float, Optional[str]]] = {}
+
+        self.checks = 0
+        self.db_loads = 0
+        self.revocations = 0
+        self.lock = threading.Lock()
+
+    def publish(self, user_id: str, session_token: str) -> None:
+        """
+        登录成功后登记最新的会话token，使旧会话立即失效
+
+        Args:
+            user_id: 用户ID
+            session_token: 新的会话token
+        """
+        with self.lock:
+            self.tokens[user_id] = (time.monotonic(), session_token)
+
+    def get_token(self, user_id: str) -> Optional[str]:
+        """
+        获取用户最新的会话token
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            最新会话token，用户不存在时返回None
+        """
+        with self.lock:
+            entry = self.tokens.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < self.refresh_interval:
+                return entry[1]
+
+        from models.users import Users
+
+        match_user = Users.get_user(user_id)
+        session_token = match_user.session_token if match_user else None
+
+        with self.lock:
+            self.db_loads += 1
+            # 回源期间本进程内发生了新的登录时，以更新的登记为准
+            current = self.tokens.get(user_id)
+            if current is None or current == entry:
+                self.tokens[user_id] = (time.monotonic(), session_token)
+            else:
+                session_token = current[1]
+
+        return session_token
+
+    def is_current(self, user_id: str, session_token: Optional[str]) -> bool:
+        """
+        判断会话token是否为该用户最新的token
+
+        Args:
+            user_id: 用户ID
+            session_token: 当前请求携带的会话token
+
+        Returns:
+            是否有效
+        """
+        latest_token = self.get_token(user_id)
+        valid = latest_token is not None and latest_token == session_token
+
+        with self.lock:
+            self.checks += 1
+            if not valid:
+                self.revocations += 1
+
+        return valid
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取注册表统计"""
+        with self.lock:
+            return {
+                "refresh_interval": self.refresh_interval,
+                "users": len(self.tokens),
+                "checks": self.checks,
+                "db_loads": self.db_loads,
+                "revocations": self.revocations,
+            }
+
+
+# 全局会话token注册表实例
+session_registry = SessionRegistry(
+    refresh_interval=BaseConfig.duplicate_login_token_refresh_interval,
+)
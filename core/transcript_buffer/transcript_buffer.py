@@ -0,0 +1,177 @@
+"""
+语音转录缓冲区
+
+在服务端缓冲语音实时对话过程中增量上传的转录批次，按时间/数量策略批量落库，
+以(session_id, seq)保证重复上传幂等。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from datetime import datetime
+import logging
+
+from configs.voice_config import VoiceConfig
+from core.flush_buffer.flush_buffer import FlushBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptBuffer(FlushBuffer):
+    """语音转录批次缓冲区"""
+
+    name = "转录缓冲区"
+    flushed_counter = "flushed_batches"
+
+    def __init__(
+        self,
+        flush_interval: float = 2.0,
+        flush_batch_size: int = 200,
+        seen_cache_size: int = 10000,
+    ):
+        """
+        初始化转录缓冲区
+
+        Args:
+            flush_interval: 定时落库间隔（秒）
+            flush_batch_size: 累计批次数达到该值时立即落库
+            seen_cache_size: 幂等去重缓存容量
+        """
+        super().__init__(flush_interval)
+        self.flush_batch_size = flush_batch_size
+        self.seen_cache_size = seen_cache_size
+
+        # 待落库批次
+        self.pending: List[Dict[str, Any]] = []
+        # 最近接收过的(session_id, seq)，用于进程内快速去重
+        self.seen = OrderedDict()
+
+    def append(
+        self,
+        session_id: str,
+        seq: int,
+        messages: List[Dict[str, Any]],
+        user_id: str = None,
+        conversation_id: str = None,
+    ) -> bool:
+        """
+        追加一个转录批次
+
+        Args:
+            session_id: 语音通话会话ID
+            seq: 批次序号
+            messages: 本批次消息列表
+            user_id: 用户ID
+            conversation_id: 关联的聊天会话ID
+
+        Returns:
+            是否为新批次（重复批次返回False）
+        """
+        self.ensure_started()
+
+        key = (session_id, seq)
+        with self.lock:
+            if key in self.seen:
+                self.counters["duplicate_batches"] += 1
+                return False
+
+            self.seen[key] = True
+            while len(self.seen) > self.seen_cache_size:
+                self.seen.popitem(last=False)
+
+            self.pending.append(
+                {
+                    "session_id": session_id,
+                    "seq": seq,
+                    "conversation_id": conversation_id,
+                    "user_id": user_id,
+                    "messages": messages,
+                    "created_at": datetime.now(),
+                }
+            )
+            self.counters["accepted_batches"] += 1
+            self.counters["accepted_messages"] += len(messages)
+
+            if len(self.pending) >= self.flush_batch_size:
+                self.flush_event.set()
+
+        return True
+
+    def _take_pending(self) -> List[Dict[str, Any]]:
+        """取出全部待落库批次"""
+        batches, self.pending = self.pending, []
+        return batches
+
+    def _write_pending(self, batches: List[Dict[str, Any]]) -> int:
+        """以单个事务批量落库"""
+        from models.voice_transcripts import VoiceCallTranscripts
+
+        VoiceCallTranscripts.add_batches(batches)
+        return len(batches)
+
+    def _restore_pending(self, batches: List[Dict[str, Any]]) -> None:
+        """落库失败的批次放回缓冲区队首"""
+        self.pending = batches + self.pending
+
+    def _after_flush(self, batches: List[Dict[str, Any]]) -> None:
+        """合并通话结束后才落库的批次"""
+        self._merge_late_batches(batches)
+
+    def _merge_late_batches(self, batches: List[Dict[str, Any]]) -> None:
+        """通话结束后才落库的批次（由其他worker进程接收），重新合并到已完成合并的聊天会话"""
+        from models.voice_transcripts import VoiceCallTranscripts
+
+        sessions = {
+            batch["session_id"]: (batch["user_id"], batch["conversation_id"])
+            for batch in batches
+            if batch["user_id"]
+        }
+        for session_id, (user_id, conversation_id) in sessions.items():
+            try:
+                if VoiceCallTranscripts.merge_into_conversation(
+                    session_id, user_id, conversation_id=conversation_id, only_if_merged=True
+                ):
+                    with self.lock:
+                        self.counters["late_merges"] += 1
+            except Exception as e:
+                logger.error(f"合并通话 {session_id} 的转录消息失败: {e}")
+
+    def _pending_stats(self) -> Dict[str, Any]:
+        """待落库批次统计"""
+        return {
+            "pending_batches": len(self.pending),
+            "seen_cache_size": len(self.seen),
+            "flush_batch_size": self.flush_batch_size,
+        }
+
+
+# 全局转录缓冲区实例
+transcript_buffer = TranscriptBuffer(
+    flush_interval=VoiceConfig.VOICE_CALL_TRANSCRIPT_FLUSH_INTERVAL,
+    flush_batch_size=VoiceConfig.VOICE_CALL_TRANSCRIPT_FLUSH_BATCH_SIZE,
+    seen_cache_size=VoiceConfig.VOICE_CALL_TRANSCRIPT_SEEN_CACHE_SIZE,
+)
+
+
+# 便捷函数
+def append_transcript_batch(
+    session_id: str,
+    seq: int,
+    messages: List[Dict[str, Any]],
+    user_id: str = None,
+    conversation_id: Optional[str] = None,
+) -> bool:
+    """追加转录批次"""
+    return transcript_buffer.append(session_id, seq, messages, user_id, conversation_id)
+
+
+def flush_transcripts() -> int:
+    """立即落库"""
+    return transcript_buffer.flush()
+
+
+def get_transcript_buffer_stats() -> Dict[str, Any]:
+    """获取缓冲区统计"""
+    return transcript_buffer.get_stats()
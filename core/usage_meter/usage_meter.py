@@ -0,0 +1,220 @@
+"""
+用户资源消耗计量模块
+
+按用户统计上游token、流式响应时长、语音合成字符数及语音通话时长等消耗。
+各线程仅向自身独占的计量分片累加，分片锁只在后台线程定时交换分片的瞬间与持有线程竞争，
+线程之间互不竞争；单次落库开销仅与活跃的(用户, 日期, 指标)组合数及线程数相关，与请求量无关。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, List, Any, Tuple
+import threading
+from collections import Counter, OrderedDict
+from datetime import date
+import logging
+
+from configs.database_config import DatabaseConfig
+from core.flush_buffer.flush_buffer import FlushBuffer
+
+logger = logging.getLogger(__name__)
+
+# 计量指标
+METRIC_PROMPT_TOKENS = "prompt_tokens"
+METRIC_COMPLETION_TOKENS = "completion_tokens"
+METRIC_COMPLETION_CHARS = "completion_chars"
+METRIC_STREAM_REQUESTS = "stream_requests"
+METRIC_STREAM_SECONDS = "stream_seconds"
+METRIC_TTS_CHARS = "tts_chars"
+METRIC_VOICE_CALL_SECONDS = "voice_call_seconds"
+
+METERED_METRICS = [
+    METRIC_PROMPT_TOKENS,
+    METRIC_COMPLETION_TOKENS,
+    METRIC_COMPLETION_CHARS,
+    METRIC_STREAM_REQUESTS,
+    METRIC_STREAM_SECONDS,
+    METRIC_TTS_CHARS,
+    METRIC_VOICE_CALL_SECONDS,
+]
+
+
+class _MeterShard:
+    """单个线程独占的计量分片"""
+
+    __slots__ = ("thread", "data", "lock")
+
+    def __init__(self, thread: threading.Thread):
+        self.thread = thread
+        # 仅由持有线程及落库线程使用
+        self.lock = threading.Lock()
+        # (用户id, 统计日期, 指标) -> 累计值
+        self.data: Dict[Tuple[str, date, str], float] = {}
+
+
+class UsageMeter(FlushBuffer):
+    """用户资源消耗计量器"""
+
+    name = "资源消耗计量"
+    flushed_counter = "flushed_rows"
+
+    def __init__(
+        self,
+        flush_interval: float = 30,
+        enabled: bool = True,
+        max_tracked_keys: int = 10000,
+    ):
+        """
+        初始化计量器
+
+        Args:
+            flush_interval: 定时落库间隔（秒），新记录的消耗最迟约一个间隔后可查询
+            enabled: 是否记录消耗
+            max_tracked_keys: 一次性计量（如语音通话时长）去重记录的键数上限
+        """
+        # self.lock 为分片注册及统计读写锁，不在计量写入路径上使用
+        super().__init__(flush_interval)
+        self.enabled = enabled
+        self.max_tracked_keys = max_tracked_keys
+
+        self.local = threading.local()
+        self.shards: List[_MeterShard] = []
+        # 落库失败、等待重试的合并数据
+        self.retry: Dict[Tuple[str, date, str], float] = {}
+        # 已计量的一次性事件键
+        self.metered_keys = OrderedDict()
+
+    def _get_shard(self) -> _MeterShard:
+        """获取当前线程的计量分片，首次调用时注册"""
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            self.ensure_started()
+
+            shard = _MeterShard(threading.current_thread())
+            with self.lock:
+                self.shards.append(shard)
+            self.local.shard = shard
+        return shard
+
+    def add(self, user_id: str, **metrics: float) -> None:
+        """
+        累加用户当天的消耗
+
+        Args:
+            user_id: 用户id
+            metrics: 指标名称 -> 消耗量，全部可选项见METERED_METRICS
+        """
+        if not self.enabled or not user_id:
+            return
+
+        shard = self._get_shard()
+        today = date.today()
+        with shard.lock:
+            data = shard.data
+            for metric, value in metrics.items():
+                if value:
+                    key = (user_id, today, metric)
+                    data[key] = data.get(key, 0) + value
+
+    def add_once(self, key: str, user_id: str, **metrics: float) -> bool:
+        """
+        对同一事件仅计量一次，用于客户端可能重试上报的消耗
+
+        Returns:
+            本次是否计量
+        """
+        with self.lock:
+            if key in self.metered_keys:
+                return False
+            self.metered_keys[key] = True
+            while len(self.metered_keys) > self.max_tracked_keys:
+                self.metered_keys.popitem(last=False)
+
+        self.add(user_id, **metrics)
+        return True
+
+    def _take_pending(self) -> Counter:
+        """交换各线程分片，与待重试数据合并"""
+        merged = Counter(self.retry)
+        self.retry = {}
+        alive = []
+        for shard in self.shards:
+            # 交换前线程已结束，则其分片不会再有写入，交换后即可注销
+            if shard.thread.is_alive():
+                alive.append(shard)
+            with shard.lock:
+                data, shard.data = shard.data, {}
+            merged.update(data)
+        self.shards = alive
+        return merged
+
+    def _write_pending(self, merged: Counter) -> int:
+        """合并后的消耗以累加式upsert落库"""
+        from models.usage_stats import UserUsageMeter
+
+        rows = [
+            {"user_id": user_id, "stat_date": stat_date, "metric": metric, "value": value}
+            for (user_id, stat_date, metric), value in merged.items()
+        ]
+        UserUsageMeter.add_increments(rows)
+        return len(rows)
+
+    def _restore_pending(self, merged: Counter) -> None:
+        """落库失败的消耗合并后放回，等待下次重试"""
+        self.retry = dict(merged)
+
+    def get_usage(
+        self,
+        start_date: date,
+        end_date: date,
+        user_id: str = None,
+        metrics: List[str] = None,
+        by_day: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """查询已落库的消耗量，参数同UserUsageMeter.get_usage()"""
+        from models.usage_stats import UserUsageMeter
+
+        return [
+            {**item, "stat_date": str(item["stat_date"])} if by_day else item
+            for item in UserUsageMeter.get_usage(
+                start_date, end_date, user_id=user_id, metrics=metrics, by_day=by_day
+            )
+        ]
+
+    def _pending_stats(self) -> Dict[str, Any]:
+        """分片及待重试数据统计"""
+        return {
+            "enabled": self.enabled,
+            "shards": len(self.shards),
+            "retry_rows": len(self.retry),
+        }
+
+
+# 全局资源消耗计量器实例
+usage_meter = UsageMeter(
+    flush_interval=DatabaseConfig.usage_meter_flush_interval,
+    enabled=DatabaseConfig.usage_meter_enabled,
+)
+
+
+# 便捷函数
+def meter_usage(user_id: str, **metrics: float) -> None:
+    """累加用户当天的消耗"""
+    usage_meter.add(user_id, **metrics)
+
+
+def get_usage(
+    start_date: date,
+    end_date: date,
+    user_id: str = None,
+    metrics: List[str] = None,
+    by_day: bool = False,
+) -> List[Dict[str, Any]]:
+    """查询已落库的消耗量"""
+    return usage_meter.get_usage(start_date, end_date, user_id, metrics, by_day)
+
+
+def get_usage_meter_stats() -> Dict[str, Any]:
+    """获取计量器统计"""
+    return usage_meter.get_stats()
@@ -0,0 +1,283 @@
+"""
+使用情况汇总模块
+
+消息、会话、登录及话题点击写入时仅在内存中按(日期, 用户)/(日期, 话题)累加增量，
+由后台线程定时以累加式upsert合并进汇总表；历史数据由向量化回填任务一次性重新计算。
+管理端统计页面仅读取汇总表，查询耗时与消息总量无关。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime
+import logging
+
+import pandas as pd
+
+from configs.database_config import DatabaseConfig
+from core.flush_buffer.flush_buffer import FlushBuffer
+
+logger = logging.getLogger(__name__)
+
+# 计为一次登录的登录日志状态
+LOGIN_SUCCESS_STATUS = "登录成功"
+
+
+class UsageRollup(FlushBuffer):
+    """使用情况增量汇总器"""
+
+    name = "使用情况汇总"
+    flushed_counter = "flushed_rows"
+
+    def __init__(self, flush_interval: float = 10, enabled: bool = True):
+        """
+        初始化使用情况汇总器
+
+        Args:
+            flush_interval: 增量定时合并间隔（秒）
+            enabled: 是否记录增量
+        """
+        super().__init__(flush_interval)
+        self.enabled = enabled
+
+        # (统计日期, 用户id) -> 各指标增量
+        self.user_pending: Dict[Tuple[date, str], Counter] = defaultdict(Counter)
+        # (统计日期, 话题分类) -> 点击次数增量
+        self.topic_pending: Counter = Counter()
+
+    def _ensure_started(self) -> bool:
+        """记录增量前按需启动后台线程，未启用时返回False"""
+        if not self.enabled:
+            return False
+        self.ensure_started()
+        return True
+
+    def record(self, user_id: str, stat_date: date = None, **metrics: int) -> None:
+        """
+        记录用户使用指标增量
+
+        Args:
+            user_id: 用户id
+            stat_date: 统计日期，默认为当天
+            metrics: 指标增量，可选messages、user_messages、conversations、logins
+        """
+        if not user_id or not self._ensure_started():
+            return
+
+        with self.lock:
+            self.user_pending[(stat_date or date.today(), user_id)].update(metrics)
+            self.counters["recorded"] += 1
+
+    def record_topic_click(self, topic: str, stat_date: date = None) -> None:
+        """记录一次话题分类点击"""
+        if not topic or not self._ensure_started():
+            return
+
+        with self.lock:
+            self.topic_pending[(stat_date or date.today(), topic)] += 1
+            self.counters["recorded"] += 1
+
+    def _take_pending(self) -> Optional[Tuple[Dict[Tuple[date, str], Counter], Counter]]:
+        """取出全部待合并增量，无增量时返回None"""
+        if not self.user_pending and not self.topic_pending:
+            return None
+        user_pending, self.user_pending = self.user_pending, defaultdict(Counter)
+        topic_pending, self.topic_pending = self.topic_pending, Counter()
+        return user_pending, topic_pending
+
+    def _write_pending(self, pending: Tuple[Dict[Tuple[date, str], Counter], Counter]) -> int:
+        """将增量以累加式upsert合并进汇总表"""
+        from models.usage_stats import UserDailyUsage, TopicDailyClicks
+
+        user_pending, topic_pending = pending
+        user_rows = [
+            {"stat_date": stat_date, "user_id": user_id, **metrics}
+            for (stat_date, user_id), metrics in user_pending.items()
+        ]
+        topic_rows = [
+            {"stat_date": stat_date, "topic": topic, "clicks": clicks}
+            for (stat_date, topic), clicks in topic_pending.items()
+        ]
+
+        UserDailyUsage.add_increments(user_rows)
+        TopicDailyClicks.add_increments(topic_rows)
+        return len(user_rows) + len(topic_rows)
+
+    def _restore_pending(self, pending: Tuple[Dict[Tuple[date, str], Counter], Counter]) -> None:
+        """合并失败的增量放回（两表分别写入，话题部分失败时用户部分可能已合并）"""
+        user_pending, topic_pending = pending
+        for key, metrics in user_pending.items():
+            self.user_pending[key].update(metrics)
+        self.topic_pending.update(topic_pending)
+
+    def backfill(self, chunk_size: int = 500) -> Dict[str, Any]:
+        """
+        根据会话消息及登录日志重新计算全部历史汇总，覆盖汇总表中对应的(日期, 用户)行。
+        话题点击无历史记录可供回填，保持不变。回填期间新产生的增量可能被覆盖，建议在低峰期执行。
+
+        Args:
+            chunk_size: 每次从数据库读取的记录数
+
+        Returns:
+            回填结果统计
+        """
+        from models.conversations import Conversations
+        from models.logs import LoginLogs
+        from models.usage_stats import UserDailyUsage, USER_DAILY_METRICS
+
+        start_time = time.perf_counter()
+        self.flush()
+
+        partials = []
+        conversation_count = 0
+        for chunk in Conversations.iter_conversation_chunks(chunk_size):
+            conversation_count += len(chunk)
+            partials.append(_aggregate_conversations(pd.DataFrame(chunk)))
+
+        login_count = 0
+        for chunk in LoginLogs.iter_log_chunks(chunk_size):
+            login_count += len(chunk)
+            partials.append(_aggregate_logins(pd.DataFrame(chunk)))
+
+        partials = [partial for partial in partials if not partial.empty]
+        if partials:
+            rollup = (
+                pd.concat(partials)
+                .reindex(columns=["stat_date", "user_id", *USER_DAILY_METRICS])
+                .fillna({metric: 0 for metric in USER_DAILY_METRICS})
+                .groupby(["stat_date", "user_id"], as_index=False)[USER_DAILY_METRICS]
+                .sum()
+            )
+            rows = rollup.astype({metric: int for metric in USER_DAILY_METRICS}).to_dict(
+                "records"
+            )
+        else:
+            rows = []
+
+        UserDailyUsage.replace_rows(rows)
+
+        result = {
+            "conversations": conversation_count,
+            "login_logs": login_count,
+            "rollup_rows": len(rows),
+            "seconds": round(time.perf_counter() - start_time, 3),
+        }
+        with self.lock:
+            self.counters["backfills"] += 1
+        logger.info(f"使用情况汇总回填完成: {result}")
+        return result
+
+    def _pending_stats(self) -> Dict[str, Any]:
+        """待合并增量统计"""
+        return {
+            "enabled": self.enabled,
+            "pending_user_rows": len(self.user_pending),
+            "pending_topic_rows": len(self.topic_pending),
+        }
+
+
+def _to_dates(values: pd.Series, fallback: pd.Series) -> pd.Series:
+    """将毫秒时间戳或日期时间字符串混合的列转换为日期，无法解析的使用fallback"""
+    numeric = pd.to_numeric(values, errors="coerce")
+    from_ms = (
+        pd.to_datetime(numeric, unit="ms", utc=True, errors="coerce")
+        .dt.tz_convert(datetime.now().astimezone().tzinfo)
+        .dt.tz_localize(None)
+    )
+    from_text = pd.to_datetime(
+        values.where(numeric.isna()).astype("string"), errors="coerce", format="mixed"
+    )
+    return from_ms.fillna(from_text).fillna(fallback).dt.date
+
+
+def _aggregate_conversations(df: pd.DataFrame) -> pd.DataFrame:
+    """按(日期, 用户)汇总一块会话记录中的新建会话数及消息数"""
+    if df.empty:
+        return pd.DataFrame()
+
+    df["conv_time"] = pd.to_datetime(df["conv_time"], errors="coerce")
+
+    conversations = (
+        df.dropna(subset=["conv_time"])
+        .assign(stat_date=lambda frame: frame["conv_time"].dt.date)
+        .groupby(["stat_date", "user_id"])
+        .size()
+        .rename("conversations")
+    )
+
+    # 每条消息展开为一行，按消息时间归入对应日期，缺失时归入会话创建日期
+    df["messages"] = df["conv_memory"].map(
+        lambda memory: memory.get("messages") if isinstance(memory, dict) else None
+    )
+    messages = df[["user_id", "conv_time", "messages"]].explode("messages")
+    messages = messages[messages["messages"].map(lambda message: isinstance(message, dict))]
+
+    frames = [conversations]
+    if not messages.empty:
+        details = pd.DataFrame(messages["messages"].tolist(), index=messages.index)
+        messages = messages.assign(
+            role=details.get("role"),
+            stat_date=_to_dates(
+                details.get("timestamp", pd.Series(index=details.index, dtype=object)),
+                messages["conv_time"],
+            ),
+        ).dropna(subset=["stat_date"])
+        frames.append(
+            messages.assign(is_user=messages["role"] == "user")
+            .groupby(["stat_date", "user_id"])
+            .agg(messages=("is_user", "size"), user_messages=("is_user", "sum"))
+        )
+
+    return pd.concat(frames, axis=1).reset_index()
+
+
+def _aggregate_logins(df: pd.DataFrame) -> pd.DataFrame:
+    """按(日期, 用户)汇总一块登录日志中的成功登录次数"""
+    if df.empty:
+        return pd.DataFrame()
+
+    df = df[(df["status"] == LOGIN_SUCCESS_STATUS) & df["user_id"].notna()]
+    if df.empty:
+        return pd.DataFrame()
+
+    return (
+        df.assign(stat_date=pd.to_datetime(df["login_datetime"]).dt.date)
+        .groupby(["stat_date", "user_id"])
+        .size()
+        .rename("logins")
+        .reset_index()
+    )
+
+
+# 全局使用情况汇总器实例
+usage_rollup = UsageRollup(
+    flush_interval=DatabaseConfig.usage_rollup_flush_interval,
+    enabled=DatabaseConfig.usage_rollup_enabled,
+)
+
+
+# 便捷函数
+def record_usage(user_id: str, **metrics: int) -> None:
+    """记录用户当天的使用指标增量"""
+    usage_rollup.record(user_id, **metrics)
+
+
+def record_topic_click(topic: str) -> None:
+    """记录一次话题分类点击"""
+    usage_rollup.record_topic_click(topic)
+
+
+def get_usage_rollup_stats() -> Dict[str, Any]:
+    """获取汇总器统计"""
+    return usage_rollup.get_stats()
+
+
+if __name__ == "__main__":
+    # 根据历史会话及登录日志回填使用情况汇总表
+    # 命令：python -m core.usage_rollup.usage_rollup
+    import models.init_db  # noqa: F401
+
+    print(usage_rollup.backfill())
@@ -0,0 +1,345 @@
+"""
+用户批量导入模块
+
+解析上传的CSV/XLSX用户表，以列式向量化方式校验各行，使用进程池并行计算密码散列值，
+单次查询完成与已有用户的重复性校验后分块批量写入。
+
+创建时间: 2026-10-19
+版本: 1.0.0
+"""
+
+from typing import Dict, List, Any, Callable, Optional, Tuple
+import io
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import logging
+
+import pandas as pd
+from peewee import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from configs import AuthConfig, BaseConfig
+
+logger = logging.getLogger(__name__)
+
+# 支持的表头名称 -> 字段名
+COLUMN_ALIASES = {
+    "用户名": "user_name",
+    "密码": "password",
+    "用户id": "user_id",
+    "用户角色": "user_role",
+    "用户头像": "user_icon",
+}
+
+# 导入模板字段，前两项为必填
+TEMPLATE_COLUMNS = ["user_name", "password", "user_id", "user_role", "user_icon"]
+
+# 未指定头像时使用的默认头像，与Users.add_user()一致
+DEFAULT_USER_ICON = "👨‍💼"
+
+
+class UserImportError(Exception):
+    """用户导入文件整体无效时抛出"""
+
+
+class UserImporter:
+    """用户批量导入器"""
+
+    def __init__(self, max_rows: int = 5000, hash_workers: int = None):
+        """
+        初始化用户导入器
+
+        Args:
+            max_rows: 单个文件允许的最大行数
+            hash_workers: 计算密码散列值使用的进程数，为None时使用全部CPU核心
+        """
+        self.max_rows = max_rows
+        self.hash_workers = hash_workers or os.cpu_count() or 1
+
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def read_table(self, contents: bytes, filename: str) -> pd.DataFrame:
+        """
+        读取上传的用户表，全部字段按字符串读取
+
+        Args:
+            contents: 文件内容
+            filename: 文件名，用于判断文件类型
+
+        Returns:
+            列名已统一为字段名的数据框
+        """
+        if filename.lower().endswith((".xlsx", ".xls")):
+            try:
+                df = pd.read_excel(io.BytesIO(contents), dtype=str)
+            except ImportError:
+                raise UserImportError("导入xlsx文件需要安装openpyxl")
+        elif filename.lower().endswith(".csv"):
+            # 兼容Excel另存为的GBK编码CSV文件
+            try:
+                df = pd.read_csv(io.BytesIO(contents), dtype=str, encoding="utf-8-sig")
+            except UnicodeDecodeError:
+                df = pd.read_csv(io.BytesIO(contents), dtype=str, encoding="gbk")
+        else:
+            raise UserImportError("仅支持csv、xlsx格式的文件")
+
+        df = df.rename(columns=lambda column: str(column).strip()).rename(
+            columns=COLUMN_ALIASES
+        )
+        if not {"user_name", "password"}.issubset(df.columns):
+            raise UserImportError("文件中缺少必要的列：user_name（用户名）、password（密码）")
+        if len(df) > self.max_rows:
+            raise UserImportError(f"单个文件最多导入 {self.max_rows} 个用户")
+
+        for column in TEMPLATE_COLUMNS:
+            if column not in df.columns:
+                df[column] = ""
+        df = df[TEMPLATE_COLUMNS].fillna("")
+        for column in TEMPLATE_COLUMNS:
+            df[column] = df[column].astype(str).str.strip()
+
+        # 记录在文件中的行号，表头为第1行
+        df.index = df.index + 2
+        return df
+
+    def validate(self, df: pd.DataFrame) -> pd.Series:
+        """
+        按列向量化校验各行，并补全默认值
+
+        Args:
+            df: read_table()返回的数据框，将被原地补全
+
+        Returns:
+            各行错误原因，空字符串表示校验通过
+        """
+        errors = pd.Series("", index=df.index, dtype=object)
+
+        def flag(mask: pd.Series, reason: str) -> None:
+            # 每行仅保留第一个错误原因
+            errors[mask & (errors == "")] = reason
+
+        # 补全默认值，角色兼容以角色描述填写
+        df["user_id"] = df["user_id"].where(df["user_id"] != "", df["user_name"])
+        df["user_role"] = (
+            df["user_role"]
+            .replace({info["description"]: role for role, info in AuthConfig.roles.items()})
+            .where(df["user_role"] != "", AuthConfig.normal_role)
+        )
+        df["user_icon"] = df["user_icon"].where(df["user_icon"] != "", DEFAULT_USER_ICON)
+
+        flag(df["user_name"] == "", "用户名不能为空")
+        flag(df["password"] == "", "密码不能为空")
+        flag(~df["user_role"].isin(list(AuthConfig.roles)), "用户角色无效")
+        flag(df["user_id"].duplicated(keep=False), "文件内用户id重复")
+        flag(df["user_name"].duplicated(keep=False), "文件内用户名重复")
+
+        self.flag_existing(df, errors)
+
+        return errors
+
+    def flag_existing(self, df: pd.DataFrame, errors: pd.Series) -> int:
+        """
+        单次查询与已有用户进行重复性校验，在errors中原地标记与已有用户重复的行
+
+        Returns:
+            新标记的行数
+        """
+        from models.users import Users
+
+        candidates = df[errors == ""]
+        existing_user_ids, existing_user_names = Users.get_existing_keys(
+            candidates["user_id"], candidates["user_name"]
+        )
+        flagged = 0
+        for column, existing, reason in (
+            ("user_id", existing_user_ids, "用户id已存在"),
+            ("user_name", existing_user_names, "用户名已存在"),
+        ):
+            mask = df[column].isin(existing) & (errors == "")
+            errors[mask] = reason
+            flagged += int(mask.sum())
+        return flagged
+
+    def insert_users(
+        self, df: pd.DataFrame, errors: pd.Series, users: Dict[int, Dict[str, Any]]
+    ) -> int:
+        """
+        批量写入校验通过的用户，校验后其他请求并发写入了相同的用户id或用户名导致写入失败时，
+        重新进行重复性校验，逐行标记重复的行并重试写入其余行
+
+        Args:
+            df: 用户表数据框
+            errors: 各行错误原因，将被原地更新
+            users: 行号 -> 待写入的用户信息
+
+        Returns:
+            成功写入的用户数
+        """
+        from models.users import Users
+
+        while True:
+            try:
+                return Users.add_users(
+                    [user for row, user in users.items() if errors[row] == ""]
+                )
+            except IntegrityError:
+                # 整批写入已回滚，未能定位到重复的行时为其他约束错误
+                if not self.flag_existing(df, errors):
+                    raise
+                with self.lock:
+                    self.counters["insert_conflicts"] += 1
+
+    def hash_passwords(
+        self, passwords: List[str], on_progress: Optional[Callable[[int], None]] = None
+    ) -> List[str]:
+        """
+        使用进程池并行计算密码散列值
+
+        Args:
+            passwords: 明文密码列表
+            on_progress: 进度回调，参数为已完成的数量，约每完成5%调用一次
+        """
+        step = max(1, len(passwords) // 20)
+        password_hashes = []
+
+        def collect(password_hash: str) -> None:
+            password_hashes.append(password_hash)
+            if on_progress is not None and len(password_hashes) % step == 0:
+                on_progress(len(password_hashes))
+
+        if len(passwords) < 2 or self.hash_workers <= 1:
+            for password in passwords:
+                collect(generate_password_hash(password))
+            return password_hashes
+
+        workers = min(self.hash_workers, len(passwords))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for password_hash in executor.map(
+                generate_password_hash,
+                passwords,
+                chunksize=max(1, len(passwords) // (workers * 4)),
+            ):
+                collect(password_hash)
+        return password_hashes
+
+    def import_file(
+        self,
+        contents: bytes,
+        filename: str,
+        on_progress: Optional[Callable[[int, str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        导入用户表文件
+
+        Args:
+            contents: 文件内容
+            filename: 文件名
+            on_progress: 进度回调，参数为(完成百分比, 当前阶段说明)
+
+        Returns:
+            导入结果，含逐行错误信息及吞吐量
+        """
+        report = on_progress or (lambda percent, stage: None)
+        start_time = time.perf_counter()
+
+        report(0, "解析文件")
+        df = self.read_table(contents, filename)
+        report(5, f"校验 {len(df)} 行数据")
+        errors = self.validate(df)
+        valid_rows = df[errors == ""]
+        validate_seconds = time.perf_counter() - start_time
+
+        hash_start_time = time.perf_counter()
+        valid_count = len(valid_rows)
+        report(10, f"计算密码散列 0/{valid_count}")
+        password_hashes = self.hash_passwords(
+            valid_rows["password"].tolist(),
+            on_progress=lambda done: report(
+                10 + 80 * done // valid_count, f"计算密码散列 {done}/{valid_count}"
+            ),
+        )
+        hash_seconds = time.perf_counter() - hash_start_time
+
+        report(90, f"写入 {valid_count} 个用户")
+        insert_start_time = time.perf_counter()
+        imported = self.insert_users(
+            df,
+            errors,
+            {
+                row: {
+                    "user_id": user_id,
+                    "user_name": user_name,
+                    "password_hash": password_hash,
+                    "user_role": user_role,
+                    "user_icon": user_icon,
+                }
+                for row, user_id, user_name, user_role, user_icon, password_hash in zip(
+                    valid_rows.index,
+                    valid_rows["user_id"],
+                    valid_rows["user_name"],
+                    valid_rows["user_role"],
+                    valid_rows["user_icon"],
+                    password_hashes,
+                )
+            },
+        )
+        insert_seconds = time.perf_counter() - insert_start_time
+
+        seconds = time.perf_counter() - start_time
+        failed_rows = errors[errors != ""]
+        result = {
+            "total": len(df),
+            "imported": imported,
+            "failed": len(failed_rows),
+            "errors": [
+                {"row": int(row), "user_name": df.at[row, "user_name"], "reason": reason}
+                for row, reason in failed_rows.items()
+            ],
+            "seconds": round(seconds, 3),
+            "validate_seconds": round(validate_seconds, 3),
+            "hash_seconds": round(hash_seconds, 3),
+            "insert_seconds": round(insert_seconds, 3),
+            "rows_per_second": round(len(df) / seconds, 1) if seconds else 0.0,
+        }
+
+        with self.lock:
+            self.counters["imports"] += 1
+            self.counters["imported_users"] += imported
+            self.counters["failed_rows"] += len(failed_rows)
+
+        logger.info(
+            f"用户批量导入完成: 共 {result['total']} 行，成功 {imported} 行，失败 {result['failed']} 行，"
+            f"耗时 {seconds:.3f}秒（密码散列 {hash_seconds:.3f}秒，{self.hash_workers} 进程）"
+        )
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取导入统计"""
+        with self.lock:
+            return {"hash_workers": self.hash_workers, **dict(self.counters)}
+
+
+# 全局用户导入器实例
+user_importer = UserImporter(
+    max_rows=BaseConfig.user_import_max_rows,
+    hash_workers=BaseConfig.user_import_hash_workers,
+)
+
+
+# 便捷函数
+def import_users_from_file(
+    contents: bytes,
+    filename: str,
+    on_progress: Optional[Callable[[int, str], None]] = None,
+) -> Dict[str, Any]:
+    """导入用户表文件"""
+    return user_importer.import_file(contents, filename, on_progress)
+
+
+def get_user_import_template() -> Tuple[str, str]:
+    """获取导入模板文件名及CSV内容"""
+    return "用户导入模板.csv", ",".join(TEMPLATE_COLUMNS) + "\n"
@@ -1,12 +1,80 @@
+import os
+from functools import wraps
 from peewee import SqliteDatabase, Model
 from feffery_dash_utils.version_utils import check_dependencies_version
 from playhouse.pool import PooledPostgresqlExtDatabase, PooledMySQLDatabase
 
 from configs.database_config import DatabaseConfig
+from core.query_monitor.query_monitor import query_monitor
+from core.replica_router.replica_router import replica_router, DEFAULT_LAG_QUERIES
+from core.performance_monitor.performance_monitor import performance_monitor
 
 
-def get_db():
-    """根据配置参数，创建数据库连接对象"""
+class ReusedConnectionContext:
+    """退出时不关闭连接的连接上下文，配合ThreadLocalSqliteDatabase使用"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        # 进程fork后不可继续使用父进程中打开的sqlite连接
+        if self.db.owner_pid != os.getpid():
+            self.db._state.reset()
+            self.db.owner_pid = os.getpid()
+
+        if self.db.is_closed():
+            self.db.connect()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            with ReusedConnectionContext(self.db):
+                return fn(*args, **kwargs)
+
+        return inner
+
+
+class ThreadLocalSqliteDatabase(SqliteDatabase):
+    """每个线程复用同一个连接的sqlite数据库对象，避免每次操作重复建立连接和执行pragma"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.owner_pid = os.getpid()
+
+    def connection_context(self):
+        return ReusedConnectionContext(self)
+
+
+def get_sqlite_db(sqlite_config: dict = None):
+    """根据sqlite配置参数，创建sqlite数据库连接对象"""
+
+    sqlite_config = sqlite_config or DatabaseConfig.sqlite_config
+
+    database_class = (
+        ThreadLocalSqliteDatabase
+        if sqlite_config.get("connection_policy") == "thread_local"
+        else SqliteDatabase
+    )
+
+    return database_class(
+        sqlite_config["database"],
+        pragmas=sqlite_config.get("pragmas") or {},
+    )
+
+
+def get_db(connection_config: dict = None, max_connections: int = None):
+    """
+    根据配置参数，创建数据库连接对象
+
+    Args:
+        connection_config: 连接配置参数，为None时使用主库配置
+        max_connections: 连接池大小，为None时使用主库连接池大小
+    """
+
+    max_connections = max_connections or DatabaseConfig.primary_max_connections
 
     if DatabaseConfig.database_type == "postgresql":
         # 必要依赖检查
@@ -18,14 +86,16 @@ def get_db():
             ]
         )
 
+        postgresql_config = connection_config or DatabaseConfig.postgresql_config
+
         # 返回postgresql类型连接池对象
         return PooledPostgresqlExtDatabase(
-            host=DatabaseConfig.postgresql_config["host"],
-            port=DatabaseConfig.postgresql_config["port"],
-            user=DatabaseConfig.postgresql_config["user"],
-            password=DatabaseConfig.postgresql_config["password"],
-            database=DatabaseConfig.postgresql_config["database"],
-            max_connections=32,
+            host=postgresql_config["host"],
+            port=postgresql_config["port"],
+            user=postgresql_config["user"],
+            password=postgresql_config["password"],
+            database=postgresql_config["database"],
+            max_connections=max_connections,
             stale_timeout=300,
         )
 
@@ -39,24 +109,73 @@ def get_db():
             ]
         )
 
+        mysql_config = connection_config or DatabaseConfig.mysql_config
+
         # 返回mysql类型连接池对象
         return PooledMySQLDatabase(
-            host=DatabaseConfig.mysql_config["host"],
-            port=DatabaseConfig.mysql_config["port"],
-            user=DatabaseConfig.mysql_config["user"],
-            passwd=DatabaseConfig.mysql_config["password"],
-            database=DatabaseConfig.mysql_config["database"],
-            max_connections=32,
+            host=mysql_config["host"],
+            port=mysql_config["port"],
+            user=mysql_config["user"],
+            passwd=mysql_config["password"],
+            database=mysql_config["database"],
+            max_connections=max_connections,
             stale_timeout=300,
         )
 
-    # 默认返回sqlite类型连接对象
-    return SqliteDatabase("yyAsistant.db")
+    # 默认返回sqlite类型连接对象，副本未指定的参数沿用主库配置
+    return get_sqlite_db(
+        {**DatabaseConfig.sqlite_config, **connection_config}
+        if connection_config
+        else None
+    )
+
+
+def get_replica_dbs():
+    """根据只读副本配置参数，创建各副本的数据库连接对象"""
+
+    return [
+        get_db(
+            replica_config,
+            max_connections=replica_config.get("max_connections")
+            or DatabaseConfig.replica_max_connections,
+        )
+        for replica_config in DatabaseConfig.read_replicas
+    ]
 
 
 # 创建数据库连接对象
 db = get_db()
 
+# 挂载只读副本路由，需在查询耗时统计之前挂载，以便统计同样覆盖发往副本的查询
+if DatabaseConfig.read_replicas:
+    replica_router.install(
+        db,
+        get_replica_dbs(),
+        lag_query=DatabaseConfig.replica_lag_query
+        or DEFAULT_LAG_QUERIES.get(DatabaseConfig.database_type),
+    )
+    performance_monitor.register_collector("replica_router", replica_router.get_stats)
+
+# 挂载查询耗时统计，统计结果通过PerformanceMonitor对外提供
+if DatabaseConfig.enable_query_monitor:
+    query_monitor.instrument(db, caller_root=os.path.dirname(os.path.abspath(__file__)))
+    performance_monitor.register_collector("database", query_monitor.get_stats)
+
+
+def reset_db_connections():
+    """
+    丢弃从父进程继承的数据库连接，供fork出的子进程在执行查询前调用，后续查询重新建立连接
+    继承的连接不关闭，避免关闭父进程仍在使用的连接
+    """
+
+    for database in [db, *replica_router.replicas]:
+        database._state.reset()
+        if hasattr(database, "_in_use"):
+            database._connections = []
+            database._in_use = {}
+        if isinstance(database, ThreadLocalSqliteDatabase):
+            database.owner_pid = os.getpid()
+
 
 class BaseModel(Model):
     """数据库表模型基类"""
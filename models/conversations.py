@@ -5,6 +5,8 @@ import time
 from typing import Union, Dict, List
 
 from . import db, BaseModel
+from core.replica_router.replica_router import read_only
+from core.usage_rollup.usage_rollup import record_usage
 from .exceptions import InvalidConversationError, ExistingConversationError
 from utils.log import log
 
@@ -38,6 +40,7 @@ class Conversations(BaseModel):
             return cls.get_or_none(cls.conversation_id == conversation_id)
 
     @classmethod
+    @read_only
     def get_conversation_by_conv_id(cls, conv_id: str):
         """根据conv_id查询会话信息"""
         
@@ -45,12 +48,32 @@ class Conversations(BaseModel):
             return cls.get_or_none(cls.conv_id == conv_id)
 
     @classmethod
+    @read_only
     def get_user_conversations(cls, user_id: str):
         """获取指定用户的所有会话"""
         
         with db.connection_context():
             return list(cls.select().where(cls.user_id == user_id).order_by(cls.conv_time.desc()).dicts())
 
+    @classmethod
+    @read_only
+    def get_user_conversation_names(cls, user_id: str):
+        """获取指定用户的全部会话id及名称，按创建时间倒序，不读取会话记忆，用于渲染会话列表"""
+
+        with db.connection_context():
+            return list(
+                cls.select(cls.conv_id, cls.conv_name)
+                .where(cls.user_id == user_id)
+                .order_by(cls.conv_time.desc())
+                .dicts()
+            )
+
+    @staticmethod
+    def default_conv_name():
+        """生成默认会话名称"""
+
+        return f"新会话-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
     @classmethod
     def get_all_conversations(cls):
         """获取所有会话信息"""
@@ -58,6 +81,35 @@ class Conversations(BaseModel):
         with db.connection_context():
             return list(cls.select().dicts())
 
+    @classmethod
+    @read_only
+    def get_conversations_after(cls, after_id: int = None, limit: int = 500):
+        """按conversation_id升序获取after_id之后的若干会话，用于键集分页遍历全部会话"""
+
+        with db.connection_context():
+            query = cls.select(
+                cls.conversation_id, cls.user_id, cls.conv_time, cls.conv_memory
+            )
+            if after_id is not None:
+                query = query.where(cls.conversation_id > after_id)
+            return list(query.order_by(cls.conversation_id).limit(limit).dicts())
+
+    @classmethod
+    def iter_conversation_chunks(cls, chunk_size: int = 500):
+        """按conversation_id分块迭代全部会话，迭代过程中不长期占用数据库连接"""
+
+        after_id = None
+        while True:
+            chunk = cls.get_conversations_after(after_id, limit=chunk_size)
+            if not chunk:
+                return
+
+            yield chunk
+
+            if len(chunk) < chunk_size:
+                return
+            after_id = chunk[-1]["conversation_id"]
+
     @classmethod
     def add_conversation(
         cls,
@@ -74,11 +126,10 @@ class Conversations(BaseModel):
 
             # 生成conv_id和默认conv_name
             current_time_ms = int(time.time() * 1000)
-            current_time_str = datetime.now().strftime('%Y%m%d%H%M%S')
             conv_id = f"conv-{user_id}-{current_time_ms}"
             
             if not conv_name:
-                conv_name = f"新会话-{current_time_str}"
+                conv_name = cls.default_conv_name()
             
             # 获取当前时间，格式化为YYYY-MM-DD HH:mm:ss
             conv_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -96,7 +147,9 @@ class Conversations(BaseModel):
                     conv_time=conv_time,
                     conv_memory=conv_memory
                 )
-                return conv_id
+
+            record_usage(user_id, conversations=1)
+            return conv_id
 
     @classmethod
     def delete_conversation(cls, conversation_id: int):
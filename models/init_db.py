@@ -6,11 +6,15 @@ from configs import AuthConfig
 from models.conversations import Conversations
 from models.logs import LoginLogs
 from models.users import Users
+from models.voice_transcripts import VoiceCallTranscripts
+from models.usage_stats import UserDailyUsage, TopicDailyClicks, UserUsageMeter
 
 # 创建表（如果表不存在）
 db.create_tables([Users])
 db.create_tables([LoginLogs])
 db.create_tables([Conversations])
+db.create_tables([VoiceCallTranscripts])
+db.create_tables([UserDailyUsage, TopicDailyClicks, UserUsageMeter])
 
 
 if __name__ == "__main__":
@@ -1,13 +1,48 @@
-from typing import List, Literal
-from peewee import AutoField, CharField, DateTimeField
+import re
+import time
+import threading
+from functools import reduce
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Union
+from peewee import AutoField, CharField, DateTimeField, Entity, Tuple, Value
 
 from models import BaseModel, db
+from core.replica_router.replica_router import read_only
+from configs.database_config import DatabaseConfig
+
+# 本进程内缓存的日志总记录数，由增删操作增量维护
+_count_cache = {"value": None, "refreshed_at": 0.0}
+_count_lock = threading.Lock()
+
+# 用户名前缀检索时的区间上界后缀，使前缀检索可以走user_name索引
+_PREFIX_UPPER_BOUND_SUFFIX = "\uffff"
+
+# 按月分区表名前缀，分区表名形如loginlogs_p202610
+_PARTITION_TABLE_PREFIX = "loginlogs_p"
+_PARTITION_TABLE_PATTERN = re.compile(r"^loginlogs_p(\d{6})$")
+
+# 启用分区前的原始登录日志表对应的分区标识，排序时视为最早的分区
+LEGACY_PARTITION = "000000"
+
+# 查询结果中标识记录所在分区的列名
+PARTITION_COLUMN = "log_partition"
+
+# 本进程内缓存的已存在分区列表，及各分区对应的模型类
+_partition_cache = {"partitions": None, "refreshed_at": 0.0}
+_partition_models = {}
+_partition_lock = threading.Lock()
 
 
 class LoginLogs(BaseModel):
-    """登录日志表模型类"""
+    """
+    登录日志表模型类
+
+    开启DatabaseConfig.login_logs_partitioning后，新记录按登录时间写入按月分区的
+    loginlogs_pYYYYMM表，本模型对应的原始表作为LEGACY_PARTITION分区继续参与查询，
+    各查询方法统一在全部分区上执行，过期分区整表删除
+    """
 
-    # 记录id，主键，自增
+    # 记录id，主键，自增，仅在所在分区内唯一
     id = AutoField()
 
     # 登录用户名称
@@ -31,14 +66,262 @@ class LoginLogs(BaseModel):
     # 登录时间
     login_datetime = DateTimeField()
 
+    class Meta:
+        # 与各可排序字段对应的联合索引，以id作为排序的唯一性补充，支撑键集分页
+        # 其中(user_name, id)同时用于用户名前缀检索，分区表继承相同的索引
+        indexes = (
+            (("login_datetime", "id"), False),
+            (("user_name", "id"), False),
+            (("status", "id"), False),
+        )
+
+    @staticmethod
+    def get_partition_key(login_datetime: Union[str, datetime]) -> str:
+        """根据登录时间计算所属分区标识，形如'202610'"""
+
+        if isinstance(login_datetime, datetime):
+            return login_datetime.strftime("%Y%m")
+        return login_datetime[:7].replace("-", "")
+
+    @classmethod
+    def _partition_model(cls, partition: str):
+        """获取指定分区对应的模型类"""
+
+        if partition == LEGACY_PARTITION:
+            return LoginLogs
+
+        model = _partition_models.get(partition)
+        if model is None:
+            with _partition_lock:
+                model = _partition_models.get(partition)
+                if model is None:
+                    model = _partition_models[partition] = type(
+                        "LoginLogs{}".format(partition),
+                        (LoginLogs,),
+                        {
+                            "Meta": type(
+                                "Meta",
+                                (),
+                                {"table_name": _PARTITION_TABLE_PREFIX + partition},
+                            ),
+                            "__module__": __name__,
+                        },
+                    )
+        return model
+
+    @classmethod
+    def get_partitions(cls, refresh: bool = False) -> List[str]:
+        """获取当前存在的全部分区标识，按时间升序排列，原始表分区始终位于首位"""
+
+        with _partition_lock:
+            if (
+                not refresh
+                and _partition_cache["partitions"] is not None
+                and time.monotonic() - _partition_cache["refreshed_at"]
+                < DatabaseConfig.login_logs_partition_refresh_interval
+            ):
+                return list(_partition_cache["partitions"])
+
+        with db.connection_context():
+            tables = db.get_tables()
+
+        partitions = [LEGACY_PARTITION] + sorted(
+            match.group(1)
+            for match in map(_PARTITION_TABLE_PATTERN.match, tables)
+            if match
+        )
+
+        with _partition_lock:
+            _partition_cache["partitions"] = partitions
+            _partition_cache["refreshed_at"] = time.monotonic()
+
+        return list(partitions)
+
+    @classmethod
+    def _ensure_partition(cls, partition: str):
+        """确保分区表存在，返回对应的模型类"""
+
+        model = cls._partition_model(partition)
+        if partition not in cls.get_partitions():
+            with db.connection_context():
+                model.create_table(safe=True)
+            with _partition_lock:
+                if partition not in _partition_cache["partitions"]:
+                    _partition_cache["partitions"] = sorted(
+                        _partition_cache["partitions"] + [partition]
+                    )
+        return model
+
+    @staticmethod
+    def get_log_key(row: Dict[str, Any]) -> str:
+        """获取记录在全部分区中唯一的标识，原始表分区的记录直接使用id"""
+
+        if row[PARTITION_COLUMN] == LEGACY_PARTITION:
+            return str(row["id"])
+        return "{}-{}".format(row[PARTITION_COLUMN], row["id"])
+
     @classmethod
-    def get_count(cls) -> int:
-        """获取日志记录总数"""
+    @read_only
+    def get_count(cls, refresh: bool = False) -> int:
+        """获取日志记录总数，优先使用本进程内增量维护的缓存值"""
 
+        with _count_lock:
+            if (
+                not refresh
+                and _count_cache["value"] is not None
+                and time.monotonic() - _count_cache["refreshed_at"]
+                < DatabaseConfig.login_logs_count_refresh_interval
+            ):
+                return _count_cache["value"]
+
+        partitions = cls.get_partitions(refresh=refresh)
         with db.connection_context():
-            return cls.select().count()
+            count = sum(
+                cls._partition_model(partition).select().count()
+                for partition in partitions
+            )
+
+        with _count_lock:
+            _count_cache["value"] = count
+            _count_cache["refreshed_at"] = time.monotonic()
+
+        return count
 
     @classmethod
+    def _adjust_count(cls, delta: int = None, value: int = None):
+        """增量更新缓存的日志记录总数，均为None时令缓存失效"""
+
+        with _count_lock:
+            if value is not None:
+                _count_cache["value"] = value
+                _count_cache["refreshed_at"] = time.monotonic()
+            elif delta is None:
+                _count_cache["value"] = None
+            elif _count_cache["value"] is not None:
+                _count_cache["value"] = max(_count_cache["value"] + delta, 0)
+
+    @staticmethod
+    def get_seek_key(
+        row: Dict[str, Any],
+        order_by: Literal["id", "user_name", "status", "login_datetime"] = "id",
+    ) -> list:
+        """根据某页最后一条记录，构造可JSON序列化的键集分页游标"""
+
+        if order_by == "id":
+            return [row[PARTITION_COLUMN], row["id"]]
+
+        value = row[order_by]
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        return [value, row[PARTITION_COLUMN], row["id"]]
+
+    @classmethod
+    def _prune_partitions(
+        cls,
+        partitions: List[str],
+        order_by: str,
+        order: str,
+        after: list = None,
+        start_datetime: datetime = None,
+        end_datetime: datetime = None,
+    ) -> List[str]:
+        """根据时间范围及键集分页游标，排除不可能包含目标记录的分区"""
+
+        lower = start_datetime and cls.get_partition_key(start_datetime)
+        upper = end_datetime and cls.get_partition_key(end_datetime)
+
+        # 按登录时间排序时，游标所在月份之前（按排序方向）的分区均已读取完毕
+        if after and order_by == "login_datetime":
+            cursor_partition = cls.get_partition_key(after[0])
+            if order == "ascend":
+                lower = max(lower or cursor_partition, cursor_partition)
+            else:
+                upper = min(upper or cursor_partition, cursor_partition)
+
+        partitions = [
+            partition
+            for partition in partitions
+            # 原始表分区时间范围不确定，不参与按月裁剪
+            if partition == LEGACY_PARTITION
+            or ((not lower or partition >= lower) and (not upper or partition <= upper))
+        ]
+
+        # 按id（即分区+分区内id）排序时，游标所在分区之前（按排序方向）的分区均已读取完毕
+        if after and order_by == "id":
+            cursor_partition = after[0]
+            partitions = [
+                partition
+                for partition in partitions
+                if (
+                    partition >= cursor_partition
+                    if order == "ascend"
+                    else partition <= cursor_partition
+                )
+            ]
+
+        return partitions
+
+    @classmethod
+    def _partition_select(
+        cls,
+        partition: str,
+        order_by: str,
+        order: str,
+        user_name_keyword: str = None,
+        after: list = None,
+        start_datetime: datetime = None,
+        end_datetime: datetime = None,
+    ):
+        """构造单个分区上的查询，过滤及游标条件均下推至分区内以利用索引"""
+
+        model = cls._partition_model(partition)
+        query = model.select(model, Value(partition).alias(PARTITION_COLUMN))
+
+        # 若用户名关键词检索条件有效，以前缀区间检索以利用索引
+        if user_name_keyword:
+            query = query.where(
+                (model.user_name >= user_name_keyword)
+                & (model.user_name < user_name_keyword + _PREFIX_UPPER_BOUND_SUFFIX)
+            )
+        # 若时间范围条件有效
+        if start_datetime:
+            query = query.where(model.login_datetime >= start_datetime)
+        if end_datetime:
+            query = query.where(model.login_datetime <= end_datetime)
+
+        # 若键集分页游标有效，将(排序字段, 分区, id)上的游标比较展开为分区内条件
+        if after:
+            ascend = order == "ascend"
+            if order_by == "id":
+                cursor_partition, cursor_id = after
+                if partition == cursor_partition:
+                    query = query.where(
+                        model.id > cursor_id if ascend else model.id < cursor_id
+                    )
+            else:
+                value, cursor_partition, cursor_id = after
+                if order_by == "login_datetime":
+                    value = datetime.fromisoformat(value)
+                sort_field = getattr(model, order_by)
+                if partition == cursor_partition:
+                    query = query.where(
+                        Tuple(sort_field, model.id) > Tuple(value, cursor_id)
+                        if ascend
+                        else Tuple(sort_field, model.id) < Tuple(value, cursor_id)
+                    )
+                elif (partition > cursor_partition) == ascend:
+                    query = query.where(
+                        sort_field >= value if ascend else sort_field <= value
+                    )
+                else:
+                    query = query.where(
+                        sort_field > value if ascend else sort_field < value
+                    )
+
+        return query
+
+    @classmethod
+    @read_only
     def get_logs(
         cls,
         limit: int = None,
@@ -46,27 +329,88 @@ class LoginLogs(BaseModel):
         order_by: Literal["id", "user_name", "status", "login_datetime"] = "id",
         order: Literal["ascend", "descend"] = "descend",
         user_name_keyword: str = None,
+        after: list = None,
+        start_datetime: datetime = None,
+        end_datetime: datetime = None,
     ):
-        """条件性获取日志记录"""
+        """
+        条件性获取日志记录
+
+        传入after（上一页最后一条记录对应的get_seek_key()结果）时使用键集分页，
+        此时offset为相对该游标继续跳过的记录数；按id排序即按(分区, 分区内id)排序。
+        传入时间范围时，范围之外的分区不参与查询
+        """
+
+        order_by = order_by or "id"
+        order = order or "descend"
+
+        partitions = cls._prune_partitions(
+            cls.get_partitions(),
+            order_by,
+            order,
+            after=after,
+            start_datetime=start_datetime,
+            end_datetime=end_datetime,
+        )
+
+        if not partitions:
+            return []
 
         with db.connection_context():
-            # 构造查询
-            query = cls.select()
-            # 若用户名关键词检索条件有效
-            if user_name_keyword:
-                query = query.where(cls.user_name.contains(user_name_keyword))
-            # 若排序条件有效
-            if order_by and order:
-                if order == "ascend":
-                    query = query.order_by(getattr(cls, order_by))
-                else:
-                    query = query.order_by(getattr(cls, order_by).desc())
+            # 各分区查询以UNION ALL合并
+            query = reduce(
+                lambda left, right: left + right,
+                [
+                    cls._partition_select(
+                        partition,
+                        order_by,
+                        order,
+                        user_name_keyword=user_name_keyword,
+                        after=after,
+                        start_datetime=start_datetime,
+                        end_datetime=end_datetime,
+                    )
+                    for partition in partitions
+                ],
+            )
+
+            # 以(分区, id)作为相同排序值时的次级排序，保证分页结果稳定
+            sort_columns = [Entity(PARTITION_COLUMN), Entity("id")]
+            if order_by != "id":
+                sort_columns.insert(0, Entity(order_by))
+            if order == "ascend":
+                query = query.order_by(*sort_columns)
+            else:
+                query = query.order_by(*[column.desc() for column in sort_columns])
+
             # 若分页相关参数有效
-            if limit and offset:
-                query = query.limit(limit).offset(offset)
+            if limit is not None:
+                query = query.limit(limit).offset(offset or 0)
             # 返回查询结果
             return list(query.dicts())
 
+    @classmethod
+    def iter_log_chunks(cls, chunk_size: int = 1000):
+        """
+        按id倒序分块迭代全部日志记录，每块均以键集分页单独查询，
+        迭代过程中不长期占用数据库连接，内存占用与总记录数无关
+        """
+
+        after = None
+        while True:
+            chunk = cls.get_logs(limit=chunk_size, offset=0, after=after)
+            if not chunk:
+                return
+
+            # 在交给调用方之前计算下一块的键集分页位置，调用方可能原地修改返回的记录
+            last_chunk = len(chunk) < chunk_size
+            after = cls.get_seek_key(chunk[-1])
+
+            yield chunk
+
+            if last_chunk:
+                return
+
     @classmethod
     def add_log(
         cls,
@@ -80,10 +424,9 @@ class LoginLogs(BaseModel):
     ):
         """添加日志记录"""
 
-        with db.connection_context():
-            # 执行日志记录添加操作
-            with db.atomic():
-                cls.create(
+        cls.add_logs(
+            [
+                dict(
                     user_name=user_name,
                     user_id=user_id,
                     ip=ip,
@@ -92,22 +435,134 @@ class LoginLogs(BaseModel):
                     status=status,
                     login_datetime=login_datetime,
                 )
+            ]
+        )
+
+    @classmethod
+    def add_logs(cls, logs: List[Dict[str, Any]], chunk_size: int = 100) -> int:
+        """在单个事务中批量添加日志记录，按登录时间路由至对应分区"""
+
+        if not logs:
+            return 0
+
+        # 按目标分区分组
+        partition_logs = {}
+        for log in logs:
+            partition = (
+                cls.get_partition_key(log["login_datetime"])
+                if DatabaseConfig.login_logs_partitioning
+                else LEGACY_PARTITION
+            )
+            partition_logs.setdefault(partition, []).append(log)
+
+        models = {
+            partition: cls._ensure_partition(partition) for partition in partition_logs
+        }
+
+        with db.connection_context():
+            with db.atomic():
+                for partition, items in partition_logs.items():
+                    for i in range(0, len(items), chunk_size):
+                        models[partition].insert_many(items[i : i + chunk_size]).execute()
+
+        cls._adjust_count(len(logs))
+
+        return len(logs)
 
     @classmethod
     def delete_logs(cls, log_ids: List[str]):
-        """删除指定日志记录"""
+        """删除指定日志记录，log_ids为get_log_key()对应的记录标识"""
 
+        # 按所在分区分组
+        partition_ids = {}
+        for log_id in log_ids:
+            partition, _, record_id = str(log_id).rpartition("-")
+            partition_ids.setdefault(partition or LEGACY_PARTITION, []).append(
+                int(record_id)
+            )
+
+        deleted_count = 0
         with db.connection_context():
             with db.atomic():
-                cls.delete().where(cls.id << log_ids).execute()
+                for partition, ids in partition_ids.items():
+                    model = cls._partition_model(partition)
+                    if model.table_exists():
+                        deleted_count += model.delete().where(model.id << ids).execute()
+
+        cls._adjust_count(-deleted_count)
 
     @classmethod
     def truncate_logs(cls):
         """清空日志记录"""
 
+        partitions = cls.get_partitions(refresh=True)
+
         with db.connection_context():
             with db.atomic():
                 cls.delete().execute()
+            db.drop_tables(
+                [
+                    cls._partition_model(partition)
+                    for partition in partitions
+                    if partition != LEGACY_PARTITION
+                ],
+                safe=True,
+            )
+
+        with _partition_lock:
+            _partition_cache["partitions"] = [LEGACY_PARTITION]
+            _partition_cache["refreshed_at"] = time.monotonic()
+
+        cls._adjust_count(value=0)
+
+    @classmethod
+    def drop_expired_partitions(cls, retention_months: int) -> Dict[str, Any]:
+        """
+        删除保留期之外的日志记录，保留当前月份在内的最近retention_months个月
+
+        按月分区整表删除，原始表分区中的过期记录按登录时间索引范围删除
+        """
+
+        if retention_months <= 0:
+            raise ValueError("登录日志保留月数必须为正整数")
+
+        now = datetime.now()
+        month_index = now.year * 12 + now.month - 1 - (retention_months - 1)
+        cutoff_datetime = datetime(month_index // 12, month_index % 12 + 1, 1)
+        cutoff_partition = cls.get_partition_key(cutoff_datetime)
+
+        expired_partitions = [
+            partition
+            for partition in cls.get_partitions(refresh=True)
+            if partition != LEGACY_PARTITION and partition < cutoff_partition
+        ]
+
+        with db.connection_context():
+            db.drop_tables(
+                [cls._partition_model(partition) for partition in expired_partitions],
+                safe=True,
+            )
+            with db.atomic():
+                legacy_deleted = (
+                    cls.delete().where(cls.login_datetime < cutoff_datetime).execute()
+                )
+
+        with _partition_lock:
+            _partition_cache["partitions"] = [
+                partition
+                for partition in _partition_cache["partitions"]
+                if partition not in expired_partitions
+            ]
+
+        # 整表删除的记录数未知，令总记录数缓存失效
+        if expired_partitions or legacy_deleted:
+            cls._adjust_count()
+
+        return {
+            "cutoff_datetime": cutoff_datetime,
+            "dropped_partitions": expired_partitions,
+            "legacy_deleted": legacy_deleted,
+        }
 
 
 # 创建表（如果表不存在）
@@ -0,0 +1,315 @@
+from datetime import date
+from typing import Dict, List
+from peewee import AutoField, CharField, DateField, FloatField, IntegerField, EXCLUDED, Case, fn
+
+from . import db, BaseModel
+from configs.database_config import DatabaseConfig
+from core.replica_router.replica_router import read_only
+
+# 用户每日使用汇总表中可累加的指标字段
+USER_DAILY_METRICS = ["messages", "user_messages", "conversations", "logins"]
+
+
+def _incoming(field):
+    """冲突更新子句中引用待插入行的字段值，MySQL不支持EXCLUDED，使用VALUES(col)"""
+
+    if DatabaseConfig.database_type == "mysql":
+        return fn.VALUES(field)
+    return getattr(EXCLUDED, field.name)
+
+
+def _on_conflict_update(query, conflict_target, update):
+    """为批量插入添加冲突时的更新子句，MySQL使用ON DUPLICATE KEY UPDATE，不支持指定conflict_target"""
+
+    if DatabaseConfig.database_type == "mysql":
+        return query.on_conflict(update=update)
+    return query.on_conflict(conflict_target=conflict_target, update=update)
+
+
+class UserDailyUsage(BaseModel):
+    """用户每日使用汇总表模型类"""
+
+    # 记录id，主键，自增
+    id = AutoField()
+
+    # 统计日期
+    stat_date = DateField()
+
+    # 用户id
+    user_id = CharField()
+
+    # 新增消息数，含用户消息及AI回复
+    messages = IntegerField(default=0)
+
+    # 用户发送的消息数
+    user_messages = IntegerField(default=0)
+
+    # 新建会话数
+    conversations = IntegerField(default=0)
+
+    # 成功登录次数
+    logins = IntegerField(default=0)
+
+    class Meta:
+        # (stat_date, user_id)唯一，作为增量累加的冲突键
+        indexes = ((("stat_date", "user_id"), True),)
+
+    @classmethod
+    def _upsert(cls, rows: List[Dict], accumulate: bool, chunk_size: int = 500) -> int:
+        """按(stat_date, user_id)写入汇总行，accumulate为True时累加已有数值，否则覆盖"""
+
+        if not rows:
+            return 0
+
+        update = {
+            getattr(cls, metric): (
+                getattr(cls, metric) + _incoming(getattr(cls, metric))
+                if accumulate
+                else _incoming(getattr(cls, metric))
+            )
+            for metric in USER_DAILY_METRICS
+        }
+
+        with db.connection_context():
+            with db.atomic():
+                for i in range(0, len(rows), chunk_size):
+                    _on_conflict_update(
+                        cls.insert_many(
+                            [
+                                {
+                                    "stat_date": row["stat_date"],
+                                    "user_id": row["user_id"],
+                                    **{metric: row.get(metric, 0) for metric in USER_DAILY_METRICS},
+                                }
+                                for row in rows[i : i + chunk_size]
+                            ]
+                        ),
+                        conflict_target=[cls.stat_date, cls.user_id],
+                        update=update,
+                    ).execute()
+
+        return len(rows)
+
+    @classmethod
+    def add_increments(cls, rows: List[Dict]) -> int:
+        """累加各用户每日指标增量"""
+
+        return cls._upsert(rows, accumulate=True)
+
+    @classmethod
+    def replace_rows(cls, rows: List[Dict]) -> int:
+        """以重新计算的结果覆盖各用户每日指标，用于历史数据回填"""
+
+        return cls._upsert(rows, accumulate=False)
+
+    @classmethod
+    @read_only
+    def get_daily_summary(cls, start_date: date, end_date: date) -> List[Dict]:
+        """按日汇总指定日期范围内的各项指标及活跃用户数"""
+
+        with db.connection_context():
+            return list(
+                cls.select(
+                    cls.stat_date,
+                    fn.SUM(cls.messages).alias("messages"),
+                    fn.SUM(cls.user_messages).alias("user_messages"),
+                    fn.SUM(cls.conversations).alias("conversations"),
+                    fn.SUM(cls.logins).alias("logins"),
+                    fn.SUM(
+                        Case(None, [((cls.messages > 0) | (cls.logins > 0), 1)], 0)
+                    ).alias("active_users"),
+                )
+                .where(cls.stat_date.between(start_date, end_date))
+                .group_by(cls.stat_date)
+                .order_by(cls.stat_date)
+                .dicts()
+            )
+
+    @classmethod
+    @read_only
+    def get_period_summary(cls, start_date: date, end_date: date) -> Dict:
+        """汇总指定日期范围内的各项指标及去重活跃用户数"""
+
+        with db.connection_context():
+            summary = (
+                cls.select(
+                    fn.COALESCE(fn.SUM(cls.messages), 0).alias("messages"),
+                    fn.COALESCE(fn.SUM(cls.user_messages), 0).alias("user_messages"),
+                    fn.COALESCE(fn.SUM(cls.conversations), 0).alias("conversations"),
+                    fn.COALESCE(fn.SUM(cls.logins), 0).alias("logins"),
+                )
+                .where(cls.stat_date.between(start_date, end_date))
+                .dicts()
+                .get()
+            )
+            summary["active_users"] = (
+                cls.select(cls.user_id)
+                .where(
+                    cls.stat_date.between(start_date, end_date),
+                    (cls.messages > 0) | (cls.logins > 0),
+                )
+                .distinct()
+                .count()
+            )
+            return summary
+
+    @classmethod
+    @read_only
+    def get_top_users(cls, start_date: date, end_date: date, limit: int = 10) -> List[Dict]:
+        """获取指定日期范围内消息数最多的若干用户"""
+
+        with db.connection_context():
+            return list(
+                cls.select(
+                    cls.user_id,
+                    fn.SUM(cls.messages).alias("messages"),
+                    fn.SUM(cls.user_messages).alias("user_messages"),
+                    fn.SUM(cls.conversations).alias("conversations"),
+                    fn.SUM(cls.logins).alias("logins"),
+                    fn.SUM(
+                        Case(None, [((cls.messages > 0) | (cls.logins > 0), 1)], 0)
+                    ).alias("active_days"),
+                )
+                .where(cls.stat_date.between(start_date, end_date))
+                .group_by(cls.user_id)
+                .order_by(fn.SUM(cls.messages).desc(), cls.user_id)
+                .limit(limit)
+                .dicts()
+            )
+
+    @classmethod
+    def truncate(cls, execute: bool = False):
+        """清空汇总表，请小心使用"""
+
+        if execute:
+            with db.connection_context():
+                with db.atomic():
+                    cls.delete().execute()
+
+
+class TopicDailyClicks(BaseModel):
+    """话题分类每日点击汇总表模型类"""
+
+    # 记录id，主键，自增
+    id = AutoField()
+
+    # 统计日期
+    stat_date = DateField()
+
+    # 话题分类名称
+    topic = CharField()
+
+    # 点击次数
+    clicks = IntegerField(default=0)
+
+    class Meta:
+        # (stat_date, topic)唯一，作为增量累加的冲突键
+        indexes = ((("stat_date", "topic"), True),)
+
+    @classmethod
+    def add_increments(cls, rows: List[Dict], chunk_size: int = 500) -> int:
+        """累加各话题分类每日点击次数增量"""
+
+        if not rows:
+            return 0
+
+        with db.connection_context():
+            with db.atomic():
+                for i in range(0, len(rows), chunk_size):
+                    _on_conflict_update(
+                        cls.insert_many(rows[i : i + chunk_size]),
+                        conflict_target=[cls.stat_date, cls.topic],
+                        update={cls.clicks: cls.clicks + _incoming(cls.clicks)},
+                    ).execute()
+
+        return len(rows)
+
+    @classmethod
+    @read_only
+    def get_distribution(cls, start_date: date, end_date: date) -> List[Dict]:
+        """获取指定日期范围内各话题分类的点击次数，按点击次数降序"""
+
+        with db.connection_context():
+            return list(
+                cls.select(cls.topic, fn.SUM(cls.clicks).alias("clicks"))
+                .where(cls.stat_date.between(start_date, end_date))
+                .group_by(cls.topic)
+                .order_by(fn.SUM(cls.clicks).desc())
+                .dicts()
+            )
+
+
+class UserUsageMeter(BaseModel):
+    """用户每日资源消耗计量表模型类"""
+
+    # 记录id，主键，自增
+    id = AutoField()
+
+    # 用户id
+    user_id = CharField()
+
+    # 统计日期
+    stat_date = DateField()
+
+    # 计量指标名称，全部可选项见core.usage_meter.usage_meter.METERED_METRICS
+    metric = CharField()
+
+    # 累计消耗量
+    value = FloatField(default=0)
+
+    class Meta:
+        # (user_id, stat_date, metric)唯一，作为增量累加的冲突键
+        indexes = ((("user_id", "stat_date", "metric"), True),)
+
+    @classmethod
+    def add_increments(cls, rows: List[Dict], chunk_size: int = 500) -> int:
+        """累加各用户每日各指标消耗增量"""
+
+        if not rows:
+            return 0
+
+        with db.connection_context():
+            with db.atomic():
+                for i in range(0, len(rows), chunk_size):
+                    _on_conflict_update(
+                        cls.insert_many(rows[i : i + chunk_size]),
+                        conflict_target=[cls.user_id, cls.stat_date, cls.metric],
+                        update={cls.value: cls.value + _incoming(cls.value)},
+                    ).execute()
+
+        return len(rows)
+
+    @classmethod
+    @read_only
+    def get_usage(
+        cls,
+        start_date: date,
+        end_date: date,
+        user_id: str = None,
+        metrics: List[str] = None,
+        by_day: bool = False,
+    ) -> List[Dict]:
+        """
+        查询指定日期范围内的消耗量
+
+        Args:
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            user_id: 用户id，为None时查询全部用户
+            metrics: 指标名称列表，为None时查询全部指标
+            by_day: 是否按日分别返回，否则按用户、指标汇总整个日期范围
+        """
+
+        with db.connection_context():
+            group_fields = [cls.user_id, cls.metric] + ([cls.stat_date] if by_day else [])
+            query = cls.select(*group_fields, fn.SUM(cls.value).alias("value")).where(
+                cls.stat_date.between(start_date, end_date)
+            )
+            if user_id is not None:
+                query = query.where(cls.user_id == user_id)
+            if metrics:
+                query = query.where(cls.metric.in_(metrics))
+
+            return list(
+                query.group_by(*group_fields).order_by(*group_fields).dicts()
+            )
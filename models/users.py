@@ -1,10 +1,12 @@
-from peewee import CharField
-from typing import Union, Dict, List
+from peewee import CharField, Tuple
+from typing import Union, Dict, List, Literal, Iterable
 from playhouse.sqlite_ext import JSONBField
 from werkzeug.security import check_password_hash
 
 from . import db, BaseModel
+from core.replica_router.replica_router import read_only
 from configs import AuthConfig
+from core.identity_cache.identity_cache import identity_cache
 from .exceptions import InvalidUserError, ExistingUserError
 
 
@@ -47,12 +49,116 @@ class Users(BaseModel):
             return cls.get_or_none(cls.user_name == user_name)
 
     @classmethod
+    @read_only
     def get_all_users(cls):
         """获取所有用户信息"""
 
         with db.connection_context():
             return list(cls.select().dicts())
 
+    @classmethod
+    def _filtered_query(
+        cls,
+        query,
+        user_name_keyword: str = None,
+        user_roles: Iterable[str] = None,
+        user_ids: Iterable[str] = None,
+    ):
+        """为查询追加筛选条件"""
+
+        # 若用户名关键词检索条件有效
+        if user_name_keyword:
+            query = query.where(cls.user_name.contains(user_name_keyword))
+        # 若用户角色筛选条件有效
+        if user_roles:
+            query = query.where(cls.user_role << list(user_roles))
+        # 若用户id范围有效
+        if user_ids is not None:
+            query = query.where(cls.user_id << list(user_ids))
+        return query
+
+    @classmethod
+    @read_only
+    def get_count(
+        cls,
+        user_name_keyword: str = None,
+        user_roles: Iterable[str] = None,
+        user_ids: Iterable[str] = None,
+    ) -> int:
+        """条件性获取用户数量"""
+
+        with db.connection_context():
+            return cls._filtered_query(
+                cls.select(),
+                user_name_keyword=user_name_keyword,
+                user_roles=user_roles,
+                user_ids=user_ids,
+            ).count()
+
+    @staticmethod
+    def get_seek_key(
+        user: Dict,
+        order_by: Literal["user_id", "user_name", "user_role"] = "user_id",
+    ) -> list:
+        """根据某页最后一条记录，构造键集分页游标"""
+
+        if order_by == "user_id":
+            return [user["user_id"]]
+        return [user[order_by], user["user_id"]]
+
+    @classmethod
+    @read_only
+    def query_page(
+        cls,
+        limit: int = None,
+        offset: int = None,
+        order_by: Literal["user_id", "user_name", "user_role"] = "user_id",
+        order: Literal["ascend", "descend"] = "ascend",
+        user_name_keyword: str = None,
+        user_roles: Iterable[str] = None,
+        after: list = None,
+    ):
+        """
+        条件性分页查询用户信息
+
+        传入after（上一页最后一条记录对应的get_seek_key()结果）时使用键集分页，
+        此时offset为相对该游标继续跳过的记录数
+
+        Returns:
+            (当前页用户信息列表, 满足筛选条件的用户总数)
+        """
+
+        with db.connection_context():
+            query = cls._filtered_query(
+                cls.select(),
+                user_name_keyword=user_name_keyword,
+                user_roles=user_roles,
+            )
+            total = query.count()
+
+            # 以user_id作为相同排序值时的次级排序，保证分页结果稳定
+            sort_field = getattr(cls, order_by or "user_id")
+            sort_fields = (
+                [sort_field] if sort_field is cls.user_id else [sort_field, cls.user_id]
+            )
+            if order == "descend":
+                query = query.order_by(*[field.desc() for field in sort_fields])
+            else:
+                query = query.order_by(*sort_fields)
+
+            # 若键集分页游标有效
+            if after:
+                if order == "descend":
+                    query = query.where(Tuple(*sort_fields) < Tuple(*after))
+                else:
+                    query = query.where(Tuple(*sort_fields) > Tuple(*after))
+
+            # 若分页相关参数有效
+            if limit is not None:
+                query = query.limit(limit).offset(offset or 0)
+
+            return list(query.dicts()), total
+
     @classmethod
     def check_user_password(cls, user_id: str, password: str):
         """校验用户密码"""
@@ -95,6 +201,44 @@ class Users(BaseModel):
                     user_icon=user_icon,
                 )
 
+    @classmethod
+    def get_existing_keys(cls, user_ids: Iterable[str], user_names: Iterable[str]):
+        """在单次查询中获取已存在的用户id及用户名集合"""
+
+        user_ids, user_names = list(user_ids), list(user_names)
+        if not (user_ids or user_names):
+            return set(), set()
+
+        with db.connection_context():
+            rows = (
+                cls.select(cls.user_id, cls.user_name)
+                .where((cls.user_id << user_ids) | (cls.user_name << user_names))
+                .tuples()
+            )
+            existing_user_ids, existing_user_names = set(), set()
+            for user_id, user_name in rows:
+                existing_user_ids.add(user_id)
+                existing_user_names.add(user_name)
+
+        return existing_user_ids, existing_user_names
+
+    @classmethod
+    def add_users(cls, users: List[Dict], chunk_size: int = 100) -> int:
+        """
+        在单个事务中批量添加用户，调用方需预先完成信息完整性及重复性校验，
+        校验后其他请求并发写入了重复的用户时整批回滚并抛出IntegrityError，由调用方重新校验后重试
+        """
+
+        if not users:
+            return 0
+
+        with db.connection_context():
+            with db.atomic():
+                for i in range(0, len(users), chunk_size):
+                    cls.insert_many(users[i : i + chunk_size]).execute()
+
+        return len(users)
+
     @classmethod
     def delete_user(cls, user_id: str):
         """删除用户"""
@@ -103,6 +247,28 @@ class Users(BaseModel):
             with db.atomic():
                 cls.delete().where(cls.user_id == user_id).execute()
 
+        # 失效该用户的身份缓存
+        identity_cache.invalidate(user_id)
+
+    @classmethod
+    def delete_users(cls, user_ids: List[str]) -> int:
+        """批量删除用户"""
+
+        if not user_ids:
+            return 0
+
+        with db.connection_context():
+            with db.atomic():
+                deleted_count = (
+                    cls.delete().where(cls.user_id << list(user_ids)).execute()
+                )
+
+        # 失效相关用户的身份缓存
+        for user_id in user_ids:
+            identity_cache.invalidate(user_id)
+
+        return deleted_count
+
     @classmethod
     def truncate_users(cls, execute: bool = False):
         """清空用户，请小心使用"""
@@ -113,6 +279,8 @@ class Users(BaseModel):
                 with db.atomic():
                     cls.delete().execute()
 
+                identity_cache.clear()
+
     @classmethod
     def update_user(cls, user_id: str, **kwargs):
         """更新用户信息"""
@@ -121,5 +289,8 @@ class Users(BaseModel):
             with db.atomic():
                 cls.update(**kwargs).where(cls.user_id == user_id).execute()
 
+            # 失效该用户的身份缓存
+            identity_cache.invalidate(user_id)
+
             # 返回成功更新后的用户信息
             return cls.get_or_none(cls.user_id == user_id)
@@ -0,0 +1,192 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+from peewee import AutoField, CharField, DateTimeField, IntegerField
+from playhouse.sqlite_ext import JSONField
+
+from . import db, BaseModel
+from .conversations import Conversations
+
+
+class VoiceCallTranscripts(BaseModel):
+    """语音实时对话转录批次表模型类"""
+
+    # 记录id，主键，自增
+    id = AutoField()
+
+    # 语音通话会话id（每次通话唯一，由前端生成）
+    session_id = CharField()
+
+    # 批次序号，同一session_id内单调递增
+    seq = IntegerField()
+
+    # 关联的聊天会话id，可为空
+    conversation_id = CharField(null=True)
+
+    # 关联用户id
+    user_id = CharField(null=True)
+
+    # 本批次转录消息列表，JSON格式
+    messages = JSONField(null=True)
+
+    # 批次接收时间
+    created_at = DateTimeField()
+
+    class Meta:
+        # (session_id, seq)唯一，保证重复上传的批次幂等
+        indexes = ((("session_id", "seq"), True),)
+
+    @classmethod
+    def add_batches(cls, batches: List[Dict], chunk_size: int = 100) -> int:
+        """批量写入转录批次，已存在的(session_id, seq)将被忽略"""
+
+        if not batches:
+            return 0
+
+        with db.connection_context():
+            with db.atomic():
+                for i in range(0, len(batches), chunk_size):
+                    cls.insert_many(
+                        batches[i : i + chunk_size]
+                    ).on_conflict_ignore().execute()
+
+        return len(batches)
+
+    @classmethod
+    def get_session_batches(cls, session_id: str):
+        """按批次序号获取指定通话会话的全部批次"""
+
+        with db.connection_context():
+            return list(
+                cls.select()
+                .where(cls.session_id == session_id)
+                .order_by(cls.seq)
+                .dicts()
+            )
+
+    @classmethod
+    def get_session_messages(cls, session_id: str) -> List[Dict]:
+        """按批次顺序拼接指定通话会话的全部转录消息"""
+
+        messages = []
+        for batch in cls.get_session_batches(session_id):
+            messages.extend(batch["messages"] or [])
+
+        return messages
+
+    @staticmethod
+    def to_chat_message(message: Dict, session_id: str) -> Dict:
+        """将前端上传的转录消息转换为会话记忆中的聊天消息格式，并标记所属通话会话"""
+
+        timestamp = message.get("timestamp")
+        if isinstance(timestamp, (int, float)):
+            # 前端时间戳单位为秒，兼容毫秒
+            timestamp = datetime.fromtimestamp(
+                timestamp / 1000 if timestamp > 1e12 else timestamp
+            ).strftime("%Y-%m-%d %H:%M:%S")
+
+        return {
+            "role": message.get("role"),
+            "content": message.get("text", ""),
+            "timestamp": timestamp,
+            "id": message.get("message_id"),
+            "voice_call_session": session_id,
+        }
+
+    @classmethod
+    def merge_into_conversation(
+        cls,
+        session_id: str,
+        user_id: str,
+        conversation_id: str = None,
+        create: bool = False,
+        only_if_merged: bool = False,
+    ) -> Optional[str]:
+        """
+        将通话会话已落库的全部转录消息合并到关联聊天会话的会话记忆中
+
+        同一通话会话的消息整体替换，重复合并结果不变；多个worker进程缓冲的批次可能晚于通话结束落库，
+        此时以only_if_merged=True再次合并，仅更新已完成过合并的通话会话
+
+        Args:
+            session_id: 语音通话会话id
+            user_id: 用户id，聊天会话须属于该用户
+            conversation_id: 关联的聊天会话conv_id，为空时使用批次中记录的会话id
+            create: 找不到关联的聊天会话时是否新建会话
+            only_if_merged: 是否仅在该通话会话已合并过时才合并
+
+        Returns:
+            合并到的聊天会话conv_id，未合并时返回None
+        """
+
+        batches = None
+        if not conversation_id:
+            batches = cls.get_session_batches(session_id)
+            conversation_id = next(
+                (batch["conversation_id"] for batch in batches if batch["conversation_id"]),
+                None,
+            )
+
+        conv = (
+            Conversations.get_conversation_by_conv_id(conversation_id)
+            if conversation_id
+            else None
+        )
+        if conv is not None and conv.user_id != user_id:
+            return None
+
+        memory = conv.conv_memory if conv is not None and isinstance(conv.conv_memory, dict) else {}
+        merged_sessions = memory.get("voice_call_sessions", [])
+        if only_if_merged and session_id not in merged_sessions:
+            return None
+
+        if conv is None:
+            if not create:
+                return None
+            conversation_id = Conversations.add_conversation(
+                user_id=user_id,
+                conv_name=f'语音实时对话_{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}',
+            )
+            with db.connection_context():
+                cls.update(conversation_id=conversation_id).where(
+                    cls.session_id == session_id
+                ).execute()
+
+        if batches is None:
+            batches = cls.get_session_batches(session_id)
+
+        # 替换该通话会话此前合并的消息，保持其在会话中的原有位置
+        messages = memory.get("messages", [])
+        kept, position = [], None
+        for message in messages:
+            if message.get("voice_call_session") == session_id:
+                if position is None:
+                    position = len(kept)
+            else:
+                kept.append(message)
+        if position is None:
+            position = len(kept)
+
+        session_messages = [
+            cls.to_chat_message(message, session_id)
+            for batch in batches
+            for message in (batch["messages"] or [])
+        ]
+
+        Conversations.update_conversation_by_conv_id(
+            conversation_id,
+            conv_memory={
+                **memory,
+                "messages": kept[:position] + session_messages + kept[position:],
+                "voice_call_sessions": merged_sessions
+                + ([] if session_id in merged_sessions else [session_id]),
+            },
+        )
+        return conversation_id
+
+    @classmethod
+    def delete_session(cls, session_id: str):
+        """删除指定通话会话的全部转录批次"""
+
+        with db.connection_context():
+            with db.atomic():
+                cls.delete().where(cls.session_id == session_id).execute()
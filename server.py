@@ -1,5 +1,5 @@
 import dash
-from flask import request, Response, stream_with_context, jsonify
+from flask import request, Response, stream_with_context, jsonify, session, has_request_context
 from user_agents import parse
 from flask_principal import Principal, Permission, RoleNeed, identity_loaded
 from flask_login import LoginManager, UserMixin, current_user, AnonymousUserMixin
@@ -10,7 +10,21 @@ import threading
 from utils.log import log
 
 # 应用基础参数
+from models import reset_db_connections
 from models.users import Users
+from core.identity_cache.identity_cache import identity_cache
+from core.audit_log_writer.audit_log_writer import audit_log_writer
+from core.password_verifier.password_verifier import password_verifier
+from core.login_limiter.login_limiter import login_attempt_limiter
+from core.replica_router.replica_router import replica_router
+from core.usage_rollup.usage_rollup import usage_rollup
+from core.usage_meter.usage_meter import usage_meter, meter_usage
+from core.message_store.message_store import message_store
+from core.message_render_cache.message_render_cache import message_render_cache
+from core.layout_cache.layout_cache import layout_cache
+from core.callback_profiler.callback_profiler import callback_profiler
+from core.background_jobs.background_jobs import background_job_manager
+from core.performance_monitor.performance_monitor import performance_monitor
 from configs import BaseConfig, AuthConfig
 
 # 导入DashProxy和SSE
@@ -30,7 +44,9 @@ app = DashProxy(
         '/assets/css/ultra_small_screen.css'
     ],
     # 添加静态文件配置，避免dash_table字体文件404错误
-    serve_locally=True
+    serve_locally=True,
+    # 耗时回调（background=True）交由本地磁盘队列及工作进程池执行，不占用web工作进程
+    background_callback_manager=background_job_manager,
     # 注意：不在这里使用 assets_ignore，因为可能会阻止文件访问
     # 聊天相关的JS文件由 chat_page_loader.js 并行加载，即使 Dash 自动加载了它们
     # chat_page_loader.js 会检查文件是否已加载，避免重复加载
@@ -80,6 +96,68 @@ login_manager.init_app(app.server)
 # 为当前应用添加flask-principal权限管理
 principals = Principal(app.server)
 
+# 身份缓存命中统计通过PerformanceMonitor对外提供
+performance_monitor.register_collector("identity_cache", identity_cache.get_stats)
+
+# 登录日志异步写入队列统计
+performance_monitor.register_collector("audit_log_writer", audit_log_writer.get_stats)
+
+# 登录密码校验进程池及登录失败次数限制统计
+performance_monitor.register_collector("password_verifier", password_verifier.get_stats)
+performance_monitor.register_collector("login_attempt_limiter", login_attempt_limiter.get_stats)
+
+# 使用情况汇总统计
+performance_monitor.register_collector("usage_rollup", usage_rollup.get_stats)
+performance_monitor.register_collector("usage_meter", usage_meter.get_stats)
+
+# 服务端聊天消息存储统计
+performance_monitor.register_collector("message_store", message_store.get_stats)
+
+# 聊天消息渲染缓存统计
+performance_monitor.register_collector("message_render_cache", message_render_cache.get_stats)
+
+# 页面骨架缓存统计
+performance_monitor.register_collector("layout_cache", layout_cache.get_stats)
+
+# Dash回调性能分析：包装回调分发视图，统计各回调耗时、数据库耗时、负载大小及no_update比例
+callback_profiler.instrument(app)
+performance_monitor.register_collector("callback_profiler", callback_profiler.get_summary)
+
+# 后台回调任务队列统计
+performance_monitor.register_collector("background_jobs", background_job_manager.get_stats)
+
+
+def get_session_user_id():
+    """获取当前请求会话中的用户id，供只读副本路由判断读己之写，不触发用户加载"""
+
+    if has_request_context():
+        return session.get("_user_id")
+    return None
+
+
+def get_session_last_write():
+    """获取当前用户会话中记录的最近一次数据库写入时间"""
+
+    if has_request_context():
+        return session.get("_last_db_write")
+    return None
+
+
+def set_session_last_write(timestamp):
+    """在当前用户会话中记录最近一次数据库写入时间，随会话cookie传递到其他worker进程"""
+
+    if has_request_context():
+        session["_last_db_write"] = timestamp
+
+
+# 只读副本路由按会话记录最近写入时间，多worker部署时用户在任一进程写入后其他进程也读取主库
+replica_router.set_identity_getter(get_session_user_id)
+replica_router.set_last_write_store(get_session_last_write, set_session_last_write)
+
+# 后台回调任务按会话用户限制同时运行的任务数，工作进程启动时丢弃继承自web进程的数据库连接
+background_job_manager.set_identity_getter(get_session_user_id)
+background_job_manager.set_worker_initializer(reset_db_connections)
+
 
 class User(UserMixin):
     """flask-login专用用户类"""
@@ -110,23 +188,32 @@ def user_loader(user_id):
     ):
         return AnonymousUserMixin()
 
-    # 根据当前要加载的用户id，从数据库中获取匹配用户信息
-    match_user = Users.get_user(user_id)
+    # 优先从身份缓存中获取用户信息，同一会话的连续回调请求无需重复查询数据库
+    session_token = request.cookies.get(BaseConfig.session_token_cookie_name)
+    user_info = identity_cache.get(user_id, session_token) if BaseConfig.identity_cache_ttl else None
 
-    # 处理未匹配到有效用户的情况
-    if not match_user:
-        return AnonymousUserMixin()
+    if user_info is None:
+        cache_version = identity_cache.get_version(user_id)
 
-    # 当前用户实例化
-    user = User(
-        id=match_user.user_id,
-        user_name=match_user.user_name,
-        user_role=match_user.user_role,
-        user_icon=match_user.user_icon,
-        session_token=match_user.session_token,
-    )
+        # 根据当前要加载的用户id，从数据库中获取匹配用户信息
+        match_user = Users.get_user(user_id)
+
+        # 处理未匹配到有效用户的情况
+        if not match_user:
+            return AnonymousUserMixin()
+
+        user_info = {
+            "id": match_user.user_id,
+            "user_name": match_user.user_name,
+            "user_role": match_user.user_role,
+            "user_icon": match_user.user_icon,
+            "session_token": match_user.session_token,
+        }
+        if BaseConfig.identity_cache_ttl:
+            identity_cache.set(user_id, session_token, user_info, version=cache_version)
 
-    return user
+    # 当前用户实例化
+    return User(**user_info)
 
 
 # 定义不同用户角色
@@ -186,6 +273,182 @@ def check_browser():
                 )
 
 
+@app.server.route('/api/session/token-check', methods=['GET'])
+def check_session_token():
+    """重复登录辅助检查：判断当前请求携带的session_token是否仍为该用户最新的token"""
+    from core.session_registry.session_registry import session_registry
+
+    if not current_user.is_authenticated:
+        return jsonify({'valid': False})
+
+    return jsonify({
+        'valid': session_registry.is_current(
+            current_user.id,
+            request.cookies.get(BaseConfig.session_token_cookie_name),
+        )
+    })
+
+
+@app.server.route('/api/login-logs/export', methods=['GET'])
+def export_login_logs():
+    """流式导出登录日志，按块读取数据库并逐块写出，内存占用与记录总数无关"""
+    import io
+    import os
+    import csv
+    import tempfile
+    from datetime import datetime
+    from urllib.parse import quote
+    from models.logs import LoginLogs
+    from configs.database_config import DatabaseConfig
+
+    # 仅管理员可导出
+    if not current_user.is_authenticated or current_user.user_role != AuthConfig.admin_role:
+        return jsonify({'error': '无权限'}), 403
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        return jsonify({'error': '不支持的导出格式'}), 400
+
+    fields = ['id', 'user_name', 'user_id', 'ip', 'browser', 'os', 'status', 'login_datetime']
+    chunk_size = DatabaseConfig.login_logs_export_chunk_size
+
+    def format_row(item):
+        """基于副本格式化导出字段，不修改键集分页所依赖的原始记录"""
+        row = {
+            **item,
+            'id': LoginLogs.get_log_key(item),
+            'login_datetime': item['login_datetime'].strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        return [row[field] for field in fields]
+
+    def iter_rows():
+        for chunk in LoginLogs.iter_log_chunks(chunk_size=chunk_size):
+            yield [format_row(item) for item in chunk]
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for rows in iter_rows():
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+
+    def generate_xlsx():
+        # xlsx需整体打包为zip，先以只写模式逐行写入临时文件，再分块读出
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+        worksheet.append(fields)
+        for rows in iter_rows():
+            for row in rows:
+                worksheet.append(row)
+
+        file_descriptor, file_path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(file_descriptor)
+        try:
+            workbook.save(file_path)
+            with open(file_path, 'rb') as f:
+                while True:
+                    data = f.read(64 * 1024)
+                    if not data:
+                        break
+                    yield data
+        finally:
+            os.remove(file_path)
+
+    if export_format == 'xlsx':
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            return jsonify({'error': '导出xlsx需要安装openpyxl'}), 400
+
+    filename = '登录日志导出结果{}.{}'.format(
+        datetime.now().strftime('%Y%m%d%H%M%S'), export_format
+    )
+    return Response(
+        generate_xlsx() if export_format == 'xlsx' else generate_csv(),
+        mimetype=(
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            if export_format == 'xlsx'
+            else 'text/csv; charset=utf-8'
+        ),
+        headers={
+            'Content-Disposition': "attachment; filename*=UTF-8''{}".format(quote(filename)),
+            # 供前端展示导出进度
+            'X-Total-Count': str(LoginLogs.get_count()),
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
+@app.server.route('/api/usage/meters', methods=['GET'])
+def query_usage_meters():
+    """查询已落库的用户资源消耗，常规用户仅可查询本人，管理员可查询指定用户或全部用户"""
+    from datetime import date, timedelta
+    from core.usage_meter.usage_meter import METERED_METRICS
+
+    if not current_user.is_authenticated:
+        return jsonify({'error': '未登录'}), 401
+
+    try:
+        end_date = date.fromisoformat(request.args.get('end') or date.today().isoformat())
+        start_date = date.fromisoformat(
+            request.args.get('start') or (end_date - timedelta(days=29)).isoformat()
+        )
+    except ValueError:
+        return jsonify({'error': '日期格式应为YYYY-MM-DD'}), 400
+
+    metrics = [metric for metric in request.args.get('metrics', '').split(',') if metric]
+    if set(metrics) - set(METERED_METRICS):
+        return jsonify({'error': '不支持的计量指标', 'metrics': METERED_METRICS}), 400
+
+    # 管理员未指定用户时查询全部用户
+    if current_user.user_role == AuthConfig.admin_role:
+        user_id = request.args.get('user_id') or None
+    else:
+        user_id = current_user.id
+        if request.args.get('user_id') not in (None, '', user_id):
+            return jsonify({'error': '无权限'}), 403
+
+    return jsonify({
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'user_id': user_id,
+        'flush_interval': usage_meter.flush_interval,
+        'usage': usage_meter.get_usage(
+            start_date,
+            end_date,
+            user_id=user_id,
+            metrics=metrics or None,
+            by_day=request.args.get('by_day') in ('1', 'true'),
+        ),
+    })
+
+
+@app.server.route('/api/callbacks/profile', methods=['GET', 'DELETE'])
+def query_callback_profile():
+    """查询Dash回调性能统计：最热及最浪费的回调、各用户操作触发的回调扇出，DELETE请求重置统计，仅管理员可用"""
+
+    if not current_user.is_authenticated:
+        return jsonify({'error': '未登录'}), 401
+    if current_user.user_role != AuthConfig.admin_role:
+        return jsonify({'error': '无权限'}), 403
+
+    if request.method == 'DELETE':
+        callback_profiler.reset()
+        return jsonify({'reset': True})
+
+    try:
+        top = max(1, min(int(request.args.get('top', 20)), 200))
+    except ValueError:
+        return jsonify({'error': 'top应为整数'}), 400
+
+    return jsonify(callback_profiler.get_stats(top))
+
+
 # 添加测试页面路由
 @app.server.route('/test_audio_visualizer.html')
 def test_audio_visualizer():
@@ -218,6 +481,10 @@ def stream():
         personality_id = data.get('personality_id', 'health_assistant')
         
         log.debug(f"/stream端点参数解析完成 - message_id: {message_id}, session_id: {session_id}, personality_id: {personality_id}")
+
+        # 资源消耗按当前登录用户计量
+        user_id = current_user.id if current_user.is_authenticated else None
+        enable_voice = bool(data.get('enable_voice', False))
         
         @stream_with_context
         def generate():
@@ -226,6 +493,9 @@ def stream():
             start_time = time.time()
             timeout_seconds = 30  # 30秒超时
             last_activity_time = start_time
+            # 上游返回的token用量（通常位于最后一个数据块）及已推送的回复字符数
+            upstream_usage = {}
+            completion_chars = 0
             
             try:
                 # 使用yychat_client进行流式聊天完成
@@ -239,9 +509,11 @@ def stream():
                     personality_id=personality_id,  # 使用从请求参数中获取的值
                     use_tools=BaseConfig.yychat_default_use_tools,
                     # 透传语音相关上下文到下游，便于后端按方案B并行触发TTS
-                    enable_voice=data.get('enable_voice', False),
+                    enable_voice=enable_voice,
                     client_id=data.get('client_id'),
-                    message_id=message_id
+                    message_id=message_id,
+                    # 请求上游在流式响应末尾返回token用量，用于资源消耗计量
+                    stream_options={"include_usage": True}
                 ):
                     # 检查超时
                     current_time = time.time()
@@ -257,6 +529,9 @@ def stream():
                         yield f'data: {timeout_str}\n\n'
                         break
                     
+                    if isinstance(chunk, dict) and chunk.get('usage'):
+                        upstream_usage = chunk['usage']
+
                     if chunk:
                         last_activity_time = current_time
                         # 发送数据，包含message_id以识别目标消息
@@ -264,6 +539,7 @@ def stream():
                         if isinstance(chunk, dict) and 'choices' in chunk and chunk['choices']:
                             content = chunk['choices'][0].get('delta', {}).get('content', '')
                             if content:
+                                completion_chars += len(content)
                                 # 先创建JSON对象，再转换为字符串，避免多线f-string语法问题
                                 response_data = {
                                     "message_id": message_id,
@@ -297,6 +573,18 @@ def stream():
                 }
                 error_str = json.dumps(error_data)
                 yield f'data: {error_str}\n\n'
+            finally:
+                # 计量本次流式响应的资源消耗，客户端中途断开时同样计入
+                meter_usage(
+                    user_id,
+                    prompt_tokens=upstream_usage.get('prompt_tokens') or 0,
+                    completion_tokens=upstream_usage.get('completion_tokens') or 0,
+                    completion_chars=completion_chars,
+                    stream_requests=1,
+                    stream_seconds=time.time() - start_time,
+                    # 开启语音时回复内容将由下游进行语音合成
+                    tts_chars=completion_chars if enable_voice else 0,
+                )
         
         # 设置响应头，返回SSE格式的数据
         return Response(
@@ -398,3 +686,98 @@ def save_voice_call_messages():
     except Exception as e:
         log.error(f"处理保存请求失败: {e}")
         return jsonify({'error': f'处理失败: {str(e)}'}), 500
+
+
+# 新增：语音实时对话转录增量上传API端点
+@app.server.route('/api/voice-call/transcript-batch', methods=['POST'])
+def append_voice_call_transcript_batch():
+    """接收语音实时对话过程中分批上传的转录文本，按(session_id, seq)幂等"""
+    from configs.voice_config import VoiceConfig
+    from core.transcript_buffer.transcript_buffer import transcript_buffer
+    from models.conversations import Conversations
+    from models.voice_transcripts import VoiceCallTranscripts
+
+    try:
+        # 检查是否启用保存功能
+        if not (VoiceConfig.VOICE_CALL_SAVE_TO_DATABASE and VoiceConfig.VOICE_CALL_INCREMENTAL_SAVE):
+            return jsonify({'error': '语音实时对话转录增量保存未启用'}), 400
+
+        # 获取当前用户
+        if not current_user or not current_user.is_authenticated:
+            return jsonify({'error': '未登录'}), 401
+
+        # 获取请求数据
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'error': '请求数据为空'}), 400
+
+        session_id = data.get('session_id')
+        seq = data.get('seq')
+        messages = data.get('messages') or []
+        final = bool(data.get('final', False))
+
+        if not session_id:
+            return jsonify({'error': 'session_id不能为空'}), 400
+
+        if not isinstance(seq, int) or seq < 0:
+            return jsonify({'error': 'seq必须为非负整数'}), 400
+
+        if not isinstance(messages, list):
+            return jsonify({'error': 'messages必须为列表'}), 400
+
+        if len(messages) > VoiceConfig.VOICE_CALL_TRANSCRIPT_BATCH_MAX_MESSAGES:
+            return jsonify({'error': '单个批次消息数超过上限'}), 413
+
+        # 关联的聊天会话须属于当前用户
+        conversation_id = data.get('conversation_id')
+        if conversation_id:
+            conv = Conversations.get_conversation_by_conv_id(conversation_id)
+            if conv is None:
+                return jsonify({'error': '会话不存在'}), 404
+            if conv.user_id != current_user.id:
+                return jsonify({'error': '无权访问该会话'}), 403
+
+        accepted = True
+        if messages:
+            accepted = transcript_buffer.append(
+                session_id=session_id,
+                seq=seq,
+                messages=messages,
+                user_id=current_user.id,
+                conversation_id=conversation_id,
+            )
+
+        # 通话结束时立即落库当前缓冲区，剩余数据量很小，并将转录消息合并到聊天会话
+        # 其他worker进程中尚未落库的批次，由其落库时再次合并
+        if final:
+            transcript_buffer.flush()
+            conversation_id = VoiceCallTranscripts.merge_into_conversation(
+                session_id,
+                current_user.id,
+                conversation_id=conversation_id,
+                create=True,
+            )
+
+            # 计量通话时长，结束批次可能被客户端重试，按session_id仅计量一次
+            call_duration_ms = data.get('call_duration_ms')
+            if isinstance(call_duration_ms, (int, float)) and call_duration_ms > 0:
+                usage_meter.add_once(
+                    f"voice-call:{session_id}",
+                    current_user.id,
+                    voice_call_seconds=min(
+                        call_duration_ms / 1000, VoiceConfig.VOICE_CALL_MAX_METERED_SECONDS
+                    ),
+                )
+
+        return jsonify({
+            'status': 'success',
+            'session_id': session_id,
+            'seq': seq,
+            'duplicate': not accepted,
+            'final': final,
+            'conversation_id': conversation_id
+        }), 200
+
+    except Exception as e:
+        log.error(f"处理转录批次失败: {e}")
+        return jsonify({'error': f'处理失败: {str(e)}'}), 500
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+聊天历史增量更新 - 自动化测试脚本
+将聊天历史的Patch增量更新及虚拟滚动窗口Patch应用到已渲染的子元素列表上，检查结果与全量渲染一致
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from plotly.utils import PlotlyJSONEncoder
+
+# 项目根目录
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from configs.database_config import DatabaseConfig
+
+# 需在导入应用之前切换到临时数据库
+TEMP_DIR = tempfile.mkdtemp()
+DatabaseConfig.database_type = "sqlite"
+DatabaseConfig.sqlite_config = {
+    **DatabaseConfig.sqlite_config,
+    "database": os.path.join(TEMP_DIR, "test_chat_history_patch.db"),
+}
+DatabaseConfig.read_replicas = []
+
+from app import app  # noqa: E402,F401
+from configs.base_config import BaseConfig  # noqa: E402
+from core.message_store.message_store import MessageStore  # noqa: E402
+import callbacks.core_pages_c.chat_input_area_c as chat_input_area_c  # noqa: E402
+
+WINDOW_SIZE = 4
+
+
+def make_message(index, role="user", content=None):
+    return {
+        "id": f"m{index}",
+        "role": role,
+        "content": content or f"c{index}",
+        "timestamp": "2026-10-19 08:00:00",
+    }
+
+
+def normalize(children):
+    return json.loads(json.dumps(children, cls=PlotlyJSONEncoder))
+
+
+def apply_patch(children, patch):
+    """按Dash前端的语义将Patch中对子元素列表的操作依次应用"""
+    children = list(children)
+    for operation in patch.to_plotly_json()["operations"]:
+        location, params = operation["location"], operation["params"]
+        assert len(location) <= 1
+        if operation["operation"] == "Append":
+            children.append(params["value"])
+        elif operation["operation"] == "Prepend":
+            children.insert(0, params["value"])
+        elif operation["operation"] == "Delete":
+            del children[location[0]]
+        elif operation["operation"] == "Assign":
+            children[location[0]] = params["value"]
+        else:
+            raise AssertionError(f"未预期的Patch操作: {operation['operation']}")
+    return children
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = MessageStore(str(tmp_path / "message_store"))
+    monkeypatch.setattr(chat_input_area_c, "get_message_changes", store.get_changes)
+    monkeypatch.setattr(BaseConfig, "chat_history_window_size", WINDOW_SIZE)
+    return store
+
+
+def render(store, token, start=None, end=None):
+    return chat_input_area_c.render_full_chat_history(token, store.get(token), start, end)
+
+
+def assert_patch_matches_full_render(store, children, rendered, token):
+    result = chat_input_area_c.build_chat_history_patch(rendered, token)
+    assert result is not None
+    patch, state = result
+
+    expected_children, expected_state = render(store, token, state["start"], state["end"])
+    assert normalize(apply_patch(children, patch)) == normalize(expected_children)
+    assert {**state, "deleted": None} == {**expected_state, "deleted": None}
+    # 依次删除的消息下标与全量渲染时按变更记录获取的一致
+    assert state["deleted"] == chat_input_area_c.get_chat_history_deletions(rendered, token)
+    return state
+
+
+def test_history_patch_append_replace_delete(store):
+    token = store.create([make_message(index) for index in range(3)])
+    children, rendered = render(store, token)
+    assert (rendered["start"], rendered["end"]) == (0, 3)
+
+    token = store.append(token, make_message(3, "assistant"))
+    token = store.replace(token, make_message(1, content="edited"))
+    token = store.delete(token, "m0")
+    token = store.append(token, make_message(4), make_message(5, "assistant"))
+
+    state = assert_patch_matches_full_render(store, children, rendered, token)
+    # 超出窗口大小后卸载窗口开头的消息，仅挂载最近的消息
+    assert (state["start"], state["end"], state["count"]) == (1, 5, 5)
+    assert state["deleted"] == [0]
+
+
+def test_history_patch_delete_before_window(store):
+    token = store.create([make_message(index) for index in range(8)])
+    children, rendered = render(store, token)
+    assert (rendered["start"], rendered["end"]) == (4, 8)
+
+    # 删除窗口之前未挂载的消息时，仅移动窗口下标
+    token = store.delete(token, "m1")
+    state = assert_patch_matches_full_render(store, children, rendered, token)
+    assert (state["start"], state["end"]) == (3, 7)
+    assert state["deleted"] == [1]
+
+
+def test_deletions_for_full_render(store):
+    token = store.create([make_message(index) for index in range(8)])
+    _, rendered = render(store, token)
+
+    # 删除后重新生成（先删除再追加），下标按依次删除时的消息列表计算
+    changed = store.delete(token, "m5")
+    changed = store.delete(changed, "m6")
+    changed = store.append(changed, make_message(8, "assistant"))
+    assert chat_input_area_c.get_chat_history_deletions(rendered, changed) == [5, 5]
+
+    # 切换了会话或首次渲染时无法获取
+    assert chat_input_area_c.get_chat_history_deletions(rendered, store.create([])) is None
+    assert chat_input_area_c.get_chat_history_deletions(None, changed) is None
+
+
+def test_history_patch_replace_before_window_is_skipped(store):
+    token = store.create([make_message(index) for index in range(8)])
+    children, rendered = render(store, token)
+
+    token = store.replace(token, make_message(0, content="edited"))
+    patch, state = chat_input_area_c.build_chat_history_patch(rendered, token)
+    assert patch.to_plotly_json()["operations"] == []
+    assert (state["start"], state["end"]) == (4, 8)
+
+
+def test_history_patch_falls_back_to_full_render(store):
+    token = store.create([make_message(0)])
+    children, rendered = render(store, token)
+
+    # 追加不渲染的消息
+    hidden = store.append(token, {"id": "h", "role": "tool", "content": "x"})
+    assert chat_input_area_c.build_chat_history_patch(rendered, hidden) is None
+
+    # 变更过多
+    many = token
+    for index in range(chat_input_area_c.MAX_HISTORY_PATCH_CHANGES + 1):
+        many = store.append(many, make_message(index + 1))
+    assert chat_input_area_c.build_chat_history_patch(rendered, many) is None
+
+    # 切换了会话
+    other = store.create([make_message(0)])
+    assert chat_input_area_c.build_chat_history_patch(rendered, other) is None
+
+    # 已挂载的消息全部被删除
+    emptied = store.delete(token, "m0")
+    assert chat_input_area_c.build_chat_history_patch(rendered, emptied) is None
+
+
+@pytest.mark.parametrize("start, end", [(3, 7), (5, 9), (6, 9), (4, 8)])
+def test_window_patch_matches_full_render(store, start, end):
+    token = store.create([make_message(index) for index in range(10)])
+    messages = store.get(token)
+    children, rendered = render(store, token)
+    assert (rendered["start"], rendered["end"]) == (6, 10)
+
+    patch = chat_input_area_c.build_chat_history_window_patch(rendered, messages, start, end)
+    expected_children, _ = render(store, token, start, end)
+    assert normalize(apply_patch(children, patch)) == normalize(expected_children)
+
+
+def test_window_patch_without_overlap_returns_none(store):
+    token = store.create([make_message(index) for index in range(10)])
+    children, rendered = render(store, token)
+
+    assert chat_input_area_c.build_chat_history_window_patch(rendered, store.get(token), 0, 4) is None
+    assert chat_input_area_c.build_chat_history_window_patch(rendered, store.get(token), 2, 6) is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
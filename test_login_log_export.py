@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+登录日志流式导出 - 自动化测试脚本
+在临时sqlite数据库中写入多于单个导出分块的日志记录，检查导出结果完整且不重复
+"""
+
+import csv
+import io
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 项目根目录
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from configs.database_config import DatabaseConfig
+
+# 需在导入模型之前切换到临时数据库，并使用较小的导出分块
+TEMP_DIR = tempfile.mkdtemp()
+DatabaseConfig.database_type = "sqlite"
+DatabaseConfig.sqlite_config = {
+    **DatabaseConfig.sqlite_config,
+    "database": os.path.join(TEMP_DIR, "test_login_log_export.db"),
+}
+DatabaseConfig.read_replicas = []
+DatabaseConfig.login_logs_export_chunk_size = 3
+
+from app import app  # noqa: E402
+from models import db  # noqa: E402
+from models.users import Users  # noqa: E402
+from models.logs import LoginLogs  # noqa: E402
+from configs import AuthConfig  # noqa: E402
+
+ADMIN_USER_ID = "export-test-admin"
+
+
+def setup_module():
+    db.create_tables([Users, LoginLogs], safe=True)
+    Users.add_user(
+        user_id=ADMIN_USER_ID,
+        user_name=ADMIN_USER_ID,
+        password_hash="-",
+        user_role=AuthConfig.admin_role,
+    )
+
+    # 原始表分区4条，两个月度分区各2条，共8条，超过单个分块的3条
+    start = datetime(2026, 8, 1, 8, 0, 0)
+    LoginLogs.insert_many(
+        [
+            dict(
+                user_name=f"legacy{index}",
+                user_id=f"legacy{index}",
+                ip="127.0.0.1",
+                browser="Chrome",
+                os="Linux",
+                status="成功",
+                login_datetime=start + timedelta(days=index),
+            )
+            for index in range(4)
+        ]
+    ).execute()
+    LoginLogs.add_logs(
+        [
+            dict(
+                user_name=f"user{index}",
+                user_id=f"user{index}",
+                ip="127.0.0.1",
+                browser="Chrome",
+                os="Linux",
+                status="成功",
+                login_datetime=(start + timedelta(days=30 * (index // 2 + 1), hours=index))
+                .strftime("%Y-%m-%d %H:%M:%S"),
+            )
+            for index in range(4)
+        ]
+    )
+
+
+def export(export_format="csv"):
+    client = app.server.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = ADMIN_USER_ID
+        session["_fresh"] = True
+    return client.get(f"/api/login-logs/export?format={export_format}")
+
+
+def test_export_multiple_chunks_completes():
+    response = export()
+    assert response.status_code == 200
+
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    header, records = rows[0], rows[1:]
+    assert header[0] == "id"
+
+    # 每条记录恰好导出一次
+    assert len(records) == 8
+    assert len({record[0] for record in records}) == 8
+    assert sorted(record[1] for record in records) == sorted(
+        [f"legacy{index}" for index in range(4)] + [f"user{index}" for index in range(4)]
+    )
+
+
+def test_iter_log_chunks_tolerates_mutated_rows():
+    chunks = []
+    for chunk in LoginLogs.iter_log_chunks(chunk_size=3):
+        chunks.append(len(chunk))
+        # 调用方原地修改记录不影响后续分块
+        for item in chunk:
+            item["id"] = LoginLogs.get_log_key(item)
+            item["login_datetime"] = str(item["login_datetime"])
+        assert len(chunks) <= 3
+
+    assert chunks == [3, 3, 2]
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
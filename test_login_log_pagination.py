@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+登录日志键集分页 - 自动化测试脚本
+在临时sqlite数据库的原始表及多个月度分区中写入日志，检查各排序字段及方向下的游标翻页、
+偏移加游标的跳页以及跨分区UNION ALL查询的结果与逐表读取后排序的结果一致
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# 项目根目录
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from configs.database_config import DatabaseConfig
+
+# 需在导入模型之前切换到临时数据库
+TEMP_DIR = tempfile.mkdtemp()
+DatabaseConfig.database_type = "sqlite"
+DatabaseConfig.sqlite_config = {
+    **DatabaseConfig.sqlite_config,
+    "database": os.path.join(TEMP_DIR, "test_login_log_pagination.db"),
+}
+DatabaseConfig.read_replicas = []
+DatabaseConfig.login_logs_partitioning = True
+
+from app import app  # noqa: E402,F401
+from models import db  # noqa: E402
+from models.logs import LoginLogs, PARTITION_COLUMN  # noqa: E402
+
+PAGE_SIZE = 3
+ORDER_FIELDS = ["id", "user_name", "status", "login_datetime"]
+
+
+def make_log(index, login_datetime):
+    return dict(
+        # 用户名及状态存在大量相同取值，检查以(分区, id)补充排序后的稳定分页
+        user_name=f"user{index % 4}",
+        user_id=f"user{index % 4}",
+        ip="127.0.0.1",
+        browser="Chrome",
+        os="Linux",
+        status="成功" if index % 3 else "失败",
+        login_datetime=login_datetime,
+    )
+
+
+def setup_module():
+    db.create_tables([LoginLogs], safe=True)
+    LoginLogs.truncate_logs()
+
+    # 原始表分区与月度分区中存在相同的登录时间
+    start = datetime(2026, 8, 1, 8, 0, 0)
+    LoginLogs.insert_many(
+        [make_log(index, start + timedelta(days=index * 9)) for index in range(6)]
+    ).execute()
+    LoginLogs.add_logs(
+        [
+            make_log(index, (start + timedelta(days=index * 9)).strftime("%Y-%m-%d %H:%M:%S"))
+            for index in range(12)
+        ]
+    )
+
+
+def teardown_module():
+    LoginLogs.truncate_logs()
+
+
+def all_rows_sorted(order_by, order):
+    """逐个分区读取全部记录后在Python中排序，作为分页结果的参照"""
+    rows = []
+    for partition in LoginLogs.get_partitions(refresh=True):
+        model = LoginLogs._partition_model(partition)
+        with db.connection_context():
+            rows.extend({**row, PARTITION_COLUMN: partition} for row in model.select().dicts())
+
+    def sort_key(row):
+        key = (row[PARTITION_COLUMN], row["id"])
+        return key if order_by == "id" else (row[order_by],) + key
+
+    return sorted(rows, key=sort_key, reverse=order == "descend")
+
+
+def log_keys(rows):
+    return [LoginLogs.get_log_key(row) for row in rows]
+
+
+def test_partitions_span_legacy_and_months():
+    partitions = LoginLogs.get_partitions(refresh=True)
+    assert partitions[0] == "000000"
+    assert len(partitions) >= 4
+    assert len(LoginLogs.get_logs()) == 18
+
+
+@pytest.mark.parametrize("order", ["ascend", "descend"])
+@pytest.mark.parametrize("order_by", ORDER_FIELDS)
+def test_keyset_pages_follow_sort_order(order_by, order):
+    expected = log_keys(all_rows_sorted(order_by, order))
+
+    pages, after = [], None
+    while True:
+        page = LoginLogs.get_logs(
+            limit=PAGE_SIZE, offset=0, order_by=order_by, order=order, after=after
+        )
+        if not page:
+            break
+        pages.extend(page)
+        after = LoginLogs.get_seek_key(page[-1], order_by)
+        assert len(pages) <= len(expected)
+
+    assert log_keys(pages) == expected
+
+
+@pytest.mark.parametrize("order", ["ascend", "descend"])
+@pytest.mark.parametrize("order_by", ORDER_FIELDS)
+def test_offset_jump_from_cursor(order_by, order):
+    expected = log_keys(all_rows_sorted(order_by, order))
+
+    # 以第1页的游标为起点，跳过2页读取第4页
+    first_page = LoginLogs.get_logs(limit=PAGE_SIZE, offset=0, order_by=order_by, order=order)
+    fourth_page = LoginLogs.get_logs(
+        limit=PAGE_SIZE,
+        offset=2 * PAGE_SIZE,
+        order_by=order_by,
+        order=order,
+        after=LoginLogs.get_seek_key(first_page[-1], order_by),
+    )
+
+    assert log_keys(first_page) == expected[:PAGE_SIZE]
+    assert log_keys(fourth_page) == expected[3 * PAGE_SIZE : 4 * PAGE_SIZE]
+
+    # 无游标时的偏移分页结果一致
+    assert log_keys(
+        LoginLogs.get_logs(limit=PAGE_SIZE, offset=3 * PAGE_SIZE, order_by=order_by, order=order)
+    ) == expected[3 * PAGE_SIZE : 4 * PAGE_SIZE]
+
+
+def test_keyset_pages_with_filters():
+    start_datetime = datetime(2026, 9, 1)
+    end_datetime = datetime(2026, 10, 31, 23, 59, 59)
+    expected = log_keys(
+        row
+        for row in all_rows_sorted("login_datetime", "descend")
+        if row["user_name"].startswith("user1")
+        and start_datetime <= row["login_datetime"] <= end_datetime
+    )
+    assert expected
+
+    pages, after = [], None
+    while True:
+        page = LoginLogs.get_logs(
+            limit=1,
+            offset=0,
+            order_by="login_datetime",
+            order="descend",
+            user_name_keyword="user1",
+            start_datetime=start_datetime,
+            end_datetime=end_datetime,
+            after=after,
+        )
+        if not page:
+            break
+        pages.extend(page)
+        after = LoginLogs.get_seek_key(page[-1], "login_datetime")
+
+    assert log_keys(pages) == expected
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
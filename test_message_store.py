@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+服务端聊天消息存储 - 自动化测试脚本
+检查分块消息列表的结构共享、磁盘日志重放与压缩，以及多个进程共享存储目录时的版本分配
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 项目根目录
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.message_store.message_store import MessageList, MessageStore  # noqa: E402
+
+
+def make_message(index, role="user"):
+    return {"id": f"m{index}", "role": role, "content": f"c{index}"}
+
+
+def contents(messages):
+    return [message["content"] for message in messages]
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    return str(tmp_path / "message_store")
+
+
+def test_message_list_sequence_access():
+    messages = MessageList(make_message(index) for index in range(70))
+
+    assert len(messages) == 70
+    assert messages[0]["id"] == "m0"
+    assert messages[69]["id"] == "m69"
+    assert messages[-1]["id"] == "m69"
+    assert contents(messages[31:34]) == ["c31", "c32", "c33"]
+    assert contents(reversed(messages))[:2] == ["c69", "c68"]
+    assert messages.find("m40") == 40
+    assert messages.find("missing") == -1
+    with pytest.raises(IndexError):
+        messages[70]
+
+
+def test_message_list_append_shares_unchanged_chunks():
+    size = MessageList.CHUNK_SIZE
+    original = MessageList(make_message(index) for index in range(size + 1))
+    appended = original.appended(*(make_message(index) for index in range(size + 1, 2 * size + 5)))
+
+    assert len(original) == size + 1
+    assert len(appended) == 2 * size + 5
+    assert contents(appended) == [f"c{index}" for index in range(2 * size + 5)]
+    # 未变更的满块在新旧列表之间共享，仅复制末尾分块
+    assert appended._chunks[0] is original._chunks[0]
+    assert appended._chunks[1] is not original._chunks[1]
+    assert original.appended() is original
+
+
+def test_message_list_replace_copies_only_affected_chunk():
+    size = MessageList.CHUNK_SIZE
+    original = MessageList(make_message(index) for index in range(3 * size))
+    replaced = original.replaced(size + 1, {"id": "m33", "content": "new"})
+
+    assert original[size + 1]["content"] == f"c{size + 1}"
+    assert replaced[size + 1]["content"] == "new"
+    assert replaced._chunks[0] is original._chunks[0]
+    assert replaced._chunks[1] is not original._chunks[1]
+    assert replaced._chunks[2] is original._chunks[2]
+    # 同一分块中未替换的消息字典同样共享
+    assert replaced[size] is original[size]
+
+
+def test_message_list_delete_rebuilds_following_chunks():
+    size = MessageList.CHUNK_SIZE
+    original = MessageList(make_message(index) for index in range(3 * size))
+    deleted = original.deleted(size + 1)
+
+    assert len(original) == 3 * size
+    assert len(deleted) == 3 * size - 1
+    assert deleted.find(f"m{size + 1}") == -1
+    assert contents(deleted) == [f"c{index}" for index in range(3 * size) if index != size + 1]
+    assert deleted._chunks[0] is original._chunks[0]
+    # 删除后除末尾分块外仍为满块，按下标访问保持正确
+    assert [len(chunk) for chunk in deleted._chunks] == [size, size, size - 1]
+    assert deleted[2 * size]["id"] == f"m{2 * size + 1}"
+
+
+def test_store_replays_versions_from_disk(store_dir):
+    store = MessageStore(store_dir)
+    token_1 = store.create([make_message(0)])
+    token_2 = store.append(token_1, make_message(1, "assistant"))
+    token_3 = store.replace(token_2, {"id": "m1", "role": "assistant", "content": "edited"})
+    token_4 = store.delete(token_3, "m0")
+
+    assert token_4["count"] == 1
+    assert token_4["delta"] == {"op": "delete", "id": "m0"}
+
+    # 新实例（如其他进程）仅凭令牌从磁盘日志恢复各版本
+    fresh = MessageStore(store_dir)
+    assert contents(fresh.get(token_1)) == ["c0"]
+    assert contents(fresh.get(token_2)) == ["c0", "c1"]
+    assert contents(fresh.get(token_3)) == ["c0", "edited"]
+    assert contents(fresh.get(token_4)) == ["edited"]
+    assert fresh.get_stats()["disk_loads"] == 1
+
+    changes = fresh.get_changes(token_4, token_2["version"])
+    assert [record["op"] for _, record in changes] == ["replace", "delete"]
+    assert contents(changes[0][0]) == ["c0", "c1"]
+
+
+def test_store_recovers_evicted_keys(store_dir):
+    store = MessageStore(store_dir, max_sessions=1)
+    first = store.append(store.create([]), make_message(0))
+    store.create([make_message(1)])
+
+    assert store.get_stats()["evictions"] == 1
+    assert contents(store.get(first)) == ["c0"]
+    assert contents(store.get(store.append(first, make_message(2)))) == ["c0", "c2"]
+
+
+def test_store_compaction_bounds_log(store_dir, tmp_path):
+    store = MessageStore(store_dir, compact_threshold=5, max_versions=3)
+    token = store.create([])
+    for index in range(20):
+        token = store.append(token, make_message(index))
+
+    log_path = Path(store_dir) / f"{token['key']}.jsonl"
+    assert len(log_path.read_text(encoding="utf-8").splitlines()) <= 5
+    assert store.get_stats()["compactions"] >= 1
+    assert contents(MessageStore(store_dir).get(token)) == [f"c{index}" for index in range(20)]
+
+
+def test_store_follows_log_compacted_by_other_worker(store_dir):
+    worker_a = MessageStore(store_dir, compact_threshold=4)
+    worker_b = MessageStore(store_dir, compact_threshold=4)
+
+    token = worker_a.create([])
+    assert contents(worker_b.get(token)) == []
+
+    # 本进程写入触发压缩，日志被替换为新文件
+    for index in range(4):
+        token = worker_a.append(token, make_message(index))
+    assert worker_a.get_stats()["compactions"] == 1
+
+    # 其他进程基于最新令牌继续写入时重新加载压缩后的日志，版本号不与已有版本冲突
+    token_b = worker_b.append(token, make_message("b"))
+    assert token_b["version"] == token["version"] + 1
+    assert contents(worker_a.get(token_b)) == ["c0", "c1", "c2", "c3", "cb"]
+
+
+def test_concurrent_workers_get_distinct_versions(store_dir):
+    # 两个进程（以两个实例模拟）在内存中都持有基础版本，并同时基于该版本追加
+    worker_a = MessageStore(store_dir)
+    worker_b = MessageStore(store_dir)
+
+    base = worker_a.create([{"id": "u0", "role": "user", "content": "u0"}])
+    assert contents(worker_b.get(base)) == ["u0"]
+
+    token_a = worker_a.append(base, {"id": "a1", "role": "assistant", "content": "a1"})
+    token_b = worker_b.append(base, {"id": "b1", "role": "assistant", "content": "b1"})
+
+    assert token_a["version"] != token_b["version"]
+    # 任一进程均按令牌解析到生成该令牌的进程写入的消息
+    for worker in (worker_a, worker_b):
+        assert contents(worker.get(token_a)) == ["u0", "a1"]
+        assert contents(worker.get(token_b)) == ["u0", "b1"]
+
+    # 后续变更作用于令牌对应的消息列表
+    token_b2 = worker_a.delete(token_b, "u0")
+    assert contents(MessageStore(store_dir).get(token_b2)) == ["b1"]
+
+
+def test_compaction_keeps_versions_written_by_other_workers(store_dir):
+    worker_a = MessageStore(store_dir, compact_threshold=4)
+    worker_b = MessageStore(store_dir, compact_threshold=4)
+
+    token = worker_a.create([])
+    for index in range(3):
+        token = worker_a.append(token, make_message(index))
+    # 其他进程基于同一版本写入，随后本进程的写入触发压缩
+    token_b = worker_b.append(token, make_message("b"))
+    token_a = worker_a.append(token, make_message("a"))
+    assert worker_a.get_stats()["compactions"] == 1
+
+    fresh = MessageStore(store_dir)
+    assert contents(fresh.get(token_b)) == ["c0", "c1", "c2", "cb"]
+    assert contents(fresh.get(token_a)) == ["c0", "c1", "c2", "ca"]
+    assert fresh.get(token_a) is not fresh.get(token_b)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+用户表键集分页 - 自动化测试脚本
+在临时sqlite数据库中写入用户，检查各排序字段及方向下的游标翻页、偏移加游标的跳页以及筛选条件下的分页结果
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# 项目根目录
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from configs.database_config import DatabaseConfig
+
+# 需在导入模型之前切换到临时数据库
+TEMP_DIR = tempfile.mkdtemp()
+DatabaseConfig.database_type = "sqlite"
+DatabaseConfig.sqlite_config = {
+    **DatabaseConfig.sqlite_config,
+    "database": os.path.join(TEMP_DIR, "test_users_pagination.db"),
+}
+DatabaseConfig.read_replicas = []
+
+from app import app  # noqa: E402,F401
+from configs import AuthConfig  # noqa: E402
+from models import db  # noqa: E402
+from models.users import Users  # noqa: E402
+
+# 以统一的用户名前缀与应用初始化时创建的用户区分
+KEYWORD = "pagetest"
+PAGE_SIZE = 3
+ORDER_FIELDS = ["user_id", "user_name", "user_role"]
+USER_IDS = [f"u{index:02d}" for index in range(17)]
+
+
+def setup_module():
+    db.create_tables([Users], safe=True)
+    Users.delete_users(USER_IDS)
+    Users.add_users(
+        [
+            dict(
+                # 用户id与用户名的排序不一致，角色存在大量相同取值
+                user_id=user_id,
+                user_name=f"{KEYWORD}{(index * 7) % 17:02d}",
+                password_hash="x",
+                user_role=AuthConfig.admin_role if index % 3 == 0 else AuthConfig.normal_role,
+            )
+            for index, user_id in enumerate(USER_IDS)
+        ]
+    )
+
+
+def teardown_module():
+    Users.delete_users(USER_IDS)
+
+
+def all_users_sorted(order_by, order, user_roles=None):
+    """读取全部用户后在Python中排序，作为分页结果的参照"""
+    with db.connection_context():
+        users = [
+            user
+            for user in Users.select().where(Users.user_name.contains(KEYWORD)).dicts()
+            if not user_roles or user["user_role"] in user_roles
+        ]
+
+    def sort_key(user):
+        if order_by == "user_id":
+            return (user["user_id"],)
+        return (user[order_by], user["user_id"])
+
+    return sorted(users, key=sort_key, reverse=order == "descend")
+
+
+def user_ids(users):
+    return [user["user_id"] for user in users]
+
+
+def walk_pages(order_by, order, **filters):
+    pages, after = [], None
+    while True:
+        page, total = Users.query_page(
+            limit=PAGE_SIZE,
+            offset=0,
+            order_by=order_by,
+            order=order,
+            user_name_keyword=KEYWORD,
+            after=after,
+            **filters,
+        )
+        if not page:
+            return pages, total
+        pages.extend(page)
+        after = Users.get_seek_key(page[-1], order_by)
+        assert len(pages) <= total
+
+
+@pytest.mark.parametrize("order", ["ascend", "descend"])
+@pytest.mark.parametrize("order_by", ORDER_FIELDS)
+def test_keyset_pages_follow_sort_order(order_by, order):
+    pages, total = walk_pages(order_by, order)
+
+    assert total == len(USER_IDS)
+    assert user_ids(pages) == user_ids(all_users_sorted(order_by, order))
+
+
+@pytest.mark.parametrize("order", ["ascend", "descend"])
+@pytest.mark.parametrize("order_by", ORDER_FIELDS)
+def test_offset_jump_from_cursor(order_by, order):
+    expected = user_ids(all_users_sorted(order_by, order))
+
+    # 以第1页的游标为起点，跳过2页读取第4页
+    first_page, _ = Users.query_page(
+        limit=PAGE_SIZE, offset=0, order_by=order_by, order=order, user_name_keyword=KEYWORD
+    )
+    fourth_page, total = Users.query_page(
+        limit=PAGE_SIZE,
+        offset=2 * PAGE_SIZE,
+        order_by=order_by,
+        order=order,
+        user_name_keyword=KEYWORD,
+        after=Users.get_seek_key(first_page[-1], order_by),
+    )
+
+    assert total == len(USER_IDS)
+    assert user_ids(first_page) == expected[:PAGE_SIZE]
+    assert user_ids(fourth_page) == expected[3 * PAGE_SIZE : 4 * PAGE_SIZE]
+
+    # 无游标时的偏移分页结果一致
+    offset_page, _ = Users.query_page(
+        limit=PAGE_SIZE,
+        offset=3 * PAGE_SIZE,
+        order_by=order_by,
+        order=order,
+        user_name_keyword=KEYWORD,
+    )
+    assert user_ids(offset_page) == expected[3 * PAGE_SIZE : 4 * PAGE_SIZE]
+
+
+@pytest.mark.parametrize("order", ["ascend", "descend"])
+def test_keyset_pages_with_role_filter(order):
+    user_roles = [AuthConfig.admin_role]
+    pages, total = walk_pages("user_name", order, user_roles=user_roles)
+
+    expected = user_ids(all_users_sorted("user_name", order, user_roles))
+    assert total == len(expected) == 6
+    assert user_ids(pages) == expected
+
+
+def test_cursor_past_last_page_returns_empty():
+    last_user = all_users_sorted("user_name", "ascend")[-1]
+
+    page, total = Users.query_page(
+        limit=PAGE_SIZE,
+        order_by="user_name",
+        user_name_keyword=KEYWORD,
+        after=Users.get_seek_key(last_user, "user_name"),
+    )
+
+    assert page == []
+    assert total == len(USER_IDS)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
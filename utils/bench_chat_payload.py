@@ -0,0 +1,180 @@
+"""
+聊天回调请求/响应体积基准测试
+
+对比浏览器端消息存储保存完整消息列表（改造前）与仅保存服务端消息存储令牌（改造后）两种方式下，
+一轮文本对话中各聊天回调（core_chat_handler、handle_chat_interactions、trigger_sse、
+handle_message_operations）的请求体与响应体字节数。请求体与响应体按Dash回调协议构建，
+改造后的令牌由服务端消息存储实际生成
+
+命令：python -m utils.bench_chat_payload --sizes 10 100 1000
+"""
+
+import json
+import argparse
+import tempfile
+from datetime import datetime
+
+from configs.base_config import BaseConfig
+
+# 模拟消息内容：用户提问约60字，AI回复约600字
+USER_CONTENT = "最近总是睡不好，晚上容易醒，白天没精神，有什么调理的办法吗？" * 2
+ASSISTANT_CONTENT = "### 改善睡眠的建议\n\n" + "- 固定作息时间，睡前一小时避免使用电子设备，保持卧室安静、黑暗和适宜的温度。\n" * 16
+
+
+def build_messages(count: int) -> list:
+    """构建指定条数的历史消息"""
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": USER_CONTENT if i % 2 == 0 else ASSISTANT_CONTENT,
+            "timestamp": timestamp,
+            "id": f"usr-message-{i}" if i % 2 == 0 else f"ai-message-{i}",
+        }
+        for i in range(count)
+    ]
+
+
+def _request_size(inputs: dict, states: dict) -> int:
+    """按Dash回调协议计算请求体字节数"""
+
+    def props(values: dict) -> list:
+        return [
+            {"id": key.rsplit(".", 1)[0], "property": key.rsplit(".", 1)[1], "value": value}
+            for key, value in values.items()
+        ]
+
+    body = {
+        "output": "..ai-chat-x-messages-store.data..",
+        "inputs": props(inputs),
+        "changedPropIds": [next(iter(inputs))],
+        "state": props(states),
+    }
+    return len(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+
+
+def _response_size(outputs: dict) -> int:
+    """按Dash回调协议计算响应体字节数"""
+
+    response = {}
+    for key, value in outputs.items():
+        component_id, prop = key.rsplit(".", 1)
+        response.setdefault(component_id, {})[prop] = value
+    return len(json.dumps({"multi": True, "response": response}, ensure_ascii=False).encode("utf-8"))
+
+
+def measure_turn(history_size: int, store) -> dict:
+    """测量一轮文本对话中各聊天回调的请求体与响应体字节数，返回 {回调: {模式: (请求, 响应)}}"""
+
+    history = build_messages(history_size)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    user_message = {"role": "user", "content": USER_CONTENT, "timestamp": timestamp, "id": f"usr-message-{history_size}"}
+    ai_message = {
+        "role": "assistant",
+        "content": "正在思考中...",
+        "timestamp": timestamp,
+        "id": f"ai-message-{history_size + 1}",
+        "is_streaming": True,
+    }
+    sent = history + [user_message, ai_message]
+
+    token = store.create(history)
+    sent_token = store.append(token, user_message, ai_message)
+    cancel_token = store.delete(sent_token, ai_message["id"])
+
+    # SSE请求选项两种方式相同：仅携带最近的若干条历史消息
+    sse_options = {
+        "payload": json.dumps(
+            {
+                "messages": [
+                    {"role": m["role"], "content": m["content"]}
+                    for m in sent[:-1][-BaseConfig.max_history_messages_count:]
+                ],
+                "message_id": ai_message["id"],
+            },
+            ensure_ascii=False,
+        ),
+        "method": "POST",
+        "headers": {"Content-Type": "application/json"},
+    }
+
+    common_states = {"ai-chat-x-input.value": USER_CONTENT, "ai-chat-x-current-session-id.data": "conv-0001"}
+    common_outputs = {
+        "ai-chat-x-input.value": "",
+        "ai-chat-x-send-btn.loading": True,
+        "ai-chat-x-send-btn.disabled": True,
+    }
+
+    results = {}
+    for mode, before, after, after_cancel in (
+        ("改造前", history, sent, history),
+        ("改造后", token, sent_token, cancel_token),
+    ):
+        send_inputs = {"ai-chat-x-send-btn.nClicks": 1}
+        results.setdefault("core_chat_handler", {})[mode] = (
+            _request_size(send_inputs, {**common_states, "ai-chat-x-messages-store.data": before}),
+            _response_size({"ai-chat-x-messages-store.data": after, **common_outputs, "chat-X-sse.options": sse_options}),
+        )
+        results.setdefault("handle_chat_interactions", {})[mode] = (
+            _request_size(
+                send_inputs,
+                {
+                    **common_states,
+                    "ai-chat-x-messages-store.data": before,
+                    "voice-websocket-connection.data": {"client_id": "client-0001"},
+                },
+            ),
+            _response_size({"ai-chat-x-messages-store.data": after, **common_outputs}),
+        )
+        results.setdefault("trigger_sse", {})[mode] = (
+            _request_size(
+                {
+                    "ai-chat-x-messages-store.data": after,
+                    "voice-enable-voice.data": False,
+                    "voice-websocket-connection.data": {"client_id": "client-0001"},
+                },
+                {"ai-chat-x-current-session-id.data": "conv-0001"},
+            ),
+            _response_size({"chat-X-sse.url": "/stream", "chat-X-sse.options": sse_options}),
+        )
+        results.setdefault("handle_message_operations", {})[mode] = (
+            _request_size(
+                {'{"index":"%s","type":"ai-chat-x-cancel"}.nClicks' % ai_message["id"]: 1},
+                {
+                    "ai-chat-x-messages-store.data": after,
+                    "ai-chat-x-current-session-id.data": "conv-0001",
+                    "ai-chat-x-send-btn.nClicks": 1,
+                },
+            ),
+            _response_size({"ai-chat-x-messages-store.data": after_cancel}),
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="聊天回调请求/响应体积基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="历史消息条数")
+    args = parser.parse_args()
+
+    from core.message_store.message_store import MessageStore
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = MessageStore(store_dir=store_dir)
+        for size in args.sizes:
+            print(f"\n历史消息 {size} 条（请求/响应字节数）")
+            for callback_name, modes in measure_turn(size, store).items():
+                (before_request, before_response), (after_request, after_response) = (
+                    modes["改造前"],
+                    modes["改造后"],
+                )
+                print(
+                    f"  {callback_name:<28}"
+                    f"改造前 {before_request:>9,} / {before_response:>9,}    "
+                    f"改造后 {after_request:>7,} / {after_response:>7,}"
+                )
+
+
+if __name__ == "__main__":
+    main()
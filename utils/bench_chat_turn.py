@@ -0,0 +1,141 @@
+"""
+单轮对话消息处理开销基准测试
+
+对比改造前（每次变更对完整消息列表深拷贝后修改）与改造后（服务端消息存储中的分块不可变消息列表，
+变更时仅复制受影响的分块）两种方式下，一轮文本对话在服务端处理消息列表的耗时及内存分配：
+发送消息时追加用户消息及AI占位消息、构建SSE请求的历史消息、SSE完成时更新AI消息、生成聊天历史增量更新
+
+命令：python -m utils.bench_chat_turn --sizes 10 100 1000 --turns 50
+"""
+
+import copy
+import time
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+from configs.base_config import BaseConfig
+from utils.bench_chat_payload import build_messages, USER_CONTENT, ASSISTANT_CONTENT
+
+
+def _new_turn_messages(turn_id: int) -> tuple:
+    """构建一轮对话的用户消息及AI占位消息"""
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    user_message = {"role": "user", "content": USER_CONTENT, "timestamp": timestamp, "id": f"usr-turn-{turn_id}"}
+    ai_message = {
+        "role": "assistant",
+        "content": "正在思考中...",
+        "timestamp": timestamp,
+        "id": f"ai-turn-{turn_id}",
+        "is_streaming": True,
+    }
+    return user_message, ai_message
+
+
+def _conversation_messages(messages, ai_message_id: str, iterate_all: bool) -> list:
+    """构建SSE请求的历史消息，iterate_all为True时按改造前的方式遍历全部消息后截取"""
+
+    max_history = BaseConfig.max_history_messages_count
+    result = []
+    for m in (messages if iterate_all else reversed(messages)):
+        if not iterate_all and len(result) >= max_history:
+            break
+        if m.get("id") == ai_message_id or m.get("content") == "正在思考中...":
+            continue
+        if m.get("role") in ["user", "assistant", "agent"] and m.get("content", "").strip():
+            result.append({"role": "user" if m["role"] == "user" else "assistant", "content": m["content"].strip()})
+    return result[-max_history:] if iterate_all else result[::-1]
+
+
+def turn_before(messages: list, turn_id: int) -> list:
+    """改造前的一轮对话：深拷贝完整消息列表后追加、更新"""
+
+    user_message, ai_message = _new_turn_messages(turn_id)
+
+    updated_messages = copy.deepcopy(messages)
+    updated_messages.append(user_message)
+    updated_messages.append(ai_message)
+    _conversation_messages(updated_messages, ai_message["id"], iterate_all=True)
+
+    completed_messages = copy.deepcopy(updated_messages)
+    for i, message in enumerate(completed_messages):
+        if message.get("id") == ai_message["id"]:
+            completed_messages[i]["content"] = ASSISTANT_CONTENT
+            completed_messages[i]["is_streaming"] = False
+            break
+    return completed_messages
+
+
+def turn_after(store, token: dict, turn_id: int) -> dict:
+    """改造后的一轮对话：在服务端消息存储中追加、替换，并按变更记录生成聊天历史增量更新"""
+
+    user_message, ai_message = _new_turn_messages(turn_id)
+
+    sent_token = store.append(token, user_message, ai_message)
+    _conversation_messages(store.get(sent_token), ai_message["id"], iterate_all=False)
+
+    messages = store.get(sent_token)
+    index = messages.find(ai_message["id"])
+    completed_token = store.replace(
+        sent_token, {**messages[index], "content": ASSISTANT_CONTENT, "is_streaming": False}
+    )
+    store.get_changes(completed_token, token["version"])
+    return completed_token
+
+
+def measure(history_size: int, turns: int, store) -> dict:
+    """测量两种方式下单轮对话的平均耗时（微秒）及内存分配峰值中位数（KB）"""
+
+    results = {}
+
+    for mode in ("改造前", "改造后"):
+        history = build_messages(history_size)
+        state = store.create(history) if mode == "改造后" else history
+
+        peaks = []
+        elapsed = 0.0
+        tracemalloc.start()
+        for turn_id in range(turns):
+            tracemalloc.reset_peak()
+            before_size, _ = tracemalloc.get_traced_memory()
+            start_time = time.perf_counter()
+            # 各轮依次基于上一轮的结果，与实际对话一致
+            if mode == "改造前":
+                state = turn_before(state, turn_id)
+            else:
+                state = turn_after(store, state, turn_id)
+            elapsed += time.perf_counter() - start_time
+            _, turn_peak = tracemalloc.get_traced_memory()
+            peaks.append(turn_peak - before_size)
+        tracemalloc.stop()
+
+        results[mode] = (elapsed / turns * 1e6, sorted(peaks)[len(peaks) // 2] / 1024)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单轮对话消息处理开销基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="历史消息条数")
+    parser.add_argument("--turns", type=int, default=50, help="每种方式测量的对话轮数")
+    args = parser.parse_args()
+
+    from core.message_store.message_store import MessageStore
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = MessageStore(store_dir=store_dir)
+        print(f"{'历史消息数':<10}{'改造前 耗时/分配峰值':>26}{'改造后 耗时/分配峰值':>26}")
+        for size in args.sizes:
+            results = measure(size, args.turns, store)
+            (before_time, before_peak), (after_time, after_peak) = results["改造前"], results["改造后"]
+            print(
+                f"{size:<10}"
+                f"{before_time:>14,.0f}us / {before_peak:>7,.1f}KB"
+                f"{after_time:>14,.0f}us / {after_peak:>7,.1f}KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+登录日志写入延迟基准测试
+
+模拟登录高峰期多线程并发登录，对比同步写入（LoginLogs.add_log）与异步批量写入
+（audit_log_writer）两种方式下，单次登录请求中登录日志写入环节的耗时分布
+
+命令：python -m utils.bench_login_audit --threads 16 --logins 200
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+from configs.database_config import DatabaseConfig
+
+
+def _percentile(values: list, q: float) -> float:
+    """计算分位数"""
+
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def run_benchmark(mode: str, threads: int, logins: int):
+    """运行单个写入方式的基准测试，返回各次写入耗时（毫秒）及总耗时"""
+
+    from models.logs import LoginLogs
+    from core.audit_log_writer.audit_log_writer import audit_log_writer
+
+    LoginLogs.truncate_logs()
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def run(thread_index: int):
+        local_latencies = []
+        for i in range(logins):
+            record = dict(
+                user_name="bench-{}-{}".format(thread_index, i),
+                user_id=None,
+                ip="127.0.0.1",
+                browser="Chrome 120",
+                os="Linux",
+                status="登录成功",
+                login_datetime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            )
+            start_time = time.perf_counter()
+            if mode == "sync":
+                LoginLogs.add_log(**record)
+            else:
+                audit_log_writer.append(**record)
+            local_latencies.append((time.perf_counter() - start_time) * 1000)
+
+        with latencies_lock:
+            latencies.extend(local_latencies)
+
+    start_time = time.perf_counter()
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # 异步模式需计入全部记录落库完成的时间
+    if mode == "async":
+        audit_log_writer.flush()
+    elapsed = time.perf_counter() - start_time
+
+    assert LoginLogs.get_count(refresh=True) == threads * logins
+
+    return latencies, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="登录日志写入延迟基准测试")
+    parser.add_argument("--threads", type=int, default=16, help="并发登录线程数")
+    parser.add_argument("--logins", type=int, default=200, help="每个线程的登录次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 需在导入models之前切换至临时sqlite数据库
+        DatabaseConfig.database_type = "sqlite"
+        DatabaseConfig.sqlite_config = {
+            **DatabaseConfig.sqlite_config,
+            "database": os.path.join(tmp_dir, "bench.db"),
+        }
+
+        print("并发线程数: {}，每线程登录次数: {}".format(args.threads, args.logins))
+        for mode in ("sync", "async"):
+            latencies, elapsed = run_benchmark(mode, args.threads, args.logins)
+            print(
+                "\033[93m{:<6}\033[0m 单次写入耗时 p50 {:.3f}ms，p95 {:.3f}ms，p99 {:.3f}ms，"
+                "max {:.3f}ms，全部落库总耗时 {:.2f}秒".format(
+                    mode,
+                    _percentile(latencies, 0.5),
+                    _percentile(latencies, 0.95),
+                    _percentile(latencies, 0.99),
+                    max(latencies),
+                    elapsed,
+                )
+            )
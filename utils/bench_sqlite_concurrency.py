@@ -0,0 +1,161 @@
+"""
+sqlite并发写入基准测试
+
+模拟gunicorn多worker、多线程场景，对比默认sqlite配置与DatabaseConfig.sqlite_config
+调优配置下Conversations、LoginLogs写入吞吐量及database is locked错误数
+
+命令：python -m utils.bench_sqlite_concurrency --processes 4 --threads 4 --ops 200
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime
+
+from configs.database_config import DatabaseConfig
+
+# 调优前：与原默认后端一致，无pragma，每次操作新建连接
+BASELINE_PROFILE = {
+    "connection_policy": "per_call",
+    "pragmas": {},
+}
+
+# 调优后：使用当前配置中的sqlite参数
+TUNED_PROFILE = {
+    "connection_policy": DatabaseConfig.sqlite_config.get("connection_policy"),
+    "pragmas": DatabaseConfig.sqlite_config.get("pragmas"),
+}
+
+
+def _use_profile(database: str, profile: dict):
+    """在当前进程中切换至指定sqlite配置，需在导入models之前调用"""
+
+    DatabaseConfig.database_type = "sqlite"
+    DatabaseConfig.sqlite_config = {"database": database, **profile}
+
+
+def _init_tables(database: str, profile: dict):
+    """建表"""
+
+    _use_profile(database, profile)
+
+    from models import db
+    from models.conversations import Conversations
+    from models.logs import LoginLogs
+
+    with db.connection_context():
+        db.create_tables([Conversations, LoginLogs], safe=True)
+
+
+def _worker(database: str, profile: dict, threads: int, ops: int, result_queue):
+    """单个worker进程，内部以多线程并发写入"""
+
+    import threading
+
+    stats = {"ops": 0, "locked": 0, "errors": 0}
+    stats_lock = threading.Lock()
+
+    # 无论成功与否都返回统计结果，避免主进程阻塞等待
+    try:
+        _use_profile(database, profile)
+
+        from models.conversations import Conversations
+        from models.logs import LoginLogs
+
+        def run(thread_index: int):
+            local_stats = {"ops": 0, "locked": 0, "errors": 0}
+            for i in range(ops):
+                user_id = "bench-{}-{}-{}".format(os.getpid(), thread_index, i)
+                try:
+                    # 交替写入会话与登录日志
+                    if i % 2 == 0:
+                        Conversations.add_conversation(user_id=user_id)
+                    else:
+                        LoginLogs.add_log(
+                            user_name=user_id,
+                            user_id=user_id,
+                            ip="127.0.0.1",
+                            browser="Chrome 120",
+                            os="Linux",
+                            status="登录成功",
+                            login_datetime=datetime.now(),
+                        )
+                    local_stats["ops"] += 1
+                except Exception as e:
+                    if "locked" in str(e):
+                        local_stats["locked"] += 1
+                    else:
+                        local_stats["errors"] += 1
+
+            with stats_lock:
+                for key, value in local_stats.items():
+                    stats[key] += value
+
+        workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        result_queue.put(stats)
+
+
+def run_benchmark(profile_name: str, profile: dict, processes: int, threads: int, ops: int):
+    """运行单个配置的基准测试，返回统计结果"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database = os.path.join(tmp_dir, "bench.db")
+
+        # 预先建表，避免建表过程计入耗时
+        ctx = multiprocessing.get_context("spawn")
+        init_process = ctx.Process(target=_init_tables, args=(database, profile))
+        init_process.start()
+        init_process.join()
+
+        result_queue = ctx.Queue()
+        workers = [
+            ctx.Process(
+                target=_worker, args=(database, profile, threads, ops, result_queue)
+            )
+            for _ in range(processes)
+        ]
+
+        start_time = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        results = [result_queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start_time
+
+    total = {
+        key: sum(result[key] for result in results) for key in ("ops", "locked", "errors")
+    }
+    total["profile"] = profile_name
+    total["seconds"] = elapsed
+    total["ops_per_second"] = total["ops"] / elapsed if elapsed else 0.0
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="sqlite并发写入基准测试")
+    parser.add_argument("--processes", type=int, default=4, help="worker进程数")
+    parser.add_argument("--threads", type=int, default=4, help="每个进程的线程数")
+    parser.add_argument("--ops", type=int, default=200, help="每个线程的写入次数")
+    args = parser.parse_args()
+
+    print(
+        "进程数: {}，每进程线程数: {}，每线程写入次数: {}".format(
+            args.processes, args.threads, args.ops
+        )
+    )
+    for name, profile in (("baseline", BASELINE_PROFILE), ("tuned", TUNED_PROFILE)):
+        result = run_benchmark(name, profile, args.processes, args.threads, args.ops)
+        print(
+            "\033[93m{profile:<8}\033[0m 成功写入 {ops:>6} 次，耗时 {seconds:.2f}秒，"
+            "吞吐量 {ops_per_second:.1f} 次/秒，database is locked {locked} 次，其他错误 {errors} 次".format(
+                **result
+            )
+        )
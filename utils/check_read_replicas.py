@@ -0,0 +1,156 @@
+"""
+只读副本路由验证脚本
+
+使用两个本地sqlite数据库文件分别模拟主库与只读副本（两者之间不做真实复制，通过写入不同数据区分查询落点），
+依次验证只读方法发往副本、写入后读己之写窗口内发往主库、副本延迟超限及不可用时回退主库
+
+命令：python -m utils.check_read_replicas
+"""
+
+import os
+import time
+import sqlite3
+import tempfile
+from datetime import datetime
+
+from configs.database_config import DatabaseConfig
+
+
+def _check(title: str, actual, expected):
+    """打印单项检查结果"""
+
+    passed = actual == expected
+    print(
+        "{} {}：实际 {!r}，预期 {!r}".format(
+            "\033[92m通过\033[0m" if passed else "\033[91m失败\033[0m",
+            title,
+            actual,
+            expected,
+        )
+    )
+    return passed
+
+
+def set_replica_lag(replica_path: str, lag: float):
+    """设置副本模拟复制延迟"""
+
+    with sqlite3.connect(replica_path) as conn:
+        conn.execute("DELETE FROM replication_lag")
+        conn.execute("INSERT INTO replication_lag (lag) VALUES (?)", (lag,))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        primary_path = os.path.join(tmp_dir, "primary.db")
+        replica_path = os.path.join(tmp_dir, "replica.db")
+
+        # 需在导入models之前完成配置
+        DatabaseConfig.database_type = "sqlite"
+        DatabaseConfig.sqlite_config = {
+            **DatabaseConfig.sqlite_config,
+            "database": primary_path,
+        }
+        DatabaseConfig.read_replicas = [{"database": replica_path}]
+        DatabaseConfig.replica_lag_check_interval = 0
+        DatabaseConfig.replica_max_lag = 5
+        DatabaseConfig.read_your_writes_window = 1
+        DatabaseConfig.replica_lag_query = "SELECT lag FROM replication_lag"
+
+        # 副本中的延迟模拟表
+        with sqlite3.connect(replica_path) as conn:
+            conn.execute("CREATE TABLE replication_lag (lag REAL)")
+        set_replica_lag(replica_path, 0)
+
+        from models import db
+        from models.conversations import Conversations
+        from core.replica_router.replica_router import replica_router
+
+        # 在主库及副本中分别建表，模拟已完成复制的表结构
+        db.create_tables([Conversations])
+        replica = replica_router.replicas[0]
+        with replica.connection_context(), replica.bind_ctx([Conversations]):
+            replica.create_tables([Conversations])
+
+        current_user = {"user_id": None}
+        replica_router.set_identity_getter(lambda: current_user["user_id"])
+
+        # 主库写入两个会话，副本仅有一个，以会话数量区分查询落点
+        current_user["user_id"] = "alice"
+        Conversations.add_conversation("alice", conv_name="主库会话1")
+        time.sleep(0.01)
+        Conversations.add_conversation("alice", conv_name="主库会话2")
+        with replica.connection_context(), replica.bind_ctx([Conversations]):
+            Conversations.insert(
+                conv_id="conv-alice-replica",
+                user_id="alice",
+                conv_name="副本会话",
+                conv_time=datetime.now(),
+            ).execute()
+
+        results = []
+
+        current_user["user_id"] = "bob"
+        results.append(
+            _check(
+                "未写入用户读取发往副本",
+                len(Conversations.get_user_conversations("alice")),
+                1,
+            )
+        )
+
+        current_user["user_id"] = "alice"
+        results.append(
+            _check(
+                "写入用户在读己之写窗口内读取发往主库",
+                len(Conversations.get_user_conversations("alice")),
+                2,
+            )
+        )
+
+        time.sleep(DatabaseConfig.read_your_writes_window + 0.1)
+        results.append(
+            _check(
+                "读己之写窗口结束后读取发往副本",
+                len(Conversations.get_user_conversations("alice")),
+                1,
+            )
+        )
+
+        set_replica_lag(replica_path, 30)
+        results.append(
+            _check(
+                "副本延迟超限时读取回退主库",
+                len(Conversations.get_user_conversations("alice")),
+                2,
+            )
+        )
+
+        set_replica_lag(replica_path, 0)
+        results.append(
+            _check(
+                "副本延迟恢复后读取发往副本",
+                len(Conversations.get_user_conversations("alice")),
+                1,
+            )
+        )
+
+        with sqlite3.connect(replica_path) as conn:
+            conn.execute("DROP TABLE replication_lag")
+        results.append(
+            _check(
+                "副本不可用时读取回退主库",
+                len(Conversations.get_user_conversations("alice")),
+                2,
+            )
+        )
+
+        results.append(
+            _check(
+                "非只读方法始终发往主库",
+                len(Conversations.get_all_conversations()),
+                2,
+            )
+        )
+
+        print("路由统计：{}".format(replica_router.get_stats()))
+        print("全部通过" if all(results) else "存在未通过的检查项")
@@ -12,6 +12,7 @@ from views.core_pages import chat
 # 令绑定的回调函数子模块生效
 import callbacks.core_pages_c  # noqa: F401
 from utils.log import log as log
+from core.layout_cache.layout_cache import layout_slot, render_cached_layout
 
 
 def get_page_search_options(current_user_access_rule: str):
@@ -96,6 +97,42 @@ def render(current_user_access_rule: str, current_pathname: str = None):
         if match_pattern == RouterConfig.wildcard_patterns["独立通配页面演示"]:
             return independent_wildcard_page_demo.render(pathname=current_pathname)
 
+    # 使用按角色缓存的页面骨架，仅渲染当前用户的头像及用户名
+    return render_cached_layout(
+        ("core_pages", current_user.user_role),
+        lambda: _create_layout(current_user_access_rule),
+        {
+            "user_avatar": _render_user_avatar,
+            "user_name": _render_user_name,
+        },
+    )
+
+
+def _render_user_avatar():
+    """渲染当前用户头像"""
+    return fac.AntdAvatar(
+        mode="text",
+        text=current_user.user_icon if current_user.user_icon else "👨‍💼",
+        size=36,
+        style=style(background="#f4f6f9"),
+    )
+
+
+def _render_user_name():
+    """渲染当前用户名"""
+    return fac.AntdText(
+        current_user.user_name.capitalize(),
+        strong=True,
+    )
+
+
+def _create_layout(current_user_access_rule: str):
+    """创建核心页面骨架，同一角色的全部用户相同，按用户变化的部分以占位组件代替
+
+    Args:
+        current_user_access_rule (str): 当前用户页面可访问性规则
+    """
+
     return html.Div(
         [
             # 核心页面常量参数数据
@@ -304,19 +341,11 @@ def render(current_user_access_rule: str, current_pathname: str = None):
                                             )
                                         ),
                                         # 用户头像
-                                        fac.AntdAvatar(
-                                            mode="text",
-                                            text=current_user.user_icon if current_user.user_icon else "👨‍💼",
-                                            size=36,
-                                            style=style(background="#f4f6f9"),
-                                        ),
+                                        layout_slot("user_avatar"),
                                         # 用户名+角色
                                         fac.AntdFlex(
                                             [
-                                                fac.AntdText(
-                                                    current_user.user_name.capitalize(),
-                                                    strong=True,
-                                                ),
+                                                layout_slot("user_name"),
                                                 fac.AntdText(
                                                     "角色：{}".format(
                                                         AuthConfig.roles.get(
@@ -10,10 +10,10 @@ from feffery_dash_utils.style_utils import style
 from components.chat_agent_message import ChatAgentMessage as render_agent_message
 from components.chat_feature_hints import ChatFeatureHints as render_feature_hints
 from components.chat_user_message import ChatUserMessage as render_user_message
-from components.chat_session_list import render as render_session_list
+from components.chat_session_list import render as render_session_list, get_session_items
 from components.mobile_session_list import render_mobile_session_list
 from components.chat_input_area import render as render_chat_input_area
-from components.ai_chat_message_history import AiChatMessageHistory
+from components.ai_chat_message_history import render_welcome_hint
 from components.health_record import render_health_record_drawer
 from components.preference import render as render_preference_drawer
 
@@ -22,6 +22,7 @@ from configs import BaseConfig
 from configs.voice_config import VoiceConfig
 from flask_login import current_user
 from utils.log import log
+from core.layout_cache.layout_cache import layout_slot, render_cached_layout
 
 # 令对当当前页面的回调函数子模块生效
 import callbacks.core_pages_c.chat_c  # noqa: F401
@@ -72,19 +73,11 @@ def _create_header_content():
                 children=fac.AntdSpace(
                     [
                         # 用户头像
-                        fac.AntdAvatar(
-                            mode="text",
-                            text=current_user.user_icon if current_user.user_icon else "👨‍💼",
-                            size=36,
-                            style=style(background="#f4f6f9"),
-                        ),
+                        layout_slot("user_avatar"),
                         # 用户名+角色
                         fac.AntdFlex(
                             [
-                                fac.AntdText(
-                                    current_user.user_name.capitalize(),
-                                    strong=True,
-                                )
+                                layout_slot("user_name")
                             ],
                             vertical=True,
                         ),
@@ -132,11 +125,29 @@ def _create_header_content():
     )
 
 
+def _render_user_avatar():
+    """渲染当前用户头像"""
+    return fac.AntdAvatar(
+        mode="text",
+        text=current_user.user_icon if current_user.user_icon else "👨‍💼",
+        size=36,
+        style=style(background="#f4f6f9"),
+    )
+
+
+def _render_user_name():
+    """渲染当前用户名"""
+    return fac.AntdText(
+        current_user.user_name.capitalize(),
+        strong=True,
+    )
+
+
 def _create_sider_content():
     """创建侧边栏内容"""
     return html.Div(
         id='ai-chat-x-session-list-container',
-        children=render_session_list(user_id=current_user.id)
+        children=layout_slot("session_list")
     )
 
 
@@ -218,7 +229,7 @@ def _create_content_area():
                             id='ai-chat-x-mobile-session-popup',
                             content=html.Div(
                                 id='ai-chat-x-mobile-session-content',
-                                children=render_mobile_session_list(user_id=current_user.id),
+                                children=layout_slot("mobile_session_list"),
                                 style={
                                     'width': '300px',
                                     'maxHeight': '400px',
@@ -251,11 +262,19 @@ def _create_content_area():
     chat_history = fuc.FefferyDiv(
         id="ai-chat-x-history",
         children=[
+            # 虚拟滚动窗口之前、之后未挂载消息的占位元素，高度由前端按已测量的消息高度设置
+            html.Div(id="ai-chat-x-history-spacer-top"),
             html.Div(
                 id="ai-chat-x-history-content",
-                children=AiChatMessageHistory(messages=None),
+                # 欢迎提示含渲染时间，按请求注入，不随骨架缓存
+                children=[layout_slot("welcome_hint")],
                 **{"data-dummy": {}}
-            )
+            ),
+            html.Div(id="ai-chat-x-history-spacer-bottom"),
+            # 聊天历史已渲染的消息存储版本及已挂载的消息窗口，用于按消息存储的变更记录增量更新
+            dcc.Store(id="ai-chat-x-history-rendered"),
+            # 前端按滚动位置请求挂载的消息窗口
+            dcc.Store(id="ai-chat-x-history-viewport")
         ],
         scrollbar='simple',
         style=style(
@@ -308,8 +327,8 @@ def _create_state_stores():
         data=False  # 默认不折叠
     )
     
-    # 添加消息历史存储
-    messages_store = dcc.Store(id='ai-chat-x-messages-store', data=[])
+    # 添加消息历史存储，仅保存服务端消息存储的令牌（存储键、版本号及本次变更）
+    messages_store = dcc.Store(id='ai-chat-x-messages-store', data=None)
     
     # 添加当前会话ID存储
     current_session_id_store = dcc.Store(id='ai-chat-x-current-session-id', data='')
@@ -391,6 +410,8 @@ def _create_state_stores():
                         VOICE_CALL_SHOW_TRANSCRIPTION: ''' + ('true' if VoiceConfig.VOICE_CALL_SHOW_TRANSCRIPTION else 'false') + ''',
                         VOICE_CALL_SAVE_TO_DATABASE: ''' + ('true' if VoiceConfig.VOICE_CALL_SAVE_TO_DATABASE else 'false') + ''',
                         VOICE_CALL_AUTO_SAVE_ON_END: ''' + ('true' if VoiceConfig.VOICE_CALL_AUTO_SAVE_ON_END else 'false') + ''',
+                        VOICE_CALL_INCREMENTAL_SAVE: ''' + ('true' if VoiceConfig.VOICE_CALL_INCREMENTAL_SAVE else 'false') + ''',
+                        VOICE_CALL_TRANSCRIPT_BATCH_MAX_MESSAGES: ''' + str(VoiceConfig.VOICE_CALL_TRANSCRIPT_BATCH_MAX_MESSAGES) + ''',
                         VOICE_CALL_MAX_DISPLAY_MESSAGES: ''' + str(VoiceConfig.VOICE_CALL_MAX_DISPLAY_MESSAGES) + ''',
                         VOICE_CALL_TRANSCRIPTION_DEBOUNCE: ''' + str(VoiceConfig.VOICE_CALL_TRANSCRIPTION_DEBOUNCE) + ''',
                         VOICE_CALL_STREAMING_DISPLAY: ''' + ('true' if VoiceConfig.VOICE_CALL_STREAMING_DISPLAY else 'false') + '''
@@ -803,7 +824,24 @@ def _create_state_stores():
 
 
 def render():
-    """子页面：AntDesign X风格AI聊天界面"""
+    """子页面：AntDesign X风格AI聊天界面，使用缓存的页面骨架，仅渲染当前用户的头像、用户名、会话列表及欢迎提示"""
+    # 桌面端与移动端会话列表共用一次会话查询
+    sessions = get_session_items(current_user.id)
+    return render_cached_layout(
+        ("chat",),
+        _create_layout,
+        {
+            "user_avatar": _render_user_avatar,
+            "user_name": _render_user_name,
+            "session_list": lambda: render_session_list(sessions=sessions),
+            "mobile_session_list": lambda: render_mobile_session_list(sessions=sessions),
+            "welcome_hint": render_welcome_hint,
+        }
+    )
+
+
+def _create_layout():
+    """创建页面骨架，按用户变化的部分以占位组件代替"""
     
     # 创建各个部分的内容
     header_content = _create_header_content()
@@ -1,3 +1,4 @@
+from dash import dcc
 import feffery_antd_components as fac
 import feffery_utils_components as fuc
 from feffery_dash_utils.style_utils import style
@@ -14,6 +15,8 @@ def render():
     return [
         # 稳定触发初始化数据加载
         fuc.FefferyTimeout(id="core-login-logs-table-init-data-trigger", delay=0),
+        # 记录已加载各页最后一条记录对应的键集分页游标
+        dcc.Store(id="core-login-logs-table-page-cursors"),
         fac.AntdSpace(
             [
                 fac.AntdBreadcrumb(
@@ -0,0 +1,143 @@
+from datetime import date, timedelta
+import feffery_antd_components as fac
+import feffery_utils_components as fuc
+from feffery_dash_utils.style_utils import style
+
+# 令对应当前页面的回调函数子模块生效
+import callbacks.core_pages_c.usage_stats_c  # noqa: F401
+
+# 统计指标卡片：(指标字段, 标题)
+STATISTIC_ITEMS = [
+    ("messages", "消息数"),
+    ("active_users", "活跃用户数"),
+    ("conversations", "新建会话数"),
+    ("avg_conversation_length", "平均会话长度"),
+    ("logins", "登录次数"),
+]
+
+
+def render():
+    """子页面：系统管理-运营分析-使用统计"""
+
+    today = date.today()
+
+    return [
+        # 稳定触发初始化数据加载
+        fuc.FefferyTimeout(id="core-usage-stats-init-data-trigger", delay=0),
+        fac.AntdSpace(
+            [
+                fac.AntdBreadcrumb(
+                    items=[
+                        {"title": "系统管理"},
+                        {"title": "运营分析"},
+                        {"title": "使用统计"},
+                    ]
+                ),
+                fac.AntdSpace(
+                    [
+                        fac.AntdDateRangePicker(
+                            id="core-usage-stats-date-range",
+                            value=[
+                                (today - timedelta(days=29)).strftime("%Y-%m-%d"),
+                                today.strftime("%Y-%m-%d"),
+                            ],
+                            allowClear=False,
+                        ),
+                        fac.AntdButton(
+                            "刷新",
+                            id="core-usage-stats-refresh",
+                            color="primary",
+                            variant="filled",
+                        ),
+                        fac.AntdText(id="core-usage-stats-query-time", type="secondary"),
+                    ]
+                ),
+                fac.AntdSpin(
+                    fac.AntdSpace(
+                        [
+                            fac.AntdRow(
+                                [
+                                    fac.AntdCol(
+                                        fac.AntdCard(
+                                            fac.AntdStatistic(
+                                                id=f"core-usage-stats-{key}",
+                                                title=title,
+                                                value=0,
+                                            ),
+                                            size="small",
+                                        ),
+                                        flex=1,
+                                    )
+                                    for key, title in STATISTIC_ITEMS
+                                ],
+                                gutter=12,
+                            ),
+                            fac.AntdRow(
+                                [
+                                    fac.AntdCol(
+                                        fac.AntdCard(
+                                            fac.AntdTable(
+                                                id="core-usage-stats-daily-table",
+                                                columns=[
+                                                    {"dataIndex": "stat_date", "title": "日期"},
+                                                    {"dataIndex": "messages", "title": "消息数"},
+                                                    {"dataIndex": "user_messages", "title": "用户消息数"},
+                                                    {"dataIndex": "active_users", "title": "活跃用户数"},
+                                                    {"dataIndex": "conversations", "title": "新建会话数"},
+                                                    {"dataIndex": "logins", "title": "登录次数"},
+                                                ],
+                                                data=[],
+                                                pagination={"pageSize": 10, "showSizeChanger": False},
+                                                bordered=True,
+                                                size="small",
+                                            ),
+                                            title="每日趋势",
+                                            size="small",
+                                        ),
+                                        span=16,
+                                    ),
+                                    fac.AntdCol(
+                                        fac.AntdCard(
+                                            fac.AntdSpace(
+                                                id="core-usage-stats-topic-distribution",
+                                                direction="vertical",
+                                                style=style(width="100%"),
+                                            ),
+                                            title="话题点击分布",
+                                            size="small",
+                                        ),
+                                        span=8,
+                                    ),
+                                ],
+                                gutter=12,
+                            ),
+                            fac.AntdCard(
+                                fac.AntdTable(
+                                    id="core-usage-stats-top-users-table",
+                                    columns=[
+                                        {"dataIndex": "user_id", "title": "用户id"},
+                                        {"dataIndex": "messages", "title": "消息数"},
+                                        {"dataIndex": "user_messages", "title": "用户消息数"},
+                                        {"dataIndex": "conversations", "title": "新建会话数"},
+                                        {"dataIndex": "logins", "title": "登录次数"},
+                                        {"dataIndex": "active_days", "title": "活跃天数"},
+                                    ],
+                                    data=[],
+                                    pagination=False,
+                                    bordered=True,
+                                    size="small",
+                                ),
+                                title="活跃用户排行",
+                                size="small",
+                            ),
+                        ],
+                        direction="vertical",
+                        style=style(width="100%"),
+                    ),
+                    delay=300,
+                ),
+            ],
+            direction="vertical",
+            style=style(width="100%"),
+        ),
+    ]
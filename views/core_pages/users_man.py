@@ -1,3 +1,4 @@
+from dash import dcc, html
 import feffery_antd_components as fac
 import feffery_utils_components as fuc
 from feffery_dash_utils.style_utils import style
@@ -15,6 +16,8 @@ def render():
     return [
         # 稳定触发初始化数据加载
         fuc.FefferyTimeout(id="core-users-table-init-data-trigger", delay=0),
+        # 记录已加载各页最后一条记录对应的键集分页游标
+        dcc.Store(id="core-users-table-page-cursors"),
         fac.AntdSpace(
             [
                 fac.AntdBreadcrumb(
@@ -67,7 +70,7 @@ def render():
                         ],
                         pagination={
                             "current": 1,
-                            "total": len(Users.get_all_users()),  # 获取用户总数
+                            "total": Users.get_count(),  # 获取用户总数
                             "pageSize": 10,
                             "showSizeChanger": False,
                         },
@@ -104,6 +107,12 @@ def render():
                                     color="primary",
                                     variant="filled",
                                 ),
+                                fac.AntdButton(
+                                    "批量导入",
+                                    id="core-users-import-users",
+                                    color="primary",
+                                    variant="filled",
+                                ),
                                 fac.AntdPopconfirm(
                                     fac.AntdButton(
                                         "删除选中",
@@ -131,6 +140,71 @@ def render():
                     maskClosable=False,
                     visible=False,
                 ),
+                # 批量导入用户模态框
+                fac.AntdDrawer(
+                    [
+                        fac.AntdSpace(
+                            [
+                                fac.AntdText(
+                                    "上传csv或xlsx格式的用户表，user_name（用户名）、password（密码）列必填，"
+                                    "user_id（用户id，默认同用户名）、user_role（用户角色，默认常规用户）、"
+                                    "user_icon（用户头像）列可选",
+                                    type="secondary",
+                                ),
+                                fac.AntdButton(
+                                    "下载导入模板",
+                                    id="core-users-import-template",
+                                    icon=fac.AntdIcon(icon="antd-download"),
+                                ),
+                                dcc.Upload(
+                                    fac.AntdButton(
+                                        "选择文件并导入",
+                                        type="primary",
+                                        icon=fac.AntdIcon(icon="antd-upload"),
+                                        block=True,
+                                    ),
+                                    id="core-users-import-upload",
+                                    accept=".csv,.xlsx",
+                                    multiple=False,
+                                ),
+                                # 导入在后台任务中执行，执行期间展示进度及取消按钮
+                                html.Div(
+                                    [
+                                        fac.AntdProgress(
+                                            id="core-users-import-progress",
+                                            percent=0,
+                                        ),
+                                        fac.AntdSpace(
+                                            [
+                                                fac.AntdText(
+                                                    id="core-users-import-progress-text",
+                                                    type="secondary",
+                                                ),
+                                                fac.AntdButton(
+                                                    "取消导入",
+                                                    id="core-users-import-cancel",
+                                                    size="small",
+                                                    danger=True,
+                                                ),
+                                            ],
+                                        ),
+                                    ],
+                                    id="core-users-import-progress-container",
+                                    style=style(display="none"),
+                                ),
+                                html.Div(id="core-users-import-result"),
+                            ],
+                            direction="vertical",
+                            style=style(width="100%"),
+                        ),
+                    ],
+                    id="core-users-import-modal",
+                    title=fac.AntdSpace([fac.AntdIcon(icon="antd-usergroup-add"), "批量导入用户"]),
+                    mask=False,
+                    placement='right',
+                    width="40vw",
+                    visible=False,
+                ),
                 # 编辑用户模态框
                 fac.AntdDrawer(
                     id="core-users-edit-modal",